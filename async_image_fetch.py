@@ -0,0 +1,142 @@
+"""
+Non-blocking image downloads for asyncio code.
+
+The Playwright sold-listing matcher runs on an event loop shared with the
+browser, so image downloads must not block it. AsyncImageFetcher downloads
+many images concurrently while capping the number of requests in flight,
+both overall and per host (eBay's image CDN throttles clients that open too
+many connections at once):
+
+    async with AsyncImageFetcher() as fetcher:
+        images = await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+
+Images already in the shared on-disk image cache (image_cache.py) are
+returned without a request, and downloads are added to it. aiohttp is used
+when it is installed; otherwise each download runs requests.get in the
+default thread pool, with the same concurrency caps.
+The caps come from the 'image_comparison.fetch_concurrency' and
+'image_comparison.fetch_per_host' settings.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from image_cache import get_image_cache
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_HOST = 6
+
+
+def _fetch_limits() -> tuple:
+    """(total, per host) request caps from settings."""
+    try:
+        from settings_manager import get_setting
+        total = int(get_setting('image_comparison.fetch_concurrency', DEFAULT_CONCURRENCY))
+        per_host = int(get_setting('image_comparison.fetch_per_host', DEFAULT_PER_HOST))
+    except Exception:
+        total, per_host = DEFAULT_CONCURRENCY, DEFAULT_PER_HOST
+    return max(1, total), max(1, per_host)
+
+
+class AsyncImageFetcher:
+    """Concurrent image downloader with total and per-host concurrency caps."""
+
+    def __init__(self, max_concurrency: Optional[int] = None, per_host: Optional[int] = None,
+                 timeout: float = 10.0, headers: Optional[Dict[str, str]] = None, use_cache: bool = True):
+        """
+        Args:
+            max_concurrency: Requests in flight overall (default: settings)
+            per_host: Requests in flight per host (default: settings)
+            timeout: Per-request timeout in seconds
+            headers: Request headers (default: a desktop browser User-Agent)
+            use_cache: Read and fill the shared image cache
+        """
+        total, host = _fetch_limits()
+        self.max_concurrency = max_concurrency or total
+        self.per_host = per_host or host
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.use_cache = use_cache
+        self.logger = logging.getLogger(__name__)
+
+        # Created on first use, inside the running event loop
+        self._total: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Close the HTTP session (the fetcher can't be used afterwards)."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Download one URL.
+
+        Args:
+            url: Image URL
+
+        Returns:
+            Response body, or None on any network or HTTP error
+        """
+        if self._total is None:
+            self._total = asyncio.Semaphore(self.max_concurrency)
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+
+        loop = asyncio.get_running_loop()
+        cache = get_image_cache() if self.use_cache else None
+        try:
+            if cache is not None:
+                # Disk reads and writes stay off the event loop
+                data = await loop.run_in_executor(None, cache.lookup, url)
+                if data is not None:
+                    return data
+
+            async with self._hosts[host], self._total:
+                if AIOHTTP_AVAILABLE:
+                    data = await self._fetch_aiohttp(url)
+                else:
+                    data = await loop.run_in_executor(None, self._fetch_requests, url)
+
+            if cache is not None:
+                await loop.run_in_executor(None, cache.store, url, data)
+            return data
+        except Exception as e:
+            self.logger.debug(f"Error downloading {url}: {e}")
+            return None
+
+    async def _fetch_aiohttp(self, url: str) -> bytes:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    def _fetch_requests(self, url: str) -> bytes:
+        response = requests.get(url, timeout=self.timeout, headers=self.headers)
+        response.raise_for_status()
+        return response.content
@@ -0,0 +1,158 @@
+"""
+Vectorized similarity metrics for one-vs-many and many-vs-many scoring.
+
+The cheap image metrics - histogram correlation, cosine similarity of
+downscaled images, SSIM - used to be computed pair by pair with
+cv2.compareHist / np.dot / skimage. Scoring a reference against M
+candidates then pays Python and call overhead M times and recomputes the
+reference's statistics every time. The functions here stack the inputs
+into matrices and score everything in a few NumPy operations:
+
+    correlation_matrix(ref_hists, candidate_hists)   # (N, D) x (M, D) -> (N, M)
+    correlation_matrix(ref_hist, candidate_hists)    # (D,) x (M, D)  -> (M,)
+    ssim_matrix(ref_grays, candidate_grays)          # (N, H, W) x (M, H, W) -> (N, M)
+
+Results match the pairwise implementations they replace:
+
+- correlation_matrix == cv2.compareHist(a, b, cv2.HISTCMP_CORREL)
+  (pass `samples` to match compareHist on a multi-channel array, which
+  divides its sums by the pixel count instead of the element count)
+- cosine_matrix == np.dot(a / (|a| + 1e-8), b / (|b| + 1e-8))
+- ssim_matrix == skimage.metrics.structural_similarity(a, b) with its
+  defaults for uint8 images (7x7 uniform window, sample covariance,
+  data range 255)
+"""
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+ArrayOrStack = Union[np.ndarray, Sequence[np.ndarray]]
+
+SSIM_WINDOW = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+# Candidates scored per step in ssim_matrix (bounds the float64 temporaries)
+SSIM_CHUNK = 16
+
+
+def stack_rows(arrays: ArrayOrStack) -> np.ndarray:
+    """
+    Stack arrays into an (N, D) float64 matrix.
+
+    A 1-D array is one row; any other array has one row per entry along its
+    first axis. A list holds one (flattened) row per element.
+    """
+    if isinstance(arrays, np.ndarray):
+        rows = arrays[None] if arrays.ndim == 1 else arrays
+        return rows.reshape(len(rows), -1).astype(np.float64, copy=False)
+    return np.stack([np.asarray(array, dtype=np.float64).ravel() for array in arrays])
+
+
+def correlation_matrix(refs: ArrayOrStack, candidates: ArrayOrStack,
+                       samples: Optional[int] = None) -> np.ndarray:
+    """
+    Pearson correlation of every reference row with every candidate row.
+
+    Args:
+        refs: One vector (D,) or N vectors (N, D) / list of arrays
+        candidates: M vectors (M, D) / list of arrays
+        samples: Count the sums are divided by (default D). compareHist on an
+            (H, W, C) array uses H * W, the pixel count of its C-channel image
+
+    Returns:
+        (M,) scores for a single reference vector, otherwise (N, M)
+    """
+    single = isinstance(refs, np.ndarray) and refs.ndim == 1
+    a = stack_rows(refs)
+    b = stack_rows(candidates)
+    # Same sums as compareHist: sum(ab) - sum(a) sum(b) / n over sum(aa) - sum(a)^2 / n etc.
+    n = a.shape[1] if samples is None else samples
+    sum_a, sum_b = a.sum(axis=1), b.sum(axis=1)
+    numerator = a @ b.T - np.outer(sum_a, sum_b) / n
+    scale = np.outer((a * a).sum(axis=1) - sum_a * sum_a / n, (b * b).sum(axis=1) - sum_b * sum_b / n)
+    # compareHist returns 1.0 when either histogram is constant
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(np.abs(scale) > np.finfo(np.float64).eps, numerator / np.sqrt(scale), 1.0)
+    return scores[0] if single else scores
+
+
+def cosine_matrix(refs: ArrayOrStack, candidates: ArrayOrStack) -> np.ndarray:
+    """
+    Cosine similarity of every reference row with every candidate row.
+
+    Args:
+        refs: One vector (D,) or N vectors (N, D) / list of arrays
+        candidates: M vectors (M, D) / list of arrays
+
+    Returns:
+        (M,) scores for a single reference vector, otherwise (N, M)
+    """
+    single = isinstance(refs, np.ndarray) and refs.ndim == 1
+    a = stack_rows(refs)
+    b = stack_rows(candidates)
+    a = a / (np.linalg.norm(a, axis=1, keepdims=True) + 1e-8)
+    b = b / (np.linalg.norm(b, axis=1, keepdims=True) + 1e-8)
+    scores = a @ b.T
+    return scores[0] if single else scores
+
+
+def _box_mean(images: np.ndarray, size: int) -> np.ndarray:
+    """Mean over every size x size window fully inside the image, for a (K, H, W) stack."""
+    integral = np.zeros((images.shape[0], images.shape[1] + 1, images.shape[2] + 1), np.float64)
+    np.cumsum(np.cumsum(images, axis=1), axis=2, out=integral[:, 1:, 1:])
+    window_sum = (integral[:, size:, size:] - integral[:, :-size, size:]
+                  - integral[:, size:, :-size] + integral[:, :-size, :-size])
+    return window_sum / (size * size)
+
+
+def _stack_images(images: ArrayOrStack) -> np.ndarray:
+    if isinstance(images, np.ndarray):
+        stack = images[None] if images.ndim == 2 else images
+        return stack.astype(np.float64, copy=False)
+    return np.stack([np.asarray(image, dtype=np.float64) for image in images])
+
+
+def ssim_matrix(refs: ArrayOrStack, candidates: ArrayOrStack, data_range: float = 255.0,
+                win_size: int = SSIM_WINDOW) -> np.ndarray:
+    """
+    Mean SSIM of every reference image with every candidate image.
+
+    All images must be grayscale and the same size. Only windows that lie
+    fully inside the image contribute, which is exactly the region skimage
+    averages, so no border handling is needed.
+
+    Args:
+        refs: One image (H, W) or N images (N, H, W) / list of images
+        candidates: M images (M, H, W) / list of images
+        data_range: Dynamic range of the pixel values (255 for uint8)
+        win_size: Side of the uniform window
+
+    Returns:
+        (M,) scores for a single reference image, otherwise (N, M)
+    """
+    single = isinstance(refs, np.ndarray) and refs.ndim == 2
+    x = _stack_images(refs)
+    y = _stack_images(candidates)
+
+    cov_norm = win_size * win_size / (win_size * win_size - 1)
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+
+    # Per-image statistics are computed once, not once per pair
+    ux = _box_mean(x, win_size)
+    uy = _box_mean(y, win_size)
+    vx = cov_norm * (_box_mean(x * x, win_size) - ux * ux)
+    vy = cov_norm * (_box_mean(y * y, win_size) - uy * uy)
+
+    scores = np.empty((len(x), len(y)), np.float64)
+    for i in range(len(x)):
+        for start in range(0, len(y), SSIM_CHUNK):
+            stop = start + SSIM_CHUNK
+            uxy = _box_mean(x[i] * y[start:stop], win_size)
+            vxy = cov_norm * (uxy - ux[i] * uy[start:stop])
+            numerator = (2 * ux[i] * uy[start:stop] + c1) * (2 * vxy + c2)
+            denominator = (ux[i] ** 2 + uy[start:stop] ** 2 + c1) * (vx[i] + vy[start:stop] + c2)
+            scores[i, start:stop] = (numerator / denominator).mean(axis=(1, 2))
+    return scores[0] if single else scores
@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for the scraping and image matching code.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.ebay_parsers
+"""
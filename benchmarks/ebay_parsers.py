@@ -0,0 +1,384 @@
+"""
+Offline benchmark and golden-output check for the eBay search page parsers.
+
+Every parser is run over the saved eBay result pages of the layout it
+parses, without touching the network:
+
+- ebay_search:     EbaySearchSpider.select_item_containers + extract_search_item_data
+- scrapy_ebay:     EbaySpider (root scrapy_ebay project) container selection + extract_search_item_data
+- browserless:     BrowserlessEbaySearch.select_item_containers + extract_item_from_container
+- sold_requests:   SoldListingMatcherRequests._extract_listing_data_from_soup
+
+Pages of eBay's current .s-card layout are the ones saved by the spider
+(ebay-scrapy-scraper-main/debug_ebay_*.html); only ebay_search parses them.
+The other parsers only know the legacy .s-item layout, which is covered by
+the pages in benchmarks/fixtures/s_item_*.html. A golden file without items
+would pass any regression, so it is reported as a failure.
+
+For each parser/page the benchmark reports items extracted, items/sec and
+memory allocated (tracemalloc peak), shows which item IDs the parsers of
+the same layout agree on, and compares the extracted items against golden
+JSON recorded in benchmarks/golden/. A selector change or parser speedup is safe when the
+golden check still passes (or the golden diff is the intended change).
+
+Usage:
+    python -m benchmarks.ebay_parsers                  # benchmark + golden check
+    python -m benchmarks.ebay_parsers --repeat 20      # more timing runs
+    python -m benchmarks.ebay_parsers --update-golden  # re-record golden JSON
+    python -m benchmarks.ebay_parsers --json report.json
+"""
+
+import argparse
+import dataclasses
+import json
+import logging
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SPIDER_PROJECT = REPO_ROOT / 'ebay-scrapy-scraper-main'
+FIXTURE_DIR = Path(__file__).resolve().parent / 'fixtures'
+GOLDEN_DIR = Path(__file__).resolve().parent / 'golden'
+
+# Saved result pages per eBay page layout: (directory, file pattern)
+FIXTURE_LAYOUTS = {
+    's-card': (SPIDER_PROJECT, 'debug_ebay_*.html'),
+    's-item': (FIXTURE_DIR, 's_item_*.html'),
+}
+
+for path in (REPO_ROOT, SPIDER_PROJECT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+FIXTURE_URL = 'https://www.ebay.com/sch/i.html'
+
+
+def find_fixtures(layout: Optional[str] = None) -> List[Path]:
+    """Saved eBay search result pages of one layout (default: all layouts), sorted by name."""
+    fixtures = []
+    for name, (directory, pattern) in FIXTURE_LAYOUTS.items():
+        if layout is None or name == layout:
+            fixtures.extend(sorted(directory.glob(pattern)))
+    return fixtures
+
+
+def fixture_query(fixture: Path) -> str:
+    """Search query a fixture was saved for (debug_ebay_Yura_Kano_X.html -> 'Yura Kano X')."""
+    return re.sub(r'^(debug_ebay_|s_item_)', '', fixture.stem).replace('_', ' ')
+
+
+def _to_jsonable(item: Any) -> Dict[str, Any]:
+    if dataclasses.is_dataclass(item):
+        return dataclasses.asdict(item)
+    return dict(item)
+
+
+# ----------------------------------------------------------------------
+# Parsers: each takes (html bytes, query) and returns JSON-able item dicts
+# ----------------------------------------------------------------------
+
+def _parse_ebay_search(html: bytes, query: str) -> List[Dict[str, Any]]:
+    from scrapy.http import HtmlResponse
+    from ebay_scraper.spiders.ebay_search import EbaySearchSpider
+
+    spider = EbaySearchSpider(query=query)
+    response = HtmlResponse(url=FIXTURE_URL, body=html, encoding='utf-8')
+    meta = {'search_query': spider.search_query, 'page': 1}
+    items = []
+    for container in spider.select_item_containers(response):
+        item = spider.extract_search_item_data(container, meta)
+        if item:
+            spider.query_results[spider.search_query] += 1
+            items.append(_to_jsonable(item))
+    return items
+
+
+def _parse_scrapy_ebay(html: bytes, query: str) -> List[Dict[str, Any]]:
+    from scrapy.http import HtmlResponse
+    from scrapy_ebay.spiders.ebay_spider import EbaySpider
+
+    spider = EbaySpider(query=query)
+    response = HtmlResponse(url=FIXTURE_URL, body=html, encoding='utf-8')
+    items = []
+    for container in spider.select_item_containers(response):
+        item = spider.extract_search_item_data(container)
+        if item:
+            items.append(item)
+    return items
+
+
+def _parse_browserless(html: bytes, query: str) -> List[Dict[str, Any]]:
+    from bs4 import BeautifulSoup
+    from browserless_ebay_search import BrowserlessEbaySearch
+
+    searcher = BrowserlessEbaySearch()
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+    for container in searcher.select_item_containers(soup):
+        item = searcher.extract_item_from_container(container)
+        if item:
+            items.append(item)
+    return items
+
+
+_sold_matcher = None
+
+
+def _parse_sold_requests(html: bytes, query: str) -> List[Dict[str, Any]]:
+    global _sold_matcher
+    from bs4 import BeautifulSoup
+    from sold_listing_matcher_requests import SoldListingMatcherRequests
+
+    # The matcher sets up an HTTP session and ORB detector; build it once
+    if _sold_matcher is None:
+        _sold_matcher = SoldListingMatcherRequests()
+    soup = BeautifulSoup(html, 'html.parser')
+    return [_to_jsonable(listing) for listing in _sold_matcher._extract_listing_data_from_soup(soup, 200)]
+
+
+PARSERS: Dict[str, Callable[[bytes, str], List[Dict[str, Any]]]] = {
+    'ebay_search': _parse_ebay_search,
+    'scrapy_ebay': _parse_scrapy_ebay,
+    'browserless': _parse_browserless,
+    'sold_requests': _parse_sold_requests,
+}
+
+# Page layout each parser handles (a key of FIXTURE_LAYOUTS)
+PARSER_LAYOUTS: Dict[str, str] = {
+    'ebay_search': 's-card',
+    'scrapy_ebay': 's-item',
+    'browserless': 's-item',
+    'sold_requests': 's-item',
+}
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+_ITEM_ID_RE = re.compile(r'/itm/(?:[^/?#]+/)?(\d{9,})')
+
+
+def item_ids(items: List[Dict[str, Any]]) -> List[str]:
+    """eBay item IDs found in the items' URL fields."""
+    ids = []
+    for item in items:
+        item_id = item.get('product_id')
+        if not item_id:
+            for field in ('product_url', 'item_url', 'listing_url', 'url'):
+                match = _ITEM_ID_RE.search(str(item.get(field) or ''))
+                if match:
+                    item_id = match.group(1)
+                    break
+        if item_id:
+            ids.append(str(item_id))
+    return ids
+
+
+def measure(parser: Callable, html: bytes, query: str, repeat: int) -> Dict[str, Any]:
+    """Time a parser over one page and measure its allocations."""
+    items = parser(html, query)  # warm-up (imports, selector compilation)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(html, query)
+        timings.append(time.perf_counter() - start)
+
+    # Separate run under tracemalloc so tracing doesn't distort the timings
+    tracemalloc.start()
+    try:
+        parser(html, query)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        'items': items,
+        'item_count': len(items),
+        'median_ms': median * 1000,
+        'best_ms': min(timings) * 1000,
+        'items_per_sec': len(items) / median if median > 0 else 0.0,
+        'peak_alloc_kib': peak / 1024,
+    }
+
+
+# ----------------------------------------------------------------------
+# Golden files
+# ----------------------------------------------------------------------
+
+def golden_path(parser_name: str) -> Path:
+    return GOLDEN_DIR / f'{parser_name}.json'
+
+
+def load_golden(parser_name: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    path = golden_path(parser_name)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_golden(parser_name: str, outputs: Dict[str, List[Dict[str, Any]]]):
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    with open(golden_path(parser_name), 'w', encoding='utf-8') as f:
+        json.dump(outputs, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def empty_golden_problems(golden: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """A golden file that records no items at all checks nothing."""
+    if not any(golden.values()):
+        return ["golden output has no items - record it from pages this parser can parse"]
+    return []
+
+
+def diff_items(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]], limit: int = 10) -> List[str]:
+    """Human readable differences between two item lists."""
+    # Round-trip through JSON so tuples/str subclasses compare like the golden file
+    actual = json.loads(json.dumps(actual, ensure_ascii=False))
+    problems = []
+    if len(expected) != len(actual):
+        problems.append(f"item count {len(expected)} -> {len(actual)}")
+    for index, (old, new) in enumerate(zip(expected, actual)):
+        for field in sorted(set(old) | set(new)):
+            if old.get(field) != new.get(field):
+                problems.append(f"item {index} '{field}': {old.get(field)!r} -> {new.get(field)!r}")
+                if len(problems) >= limit:
+                    return problems
+    return problems
+
+
+def check_golden(parser_names: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Run the parsers once over every fixture of their layout and compare with the golden JSON.
+
+    Returns:
+        {'parser/fixture': [differences]} for every mismatch (empty = all match)
+    """
+    failures = {}
+    for name in parser_names or list(PARSERS):
+        golden = load_golden(name)
+        if golden is None:
+            failures[name] = [f"missing golden file {golden_path(name)}"]
+            continue
+        if empty_golden_problems(golden):
+            failures[name] = empty_golden_problems(golden)
+        for fixture in find_fixtures(PARSER_LAYOUTS[name]):
+            actual = PARSERS[name](fixture.read_bytes(), fixture_query(fixture))
+            problems = diff_items(golden.get(fixture.name, []), actual)
+            if problems:
+                failures[f"{name}/{fixture.name}"] = problems
+    return failures
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def run(parser_names: List[str], repeat: int, update_golden: bool) -> Dict[str, Any]:
+    layouts = {PARSER_LAYOUTS[name] for name in parser_names}
+    fixtures = [fixture for layout in FIXTURE_LAYOUTS if layout in layouts for fixture in find_fixtures(layout)]
+    report: Dict[str, Any] = {'fixtures': [f.name for f in fixtures], 'parsers': {}, 'agreement': {},
+                              'golden_failures': {}}
+
+    for name in parser_names:
+        outputs = {}
+        results = {}
+        for fixture in find_fixtures(PARSER_LAYOUTS[name]):
+            result = measure(PARSERS[name], fixture.read_bytes(), fixture_query(fixture), repeat)
+            outputs[fixture.name] = result.pop('items')
+            result['item_ids'] = item_ids(outputs[fixture.name])
+            results[fixture.name] = result
+
+        if update_golden:
+            save_golden(name, outputs)
+            print(f"[BENCHMARK] Wrote golden output {golden_path(name)}")
+        else:
+            golden = load_golden(name)
+            if golden is None:
+                report['golden_failures'][name] = [f"missing golden file {golden_path(name)}"]
+            else:
+                if empty_golden_problems(golden):
+                    report['golden_failures'][name] = empty_golden_problems(golden)
+                for fixture_name, items in outputs.items():
+                    problems = diff_items(golden.get(fixture_name, []), items)
+                    if problems:
+                        report['golden_failures'][f"{name}/{fixture_name}"] = problems
+
+        report['parsers'][name] = results
+
+    # Which parsers of a page's layout extracted the same listings from it. Parsers that
+    # report no item IDs at all (scrapy_ebay keeps no URL) are left out of the intersection.
+    for fixture in fixtures:
+        ids_by_parser = {name: set(report['parsers'][name][fixture.name]['item_ids'])
+                         for name in parser_names if fixture.name in report['parsers'][name]}
+        with_ids = [ids for ids in ids_by_parser.values() if ids]
+        report['agreement'][fixture.name] = {
+            'union': len(set().union(*with_ids)),
+            'found_by_all': len(set.intersection(*with_ids)) if with_ids else 0,
+            'per_parser': {name: len(ids) for name, ids in ids_by_parser.items()},
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'parser':<15} {'fixture':<50} {'items':>5} {'median ms':>10} {'items/s':>9} {'peak KiB':>9}")
+    print('-' * 103)
+    for name, results in report['parsers'].items():
+        for fixture_name, result in results.items():
+            print(f"{name:<15} {fixture_name:<50} {result['item_count']:>5} {result['median_ms']:>10.2f} "
+                  f"{result['items_per_sec']:>9.1f} {result['peak_alloc_kib']:>9.0f}")
+
+    print("\nItem ID agreement (distinct eBay item IDs per page):")
+    for fixture_name, agreement in report['agreement'].items():
+        per_parser = ', '.join(f"{name}={count}" for name, count in agreement['per_parser'].items())
+        print(f"  {fixture_name}: union={agreement['union']} all={agreement['found_by_all']} ({per_parser})")
+
+    if report['golden_failures']:
+        print("\nGolden output mismatches:")
+        for key, problems in report['golden_failures'].items():
+            print(f"  {key}")
+            for problem in problems:
+                print(f"    {problem}")
+    else:
+        print("\nGolden output: OK")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the eBay search page parsers on saved HTML')
+    parser.add_argument('--parser', action='append', choices=sorted(PARSERS),
+                        help='Parser to run (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per parser/page (default: 5)')
+    parser.add_argument('--update-golden', action='store_true', help='Re-record the golden JSON output')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='Keep the parsers\' own INFO logging')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Per-item INFO logging would dominate the timings
+        logging.disable(logging.INFO)
+
+    if not find_fixtures():
+        print(f"[BENCHMARK] No fixtures in {', '.join(str(d / p) for d, p in FIXTURE_LAYOUTS.values())}")
+        return 1
+
+    report = run(args.parser or list(PARSERS), max(1, args.repeat), args.update_golden)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCHMARK] Report written to {args.json}")
+
+    return 1 if report['golden_failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
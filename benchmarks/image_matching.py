@@ -0,0 +1,424 @@
+"""
+Accuracy and throughput regression suite for the image comparators.
+
+The saved comparison runs in debug_comparison/ (CSV reference images
+CSV_*_REF_*.jpg and eBay images ebay_*.jpg per folder) together with the
+ground truth in debug_comparison/labels.json form a labelled set of
+reference x candidate pairs. The pairs are written to a manifest
+(debug_comparison/manifest.json) so every comparator is scored on exactly
+the same, stable dataset:
+
+    {"version": 1, "pairs": [{"run": ..., "reference": ..., "candidate": ..., "match": true}, ...]}
+
+Every registered comparator is run over the manifest and reports:
+
+- throughput: pairs/sec (feature preparation + scoring), p50/p99 score latency
+- memory: peak RSS of the process that ran the comparator
+- accuracy: precision/recall at similarity thresholds, ROC AUC and the gap
+  between the worst match and the best non-match
+
+Each comparator runs in its own fresh process so the peak RSS figures are
+comparable. A speed optimization to matching is safe when its accuracy
+numbers hold against a saved baseline report:
+
+Usage:
+    python -m benchmarks.image_matching --build-manifest
+    python -m benchmarks.image_matching                          # all comparators
+    python -m benchmarks.image_matching -c features cascade --json report.json
+    python -m benchmarks.image_matching --baseline report.json   # exit 1 on an accuracy regression
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import cv2
+import numpy as np
+
+DEBUG_DIR = REPO_ROOT / 'debug_comparison'
+MANIFEST_FILE = DEBUG_DIR / 'manifest.json'
+MANIFEST_VERSION = 1
+
+DEFAULT_THRESHOLDS = [50.0, 60.0, 70.0, 80.0]
+
+# ROC AUC may drop by this much against the baseline before --baseline fails
+AUC_TOLERANCE = 0.01
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+def build_manifest(debug_dir: Path = DEBUG_DIR) -> Dict[str, Any]:
+    """Every reference x eBay pair of every labelled run, with its ground-truth label."""
+    with open(debug_dir / 'labels.json', 'r', encoding='utf-8') as f:
+        labels = json.load(f)
+
+    pairs = []
+    for run, truth in labels.items():
+        folder = debug_dir / run
+        if run.startswith('_') or not folder.is_dir():
+            continue
+        candidates = sorted(path.name for path in folder.glob('ebay_*.jpg'))
+        for reference in sorted(path.name for path in folder.glob('CSV_*_REF_*.jpg')):
+            matches = set(truth.get(reference, []))
+            pairs.extend({'run': run, 'reference': reference, 'candidate': candidate,
+                          'match': candidate in matches}
+                         for candidate in candidates)
+    return {'version': MANIFEST_VERSION, 'pairs': pairs}
+
+
+def load_manifest(path: Path = MANIFEST_FILE) -> Dict[str, Any]:
+    """Read a manifest written by --build-manifest."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('version')} in {path}")
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Comparators
+# ---------------------------------------------------------------------------
+
+class Comparator(ABC):
+    """
+    A scorer under test.
+
+    prepare() turns a decoded BGR image into whatever score() consumes (run
+    once per image, so comparators that precompute features get credit for
+    it); score() returns the similarity of a prepared reference and candidate
+    on the 0-100 scale.
+    """
+
+    def prepare(self, image: np.ndarray) -> Any:
+        return image
+
+    @abstractmethod
+    def score(self, reference: Any, candidate: Any) -> float:
+        raise NotImplementedError("Subclass must implement score()")
+
+
+COMPARATORS: Dict[str, Callable[[], Comparator]] = {}
+
+
+def register_comparator(name: str):
+    """Class decorator adding a comparator to the suite under the given name."""
+    def decorator(cls):
+        COMPARATORS[name] = cls
+        return cls
+    return decorator
+
+
+@register_comparator('compare_images')
+class CompareImagesComparator(Comparator):
+    """gui.workers.compare_images on raw images (features extracted for every pair)."""
+
+    def __init__(self):
+        from gui.workers import compare_images
+        self.compare_images = compare_images
+
+    def score(self, reference, candidate):
+        # compare_images prints a breakdown for every pair
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.compare_images(reference, candidate)
+
+
+@register_comparator('features')
+class FeaturesComparator(Comparator):
+    """image_features: features extracted once per image, compare_features per pair."""
+
+    use_ransac = False
+
+    def __init__(self):
+        import image_features
+        self.image_features = image_features
+
+    def prepare(self, image):
+        return self.image_features.extract_features(image)
+
+    def score(self, reference, candidate):
+        return self.image_features.compare_features(reference, candidate, self.use_ransac, verbose=False)
+
+
+@register_comparator('features_ransac')
+class FeaturesRansacComparator(FeaturesComparator):
+    """FeaturesComparator with RANSAC geometric verification."""
+
+    use_ransac = True
+
+
+@register_comparator('cascade')
+class CascadeComparator(FeaturesComparator):
+    """
+    compare_features_cascade at the GUI's 70% threshold.
+
+    Scores are only exact near the threshold; pairs decided early report the
+    bound that decided them, so accuracy is only meaningful at 70.
+    """
+
+    threshold = 70.0
+
+    def score(self, reference, candidate):
+        return self.image_features.compare_features_cascade(reference, candidate, self.threshold).score
+
+
+@register_comparator('features_flann')
+class FeaturesFlannComparator(FeaturesComparator):
+    """FeaturesComparator with FLANN-LSH instead of brute-force ORB matching."""
+
+    def __init__(self):
+        super().__init__()
+        from matching_core import set_matcher_kind
+        set_matcher_kind('flann')
+
+
+@register_comparator('sold_listing')
+class SoldListingComparator(Comparator):
+    """The sold listing matchers' scorer (matching_core 'sold_listing', scaled to 0-100)."""
+
+    def __init__(self):
+        from matching_core import SoldListingScorer
+        self.scorer = SoldListingScorer()
+
+    def prepare(self, image):
+        return self.scorer.extract(image)
+
+    def score(self, reference, candidate):
+        return 100.0 * self.scorer.score(reference, candidate)
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def roc_auc(scores: Sequence[float], labels: Sequence[bool]) -> Optional[float]:
+    """
+    Area under the ROC curve: the probability a random match outscores a random non-match.
+
+    Computed from ranks (Mann-Whitney U) with ties counted as half. None when
+    either class is empty.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return None
+
+    order = np.argsort(scores, kind='mergesort')
+    sorted_scores = scores[order]
+    ranks = np.empty(len(scores), np.float64)
+    start = 0
+    while start < len(scores):
+        stop = start
+        while stop + 1 < len(scores) and sorted_scores[stop + 1] == sorted_scores[start]:
+            stop += 1
+        # Tied scores share their average (1-based) rank
+        ranks[order[start:stop + 1]] = (start + stop) / 2 + 1
+        start = stop + 1
+    u = ranks[labels].sum() - positives * (positives + 1) / 2
+    return float(u / (positives * negatives))
+
+
+def precision_recall(scores: Sequence[float], labels: Sequence[bool], threshold: float) -> Dict[str, float]:
+    """Precision and recall when pairs scoring >= threshold are called matches."""
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    predicted = scores >= threshold
+    true_positives = int(np.sum(predicted & labels))
+    return {
+        'threshold': threshold,
+        'precision': true_positives / int(predicted.sum()) if predicted.any() else 1.0,
+        'recall': true_positives / int(labels.sum()) if labels.any() else 1.0,
+        'true_positives': true_positives,
+        'false_positives': int(np.sum(predicted & ~labels)),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_comparator(name: str, pairs: List[Dict], thresholds: Sequence[float],
+                   debug_dir: Path = DEBUG_DIR) -> Dict[str, Any]:
+    """Score every manifest pair with one comparator and collect its metrics."""
+    comparator = COMPARATORS[name]()
+
+    prepared = {}
+    prepare_seconds = 0.0
+    for pair in pairs:
+        for key in ('reference', 'candidate'):
+            path = (pair['run'], pair[key])
+            if path in prepared:
+                continue
+            image = cv2.imread(str(debug_dir.joinpath(*path)))
+            if image is None:
+                raise FileNotFoundError(f"Missing manifest image {debug_dir.joinpath(*path)}")
+            start = time.perf_counter()
+            prepared[path] = comparator.prepare(image)
+            prepare_seconds += time.perf_counter() - start
+
+    scores = []
+    latencies = []
+    for pair in pairs:
+        reference = prepared[(pair['run'], pair['reference'])]
+        candidate = prepared[(pair['run'], pair['candidate'])]
+        start = time.perf_counter()
+        scores.append(float(comparator.score(reference, candidate)))
+        latencies.append(time.perf_counter() - start)
+
+    labels = np.array([pair['match'] for pair in pairs], dtype=bool)
+    score_array = np.array(scores)
+    latency_ms = np.array(latencies) * 1000
+    total_seconds = prepare_seconds + float(np.sum(latencies))
+    return {
+        'comparator': name,
+        'pairs': len(pairs),
+        'pairs_per_sec': len(pairs) / total_seconds if total_seconds else None,
+        'prepare_ms_per_image': prepare_seconds * 1000 / len(prepared) if prepared else 0.0,
+        'latency_p50_ms': float(np.percentile(latency_ms, 50)),
+        'latency_p99_ms': float(np.percentile(latency_ms, 99)),
+        'peak_rss_mb': peak_rss_mb(),
+        'roc_auc': roc_auc(score_array, labels),
+        'separation_gap': (float(score_array[labels].min() - score_array[~labels].max())
+                           if labels.any() and not labels.all() else None),
+        'thresholds': [precision_recall(score_array, labels, threshold) for threshold in thresholds],
+        'scores': scores,
+    }
+
+
+def run_isolated(name: str, pairs: List[Dict], thresholds: Sequence[float]) -> Dict[str, Any]:
+    """run_comparator in a fresh process, so peak RSS is this comparator's alone."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_comparator, name, pairs, list(thresholds)).result()
+
+
+def check_baseline(results: Dict[str, Dict], baseline: Dict[str, Any],
+                   tolerance: float = AUC_TOLERANCE) -> List[str]:
+    """Accuracy regressions against a previous --json report (empty when none)."""
+    problems = []
+    for name, result in results.items():
+        previous = baseline.get('comparators', {}).get(name)
+        if not previous:
+            continue
+        if previous.get('roc_auc') is not None and result['roc_auc'] is not None:
+            if result['roc_auc'] < previous['roc_auc'] - tolerance:
+                problems.append(f"{name}: ROC AUC {result['roc_auc']:.3f} < baseline {previous['roc_auc']:.3f}")
+        before = {entry['threshold']: entry for entry in previous.get('thresholds', [])}
+        for entry in result['thresholds']:
+            old = before.get(entry['threshold'])
+            if old and entry['recall'] < old['recall']:
+                problems.append(f"{name}: recall@{entry['threshold']:.0f} {entry['recall']:.2f} "
+                                f"< baseline {old['recall']:.2f}")
+    return problems
+
+
+def print_result(result: Dict[str, Any]):
+    auc = result['roc_auc']
+    gap = result['separation_gap']
+    rss = result['peak_rss_mb']
+    print(f"{result['comparator']}:")
+    print(f"  {result['pairs_per_sec']:.1f} pairs/sec, prepare {result['prepare_ms_per_image']:.1f} ms/image, "
+          f"score p50 {result['latency_p50_ms']:.2f} ms / p99 {result['latency_p99_ms']:.2f} ms")
+    print(f"  peak RSS: {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+    print(f"  ROC AUC: {f'{auc:.3f}' if auc is not None else 'n/a'}, "
+          f"separation gap: {f'{gap:.1f}' if gap is not None else 'n/a'}")
+    for entry in result['thresholds']:
+        print(f"  @{entry['threshold']:.0f}: precision {entry['precision']:.2f}, recall {entry['recall']:.2f} "
+              f"({entry['true_positives']} TP, {entry['false_positives']} FP)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Image comparator accuracy and throughput on debug_comparison')
+    parser.add_argument('--build-manifest', action='store_true',
+                        help=f'(Re)build {MANIFEST_FILE.name} from labels.json and the run folders')
+    parser.add_argument('--manifest', type=Path, default=MANIFEST_FILE, help='Manifest to score')
+    parser.add_argument('-c', '--comparators', nargs='+', choices=sorted(COMPARATORS),
+                        default=list(COMPARATORS), help='Comparators to run (default: all)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS)
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run comparators in this process (peak RSS is then cumulative)')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report as JSON')
+    parser.add_argument('--baseline', type=Path, metavar='PATH',
+                        help='Previous --json report; exit 1 if accuracy regressed')
+    args = parser.parse_args(argv)
+
+    if args.build_manifest:
+        manifest = build_manifest()
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        positives = sum(pair['match'] for pair in manifest['pairs'])
+        print(f"[MATCH BENCH] Wrote {len(manifest['pairs'])} pairs ({positives} matches) to {args.manifest}")
+        return 0
+
+    if not args.manifest.exists():
+        print(f"[MATCH BENCH] No manifest at {args.manifest} - run with --build-manifest first")
+        return 1
+    pairs = load_manifest(args.manifest)['pairs']
+    if not pairs:
+        print(f"[MATCH BENCH] Manifest {args.manifest} has no pairs")
+        return 1
+
+    positives = sum(pair['match'] for pair in pairs)
+    print(f"[MATCH BENCH] {len(pairs)} pairs, {positives} matches\n")
+
+    results = {}
+    for name in args.comparators:
+        if args.in_process:
+            results[name] = run_comparator(name, pairs, args.thresholds)
+        else:
+            results[name] = run_isolated(name, pairs, args.thresholds)
+        print_result(results[name])
+
+    if args.json:
+        report = {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'manifest': str(args.manifest),
+            'pairs': len(pairs),
+            'matches': positives,
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'comparators': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            problems = check_baseline(results, json.load(f))
+        for problem in problems:
+            print(f"[MATCH BENCH] REGRESSION {problem}")
+        if problems:
+            return 1
+        print(f"\n[MATCH BENCH] No accuracy regression against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
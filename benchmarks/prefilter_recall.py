@@ -0,0 +1,108 @@
+"""
+Recall of the perceptual-hash prefilter on the labelled comparison runs.
+
+Each folder in debug_comparison/ holds the CSV reference images
+(CSV_*_REF_*.jpg) and the eBay images (ebay_*.jpg) of one comparison run;
+debug_comparison/labels.json lists which eBay images really show each
+reference's item. For several top-K values this reports:
+
+- recall: labelled matches that survive the prefilter
+- kept: fraction of reference x eBay pairs passed on to the full comparator
+
+Usage:
+    python -m benchmarks.prefilter_recall
+    python -m benchmarks.prefilter_recall --top-k 1 2 3 --guard-radius 16
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import cv2
+
+from image_prefilter import CandidatePrefilter, compute_signature
+
+DEBUG_DIR = REPO_ROOT / 'debug_comparison'
+LABELS_FILE = DEBUG_DIR / 'labels.json'
+
+
+def load_runs(debug_dir: Path = DEBUG_DIR) -> List[Dict]:
+    """Labelled comparison runs: [{'name', 'refs': {name: sig}, 'candidates': {name: sig}, 'truth'}]"""
+    with open(debug_dir / 'labels.json', 'r', encoding='utf-8') as f:
+        labels = json.load(f)
+
+    runs = []
+    for folder, truth in labels.items():
+        if folder.startswith('_') or not (debug_dir / folder).is_dir():
+            continue
+        run = {'name': folder, 'truth': truth, 'refs': {}, 'candidates': {}}
+        for kind, pattern in (('refs', 'CSV_*_REF_*.jpg'), ('candidates', 'ebay_*.jpg')):
+            for path in sorted((debug_dir / folder).glob(pattern)):
+                image = cv2.imread(str(path))
+                if image is not None:
+                    run[kind][path.name] = compute_signature(image)
+        runs.append(run)
+    return runs
+
+
+def evaluate(runs: List[Dict], top_k: int, guard_radius: int) -> Dict[str, float]:
+    """Recall and pruning of the prefilter at one setting."""
+    found = expected = kept = pairs = 0
+    for run in runs:
+        prefilter = CandidatePrefilter(top_k=top_k, guard_radius=guard_radius)
+        for name, signature in run['candidates'].items():
+            prefilter.add(name, signature)
+        for ref_name, signature in run['refs'].items():
+            selected = set(prefilter.select(signature))
+            kept += len(selected)
+            pairs += len(run['candidates'])
+            matches = run['truth'].get(ref_name, [])
+            expected += len(matches)
+            found += sum(1 for match in matches if match in selected)
+    return {
+        'top_k': top_k,
+        'recall': found / expected if expected else 1.0,
+        'matches_found': found,
+        'matches_expected': expected,
+        'kept_fraction': kept / pairs if pairs else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Prefilter recall on the labelled debug_comparison runs')
+    parser.add_argument('--top-k', type=int, nargs='+', default=[1, 2, 3, 5, 8])
+    parser.add_argument('--guard-radius', type=int, default=24)
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    args = parser.parse_args(argv)
+
+    if not LABELS_FILE.exists():
+        print(f"[PREFILTER] No labels file at {LABELS_FILE}")
+        return 1
+
+    start = time.perf_counter()
+    runs = load_runs()
+    images = sum(len(run['refs']) + len(run['candidates']) for run in runs)
+    elapsed = time.perf_counter() - start
+    print(f"[PREFILTER] {len(runs)} runs, {images} images (decode + signature {elapsed * 1000 / max(images, 1):.1f} ms/image)")
+
+    results = [evaluate(runs, top_k, args.guard_radius) for top_k in args.top_k]
+    print(f"\n{'top K':>5} {'recall':>8} {'found':>7} {'kept':>7}")
+    for result in results:
+        print(f"{result['top_k']:>5} {result['recall']:>8.1%} "
+              f"{result['matches_found']:>3}/{result['matches_expected']:<3} {result['kept_fraction']:>7.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'guard_radius': args.guard_radius, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Coarse-to-fine vs. exhaustive template matching on the debug_comparison runs.
+
+Scores every CSV reference x eBay image pair of each run in
+debug_comparison/ with both template matchers and reports:
+
+- time per pair of each matcher
+- template score difference (the cascade never scores higher)
+- total similarity difference and how many pairs change side of the
+  similarity threshold
+
+Usage:
+    python -m benchmarks.template_cascade
+    python -m benchmarks.template_cascade --threshold 70 --json out.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import cv2
+import numpy as np
+
+from image_features import compare_features, extract_features, template_match_score
+
+DEBUG_DIR = REPO_ROOT / 'debug_comparison'
+
+
+def load_pairs(debug_dir: Path = DEBUG_DIR) -> List[tuple]:
+    """(reference features, eBay features) for every pair of every run."""
+    pairs = []
+    for folder in sorted(path for path in debug_dir.iterdir() if path.is_dir()):
+        refs = [cv2.imread(str(path)) for path in sorted(folder.glob('CSV_*_REF_*.jpg'))]
+        candidates = [cv2.imread(str(path)) for path in sorted(folder.glob('ebay_*.jpg'))]
+        refs = [extract_features(image) for image in refs if image is not None]
+        candidates = [extract_features(image) for image in candidates if image is not None]
+        pairs.extend((ref, candidate) for ref in refs for candidate in candidates)
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Template matching cascade accuracy and speed')
+    parser.add_argument('--threshold', type=float, default=70.0, help='Similarity threshold (0-100)')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    args = parser.parse_args(argv)
+
+    pairs = load_pairs()
+    if not pairs:
+        print(f"[TEMPLATE] No comparison runs in {DEBUG_DIR}")
+        return 1
+
+    timings = {}
+    scores = {}
+    for name, exhaustive in (('exhaustive', True), ('cascade', False)):
+        start = time.perf_counter()
+        scores[name] = np.array([template_match_score(ref, other, exhaustive) for ref, other in pairs])
+        timings[name] = (time.perf_counter() - start) * 1000 / len(pairs)
+
+    totals = {name: np.array([compare_features(ref, other, verbose=False, exact_template=exact)
+                              for ref, other in pairs])
+              for name, exact in (('exhaustive', True), ('cascade', False))}
+    template_diff = np.maximum(scores['exhaustive'], 0) - np.maximum(scores['cascade'], 0)
+    total_diff = np.abs(totals['exhaustive'] - totals['cascade'])
+    flipped = int(np.sum((totals['exhaustive'] >= args.threshold) != (totals['cascade'] >= args.threshold)))
+
+    results = {
+        'pairs': len(pairs),
+        'exhaustive_ms_per_pair': timings['exhaustive'],
+        'cascade_ms_per_pair': timings['cascade'],
+        'speedup': timings['exhaustive'] / max(timings['cascade'], 1e-9),
+        'template_max_diff': float(template_diff.max()),
+        'template_mean_diff': float(template_diff.mean()),
+        'template_exact_fraction': float(np.mean(template_diff < 1e-4)),
+        'total_max_diff': float(total_diff.max()),
+        'total_mean_diff': float(total_diff.mean()),
+        'threshold': args.threshold,
+        'threshold_flips': flipped,
+    }
+
+    print(f"[TEMPLATE] {len(pairs)} pairs")
+    print(f"  exhaustive: {results['exhaustive_ms_per_pair']:.2f} ms/pair")
+    print(f"  cascade:    {results['cascade_ms_per_pair']:.2f} ms/pair ({results['speedup']:.1f}x)")
+    print(f"  template score diff: max {results['template_max_diff']:.4f}, "
+          f"mean {results['template_mean_diff']:.4f}, exact on {results['template_exact_fraction']:.0%}")
+    print(f"  total similarity diff: max {results['total_max_diff']:.2f}, mean {results['total_mean_diff']:.2f} points")
+    print(f"  pairs changing side of {args.threshold:.0f}%: {flipped}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
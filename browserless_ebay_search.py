@@ -38,7 +38,17 @@ class BrowserlessEbaySearch:
             'Sec-Fetch-Site': 'none',
         })
 
-    def search_ebay(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    def search_ebay(self, query: str, max_results: int = 5, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Search eBay for items and extract images (served from the shared search cache when fresh)"""
+        from ebay_search_cache import cached_search
+
+        return cached_search(
+            'browserless', query, max_results, False,
+            lambda depth: self._search_ebay_uncached(query, depth),
+            use_cache=use_cache
+        )
+
+    def _search_ebay_uncached(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Search eBay for items and extract images"""
         self.logger.info(f"Starting browserless eBay search for: {query}")
 
@@ -69,23 +79,7 @@ class BrowserlessEbaySearch:
             # Parse HTML
             soup = BeautifulSoup(response.content, 'html.parser')
 
-            # Try different item selectors
-            item_containers = []
-            selectors_to_try = [
-                '.s-item',
-                '.sresult',
-                '[data-testid="item"]',
-                '.x-item',
-                '.srp-results .s-item',
-                '.srp-river-results .s-item'
-            ]
-
-            for selector in selectors_to_try:
-                containers = soup.select(selector)
-                if containers:
-                    self.logger.info(f"Found {len(containers)} items with selector: {selector}")
-                    item_containers = containers
-                    break
+            item_containers = self.select_item_containers(soup)
 
             if not item_containers:
                 # Fallback: look for any links to item pages
@@ -143,6 +137,26 @@ class BrowserlessEbaySearch:
             self.logger.error(f"Error during eBay search: {e}")
             return []
 
+    def select_item_containers(self, soup: BeautifulSoup) -> List[Any]:
+        """Find the search result item containers on a results page"""
+        # Try different item selectors
+        selectors_to_try = [
+            '.s-item',
+            '.sresult',
+            '[data-testid="item"]',
+            '.x-item',
+            '.srp-results .s-item',
+            '.srp-river-results .s-item'
+        ]
+
+        for selector in selectors_to_try:
+            containers = soup.select(selector)
+            if containers:
+                self.logger.info(f"Found {len(containers)} items with selector: {selector}")
+                return containers
+
+        return []
+
     def extract_item_from_container(self, container) -> Optional[Dict[str, Any]]:
         """Extract basic item data from search result container"""
         try:
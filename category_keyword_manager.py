@@ -12,12 +12,17 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
+from keyword_matcher import KeywordMatcher, normalize_text
+
 class CategoryKeywordManager:
     """Manages category keywords for search optimization"""
 
     def __init__(self, keywords_file: str = "category_keywords.json"):
         self.keywords_file = Path(keywords_file)
         self.categories = {}
+        self._keyword_matcher = KeywordMatcher()
+        self._keyword_categories: Dict[str, str] = {}
+        self._matcher_dirty = True
         self.load_keywords()
 
     def load_keywords(self) -> Dict[str, Any]:
@@ -34,10 +39,13 @@ class CategoryKeywordManager:
             logging.error(f"Error loading category keywords: {e}")
             self.categories = {}
 
+        self._matcher_dirty = True
         return self.categories
 
     def save_keywords(self) -> bool:
         """Save category keywords to JSON file"""
+        # Every keyword mutation goes through here
+        self._matcher_dirty = True
         try:
             with open(self.keywords_file, 'w', encoding='utf-8') as f:
                 json.dump(self.categories, f, indent=2, ensure_ascii=False)
@@ -142,24 +150,39 @@ class CategoryKeywordManager:
             logging.error(f"Error updating research data for {category}: {e}")
             return False
 
+    def _refresh_keyword_matcher(self):
+        """Recompile the keyword automaton if categories changed since last build"""
+        if not self._matcher_dirty:
+            return
+
+        keywords = []
+        keyword_categories = {}
+        for category, data in self.categories.items():
+            candidates = [data.get('primary_keyword', '')] + list(data.get('secondary_keywords', []))
+            for keyword in candidates:
+                normalized = normalize_text(keyword)
+                if not normalized.strip():
+                    continue
+                keywords.append(keyword)
+                # First category (in file order) wins, same as the old linear scan
+                keyword_categories.setdefault(normalized, category)
+
+        self._keyword_matcher.set_keywords(keywords)
+        self._keyword_categories = keyword_categories
+        self._matcher_dirty = False
+
     def detect_category_from_text(self, text: str) -> Optional[str]:
         """Detect which category a text belongs to based on keywords"""
-        text_lower = text.lower()
+        self._refresh_keyword_matcher()
 
-        # Check each category's keywords
-        for category, data in self.categories.items():
-            # Check primary keyword
-            primary = data.get('primary_keyword', '').lower()
-            if primary and primary in text_lower:
-                return category
-
-            # Check secondary keywords
-            secondary_keywords = data.get('secondary_keywords', [])
-            for keyword in secondary_keywords:
-                if keyword.lower() in text_lower:
-                    return category
-
-        return None
+        matched = self._keyword_matcher.find_all(text)
+        if not matched:
+            return None
+
+        # Pick the earliest category among all matched keywords
+        category_order = {category: i for i, category in enumerate(self.categories)}
+        matched_categories = {self._keyword_categories[normalize_text(kw)] for kw in matched}
+        return min(matched_categories, key=lambda c: category_order.get(c, len(category_order)))
 
     def get_all_categories(self) -> List[str]:
         """Get list of all available categories"""
@@ -0,0 +1,195 @@
+"""
+Incremental CSV comparison: cached eBay matches per CSV row.
+
+Scheduled runs compare the same CSV rows against mostly the same eBay
+listings every hour. Each compared row gets a fingerprint of everything
+its matches depend on - the row's price, its image, the version of the
+eBay result set it was compared against and the scoring settings - and its
+matches are cached in a sidecar file next to the CSV
+(results/foo.csv -> results/foo.compare.json):
+
+    cache = get_compare_cache(csv_path)
+    version = result_set_version(ebay_results, scoring_config)
+    fingerprint = compare_fingerprint(row, version)
+    matches = cache.get(row_key(row), fingerprint)    # None: compare the row again
+    ...
+    cache.put(row_key(row), fingerprint, [cached_match(ebay_item, similarity), ...])
+    cache.save()
+
+Only the matched eBay listing and its similarity are cached; result rows
+(profit at the current exchange rate) are built from them on every run.
+A row is compared again when it is new, its price or image changed, the
+eBay results or scoring settings changed, or its cached matches are older than
+'image_comparison.compare_cache_max_age_hours'. The mode is switched by
+'image_comparison.incremental_compare'.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Bump when the stored matches change meaning (scoring, stored fields)
+CACHE_VERSION = 2
+
+DEFAULT_MAX_AGE_HOURS = 24
+
+
+def _digest(*parts) -> str:
+    hasher = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        hasher.update(str(part).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def row_key(row: Dict) -> str:
+    """Stable key of a CSV row (its product URL, falling back to the title)."""
+    return row.get('product_url') or row.get('url') or row.get('title', '')
+
+
+def result_set_version(ebay_results: List[Dict], scoring_config: Optional[Dict] = None) -> str:
+    """
+    Version of an eBay result set and the scoring it is compared with.
+
+    Args:
+        ebay_results: eBay listings; the version changes when any listing, image or price changes
+        scoring_config: Settings the similarities and kept matches depend on (feature
+            version, matches per item, comparison method, ...); any change invalidates the matches
+
+    Returns:
+        Version digest
+    """
+    listings = sorted(
+        (ebay_item.get('product_url') or ebay_item.get('url', ''),
+         ebay_item.get('main_image') or ebay_item.get('image_url', ''),
+         ebay_item.get('current_price') or ebay_item.get('price', ''),
+         ebay_item.get('shipping_cost') or ebay_item.get('shipping', ''))
+        for ebay_item in ebay_results)
+    scoring = json.dumps(scoring_config or {}, sort_keys=True, default=str)
+    return _digest(CACHE_VERSION, scoring, *listings)
+
+
+def image_hash(row: Dict) -> str:
+    """Hash of a row's image: the local file's bytes, or its URL if not downloaded."""
+    local_image = (row.get('local_image') or '').strip()
+    if local_image:
+        try:
+            return hashlib.blake2b(Path(local_image).read_bytes(), digest_size=12).hexdigest()
+        except OSError:
+            pass
+    return _digest(row.get('image_url', ''))
+
+
+def cached_match(ebay_item: Dict, similarity: float) -> Dict:
+    """Cache entry of one match: the eBay listing and its similarity (result rows are rebuilt from it)."""
+    return {'ebay_item': ebay_item, 'similarity': similarity}
+
+
+def compare_fingerprint(row: Dict, version: str) -> str:
+    """Fingerprint of a row's comparison: its price, its image and the eBay result set version."""
+    return _digest(row.get('price_text', row.get('price', '')), image_hash(row), version)
+
+
+class CompareResultCache:
+    """Fingerprinted comparison matches per CSV row, stored as one JSON file."""
+
+    def __init__(self, path, max_age_hours: float = DEFAULT_MAX_AGE_HOURS):
+        """
+        Load the cache file (a missing or unreadable file starts an empty cache).
+
+        Args:
+            path: Cache file
+            max_age_hours: Cached matches older than this are compared again
+        """
+        self.path = Path(path)
+        self.max_age = max_age_hours * 3600
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self._entries = data.get('rows', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.warning(f"Ignoring unreadable compare cache {self.path}: {e}")
+
+    def get(self, key: str, fingerprint: str) -> Optional[List[Dict]]:
+        """
+        Cached matches of a row.
+
+        Returns:
+            The cached_match() entries (possibly empty), or None if the row must be compared again
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.get('fingerprint') != fingerprint:
+            return None
+        if time.time() - entry.get('compared_at', 0) > self.max_age:
+            return None
+        return entry.get('results', [])
+
+    def put(self, key: str, fingerprint: str, results: List[Dict]):
+        """Record the matches (cached_match() entries) of a freshly compared row."""
+        with self._lock:
+            self._entries[key] = {'fingerprint': fingerprint, 'compared_at': time.time(), 'results': results}
+            self._dirty = True
+
+    def clear(self):
+        """Forget every row (the next compare runs in full)."""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = False
+        self.path.unlink(missing_ok=True)
+
+    def save(self):
+        """Write the cache file if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': CACHE_VERSION, 'rows': dict(self._entries)}
+            self._dirty = False
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not write compare cache {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def compare_cache_path(csv_path) -> Path:
+    """Sidecar cache file of a CSV file."""
+    return Path(csv_path).with_suffix('.compare.json')
+
+
+def get_compare_cache(csv_path) -> Optional[CompareResultCache]:
+    """
+    Compare cache of a CSV file, configured from user settings.
+
+    Returns:
+        The cache, or None when incremental comparison is switched off (or there is no CSV)
+    """
+    if not csv_path:
+        return None
+    max_age_hours = DEFAULT_MAX_AGE_HOURS
+    try:
+        from settings_manager import get_setting
+        if not get_setting('image_comparison.incremental_compare', True):
+            return None
+        max_age_hours = float(get_setting('image_comparison.compare_cache_max_age_hours', DEFAULT_MAX_AGE_HOURS))
+    except Exception:
+        pass
+    return CompareResultCache(compare_cache_path(csv_path), max_age_hours=max_age_hours)
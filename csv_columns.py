@@ -0,0 +1,407 @@
+"""
+Columnar in-memory model of a results CSV.
+
+The CSV comparison tree filters the same rows on every toggle: in stock,
+newly listed in the last N hours, not compared yet. Instead of re-parsing
+'first_seen' timestamps, lowercasing 'in_stock' and reformatting prices row
+by row each time, the rows are parsed once into typed NumPy columns and the
+filters become mask operations:
+
+    columns = load_csv_columns(csv_path)
+    rows = columns.select(in_stock_only=True, listed_within_hours=24)   # row indexes
+    new = columns.listed_since_mask(12)[rows]
+
+- The parsed rows (csv.DictReader dicts) are kept in 'columns.rows'; rows
+  edited in place are re-typed with update_rows().
+- Columns are cached per CSV path, size and mtime: reloading an unchanged
+  file reuses them, and a file written by the GUI can be re-registered
+  with remember_csv_columns() so the next load stays instant.
+- Across sessions, the rows and typed columns are also stored in a binary
+  sidecar next to the CSV (results/foo.csv -> results/foo.csvcol), written
+  after the first parse and validated by the CSV's size and mtime. Later
+  loads memory-map it: each field is one UTF-8 block split into values and
+  the typed columns are read as raw arrays, so nothing is re-parsed. The
+  sidecar is switched by 'general.csv_sidecar_cache'.
+"""
+
+import csv
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Files whose columns are kept in memory
+MAX_CACHED_FILES = 8
+
+# Sidecar file: MAGIC, '<I' header length, JSON header, then the field blocks and typed arrays
+SIDECAR_SUFFIX = '.csvcol'
+SIDECAR_MAGIC = b'CSVCOL1\n'
+SIDECAR_HEADER = struct.Struct('<I')
+# Bump when the sidecar layout or the typed columns change meaning
+SIDECAR_VERSION = 1
+# Separator of the values in a field block (never part of a CSV value)
+_VALUE_SEPARATOR = '\0'
+
+_TRUE_VALUES = ('true', 'yes', '1')
+_PRICE_NUMBER = re.compile(r'\d+\.?\d*')
+
+
+def parse_timestamp(text: str) -> float:
+    """Epoch seconds of an ISO timestamp (local time if naive), NaN if missing or invalid."""
+    if not text:
+        return np.nan
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except (ValueError, TypeError, OverflowError):
+        return np.nan
+
+
+def parse_price(text) -> float:
+    """Numeric price of a float or a price text ('¥1,234', '160999.0'), NaN if there is none."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _PRICE_NUMBER.search(str(text or '').replace(',', ''))
+    return float(match.group(0)) if match else np.nan
+
+
+class CSVColumns:
+    """Typed columns (timestamps, stock flags, prices, categories) over the rows of a results CSV."""
+
+    # Names of the typed column arrays
+    TYPED_COLUMNS = ('first_seen', 'in_stock', 'compared', 'price', 'price_is_number', 'category')
+
+    def __init__(self, rows: List[Dict]):
+        """
+        Parse the typed columns of the rows.
+
+        Args:
+            rows: CSV rows (kept by reference in self.rows)
+        """
+        self.rows = rows
+        count = len(rows)
+        # 'first_seen' as epoch seconds (NaN: missing or invalid)
+        self.first_seen = np.full(count, np.nan)
+        self.in_stock = np.zeros(count, dtype=bool)
+        self.compared = np.zeros(count, dtype=bool)
+        # Numeric store price (NaN: unknown) and whether the CSV holds it as a bare number
+        self.price = np.full(count, np.nan)
+        self.price_is_number = np.zeros(count, dtype=bool)
+        # Category of each row as an index into self.categories
+        self.category = np.zeros(count, dtype=np.int32)
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._category_rows: Dict[int, np.ndarray] = {}
+
+        self.update_rows()
+
+    @classmethod
+    def from_arrays(cls, rows: List[Dict], arrays: Dict[str, np.ndarray], categories: List[str]) -> 'CSVColumns':
+        """Columns of rows whose typed columns were already parsed (e.g. read from a sidecar)."""
+        columns = cls.__new__(cls)
+        columns.rows = rows
+        for name in cls.TYPED_COLUMNS:
+            setattr(columns, name, arrays[name])
+        columns.categories = list(categories)
+        columns._category_codes = {category: code for code, category in enumerate(columns.categories)}
+        columns._category_rows = {}
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def update_rows(self, indexes: Optional[Iterable[int]] = None) -> None:
+        """
+        Re-type rows edited in place (e.g. after 'ebay_compared' is set).
+
+        Args:
+            indexes: Row indexes to update (default: all)
+        """
+        for i in (range(len(self.rows)) if indexes is None else indexes):
+            row = self.rows[i]
+            self.first_seen[i] = parse_timestamp(row.get('first_seen', ''))
+            self.in_stock[i] = str(row.get('in_stock', '')).lower() in _TRUE_VALUES
+            self.compared[i] = bool(row.get('ebay_compared', ''))
+
+            price_raw = row.get('price_text', row.get('price', ''))
+            self.price[i] = parse_price(price_raw)
+            self.price_is_number[i] = isinstance(price_raw, (int, float)) or (
+                isinstance(price_raw, str) and price_raw.replace('.', '').replace(',', '').isdigit())
+
+            category = row.get('category', '')
+            code = self._category_codes.get(category)
+            if code is None:
+                code = self._category_codes[category] = len(self.categories)
+                self.categories.append(category)
+            self.category[i] = code
+        self._category_rows.clear()
+
+    # ------------------------------------------------------------------
+    # Masks
+    # ------------------------------------------------------------------
+
+    def in_stock_mask(self) -> np.ndarray:
+        return self.in_stock
+
+    def not_compared_mask(self) -> np.ndarray:
+        return ~self.compared
+
+    def listed_since_mask(self, hours: float, now: Optional[float] = None) -> np.ndarray:
+        """Rows first seen within the last N hours (rows without a valid date never match)."""
+        cutoff = (time.time() if now is None else now) - hours * 3600
+        with np.errstate(invalid='ignore'):
+            return self.first_seen >= cutoff
+
+    def category_rows(self, category: str) -> np.ndarray:
+        """Indexes of the rows in a category (precomputed on first use)."""
+        code = self._category_codes.get(category)
+        if code is None:
+            return np.zeros(0, dtype=np.intp)
+        rows = self._category_rows.get(code)
+        if rows is None:
+            rows = self._category_rows[code] = np.flatnonzero(self.category == code)
+        return rows
+
+    def select(self, in_stock_only: bool = False, listed_within_hours: Optional[float] = None,
+               not_compared_only: bool = False, category: Optional[str] = None,
+               now: Optional[float] = None) -> np.ndarray:
+        """
+        Indexes of the rows passing every requested filter, in file order.
+
+        Args:
+            in_stock_only: Keep rows marked in stock
+            listed_within_hours: Keep rows first seen within the last N hours
+            not_compared_only: Keep rows without eBay comparison results
+            category: Keep rows of this category
+            now: Reference time in epoch seconds (default: now)
+        """
+        mask = np.ones(len(self.rows), dtype=bool)
+        if in_stock_only:
+            mask &= self.in_stock_mask()
+        if listed_within_hours is not None:
+            mask &= self.listed_since_mask(listed_within_hours, now)
+        if not_compared_only:
+            mask &= self.not_compared_mask()
+        if category is not None:
+            category_mask = np.zeros(len(self.rows), dtype=bool)
+            category_mask[self.category_rows(category)] = True
+            mask &= category_mask
+        return np.flatnonzero(mask)
+
+    def display_price(self, index: int) -> str:
+        """Store price as shown in the GUI: bare numbers as '¥160,999', formatted texts as is."""
+        if self.price_is_number[index] and not np.isnan(self.price[index]):
+            return f"¥{self.price[index]:,.0f}"
+        row = self.rows[index]
+        return row.get('price_text', row.get('price', ''))
+
+
+# Cached columns: resolved path -> ((size, mtime_ns), columns)
+_columns_cache: "OrderedDict[str, Tuple[Tuple[int, int], CSVColumns]]" = OrderedDict()
+_columns_cache_lock = threading.Lock()
+
+
+def _file_version(csv_path: Path) -> Tuple[int, int]:
+    stat = csv_path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_csv_columns(csv_path) -> CSVColumns:
+    """
+    Rows and typed columns of a CSV file, parsed once per file version.
+
+    Args:
+        csv_path: CSV file
+
+    Returns:
+        The cached columns if the file's size and mtime are unchanged, else freshly parsed ones
+    """
+    csv_path = Path(csv_path)
+    key = str(csv_path.resolve())
+    version = _file_version(csv_path)
+    with _columns_cache_lock:
+        cached = _columns_cache.get(key)
+        if cached and cached[0] == version:
+            _columns_cache.move_to_end(key)
+            return cached[1]
+
+    use_sidecar = _sidecar_enabled()
+    columns = read_sidecar(csv_path, version) if use_sidecar else None
+    if columns is None:
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        columns = CSVColumns(rows)
+        logging.getLogger(__name__).debug(f"Parsed {len(rows)} rows of {csv_path.name}")
+        if use_sidecar:
+            write_sidecar(csv_path, columns, version)
+    _store(key, version, columns)
+    return columns
+
+
+def remember_csv_columns(csv_path, columns: CSVColumns) -> None:
+    """Register the columns of a CSV file just written from them, so the next load reuses them."""
+    csv_path = Path(csv_path)
+    try:
+        version = _file_version(csv_path)
+    except OSError:
+        return
+    _store(str(csv_path.resolve()), version, columns)
+    if _sidecar_enabled():
+        write_sidecar(csv_path, columns, version)
+
+
+def _store(key: str, version: Tuple[int, int], columns: CSVColumns) -> None:
+    with _columns_cache_lock:
+        _columns_cache[key] = (version, columns)
+        _columns_cache.move_to_end(key)
+        while len(_columns_cache) > MAX_CACHED_FILES:
+            _columns_cache.popitem(last=False)
+
+
+# ----------------------------------------------------------------------
+# Sidecar files
+# ----------------------------------------------------------------------
+
+def _sidecar_enabled() -> bool:
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('general.csv_sidecar_cache', True))
+    except Exception:
+        return True
+
+
+def sidecar_path(csv_path) -> Path:
+    """Sidecar file of a CSV file."""
+    return Path(csv_path).with_suffix(SIDECAR_SUFFIX)
+
+
+def write_sidecar(csv_path, columns: CSVColumns, version: Tuple[int, int]) -> bool:
+    """
+    Store rows and typed columns next to their CSV file.
+
+    Args:
+        csv_path: CSV file the columns were parsed from
+        columns: Parsed columns
+        version: (size, mtime_ns) of the CSV file
+
+    Returns:
+        True if written; False if the rows can't be stored as plain text fields
+        (missing or extra values, differing keys) or the file can't be written
+    """
+    logger = logging.getLogger(__name__)
+    rows = columns.rows
+    fields = list(rows[0].keys()) if rows else []
+    for row in rows:
+        if len(row) != len(fields) or list(row.keys()) != fields:
+            return False
+
+    # Each field is one block of its values; typed arrays follow, 8-byte aligned
+    blocks = []
+    for field in fields:
+        values = [row[field] for row in rows]
+        if not all(isinstance(value, str) and _VALUE_SEPARATOR not in value for value in values):
+            return False
+        blocks.append(_VALUE_SEPARATOR.join(values).encode('utf-8'))
+    arrays = [np.ascontiguousarray(getattr(columns, name)) for name in CSVColumns.TYPED_COLUMNS]
+
+    offset = 0
+    block_spans = []
+    for block in blocks:
+        block_spans.append([offset, len(block)])
+        offset += len(block)
+    array_specs = {}
+    for name, array in zip(CSVColumns.TYPED_COLUMNS, arrays):
+        offset += -offset % 8
+        array_specs[name] = [array.dtype.str, offset, len(array)]
+        offset += array.nbytes
+
+    header = json.dumps({
+        'version': SIDECAR_VERSION,
+        'csv_size': version[0],
+        'csv_mtime_ns': version[1],
+        'rows': len(rows),
+        'fields': fields,
+        'blocks': block_spans,
+        'arrays': array_specs,
+        'categories': columns.categories,
+    }, ensure_ascii=False).encode('utf-8')
+
+    path = sidecar_path(csv_path)
+    tmp_path = path.with_suffix(f'{SIDECAR_SUFFIX}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(SIDECAR_MAGIC)
+            f.write(SIDECAR_HEADER.pack(len(header)))
+            f.write(header)
+            written = 0
+            for block in blocks:
+                f.write(block)
+                written += len(block)
+            for name, array in zip(CSVColumns.TYPED_COLUMNS, arrays):
+                padding = array_specs[name][1] - written
+                f.write(b'\0' * padding)
+                f.write(array.tobytes())
+                written += padding + array.nbytes
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write CSV sidecar {path.name}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def read_sidecar(csv_path, version: Tuple[int, int]) -> Optional[CSVColumns]:
+    """
+    Rows and typed columns of a CSV file from its sidecar.
+
+    Args:
+        csv_path: CSV file
+        version: Current (size, mtime_ns) of the CSV file
+
+    Returns:
+        The columns, or None if there is no valid sidecar for this version of the file
+    """
+    path = sidecar_path(csv_path)
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(SIDECAR_MAGIC)] != SIDECAR_MAGIC:
+                raise ValueError("bad magic")
+            start = len(SIDECAR_MAGIC) + SIDECAR_HEADER.size
+            (header_size,) = SIDECAR_HEADER.unpack_from(mapped, len(SIDECAR_MAGIC))
+            header = json.loads(mapped[start:start + header_size].decode('utf-8'))
+            if (header.get('version') != SIDECAR_VERSION
+                    or (header.get('csv_size'), header.get('csv_mtime_ns')) != tuple(version)):
+                return None
+
+            body = start + header_size
+            count = header['rows']
+            with memoryview(mapped) as view:
+                values = []
+                for offset, size in header['blocks']:
+                    block = str(view[body + offset:body + offset + size], 'utf-8')
+                    values.append(block.split(_VALUE_SEPARATOR) if count else [])
+                arrays = {}
+                for name, (dtype, offset, length) in header['arrays'].items():
+                    # Copied out of the mapping: the columns are updated in place later
+                    arrays[name] = np.frombuffer(view, dtype=np.dtype(dtype), count=length,
+                                                 offset=body + offset).copy()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        logging.getLogger(__name__).warning(f"Ignoring unreadable CSV sidecar {path.name}: {e}")
+        return None
+
+    fields = header['fields']
+    if any(len(column) != count for column in values) or set(arrays) != set(CSVColumns.TYPED_COLUMNS):
+        return None
+    rows = [dict(zip(fields, row_values)) for row_values in zip(*values)] if fields else [{} for _ in range(count)]
+    return CSVColumns.from_arrays(rows, arrays, header['categories'])
@@ -0,0 +1,313 @@
+"""
+Debug artifacts of comparison runs.
+
+Compare workers keep the images they compared under
+debug_comparison/<query>_<timestamp>/ so a run can be inspected afterwards
+(and turned into benchmark fixtures, see benchmarks/image_matching.py).
+Writing them must not slow the comparison down, so a DebugRun hands the
+files to a background writer and keeps a manifest of the run:
+
+    run = start_debug_run(query)
+    run.save_image(f"ebay_{i:02d}_{title}.jpg", image, url=image_url)
+    run.record(csv_item=1, ebay_item=3, similarity=87.5)
+    run.close(results=len(results))
+
+- Levels, from the 'image_comparison.debug_artifacts' setting:
+    off      nothing is written, not even the folder
+    summary  only manifest.json (images compared, scores, timing)
+    full     manifest.json plus every image
+- One writer thread serves all runs. Its queue is bounded in bytes; when it is
+  full, images are dropped (and flagged in the manifest) instead of stalling
+  the comparison.
+- Images are copied as their original encoded bytes (from the image cache or
+  the local file) when those are already in the target file's format, and
+  only re-encoded otherwise.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from image_cache import get_image_cache, image_extension
+
+DEBUG_LEVELS = ('off', 'summary', 'full')
+DEFAULT_LEVEL = 'full'
+DEBUG_ROOT = 'debug_comparison'
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_QUEUE_MB = 64
+
+
+def _normalize_extension(suffix: str) -> str:
+    suffix = suffix.lower()
+    return '.jpg' if suffix == '.jpeg' else suffix
+
+
+class ArtifactWriter:
+    """Background thread writing debug files from a byte-bounded queue."""
+
+    def __init__(self, max_queue_mb: float = DEFAULT_QUEUE_MB):
+        """
+        Args:
+            max_queue_mb: Images waiting to be written may hold at most this much memory
+        """
+        self.max_queue_bytes = int(max_queue_mb * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+
+    def submit(self, path, image: Optional[np.ndarray] = None, data: Optional[bytes] = None,
+               url: Optional[str] = None, source_file: Optional[str] = None) -> bool:
+        """
+        Queue one image file.
+
+        The file gets the first of these that is already in its format: data,
+        the cached bytes of url, the bytes of source_file. Otherwise image is
+        encoded (or data written as is, when there is no decoded image).
+
+        Args:
+            path: Destination file; its suffix picks the format
+            image: Decoded BGR image
+            data: Encoded image bytes
+            url: URL the image was downloaded from (through the image cache)
+            source_file: Local file the image was loaded from
+
+        Returns:
+            False if the queue was full and the image was dropped
+        """
+        size = (len(data) if data is not None else 0) + (image.nbytes if image is not None else 0)
+        with self._cond:
+            if self._queue and self._queued_bytes + size > self.max_queue_bytes:
+                self.dropped += 1
+                return False
+            self._queue.append((Path(path), image, data, url, source_file, size))
+            self._queued_bytes += size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='debug-artifact-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush, 10)
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued file is written.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                path, image, data, url, source_file, size = self._queue.popleft()
+                self._busy = True
+            try:
+                self._write(path, image, data, url, source_file)
+                self.written += 1
+            except Exception as e:
+                self.logger.warning(f"Could not write debug image {path}: {e}")
+            finally:
+                with self._cond:
+                    self._queued_bytes -= size
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _write(path: Path, image, data, url, source_file):
+        extension = _normalize_extension(path.suffix) or '.jpg'
+
+        encoded = None
+        for candidate in (
+                lambda: data,
+                lambda: get_image_cache().lookup(url) if url else None,
+                lambda: Path(source_file).read_bytes() if source_file else None):
+            try:
+                blob = candidate()
+            except OSError:
+                blob = None
+            if blob and image_extension(blob, default='') == extension:
+                encoded = blob
+                break
+
+        if encoded is None and image is not None:
+            ok, buffer = cv2.imencode(extension, image)
+            if not ok:
+                raise ValueError(f"could not encode image as {extension}")
+            encoded = buffer.tobytes()
+        if encoded is None:
+            encoded = data
+        if not encoded:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(encoded)
+
+
+class DebugRun:
+    """Debug folder and manifest of one comparison run."""
+
+    def __init__(self, name: str, level: str = DEFAULT_LEVEL, root: str = DEBUG_ROOT,
+                 writer: Optional[ArtifactWriter] = None):
+        """
+        Start a run (creates its folder unless the level is 'off').
+
+        Args:
+            name: Run name, usually the search query
+            level: 'off', 'summary' or 'full'
+            root: Directory holding the run folders
+            writer: Image writer (default: the global one)
+        """
+        self.name = name
+        self.level = level if level in DEBUG_LEVELS else DEFAULT_LEVEL
+        self.writer = writer
+        self.started = time.time()
+        self.folder: Optional[Path] = None
+
+        self._lock = threading.Lock()
+        self._images: List[Dict[str, Any]] = []
+        self._records: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.closed = False
+
+        if self.enabled:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_name = safe_filename(name, limit=None)
+            self.folder = Path(root) / f"{safe_name}_{timestamp}"
+            self.folder.mkdir(parents=True, exist_ok=True)
+            print(f"[DEBUG] Debug folder: {self.folder} (level: {self.level})")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the run writes anything at all."""
+        return self.level != 'off'
+
+    @property
+    def saves_images(self) -> bool:
+        """Whether images are written (level 'full')."""
+        return self.level == 'full'
+
+    def save_image(self, filename: str, image: Optional[np.ndarray] = None, data: Optional[bytes] = None,
+                   url: Optional[str] = None, source_file: Optional[str] = None, **info):
+        """
+        Save one compared image (level 'full') and list it in the manifest.
+
+        Args:
+            filename: File name inside the run folder
+            image, data, url, source_file: See ArtifactWriter.submit
+            **info: Extra manifest fields for the image
+        """
+        if not self.enabled:
+            return
+        entry = {'file': filename, **info}
+        if url:
+            entry['url'] = url
+        elif source_file:
+            entry['source'] = str(source_file)
+
+        if self.saves_images:
+            writer = self.writer or get_artifact_writer()
+            if not writer.submit(self.folder / filename, image, data, url, source_file):
+                entry['dropped'] = True
+                with self._lock:
+                    self.dropped += 1
+        with self._lock:
+            self._images.append(entry)
+
+    def record(self, **fields):
+        """Add one record (a score, a match, a timing) to the manifest."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._records.append(fields)
+
+    def close(self, **summary) -> Optional[Path]:
+        """
+        Write the run manifest. Queued images keep being written in the background.
+
+        Args:
+            **summary: Run-level manifest fields (result counts and so on)
+
+        Returns:
+            Manifest path, or None when the level is 'off'
+        """
+        if not self.enabled or self.closed:
+            return None
+        self.closed = True
+        with self._lock:
+            manifest = {
+                'name': self.name,
+                'level': self.level,
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'duration_s': round(time.time() - self.started, 3),
+                'summary': summary,
+                'images': self._images,
+                'dropped_images': self.dropped,
+                'records': self._records,
+            }
+
+        path = self.folder / MANIFEST_NAME
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not write debug manifest {path}: {e}")
+            return None
+        return path
+
+
+def safe_filename(text: str, limit: Optional[int] = 50) -> str:
+    """Text reduced to letters, digits and underscores, for debug file names."""
+    if limit is not None:
+        text = text[:limit]
+    return "".join(c for c in text if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
+
+
+def get_debug_level() -> str:
+    """Debug artifact level from user settings ('off', 'summary' or 'full')."""
+    try:
+        from settings_manager import get_setting
+        level = str(get_setting('image_comparison.debug_artifacts', DEFAULT_LEVEL)).lower()
+    except Exception:
+        level = DEFAULT_LEVEL
+    return level if level in DEBUG_LEVELS else DEFAULT_LEVEL
+
+
+# Global writer instance
+_artifact_writer = None
+_artifact_writer_lock = threading.Lock()
+
+
+def get_artifact_writer() -> ArtifactWriter:
+    """Get the global debug image writer."""
+    global _artifact_writer
+    with _artifact_writer_lock:
+        if _artifact_writer is None:
+            _artifact_writer = ArtifactWriter()
+        return _artifact_writer
+
+
+def start_debug_run(name: str) -> DebugRun:
+    """Start a debug run at the level configured in user settings."""
+    return DebugRun(name, level=get_debug_level())
@@ -18,11 +18,17 @@ class EbaySearchSpider(scrapy.Spider):
     }
     
     def __init__(self, query=None, max_results=50, site='US', condition=None,
-                 min_price=None, max_price=None, sort='BestMatch', sold_listings=False, *args, **kwargs):
+                 min_price=None, max_price=None, sort='BestMatch', sold_listings=False,
+                 queries=None, queries_file=None, dedupe='True', *args, **kwargs):
         super(EbaySearchSpider, self).__init__(*args, **kwargs)
 
-        self.search_query = query or 'laptop computer'
+        # Batch mode: several queries in one crawl (max_results applies per query)
+        #   -a queries='["query one", "query two"]'
+        #   -a queries_file=queries.json   (JSON list, or one query per line)
+        self.search_queries = self._load_queries(query, queries, queries_file)
+        self.search_query = self.search_queries[0]
         self.max_results = int(max_results)
+        self.dedupe = str(dedupe).lower() not in ('false', '0', 'no')
         self.site = site.upper()
         self.condition = condition
         self.min_price = min_price
@@ -31,6 +37,14 @@ class EbaySearchSpider(scrapy.Spider):
         self.sold_listings = sold_listings  # Search sold listings if True
         self.results_count = 0
         self.current_page = 1
+
+        # Per-query progress and cross-query deduplication by eBay item ID
+        self.query_results = {q: 0 for q in self.search_queries}
+        self.query_pages = {q: 1 for q in self.search_queries}
+        self.seen_item_ids = set()
+        self.duplicates_skipped = 0
+        # Queries whose result pages ran out before max_results (their results are complete)
+        self.exhausted_queries = set()
         
         # eBay site URLs
         self.site_urls = {
@@ -46,13 +60,55 @@ class EbaySearchSpider(scrapy.Spider):
         
         self.base_url = self.site_urls.get(self.site, self.site_urls['US'])
         
-        self.logger.info(f"Starting eBay search for: '{self.search_query}' on {self.site}")
+        if len(self.search_queries) > 1:
+            self.logger.info(f"Starting eBay batch search for {len(self.search_queries)} queries on {self.site}")
+        else:
+            self.logger.info(f"Starting eBay search for: '{self.search_query}' on {self.site}")
         self.logger.info(f"Max results to scrape: {self.max_results}")
-    
+
+    def _load_queries(self, query, queries, queries_file):
+        """Collect search queries from the query / queries / queries_file arguments"""
+        collected = []
+        if query:
+            collected.append(query)
+
+        if queries:
+            if isinstance(queries, str):
+                try:
+                    parsed = json.loads(queries)
+                except json.JSONDecodeError:
+                    parsed = [queries]
+            else:
+                parsed = queries
+            collected.extend(parsed if isinstance(parsed, list) else [parsed])
+
+        if queries_file:
+            with open(queries_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            try:
+                parsed = json.loads(content)
+                collected.extend(parsed if isinstance(parsed, list) else [parsed])
+            except json.JSONDecodeError:
+                collected.extend(content.splitlines())
+
+        # Drop blanks and exact repeats, keep order
+        unique = []
+        for q in collected:
+            q = str(q).strip()
+            if q and q not in unique:
+                unique.append(q)
+
+        return unique or ['laptop computer']
+
     def start_requests(self):
-        """Generate initial search requests"""
+        """Generate initial search requests (one per query)"""
+        for search_query in self.search_queries:
+            yield self._build_search_request(search_query)
+
+    def _build_search_request(self, search_query):
+        """Build the first-page search request for one query"""
         search_params = {
-            '_nkw': self.search_query,  # Search query
+            '_nkw': search_query,  # Search query
             '_sop': self._get_sort_value(self.sort),  # Sort option
         }
         
@@ -85,11 +141,11 @@ class EbaySearchSpider(scrapy.Spider):
         # Log the actual URL being requested
         self.logger.info(f"Search URL: {search_url}")
 
-        yield scrapy.Request(
+        return scrapy.Request(
             url=search_url,
             callback=self.parse_search_results,
             meta={
-                'search_query': self.search_query,
+                'search_query': search_query,
                 'page': 1,
                 'search_params': search_params
             },
@@ -134,20 +190,7 @@ class EbaySearchSpider(scrapy.Spider):
         """Parse eBay search results page"""
         self.logger.info(f"Parsing search results from: {response.url}")
 
-        # Extract search result items - eBay now uses .s-card class within .srp-river-results
-        # Updated selector to match new eBay HTML structure (changed from .s-item to .s-card)
-        item_containers = response.css('.srp-river-results li.s-card')
-        self.logger.info(f"Found {len(item_containers)} items with .srp-river-results li.s-card")
-
-        if not item_containers:
-            # Fallback to broader selectors
-            item_containers = response.css('li.s-card')
-            self.logger.info(f"Fallback - Found {len(item_containers)} items with li.s-card")
-
-        if not item_containers:
-            # Try old selector in case eBay reverts
-            item_containers = response.css('li.s-item')
-            self.logger.info(f"Fallback - Found {len(item_containers)} items with li.s-item")
+        item_containers = self.select_item_containers(response)
 
         if not item_containers:
             # Save HTML for debugging
@@ -158,15 +201,17 @@ class EbaySearchSpider(scrapy.Spider):
 
         self.logger.info(f"eBay returned {len(item_containers)} item containers on page {response.meta.get('page', 1)}")
 
+        search_query = response.meta['search_query']
+
         # Save HTML for debugging if few results found
         if len(item_containers) <= 3:
-            debug_filename = f'debug_ebay_{self.search_query.replace(" ", "_")[:30]}.html'
+            debug_filename = f'debug_ebay_{search_query.replace(" ", "_")[:30]}.html'
             with open(debug_filename, 'wb') as f:
                 f.write(response.body)
             self.logger.info(f"Few results found - HTML saved to {debug_filename} for debugging")
 
         for container in item_containers:
-            if self.results_count >= self.max_results:
+            if self.query_results[search_query] >= self.max_results:
                 return
             
             # Skip sponsored/ad items if desired
@@ -176,6 +221,12 @@ class EbaySearchSpider(scrapy.Spider):
             try:
                 item_data = self.extract_search_item_data(container, response.meta)
                 if item_data:
+                    # Items already emitted for another query in this crawl are skipped
+                    if self.dedupe and item_data['product_id'] in self.seen_item_ids:
+                        self.duplicates_skipped += 1
+                        continue
+                    self.seen_item_ids.add(item_data['product_id'])
+                    self.query_results[search_query] += 1
                     self.results_count += 1
                     yield item_data
             except Exception as e:
@@ -183,21 +234,50 @@ class EbaySearchSpider(scrapy.Spider):
                 continue
         
         # Check for next page
-        if self.results_count < self.max_results:
+        if self.query_results[search_query] < self.max_results:
             next_page_url = self.get_next_page_url(response)
             if next_page_url:
-                self.current_page += 1
+                self.query_pages[search_query] = response.meta['page'] + 1
+                self.current_page = self.query_pages[search_query]
                 yield scrapy.Request(
                     url=next_page_url,
                     callback=self.parse_search_results,
                     meta={
-                        'search_query': response.meta['search_query'],
-                        'page': self.current_page,
+                        'search_query': search_query,
+                        'page': self.query_pages[search_query],
                         'search_params': response.meta['search_params']
                     },
                     headers=self._get_headers()
                 )
+            else:
+                self.exhausted_queries.add(search_query)
+
+    def closed(self, reason):
+        """Log per-query totals for batch crawls"""
+        if len(self.search_queries) > 1:
+            for search_query, count in self.query_results.items():
+                self.logger.info(f"Batch query '{search_query}': {count} items")
+            self.logger.info(f"Batch crawl skipped {self.duplicates_skipped} duplicate items across queries")
     
+    def select_item_containers(self, response):
+        """Find the search result item containers on a results page"""
+        # Extract search result items - eBay now uses .s-card class within .srp-river-results
+        # Updated selector to match new eBay HTML structure (changed from .s-item to .s-card)
+        item_containers = response.css('.srp-river-results li.s-card')
+        self.logger.info(f"Found {len(item_containers)} items with .srp-river-results li.s-card")
+
+        if not item_containers:
+            # Fallback to broader selectors
+            item_containers = response.css('li.s-card')
+            self.logger.info(f"Fallback - Found {len(item_containers)} items with li.s-card")
+
+        if not item_containers:
+            # Try old selector in case eBay reverts
+            item_containers = response.css('li.s-item')
+            self.logger.info(f"Fallback - Found {len(item_containers)} items with li.s-item")
+
+        return item_containers
+
     def extract_search_item_data(self, container, meta):
         """Extract data from a single search result item"""
         try:
@@ -395,7 +475,7 @@ class EbaySearchSpider(scrapy.Spider):
             
             # Search context
             item['search_query'] = meta['search_query']
-            item['search_position'] = self.results_count + 1
+            item['search_position'] = self.query_results.get(meta['search_query'], self.results_count) + 1
             item['search_page'] = meta['page']
             item['search_sort'] = self.sort
             
@@ -501,9 +581,9 @@ class EbaySearchSpider(scrapy.Spider):
             if next_link_alt:
                 return urljoin(response.url, next_link_alt)
             
-            # Build next page URL manually
-            current_params = response.meta.get('search_params', {})
-            current_params['_pgn'] = self.current_page + 1
+            # Build next page URL manually (copy - params are shared with earlier requests)
+            current_params = dict(response.meta.get('search_params', {}))
+            current_params['_pgn'] = response.meta.get('page', 1) + 1
             
             base_url = f"{self.base_url}/sch/i.html"
             next_url = f"{base_url}?{urlencode(current_params)}"
@@ -14,7 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from mandarake_scraper import EbayAPI
 
 
-def run_ebay_api_search(query: str, max_results: int = 50) -> List[Dict]:
+def run_ebay_api_search(query: str, max_results: int = 50, use_cache: bool = True) -> List[Dict]:
     """
     Search eBay using official Browse API and return results
 
@@ -24,10 +24,22 @@ def run_ebay_api_search(query: str, max_results: int = 50) -> List[Dict]:
     Args:
         query: Search query
         max_results: Maximum number of results to fetch (up to 200)
+        use_cache: Allow cached results (False forces a fresh API call)
 
     Returns:
         List of dictionaries containing eBay data in Scrapy-compatible format
     """
+    from ebay_search_cache import cached_search
+
+    return cached_search(
+        'api', query, max_results, False,
+        lambda depth: _run_ebay_api_search_uncached(query, depth),
+        use_cache=use_cache
+    )
+
+
+def _run_ebay_api_search_uncached(query: str, max_results: int) -> List[Dict]:
+    """Call the Browse API (no caching)."""
 
     # Load credentials from user_settings.json
     try:
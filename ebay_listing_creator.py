@@ -10,6 +10,8 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.parse import urlparse, unquote
 
+from image_cache import get_image_bytes
+
 
 class EbayListingCreator:
     """Create eBay draft listings from Mandarake items"""
@@ -67,9 +69,10 @@ class EbayListingCreator:
                 # Full-size: https://img.mandarake.co.jp/webshopimg/02/00/123/0200000123456.jpg
                 full_url = url.replace('s.jpg', '.jpg').replace('_thumb', '')
 
-                # Download image
-                response = requests.get(full_url, timeout=30)
-                response.raise_for_status()
+                # Download image (shared image cache)
+                data = get_image_bytes(full_url, timeout=30)
+                if data is None:
+                    raise IOError("download failed")
 
                 # Determine filename
                 parsed_url = urlparse(full_url)
@@ -84,7 +87,7 @@ class EbayListingCreator:
 
                 # Save image
                 with open(image_path, 'wb') as f:
-                    f.write(response.content)
+                    f.write(data)
 
                 downloaded.append(image_path)
                 print(f"[LISTING IMAGES] Downloaded: {image_path.name}")
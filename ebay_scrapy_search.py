@@ -10,18 +10,75 @@ from pathlib import Path
 from typing import List, Dict, Optional
 
 
-def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: bool = True) -> List[Dict]:
+def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: bool = True,
+                           use_cache: bool = True) -> List[Dict]:
     """
     Run the eBay Scrapy spider and return results
 
+    Results are served from the shared search cache when possible. Real
+    searches use the persistent crawler service (one reactor for all
+    queries) and fall back to a one-off `scrapy crawl` subprocess if the
+    service is disabled or unavailable.
+
     Args:
         query: Search query
         max_results: Maximum number of results to fetch
         sold_listings: Whether to search sold listings only
+        use_cache: Allow cached results (False forces a fresh scrape)
 
     Returns:
         List of dictionaries containing scraped eBay data
     """
+    from ebay_search_cache import cached_search
+
+    return cached_search(
+        'scrapy', query, max_results, sold_listings,
+        lambda depth: _run_ebay_scrapy_uncached(query, depth, sold_listings),
+        use_cache=use_cache
+    )
+
+
+def _run_ebay_scrapy_uncached(query: Optional[str], max_results: int, sold_listings: bool,
+                              queries: Optional[List[str]] = None, dedupe: bool = True,
+                              timeout: int = 60) -> List[Dict]:
+    """
+    Scrape eBay via the crawler service, or a subprocess if it's unavailable.
+
+    Service results are a CrawlResult: a crawl cut off by its timeout returns
+    the items scraped so far with `timed_out` set (they must not be cached),
+    and `exhausted_queries` names the queries that ran out of result pages.
+    """
+    from ebay_search_service import SearchServiceError, get_search_service, search_service_enabled
+
+    # Spider arguments (same as `-a key=value` on the command line)
+    spider_args = {
+        'max_results': max_results,
+        'sold_listings': 'True' if sold_listings else 'False',
+    }
+    if query:
+        spider_args['query'] = query
+    if queries:
+        spider_args['queries'] = json.dumps(queries, ensure_ascii=False)
+        spider_args['dedupe'] = 'True' if dedupe else 'False'
+
+    if search_service_enabled():
+        try:
+            service = get_search_service('ebay_search')
+            results = service.crawl('ebay_search', timeout=timeout, **spider_args)
+            if results.timed_out:
+                print(f"[SCRAPY] Crawl timed out after {timeout} seconds, "
+                      f"keeping {len(results)} partial items (not cached)")
+            else:
+                print(f"[SCRAPY] Successfully scraped {len(results)} items (crawler service)")
+            return results
+        except SearchServiceError as e:
+            print(f"[SCRAPY] Crawler service unavailable ({e}), falling back to subprocess")
+
+    return _run_ebay_scrapy_subprocess(spider_args, timeout)
+
+
+def _run_ebay_scrapy_subprocess(spider_args: Dict, timeout: int = 60) -> List[Dict]:
+    """Run the spider in a one-off `scrapy crawl` subprocess (results via temp JSON file)."""
     # Create temporary file for results
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
         temp_output = f.name
@@ -33,12 +90,13 @@ def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: boo
         cmd = [
             sys.executable,  # Use current Python interpreter
             "-m", "scrapy", "crawl", "ebay_search",
-            "-a", f"query={query}",
-            "-a", f"max_results={max_results}",
-            "-a", f"sold_listings={'True' if sold_listings else 'False'}",
+        ]
+        for key, value in spider_args.items():
+            cmd.extend(["-a", f"{key}={value}"])
+        cmd.extend([
             "-O", temp_output,
             "-s", "LOG_LEVEL=INFO"  # Show INFO logs to see URLs
-        ]
+        ])
 
         print(f"[SCRAPY] Running command: {' '.join(cmd)}")
         print(f"[SCRAPY] Working directory: {spider_path}")
@@ -50,7 +108,7 @@ def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: boo
             'cwd': str(spider_path),
             'capture_output': True,
             'text': True,
-            'timeout': 60,
+            'timeout': timeout,
             'stdin': subprocess.DEVNULL  # Don't inherit stdin
         }
 
@@ -76,7 +134,7 @@ def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: boo
         return results
 
     except subprocess.TimeoutExpired:
-        print("[SCRAPY ERROR] Spider timed out after 60 seconds")
+        print(f"[SCRAPY ERROR] Spider timed out after {timeout} seconds")
         return []
     except Exception as e:
         print(f"[SCRAPY ERROR] {e}")
@@ -89,6 +147,66 @@ def run_ebay_scrapy_search(query: str, max_results: int = 10, sold_listings: boo
             logging.debug(f"Failed to delete temp file {temp_output}: {e}")
 
 
+def run_ebay_scrapy_batch_search(queries: List[str], max_results: int = 10, sold_listings: bool = True,
+                                 dedupe: bool = False, use_cache: bool = True) -> Dict[str, List[Dict]]:
+    """
+    Run several eBay searches in ONE spider crawl and return results per query
+
+    Queries with fresh cached results are not crawled again. The remaining
+    queries are passed to the ebay_search spider's batch mode, so crawl
+    start-up is paid once and Scrapy interleaves the requests.
+
+    Args:
+        queries: Search queries
+        max_results: Maximum number of results per query
+        sold_listings: Whether to search sold listings only
+        dedupe: Drop items already returned for an earlier query. Leave off
+                when every query needs its own full result set.
+        use_cache: Allow cached results
+
+    Returns:
+        Dict mapping each query to its list of scraped items
+    """
+    from ebay_search_cache import get_search_cache, search_cache_enabled
+
+    unique_queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    results: Dict[str, List[Dict]] = {q: [] for q in unique_queries}
+
+    cache = get_search_cache() if use_cache and search_cache_enabled() else None
+    to_crawl = []
+    for query in unique_queries:
+        cached = cache.lookup('scrapy', query, max_results, sold_listings) if cache else None
+        if cached is not None:
+            results[query] = cached
+        else:
+            to_crawl.append(query)
+
+    print(f"[SCRAPY BATCH] {len(unique_queries) - len(to_crawl)} cached, {len(to_crawl)} to crawl")
+    if not to_crawl:
+        return results
+
+    items = _run_ebay_scrapy_uncached(
+        None, max_results, sold_listings,
+        queries=to_crawl, dedupe=dedupe,
+        timeout=60 + 20 * (len(to_crawl) - 1)
+    )
+
+    for item in items:
+        query = item.get('search_query')
+        if query in results:
+            results[query].append(item)
+
+    if cache and getattr(items, 'timed_out', False):
+        print("[SCRAPY BATCH] Crawl timed out, partial results are not cached")
+    elif cache:
+        exhausted = getattr(items, 'exhausted_queries', ())
+        for query in to_crawl:
+            cache.store('scrapy', query, max_results, sold_listings, results[query],
+                        complete=query in exhausted)
+
+    return results
+
+
 if __name__ == "__main__":
     # Test the wrapper
     print("Testing eBay Scrapy Search...")
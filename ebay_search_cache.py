@@ -0,0 +1,393 @@
+"""
+Shared TTL cache for eBay search results.
+
+Sold-listing comps change slowly, but the same queries are scraped again and
+again (CSV batch compare, per-item compare, cart ROI checks, schedules) and
+every scrape is paid for through ScrapeOps. This cache sits in front of the
+search functions:
+
+- Key: (source, normalized query, sold flag). The normalized query is
+  NFKC + casefold + collapsed whitespace, so "Yura  Kano" == "yura kano".
+- Depth: an entry remembers how many results were requested. A request for
+  fewer results is served from the entry; a request for MORE results fetches
+  the deeper result set and extends the entry ("deeper results" upgrade).
+  An entry is 'complete' (served for any depth) only when the search says
+  it ran out of result pages (CrawlResult.exhausted_queries); a short
+  result set alone may just be a truncated scrape.
+- TTL: fresh entries are returned directly. Entries past their TTL but still
+  inside the stale window are returned immediately and refreshed in a
+  background thread (stale-while-revalidate). Older entries are refetched.
+- Empty results are never cached (the search functions return [] on errors),
+  and neither are timed-out partial results (CrawlResult.timed_out).
+- Callers get deep copies of the cached results, so fields they add to
+  result dicts never leak into the cache.
+
+Entries are persisted to a JSON file so the cache survives restarts. Writes
+are batched: stores mark the cache dirty and a timer flushes it once, outside
+the lock that readers take.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for use as a cache key."""
+    query = unicodedata.normalize('NFKC', query or '').casefold()
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+def _is_cacheable(results: Any) -> bool:
+    """Whether a search result may be cached (not empty, not an error, not a timed-out partial)."""
+    if not results or getattr(results, 'timed_out', False):
+        return False
+    return not (isinstance(results, dict) and results.get('error'))
+
+
+def _is_exhausted(results: Any, query: str) -> bool:
+    """Whether the search reported that the query ran out of result pages."""
+    exhausted = getattr(results, 'exhausted_queries', ())
+    return normalize_query(query) in {normalize_query(q) for q in exhausted}
+
+
+def _result_identity(item: Dict) -> str:
+    """Stable identity of a search result for merging result sets."""
+    return str(item.get('product_id') or item.get('item_id') or item.get('product_url')
+               or item.get('item_url') or item.get('url') or item.get('product_title') or '')
+
+
+class SearchResultCache:
+    """TTL + stale-while-revalidate cache of eBay search results."""
+
+    def __init__(self, cache_file: str = "ebay_search_cache.json", sold_ttl_hours: float = 24,
+                 active_ttl_minutes: float = 30, stale_hours: float = 72, max_entries: int = 2000,
+                 flush_delay: float = 2.0):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_file: JSON file used for persistence (None = memory only)
+            sold_ttl_hours: Freshness of sold-listing results
+            active_ttl_minutes: Freshness of active-listing results
+            stale_hours: How long past its TTL an entry may still be served
+                         while it is refreshed in the background
+            max_entries: Oldest entries are evicted above this count
+            flush_delay: Seconds after a change before the cache file is rewritten
+                         (all changes in that time are written at once)
+        """
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.sold_ttl = sold_ttl_hours * 3600
+        self.active_ttl = active_ttl_minutes * 60
+        self.stale_window = stale_hours * 3600
+        self.max_entries = max_entries
+        self.flush_delay = flush_delay
+        self.logger = logging.getLogger(__name__)
+
+        # Entries are replaced, never mutated, so a shallow snapshot can be saved outside the lock
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._refreshing = set()
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._atexit_registered = False
+        # Serializes file writes so an older snapshot never overwrites a newer one
+        self._save_lock = threading.Lock()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            self.logger.info(f"Loaded {len(self._entries)} cached eBay searches from {self.cache_file}")
+        except Exception as e:
+            self.logger.warning(f"Could not load search cache {self.cache_file}: {e}")
+            self._entries = {}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        try:
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            tmp_file.replace(self.cache_file)
+        except Exception as e:
+            self.logger.warning(f"Could not save search cache {self.cache_file}: {e}")
+
+    def _mark_dirty(self):
+        """Schedule a write of the cache file (call with self._lock held)."""
+        self._dirty = True
+        if not self.cache_file or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    def flush(self):
+        """Write pending changes to the cache file now."""
+        if not self.cache_file:
+            return
+        with self._save_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                snapshot = dict(self._entries)
+            # Serializing and writing happens outside self._lock, readers aren't blocked
+            self._save(snapshot)
+
+    def _evict(self):
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k]['fetched_at'])[:overflow]
+            for key in oldest:
+                del self._entries[key]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(source: str, query: str, sold: bool, variant: str = '') -> str:
+        """Build the cache key for a search."""
+        key = f"{source}|{'sold' if sold else 'active'}|{normalize_query(query)}"
+        return f"{key}|{variant}" if variant else key
+
+    def _ttl(self, sold: bool) -> float:
+        return self.sold_ttl if sold else self.active_ttl
+
+    def _age_state(self, entry: Dict, sold: bool) -> str:
+        """Classify an entry as 'fresh', 'stale' or 'expired'."""
+        age = time.time() - entry['fetched_at']
+        ttl = self._ttl(sold)
+        if age < ttl:
+            return 'fresh'
+        if age < ttl + self.stale_window:
+            return 'stale'
+        return 'expired'
+
+    def _store(self, key: str, results: Any, depth: Optional[int], complete: bool = False):
+        # Copied in, so the caller's objects and the cache never share state
+        results = copy.deepcopy(list(results) if isinstance(results, list) else results)
+        with self._lock:
+            self._entries[key] = {
+                'results': results,
+                'depth': depth,
+                'complete': complete,
+                'fetched_at': time.time(),
+            }
+            self._evict()
+            self._mark_dirty()
+
+    def _store_fetched(self, key: str, query: str, results: Any, depth: Optional[int]) -> bool:
+        """Store a fresh search result unless it is empty, an error or a timed-out partial."""
+        if not _is_cacheable(results):
+            if getattr(results, 'timed_out', False):
+                print(f"[SEARCH CACHE] Not caching timed-out search for '{query}' ({len(results)} partial results)")
+            return False
+        self._store(key, results, depth, complete=_is_exhausted(results, query))
+        return True
+
+    def _refresh_in_background(self, key: str, query: str,
+                               fetch: Callable[[], Tuple[Any, Optional[int]]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def worker():
+            try:
+                results, depth = fetch()
+                if self._store_fetched(key, query, results, depth):
+                    self.logger.info(f"Refreshed stale search cache entry: {key}")
+            except Exception as e:
+                self.logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def get_or_fetch(self, source: str, query: str, max_results: int, sold: bool,
+                     fetch: Callable[[int], List[Dict]]) -> List[Dict]:
+        """
+        Return cached results for a search, fetching (or extending) as needed.
+
+        Args:
+            source: Search backend name ('scrapy', 'api', 'browserless', ...)
+            query: Raw search query
+            max_results: Number of results the caller wants
+            sold: Sold listings (True) or active listings (False)
+            fetch: Called with a result count to perform the real search
+
+        Returns:
+            Up to max_results search results (copies, safe to modify)
+        """
+        key = self.make_key(source, query, sold)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            state = self._age_state(entry, sold)
+            deep_enough = entry['complete'] or (entry['depth'] or 0) >= max_results
+
+            if state != 'expired' and deep_enough:
+                if state == 'stale':
+                    depth = entry['depth']
+                    self._refresh_in_background(key, query, lambda: (fetch(depth), depth))
+                print(f"[SEARCH CACHE] {state.upper()} hit for '{query}' ({source}, {len(entry['results'])} results)")
+                return copy.deepcopy(entry['results'][:max_results])
+
+            if state != 'expired':
+                # Deeper results upgrade: fetch the larger set and keep any
+                # cached results the deeper fetch didn't return
+                print(f"[SEARCH CACHE] Extending '{query}' ({source}) from {entry['depth']} to {max_results} results")
+                results = fetch(max_results)
+                if results:
+                    seen = {_result_identity(item) for item in results}
+                    extra = copy.deepcopy([item for item in entry['results'] if _result_identity(item) not in seen])
+                    if _is_cacheable(results):
+                        self._store(key, list(results) + extra, max_results,
+                                    complete=_is_exhausted(results, query))
+                    else:
+                        print(f"[SEARCH CACHE] Not caching timed-out search for '{query}' ({len(results)} partial results)")
+                    return (list(results) + extra)[:max_results]
+                return copy.deepcopy(entry['results'][:max_results])
+
+        results = fetch(max_results)
+        self._store_fetched(key, query, results, max_results)
+        return results
+
+    def lookup(self, source: str, query: str, max_results: int, sold: bool) -> Optional[List[Dict]]:
+        """
+        Return fresh cached results deep enough for max_results, or None.
+
+        Used by batch searches that fetch all misses in one go and then
+        store() each result set. Returns copies, safe to modify.
+        """
+        with self._lock:
+            entry = self._entries.get(self.make_key(source, query, sold))
+        if entry is None or self._age_state(entry, sold) != 'fresh':
+            return None
+        if not entry['complete'] and (entry['depth'] or 0) < max_results:
+            return None
+        return copy.deepcopy(entry['results'][:max_results])
+
+    def store(self, source: str, query: str, max_results: int, sold: bool, results: List[Dict],
+              complete: bool = False):
+        """
+        Store the results of a search that was requested with max_results.
+
+        Args:
+            complete: The search ran out of result pages (serve the entry for any depth)
+        """
+        if results:
+            self._store(self.make_key(source, query, sold), results, max_results, complete=complete)
+
+    def get_or_fetch_value(self, source: str, query: str, sold: bool, fetch: Callable[[], Any],
+                           variant: str = '') -> Any:
+        """
+        Cache an opaque (non-list) search result such as a sold-price summary.
+
+        Same TTL / stale-while-revalidate rules as get_or_fetch(), without the
+        depth upgrade path. Dict results carrying an 'error' key are not
+        cached. `variant` separates otherwise identical queries (e.g.
+        different days_back windows).
+        """
+        key = self.make_key(source, query, sold, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            state = self._age_state(entry, sold)
+            if state != 'expired':
+                if state == 'stale':
+                    self._refresh_in_background(key, query, lambda: (fetch(), None))
+                print(f"[SEARCH CACHE] {state.upper()} hit for '{query}' ({source})")
+                return copy.deepcopy(entry['results'])
+
+        result = fetch()
+        self._store_fetched(key, query, result, None)
+        return result
+
+    def invalidate(self, source: Optional[str] = None, query: Optional[str] = None):
+        """Drop cached entries (all, one source, or one query)."""
+        with self._lock:
+            if source is None and query is None:
+                self._entries.clear()
+            else:
+                prefix = f"{source}|" if source else ''
+                needle = f"|{normalize_query(query)}" if query else ''
+                for key in list(self._entries):
+                    if key.startswith(prefix) and needle in key:
+                        del self._entries[key]
+            self._mark_dirty()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Count entries by freshness."""
+        stats = {'fresh': 0, 'stale': 0, 'expired': 0}
+        with self._lock:
+            for key, entry in self._entries.items():
+                sold = key.split('|')[1] == 'sold'
+                stats[self._age_state(entry, sold)] += 1
+        stats['total'] = sum(stats.values())
+        return stats
+
+
+# Global cache instance
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Get the global search cache, configured from user settings."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            try:
+                from settings_manager import get_setting
+                _search_cache = SearchResultCache(
+                    sold_ttl_hours=float(get_setting('ebay.search_cache_ttl_hours', 24)),
+                    active_ttl_minutes=float(get_setting('ebay.search_cache_active_ttl_minutes', 30)),
+                    stale_hours=float(get_setting('ebay.search_cache_stale_hours', 72)),
+                )
+            except Exception:
+                _search_cache = SearchResultCache()
+        return _search_cache
+
+
+def search_cache_enabled() -> bool:
+    """Check the 'ebay.search_cache_enabled' setting (default on)."""
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('ebay.search_cache_enabled', True))
+    except Exception:
+        return True
+
+
+def cached_search(source: str, query: str, max_results: int, sold: bool,
+                  fetch: Callable[[int], List[Dict]], use_cache: bool = True) -> List[Dict]:
+    """Run a list-returning search through the shared cache (if enabled)."""
+    if not use_cache or not search_cache_enabled():
+        return fetch(max_results)
+    return get_search_cache().get_or_fetch(source, query, max_results, sold, fetch)
@@ -0,0 +1,440 @@
+"""
+Persistent Scrapy crawler service for eBay searches.
+
+Running `python -m scrapy crawl ...` per query pays interpreter start-up,
+Scrapy/Twisted import and reactor start-up every time, and hands results
+back through a temp JSON file. This module keeps ONE child process alive
+with the Twisted reactor running, and feeds it query jobs over a
+multiprocessing queue:
+
+- Jobs run concurrently inside the child (bounded by max_concurrent_jobs,
+  on top of the project's own CONCURRENT_REQUESTS limits)
+- Items are streamed back to the caller as soon as they are scraped
+- A job that exceeds its timeout is cancelled in the child and reported to
+  the caller (SearchTimeoutError / CrawlResult.timed_out), the service
+  itself keeps running
+- When a job finishes, the spider's 'exhausted_queries' (queries that ran
+  out of result pages before max_results) are passed back with it, so
+  callers know a short result set is really complete
+- If the child dies, waiting jobs fail and the next job starts a new child
+
+The child process uses the 'spawn' start method so it never inherits the
+Tk GUI state of the parent.
+
+Usage:
+    service = get_search_service('ebay_search')
+    for item in service.stream('ebay_search', timeout=60, query='pokemon', max_results=10):
+        ...
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, Optional, Tuple
+
+
+PROJECT_ROOT = Path(__file__).parent
+
+# Known Scrapy projects in this repo: spider name -> how to load its project.
+# FEEDS is cleared because the service streams items back instead of using
+# feed exports (the old subprocess runs overrode FEEDS with -O/-o as well).
+SERVICE_PROJECTS = {
+    'ebay_search': {
+        'project_dir': PROJECT_ROOT / 'ebay-scrapy-scraper-main',
+        'settings_module': 'ebay_scraper.settings',
+        'settings': {'FEEDS': {}, 'LOG_LEVEL': 'INFO'},
+    },
+    'ebay': {
+        'project_dir': PROJECT_ROOT,
+        'settings_module': 'scrapy_ebay.settings',
+        'settings': {'FEEDS': {}, 'LOG_LEVEL': 'INFO', 'ROBOTSTXT_OBEY': False, 'DOWNLOAD_DELAY': 1},
+    },
+}
+
+# Message types sent from the service process back to the client
+_MSG_READY = 'ready'
+_MSG_ITEM = 'item'
+_MSG_DONE = 'done'
+_MSG_ERROR = 'error'
+
+
+class SearchServiceError(Exception):
+    """Raised when the crawler service fails to start or a job fails."""
+
+
+class SearchTimeoutError(SearchServiceError):
+    """Raised when a crawl job is cancelled because it exceeded its timeout."""
+
+
+class CrawlResult(list):
+    """Items scraped by a crawl job, with how the job ended."""
+
+    def __init__(self, items: Iterable[Dict] = (), timed_out: bool = False,
+                 exhausted_queries: Iterable[str] = ()):
+        """
+        Args:
+            items: Scraped items
+            timed_out: The job was cancelled at its timeout (the items are a partial result)
+            exhausted_queries: Queries whose result pages ran out before max_results
+        """
+        super().__init__(items)
+        self.timed_out = timed_out
+        self.exhausted_queries = set(exhausted_queries)
+
+
+def _service_main(project_dir: str, settings_module: str, settings_overrides: Dict[str, Any],
+                  max_concurrent_jobs: int, job_queue, result_queue):
+    """
+    Entry point of the service process: start the reactor once and run jobs.
+
+    Job messages:
+        ('crawl', job_id, spider_name, spider_kwargs)
+        ('cancel', job_id)
+        None  -> shut down
+    """
+    os.chdir(project_dir)
+    sys.path.insert(0, project_dir)
+    os.environ['SCRAPY_SETTINGS_MODULE'] = settings_module
+
+    from scrapy import signals
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.log import configure_logging
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+
+    settings = get_project_settings()
+    settings.setdict(settings_overrides, priority='cmdline')
+
+    reactor_path = settings.get('TWISTED_REACTOR')
+    if reactor_path:
+        install_reactor(reactor_path)
+
+    from twisted.internet import defer, reactor
+
+    configure_logging(settings)
+    runner = CrawlerRunner(settings)
+    semaphore = defer.DeferredSemaphore(max(1, int(max_concurrent_jobs)))
+    active_crawlers = {}
+    cancelled = set()
+
+    def run_job(job_id, spider_name, spider_kwargs):
+        if job_id in cancelled:
+            cancelled.discard(job_id)
+            result_queue.put((_MSG_DONE, job_id, None))
+            return None
+
+        crawler = runner.create_crawler(spider_name)
+        active_crawlers[job_id] = crawler
+
+        def on_item_scraped(item, response, spider):
+            result_queue.put((_MSG_ITEM, job_id, dict(item)))
+
+        # weak=False: the closure is only referenced by the signal manager
+        crawler.signals.connect(on_item_scraped, signal=signals.item_scraped, weak=False)
+
+        def on_finished(_):
+            active_crawlers.pop(job_id, None)
+            exhausted = getattr(crawler.spider, 'exhausted_queries', ())
+            result_queue.put((_MSG_DONE, job_id, {'exhausted_queries': sorted(exhausted)}))
+
+        def on_failed(failure):
+            active_crawlers.pop(job_id, None)
+            result_queue.put((_MSG_ERROR, job_id, failure.getErrorMessage()))
+
+        d = runner.crawl(crawler, **spider_kwargs)
+        d.addCallbacks(on_finished, on_failed)
+        return d
+
+    def cancel_job(job_id):
+        crawler = active_crawlers.get(job_id)
+        if crawler is not None:
+            crawler.stop()
+        else:
+            # Still waiting on the semaphore
+            cancelled.add(job_id)
+
+    def read_jobs():
+        while True:
+            message = job_queue.get()
+            if message is None:
+                reactor.callFromThread(reactor.stop)
+                return
+            if message[0] == 'crawl':
+                _, job_id, spider_name, spider_kwargs = message
+                reactor.callFromThread(semaphore.run, run_job, job_id, spider_name, spider_kwargs)
+            elif message[0] == 'cancel':
+                reactor.callFromThread(cancel_job, message[1])
+
+    threading.Thread(target=read_jobs, daemon=True).start()
+    reactor.callWhenRunning(result_queue.put, (_MSG_READY, None, None))
+    reactor.run(installSignalHandlers=False)
+
+
+class EbaySearchService:
+    """Client for a long-lived Scrapy crawler process."""
+
+    # Seconds to wait before retrying after the service failed to start
+    RESTART_BACKOFF = 300
+
+    def __init__(self, project_dir: Path, settings_module: str,
+                 settings: Optional[Dict[str, Any]] = None, max_concurrent_jobs: int = 4):
+        """
+        Initialize the service client (the process is started lazily).
+
+        Args:
+            project_dir: Scrapy project directory (contains scrapy.cfg)
+            settings_module: Project settings module (e.g. 'ebay_scraper.settings')
+            settings: Settings overrides applied at command-line priority
+            max_concurrent_jobs: How many queries may crawl at the same time
+        """
+        self.project_dir = Path(project_dir)
+        self.settings_module = settings_module
+        self.settings = dict(settings or {})
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.logger = logging.getLogger(__name__)
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._process = None
+        self._job_queue = None
+        self._result_queue = None
+        self._dispatcher = None
+        self._job_ids = itertools.count(1)
+        # job id -> (message queue, service process running the job)
+        self._jobs: Dict[int, Tuple[queue.Queue, Any]] = {}
+        self._lock = threading.Lock()
+        self._start_failed_at: Optional[float] = None
+
+    def is_alive(self) -> bool:
+        """Check whether the service process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def start(self, ready_timeout: float = 60) -> bool:
+        """
+        Start the service process if it isn't running yet.
+
+        Args:
+            ready_timeout: Seconds to wait for the reactor to come up
+
+        Returns:
+            True if the service is running
+        """
+        with self._lock:
+            if self.is_alive():
+                return True
+
+            # Don't pay the start-up timeout on every query after a failed start
+            if self._start_failed_at and time.monotonic() - self._start_failed_at < self.RESTART_BACKOFF:
+                return False
+
+            self._job_queue = self._ctx.Queue()
+            self._result_queue = self._ctx.Queue()
+            self._process = self._ctx.Process(
+                target=_service_main,
+                args=(str(self.project_dir), self.settings_module, self.settings,
+                      self.max_concurrent_jobs, self._job_queue, self._result_queue),
+                daemon=True,
+                name=f"scrapy-service-{self.settings_module}"
+            )
+            self._process.start()
+
+            try:
+                message = self._result_queue.get(timeout=ready_timeout)
+            except queue.Empty:
+                message = None
+
+            if not message or message[0] != _MSG_READY:
+                self.logger.error(f"Crawler service for {self.settings_module} failed to start")
+                self._terminate()
+                self._start_failed_at = time.monotonic()
+                return False
+
+            self._start_failed_at = None
+
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_results, args=(self._process, self._result_queue), daemon=True)
+            self._dispatcher.start()
+            self.logger.info(f"Crawler service started (pid {self._process.pid}, "
+                             f"{self.max_concurrent_jobs} concurrent jobs)")
+            return True
+
+    def _dispatch_results(self, process, result_queue):
+        """Route messages from one service process to per-job queues (until that process exits)."""
+        while True:
+            try:
+                message = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+
+            job = self._jobs.get(message[1])
+            if job is not None:
+                job[0].put(message)
+
+        # Service died - unblock every job it was running (a restarted service has its own jobs)
+        for job_queue, job_process in list(self._jobs.values()):
+            if job_process is process:
+                job_queue.put((_MSG_ERROR, None, 'crawler service stopped'))
+
+    def stream(self, spider_name: str, timeout: float = 60,
+               **spider_kwargs) -> Generator[Dict, None, Dict[str, Any]]:
+        """
+        Run one crawl job and yield items as they are scraped.
+
+        Args:
+            spider_name: Spider to run
+            timeout: Seconds before the job is cancelled
+            **spider_kwargs: Spider arguments (same as `-a key=value`)
+
+        Yields:
+            Scraped item dicts
+
+        Returns:
+            The job summary ({'exhausted_queries': [...]}) as the generator's return value
+
+        Raises:
+            SearchTimeoutError: If the job exceeded its timeout (items already yielded are partial)
+            SearchServiceError: If the service is down or the crawl fails
+        """
+        if not self.start():
+            raise SearchServiceError("crawler service is not running")
+
+        job_id = next(self._job_ids)
+        job_queue: queue.Queue = queue.Queue()
+        self._jobs[job_id] = (job_queue, self._process)
+        # Spider arguments arrive as strings from the command line
+        kwargs = {key: str(value) for key, value in spider_kwargs.items() if value is not None}
+        self._job_queue.put(('crawl', job_id, spider_name, kwargs))
+
+        deadline = time.monotonic() + timeout
+        finished = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning(f"Crawl job {job_id} timed out after {timeout} seconds")
+                    raise SearchTimeoutError(f"crawl timed out after {timeout} seconds")
+                try:
+                    kind, _, payload = job_queue.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+                if kind == _MSG_ITEM:
+                    yield payload
+                elif kind == _MSG_DONE:
+                    finished = True
+                    return payload or {}
+                elif kind == _MSG_ERROR:
+                    finished = True
+                    raise SearchServiceError(payload)
+        finally:
+            self._jobs.pop(job_id, None)
+            if not finished and self.is_alive():
+                # Timed out or the caller stopped consuming - free the crawl slot
+                self._job_queue.put(('cancel', job_id))
+
+    def crawl(self, spider_name: str, timeout: float = 60, **spider_kwargs) -> CrawlResult:
+        """
+        Run one crawl job and return all items.
+
+        Items scraped before a timeout are kept, with CrawlResult.timed_out set.
+
+        Raises:
+            SearchServiceError: If the service is down or the crawl fails
+        """
+        result = CrawlResult()
+        items = self.stream(spider_name, timeout=timeout, **spider_kwargs)
+        try:
+            while True:
+                result.append(next(items))
+        except StopIteration as done:
+            result.exhausted_queries.update((done.value or {}).get('exhausted_queries', ()))
+        except SearchTimeoutError:
+            result.timed_out = True
+        return result
+
+    def stop(self, timeout: float = 10):
+        """Shut down the service process."""
+        with self._lock:
+            if not self.is_alive():
+                return
+            try:
+                self._job_queue.put(None)
+                self._process.join(timeout)
+            finally:
+                self._terminate()
+
+    def _terminate(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+
+# Global service instances (one per Scrapy project)
+_services: Dict[str, EbaySearchService] = {}
+_services_lock = threading.Lock()
+
+
+def get_search_service(spider_name: str = 'ebay_search') -> EbaySearchService:
+    """
+    Get the shared crawler service that hosts a spider.
+
+    Concurrency comes from the 'ebay.search_service_concurrency' setting.
+    """
+    project = SERVICE_PROJECTS[spider_name]
+    key = project['settings_module']
+
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            try:
+                from settings_manager import get_setting
+                max_jobs = int(get_setting('ebay.search_service_concurrency', 4))
+            except Exception:
+                max_jobs = 4
+            service = EbaySearchService(
+                project_dir=project['project_dir'],
+                settings_module=project['settings_module'],
+                settings=project['settings'],
+                max_concurrent_jobs=max_jobs
+            )
+            _services[key] = service
+        return service
+
+
+def search_service_enabled() -> bool:
+    """Check the 'ebay.use_search_service' setting (default on)."""
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('ebay.use_search_service', True))
+    except Exception:
+        return True
+
+
+def shutdown_search_services():
+    """Stop all running crawler services (call on application exit)."""
+    with _services_lock:
+        services = list(_services.values())
+        _services.clear()
+    for service in services:
+        service.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    service = get_search_service('ebay_search')
+
+    for query in ["pokemon card", "yura kano photobook"]:
+        start = time.time()
+        items = service.crawl('ebay_search', timeout=60, query=query, max_results=3, sold_listings=True)
+        print(f"{query}: {len(items)} items in {time.time() - start:.1f}s")
+
+    shutdown_search_services()
@@ -0,0 +1,283 @@
+"""
+Persistent on-disk store of extracted image features.
+
+Comparison runs see the same Mandarake reference images and the same eBay
+listing images over and over (CSV batch compare, scheduled runs, sold
+listing matching). Feature extraction (ORB, histograms, template pyramids)
+is the expensive part of a comparison, so extracted features are stored on
+disk and reused:
+
+- Key: content hash of the decoded image pixels + extractor name + extractor
+  version. The same picture downloaded from a different URL or loaded from
+  a local copy hits the same entry; changing an extractor only requires
+  bumping its version.
+- Format: one file per entry - a small JSON header (array names, dtypes,
+  shapes, offsets) followed by the raw array data, each array 64-byte
+  aligned. Arrays load with np.frombuffer (no parsing) or np.memmap.
+- Eviction: least recently used entries are deleted once the store grows
+  past its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+MAGIC = b'FEAT1\n'
+ALIGNMENT = 64
+
+
+def image_content_hash(image: np.ndarray) -> str:
+    """Hash of a decoded image's pixels (and shape/dtype)."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.shape}|{image.dtype}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def _padding(offset: int) -> int:
+    return (-offset) % ALIGNMENT
+
+
+class FeatureStore:
+    """Content-addressed, size-bounded on-disk feature cache."""
+
+    def __init__(self, store_dir: str = "feature_store", max_size_mb: float = 512):
+        """
+        Initialize the store.
+
+        Args:
+            store_dir: Directory holding the feature files
+            max_size_mb: Least recently used entries are evicted above this size
+        """
+        self.store_dir = Path(store_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.RLock()
+        # filename -> [size, last_used]
+        self._index: Dict[str, list] = {}
+        self._total_bytes = 0
+        self._last_stamp = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def _scan(self):
+        """Build the LRU index from the files already on disk."""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.store_dir.glob('*.feat'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[path.name] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def _stamp(self) -> float:
+        """Strictly increasing use time, so LRU order is exact even within a clock tick."""
+        self._last_stamp = max(time.time(), self._last_stamp + 1e-6)
+        return self._last_stamp
+
+    @staticmethod
+    def make_key(content_hash: str, extractor: str, version: int) -> str:
+        return f"{content_hash}.{extractor}-v{version}"
+
+    def _path(self, key: str) -> Path:
+        return self.store_dir / f"{key}.feat"
+
+    # ------------------------------------------------------------------
+    # Read / write
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, mmap: bool = False) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Load the arrays stored under a key.
+
+        Args:
+            key: Entry key (see make_key)
+            mmap: Memory-map the arrays instead of reading the file
+
+        Returns:
+            {name: array} or None if the entry is missing or unreadable
+        """
+        path = self._path(key)
+        with self._lock:
+            if path.name not in self._index:
+                self.misses += 1
+                return None
+            self._index[path.name][1] = self._stamp()
+
+        try:
+            # Keep recency across restarts (the index is rebuilt from mtimes)
+            os.utime(path)
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError("bad magic")
+                header_len = struct.unpack('<I', f.read(4))[0]
+                header = json.loads(f.read(header_len).decode('utf-8'))
+                data = None if mmap else f.read()
+            data_start = len(MAGIC) + 4 + header_len
+
+            arrays = {}
+            for name, (dtype, shape, offset) in header.items():
+                count = int(np.prod(shape)) if shape else 1
+                if mmap:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + offset,
+                                             shape=tuple(shape))
+                else:
+                    arrays[name] = np.frombuffer(data, dtype=dtype, count=count,
+                                                 offset=offset).reshape(shape)
+            with self._lock:
+                self.hits += 1
+            return arrays
+
+        except Exception as e:
+            self.logger.warning(f"Dropping unreadable feature file {path.name}: {e}")
+            self._remove(path.name)
+            with self._lock:
+                self.misses += 1
+            return None
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray]):
+        """Store arrays under a key, evicting old entries if over the size limit."""
+        header = {}
+        offset = 0
+        for name, array in arrays.items():
+            offset += _padding(offset)
+            header[name] = (np.asarray(array).dtype.str, list(np.shape(array)), offset)
+            offset += np.asarray(array).nbytes
+        header_bytes = json.dumps(header).encode('utf-8')
+        # Pad the header so the array data starts on an aligned file offset
+        header_bytes += b' ' * _padding(len(MAGIC) + 4 + len(header_bytes))
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(MAGIC)
+                f.write(struct.pack('<I', len(header_bytes)))
+                f.write(header_bytes)
+                written = 0
+                for name, array in arrays.items():
+                    f.write(b'\0' * _padding(written))
+                    written += _padding(written)
+                    data = np.ascontiguousarray(array).tobytes()
+                    f.write(data)
+                    written += len(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not write feature file {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            previous = self._index.get(path.name)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._index[path.name] = [size, self._stamp()]
+            self._total_bytes += size
+            self._evict()
+
+    def _remove(self, filename: str):
+        with self._lock:
+            entry = self._index.pop(filename, None)
+            if entry:
+                self._total_bytes -= entry[0]
+        try:
+            (self.store_dir / filename).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for filename in sorted(self._index, key=lambda name: self._index[name][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(filename)
+
+    def get_or_extract(self, image: np.ndarray, extractor: str, version: int,
+                       extract: Callable[[np.ndarray], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        Return the stored features of an image, extracting and storing them on a miss.
+
+        Args:
+            image: Decoded image
+            extractor: Name of the feature extractor
+            version: Extractor version (bump when its output changes)
+            extract: Called with the image on a miss; returns {name: array}
+
+        Returns:
+            {name: array}
+        """
+        key = self.make_key(image_content_hash(image), extractor, version)
+        arrays = self.get(key)
+        if arrays is not None:
+            return arrays
+
+        arrays = extract(image)
+        # Extractors return all-empty arrays on failure; don't persist those
+        if arrays and any(np.size(array) for array in arrays.values()):
+            self.put(key, arrays)
+        return arrays
+
+    def clear(self):
+        """Delete every stored entry."""
+        with self._lock:
+            for filename in list(self._index):
+                self._remove(filename)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'size_mb': self._total_bytes / (1024 * 1024),
+                'max_size_mb': self.max_bytes / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global store instance
+_feature_store = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """Get the global feature store, configured from user settings."""
+    global _feature_store
+    with _feature_store_lock:
+        if _feature_store is None:
+            try:
+                from settings_manager import get_setting
+                _feature_store = FeatureStore(
+                    max_size_mb=float(get_setting('image_comparison.feature_store_max_mb', 512)))
+            except Exception:
+                _feature_store = FeatureStore()
+        return _feature_store
+
+
+def feature_store_enabled() -> bool:
+    """Check the 'image_comparison.feature_store_enabled' setting (default on)."""
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('image_comparison.feature_store_enabled', True))
+    except Exception:
+        return True
+
+
+def get_or_extract(image: np.ndarray, extractor: str, version: int,
+                   extract: Callable[[np.ndarray], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Run a feature extractor through the global store (if enabled)."""
+    if not feature_store_enabled():
+        return extract(image)
+    return get_feature_store().get_or_extract(image, extractor, version, extract)
@@ -17,6 +17,8 @@ from typing import Dict, List, Any, Optional, Callable
 import schedule
 from dataclasses import dataclass, asdict
 
+from keyword_matcher import get_matcher
+
 
 @dataclass
 class Alert:
@@ -522,6 +524,8 @@ class AlertSystem:
             Filtered results
         """
         filtered = []
+        include_matcher = get_matcher(alert.keywords or [])
+        exclude_matcher = get_matcher(alert.exclude_keywords or [])
         
         for result in results:
             # Price filtering
@@ -534,16 +538,16 @@ class AlertSystem:
                 continue
             
             # Keyword filtering
-            title = result.get('title', '').lower()
+            title = result.get('title', '')
             
             # Must include at least one include keyword
-            if alert.keywords:
-                if not any(kw.lower() in title for kw in alert.keywords):
+            if len(include_matcher):
+                if not include_matcher.matches_any(title):
                     continue
             
             # Must not include any exclude keywords
-            if alert.exclude_keywords:
-                if any(kw.lower() in title for kw in alert.exclude_keywords):
+            if len(exclude_matcher):
+                if exclude_matcher.matches_any(title):
                     continue
             
             filtered.append(result)
@@ -383,7 +383,8 @@ class ConfigTreeManager:
             success = self.main._load_csv_worker(csv_path, autofill_from_config=config)
 
             if success:
-                csv_data = self.main.ebay_tab.csv_compare_data if hasattr(self.main, 'ebay_tab') else []
+                manager = self.main.ebay_tab.csv_comparison_manager if hasattr(self.main, 'ebay_tab') else None
+                csv_data = manager.csv_compare_data if manager else []
                 self.main.status_var.set(f"CSV loaded successfully: {len(csv_data)} items")
             else:
                 self.main.status_var.set(f"Error loading CSV: {csv_path.name}")
@@ -335,6 +335,10 @@ class ConfigurationManager:
                 except Exception as e:
                     print(f"[DELETE] Could not remove CSV {csv_path.name}: {e}")
 
+            # Clean up the CSV's parsed-columns sidecar
+            from csv_columns import sidecar_path
+            sidecar_path(csv_path).unlink(missing_ok=True)
+
             # Clean up associated images folder
             images_dir = Path('images') / path.stem
             if images_dir.exists() and images_dir.is_dir():
@@ -1,21 +1,23 @@
 """CSV Comparison Manager - Handles CSV loading, filtering, and comparison operations."""
 
 import csv
-import logging
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple, Callable, Any
 import re
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog
 import webbrowser
+import numpy as np
 from PIL import Image, ImageTk
 import requests
 from io import BytesIO
 
+from csv_columns import CSVColumns, load_csv_columns, remember_csv_columns
 from gui.constants import CATEGORY_KEYWORDS
+from gui.virtual_tree import VirtualTreeview
 
 
 class CSVComparisonManager:
@@ -31,8 +33,17 @@ class CSVComparisonManager:
         self.csv_compare_data: List[Dict] = []
         self.csv_compare_path: Optional[Path] = None
         self.csv_filtered_items: List[Dict] = []
+        # Typed columns of csv_compare_data and the data indexes of csv_filtered_items
+        self.csv_columns: Optional[CSVColumns] = None
+        self.csv_filtered_indexes = np.zeros(0, dtype=np.intp)
         self.csv_new_items: Set[str] = set()
         self.csv_images: Dict[str, ImageTk.PhotoImage] = {}
+        # Rows of csv_items_tree are materialized only around the viewport (see _get_csv_view)
+        self.csv_view: Optional[VirtualTreeview] = None
+        self._csv_thumbs_requested: Set[int] = set()
+        self._csv_thumb_timer = None
+        # Set to stop the running batch comparison (see cancel_csv_comparison)
+        self.csv_compare_cancel = threading.Event()
         
     def load_csv_worker(self, csv_path: Path, autofill_from_config: Optional[Dict] = None) -> bool:
         """Load CSV data into comparison tree.
@@ -53,12 +64,9 @@ class CSVComparisonManager:
             # Clear image cache when loading new CSV file
             self.csv_images.clear()
 
-            # Load CSV data
-            self.csv_compare_data = []
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.csv_compare_data.append(row)
+            # Load CSV data (parsed once per file version, see csv_columns)
+            self.csv_columns = load_csv_columns(csv_path)
+            self.csv_compare_data = self.csv_columns.rows
 
             # Set in-stock filter from config if provided
             if autofill_from_config and hasattr(self.gui, 'csv_in_stock_only'):
@@ -82,111 +90,137 @@ class CSVComparisonManager:
             print(f"[CSV WORKER ERROR] {e}")
             return False
 
+    def _get_csv_view(self) -> VirtualTreeview:
+        """Virtual view over csv_items_tree (created on first use)."""
+        if self.csv_view is None:
+            self.csv_view = VirtualTreeview(
+                self.gui.csv_items_tree,
+                getattr(self.gui, 'csv_v_scroll', None),
+                self._csv_tree_row,
+                on_window_changed=self._on_csv_window_changed
+            )
+        return self.csv_view
+
+    def _get_csv_columns(self) -> CSVColumns:
+        """Typed columns of csv_compare_data (rebuilt when the list was replaced, e.g. after a delete)."""
+        if self.csv_columns is None or self.csv_columns.rows is not self.csv_compare_data:
+            self.csv_columns = CSVColumns(self.csv_compare_data)
+        return self.csv_columns
+
+    def get_uncompared_filtered_items(self) -> List[Dict]:
+        """Filtered CSV items that haven't been compared with eBay yet."""
+        columns = self._get_csv_columns()
+        if not self.csv_filtered_items:
+            return [columns.rows[i] for i in np.flatnonzero(columns.not_compared_mask())]
+        uncompared = columns.not_compared_mask()[self.csv_filtered_indexes]
+        return [self.csv_filtered_items[i] for i in np.flatnonzero(uncompared)]
+
+    def _csv_thumbnails_enabled(self) -> bool:
+        """Whether thumbnails are shown in the CSV tree (advanced tab setting)."""
+        # Access csv_show_thumbnails from advanced_tab through main_window
+        if hasattr(self.gui, 'main_window') and hasattr(self.gui.main_window, 'advanced_tab'):
+            return self.gui.main_window.advanced_tab.csv_show_thumbnails.get()
+        return False
+
     def filter_csv_items(self) -> None:
-        """Filter and display CSV items based on in-stock filter - fast load, thumbnails loaded on demand."""
+        """Filter and display CSV items based on in-stock filter - only visible rows are materialized."""
         if not hasattr(self.gui, 'csv_items_tree'):
             return
 
-        # Clear existing tree items (but keep image cache for performance)
-        for item in self.gui.csv_items_tree.get_children():
-            self.gui.csv_items_tree.delete(item)
         # NOTE: Don't clear self.csv_images - it's a persistent cache cleared only on new CSV load
+        view = self._get_csv_view()
 
         if not self.csv_compare_data:
+            self.csv_filtered_items = []
+            self.csv_filtered_indexes = np.zeros(0, dtype=np.intp)
+            self.csv_new_items.clear()
+            view.set_rows(0)
             return
 
-        # Apply filters
-        current_time = datetime.now()
-        cutoff_time = current_time - timedelta(hours=24)  # 24 hours for newly listed filter
-
+        # Apply filters (mask operations over the typed columns)
+        columns = self._get_csv_columns()
         in_stock_only = getattr(self.gui, 'csv_in_stock_only', tk.BooleanVar()).get()
         newly_listed_only = getattr(self.gui, 'csv_newly_listed_only', tk.BooleanVar()).get()
-        filtered_items = []
+        now = time.time()
 
-        for row in self.csv_compare_data:
-            # In-stock filter
-            stock = row.get('in_stock', '').lower()
-            if in_stock_only and stock not in ('true', 'yes', '1'):
-                continue
-
-            # Newly listed filter (24 hours)
-            if newly_listed_only:
-                first_seen_str = row.get('first_seen', '')
-                if first_seen_str:
-                    try:
-                        first_seen = datetime.fromisoformat(first_seen_str)
-                        if first_seen < cutoff_time:
-                            continue  # Skip items older than 24 hours
-                    except (ValueError, TypeError) as e:
-                        logging.debug(f"Skipping item with invalid first_seen date '{first_seen_str}': {e}")
-                        continue  # Skip items with invalid dates
-                else:
-                    continue  # Skip items without first_seen date
-
-            filtered_items.append(row)
-
-        # Display filtered items WITHOUT thumbnails first (fast load)
-        recent_hours = self._get_recent_hours_value()
-        new_indicator_cutoff = current_time - timedelta(hours=recent_hours) if recent_hours else current_time - timedelta(hours=12)
+        indexes = columns.select(
+            in_stock_only=in_stock_only,
+            listed_within_hours=24 if newly_listed_only else None,  # 24 hours for newly listed filter
+            now=now
+        )
+        filtered_items = [columns.rows[i] for i in indexes]
 
         # Store NEW status for each item for thumbnail border rendering
+        recent_hours = self._get_recent_hours_value() or 12
+        new_rows = np.flatnonzero(columns.listed_since_mask(recent_hours, now)[indexes])
         self.csv_new_items.clear()
+        self.csv_new_items.update(str(i) for i in new_rows)
 
-        for i, row in enumerate(filtered_items):
-            # Calculate NEW indicator dynamically
-            first_seen_str = row.get('first_seen', '')
-            if first_seen_str:
-                try:
-                    first_seen = datetime.fromisoformat(first_seen_str)
-                    if first_seen >= new_indicator_cutoff:
-                        self.csv_new_items.add(str(i))  # Mark as new
-                except (ValueError, TypeError):
-                    pass  # Skip NEW indicator for items with invalid dates
-
-            # Use English translated title if available, otherwise use original title
-            title = row.get('title_en', row.get('title', ''))
-
-            # Format price properly - handle both floats (Suruga-ya) and formatted strings (Mandarake)
-            price_raw = row.get('price_text', row.get('price', ''))
-            if isinstance(price_raw, (int, float)):
-                # Format as currency: ¥160,999
-                price = f"¥{price_raw:,.0f}"
-            elif isinstance(price_raw, str) and price_raw.replace('.', '').replace(',', '').isdigit():
-                # String but looks like a number (e.g., "160999.0")
-                try:
-                    price = f"¥{float(price_raw):,.0f}"
-                except (ValueError, TypeError):
-                    price = price_raw  # Fallback to original
-            else:
-                # Already formatted (e.g., "¥1,234")
-                price = price_raw
-
-            shop = row.get('shop', row.get('shop_text', ''))
-            stock_display = 'Yes' if row.get('in_stock', '').lower() in ('true', 'yes', '1') else 'No'
-            category = row.get('category', '')
-            url = row.get('url', '')
-            # Check if item has been compared (ebay_compared field exists and is not empty)
-            compared_display = '✓' if row.get('ebay_compared', '') else ''
+        # Store filtered items for thumbnail toggling and row building
+        self.csv_filtered_items = filtered_items
+        self.csv_filtered_indexes = indexes
+        self._csv_thumbs_requested.clear()
 
-            # Insert WITHOUT image for fast loading (use 0-based index as iid for proper mapping)
-            self.gui.csv_items_tree.insert('', 'end', iid=str(i), text=str(i+1),
-                                          values=(title, price, shop, stock_display, category, compared_display, url))
+        # Rows (and their thumbnails) are built only when scrolled into view
+        view.set_rows(len(filtered_items))
 
         print(f"[CSV COMPARE] Displayed {len(filtered_items)} items (newly listed: {newly_listed_only}, in-stock: {in_stock_only})")
 
-        # Store filtered items for thumbnail toggling
-        self.csv_filtered_items = filtered_items
-
-        # Load thumbnails in background thread if enabled
-        # Access csv_show_thumbnails from advanced_tab through main_window
-        show_thumbnails = False
-        if hasattr(self.gui, 'main_window') and hasattr(self.gui.main_window, 'advanced_tab'):
-            show_thumbnails = self.gui.main_window.advanced_tab.csv_show_thumbnails.get()
+    def _csv_tree_row(self, index: int) -> Dict:
+        """Treeview insert options of a filtered CSV item (called when the row scrolls into view)."""
+        row = self.csv_filtered_items[index]
+        columns = self.csv_columns
+        data_index = self.csv_filtered_indexes[index]
+
+        # Use English translated title if available, otherwise use original title
+        title = row.get('title_en', row.get('title', ''))
+
+        # Bare numbers (e.g. "160999.0") as ¥160,999, already formatted prices (e.g. "¥1,234") as is
+        price = columns.display_price(data_index)
+
+        shop = row.get('shop', row.get('shop_text', ''))
+        stock_display = 'Yes' if columns.in_stock[data_index] else 'No'
+        category = row.get('category', '')
+        url = row.get('url', '')
+        # Check if item has been compared (ebay_compared field exists and is not empty)
+        compared_display = '✓' if columns.compared[data_index] else ''
+
+        options = {'text': str(index + 1),
+                   'values': (title, price, shop, stock_display, category, compared_display, url)}
+
+        # Rows scrolled back into view reuse their already loaded thumbnail
+        photo = self.csv_images.get(row.get('product_url', f'item_{index}'))
+        if photo is not None and self._csv_thumbnails_enabled():
+            options.update(image=photo, text='')
+        return options
+
+    def _on_csv_window_changed(self, start: int, stop: int) -> None:
+        """Load thumbnails of the rows that just scrolled into view (debounced while scrolling)."""
+        if not self._csv_thumbnails_enabled():
+            return
+        if self._csv_thumb_timer is not None:
+            self.gui.after_cancel(self._csv_thumb_timer)
+        self._csv_thumb_timer = self.gui.after(150, self._load_visible_csv_thumbnails)
+
+    def _load_visible_csv_thumbnails(self) -> None:
+        """Start loading thumbnails of the materialized rows that don't have one yet."""
+        self._csv_thumb_timer = None
+        if self.csv_view is None or not self.csv_filtered_items:
+            return
+        start, stop = self.csv_view.window()
+        indexes = [i for i in range(start, stop) if i not in self._csv_thumbs_requested]
+        if not indexes:
+            return
+        self._csv_thumbs_requested.update(indexes)
+        self._start_thread(self._load_csv_thumbnails_worker, self.csv_filtered_items, indexes)
 
-        if show_thumbnails:
-            self._start_thread(self._load_csv_thumbnails_worker, filtered_items)
-        else:
-            print(f"[CSV THUMBNAILS] Thumbnails disabled, skipping load")
+    def _reload_csv_thumbnails(self) -> None:
+        """Drop loaded thumbnails and load the visible rows again (new size or style)."""
+        self.csv_images.clear()
+        self._csv_thumbs_requested.clear()
+        if self.csv_view is not None:
+            self.csv_view.refresh()
+        self._load_visible_csv_thumbnails()
 
     def load_csv_for_comparison(self) -> None:
         """Load CSV file for batch comparison."""
@@ -201,25 +235,35 @@ class CSVComparisonManager:
             if not success:
                 messagebox.showerror("Error", f"Failed to load CSV: {file_path}")
 
-    def _load_csv_thumbnails_worker(self, filtered_items: List[Dict]) -> None:
-        """Background worker to load CSV thumbnails without blocking UI."""
+    def _load_csv_thumbnails_worker(self, filtered_items: List[Dict], indexes: Optional[List[int]] = None) -> None:
+        """Background worker to load CSV thumbnails without blocking UI.
+
+        Args:
+            filtered_items: Filtered CSV items shown in the tree
+            indexes: Optional indexes of the items to load (default: all)
+        """
         def update_image_callback(item_id: str, pil_img: Image.Image) -> None:
             def update_image():
                 try:
-                    # item_id is the tree item's iid (0-based index as string)
-                    if item_id in self.gui.csv_items_tree.get_children():
-                        # Get stable cache key from item (use URL as unique identifier)
-                        item_idx = int(item_id)
-                        cache_key = filtered_items[item_idx].get('product_url', f'item_{item_id}')
-
-                        # Reuse cached PhotoImage if available, otherwise create new one
-                        if cache_key in self.csv_images:
-                            photo = self.csv_images[cache_key]
-                        else:
-                            from PIL import ImageTk
-                            photo = ImageTk.PhotoImage(pil_img)
-                            self.csv_images[cache_key] = photo  # Cache by stable key
+                    # Results of an outdated filter don't belong to the current rows
+                    if filtered_items is not self.csv_filtered_items:
+                        return
+
+                    # Get stable cache key from item (use URL as unique identifier)
+                    item_idx = int(item_id)
+                    cache_key = filtered_items[item_idx].get('product_url', f'item_{item_id}')
+
+                    # Reuse cached PhotoImage if available, otherwise create new one
+                    if cache_key in self.csv_images:
+                        photo = self.csv_images[cache_key]
+                    else:
+                        from PIL import ImageTk
+                        photo = ImageTk.PhotoImage(pil_img)
+                        self.csv_images[cache_key] = photo  # Cache by stable key
 
+                    # item_id is the tree item's iid (0-based index as string); rows scrolled
+                    # out of view pick the cached image up when they are materialized again
+                    if self.gui.csv_items_tree.exists(item_id):
                         self.gui.csv_items_tree.item(item_id, image=photo, text='')
                 except Exception as e:
                     print(f"[CSV THUMBNAILS] Error updating image for {item_id}: {e}")
@@ -260,7 +304,8 @@ class CSVComparisonManager:
             update_image_callback,
             thumb_width,
             csv_path=self.csv_compare_path,
-            save_to_csv_callback=save_to_csv_callback
+            save_to_csv_callback=save_to_csv_callback,
+            indexes=indexes
         )
 
     def toggle_csv_thumbnails(self) -> None:
@@ -268,27 +313,28 @@ class CSVComparisonManager:
         if not hasattr(self.gui, 'csv_items_tree'):
             return
 
-        # Access csv_show_thumbnails from advanced_tab through main_window
-        show_thumbnails = False
-        if hasattr(self.gui, 'main_window') and hasattr(self.gui.main_window, 'advanced_tab'):
-            show_thumbnails = self.gui.main_window.advanced_tab.csv_show_thumbnails.get()
+        show_thumbnails = self._csv_thumbnails_enabled()
 
         if show_thumbnails:
             # Show thumbnails - set column width and rowheight
             self.gui.csv_items_tree.column('#0', width=70, stretch=False)
             style = ttk.Style()
             style.configure('CSV.Treeview', rowheight=70)
-
-            # Reload thumbnails if we have CSV items loaded
-            if hasattr(self, 'csv_filtered_items') and self.csv_filtered_items:
-                print(f"[CSV THUMBNAILS] Loading thumbnails for {len(self.csv_filtered_items)} items...")
-                self._start_thread(self._load_csv_thumbnails_worker, self.csv_filtered_items)
         else:
             # Hide thumbnails - set column width to 0
             self.gui.csv_items_tree.column('#0', width=0, stretch=False)
             style = ttk.Style()
             style.configure('CSV.Treeview', rowheight=25)
 
+        # The row height changed: fit the materialized rows to the viewport again
+        if self.csv_view is not None:
+            self.csv_view.refresh()
+
+        # Reload thumbnails of the visible rows if we have CSV items loaded
+        if show_thumbnails and self.csv_filtered_items:
+            self._csv_thumbs_requested.clear()
+            self._load_visible_csv_thumbnails()
+
         print(f"[CSV THUMBNAILS] Thumbnails {'shown' if show_thumbnails else 'hidden'}")
 
     def on_csv_item_selected(self, event) -> None:
@@ -357,19 +403,13 @@ class CSVComparisonManager:
 
         def reload_thumbnails():
             # Check if thumbnail column was resized and thumbnails are enabled
-            # Access csv_show_thumbnails from advanced_tab through main_window
-            show_thumbnails = False
-            if hasattr(self.gui, 'main_window') and hasattr(self.gui.main_window, 'advanced_tab'):
-                show_thumbnails = self.gui.main_window.advanced_tab.csv_show_thumbnails.get()
-
-            if (show_thumbnails and
-                hasattr(self, 'csv_filtered_items') and self.csv_filtered_items):
+            if self._csv_thumbnails_enabled() and self.csv_filtered_items:
                 current_width = self.gui.csv_items_tree.column('#0', 'width')
                 # Only reload if width changed significantly (more than 5px)
                 if not hasattr(self, '_last_thumb_width') or abs(current_width - self._last_thumb_width) > 5:
                     self._last_thumb_width = current_width
-                    print(f"[CSV THUMBNAILS] Column resized to {current_width}px, reloading thumbnails...")
-                    self._start_thread(self._load_csv_thumbnails_worker, self.csv_filtered_items)
+                    print(f"[CSV THUMBNAILS] Column resized to {current_width}px, reloading visible thumbnails...")
+                    self._reload_csv_thumbnails()
 
         # Debounce: wait 300ms after user stops dragging
         self._resize_timer = self.gui.after(300, reload_thumbnails)
@@ -526,11 +566,19 @@ class CSVComparisonManager:
             return
 
         max_results = int(self.gui.browserless_max_results.get())
+        self.csv_compare_cancel = threading.Event()
 
         def update_callback(message: str) -> None:
             if hasattr(self.gui, 'browserless_status'):
                 self.gui.after(0, lambda: self.gui.browserless_status.set(message))
 
+        def partial_results_callback(comparison_results: List[Dict]) -> None:
+            # Show the best matches so far (not saved to the CSV or sent to alerts)
+            if hasattr(self.gui, 'all_comparison_results'):
+                self.gui.all_comparison_results = comparison_results
+                main_window = self.gui.main_window if hasattr(self.gui, 'main_window') else self.gui
+                self.gui.after(0, main_window.apply_results_filter)
+
         def display_callback(comparison_results: List[Dict]) -> None:
             # Store results and apply filter
             if hasattr(self.gui, 'all_comparison_results'):
@@ -567,6 +615,7 @@ class CSVComparisonManager:
 
         # Import workers module for comparison
         from gui import workers
+        from compare_cache import get_compare_cache
         workers.compare_csv_items_worker(
             items,
             max_results,
@@ -575,8 +624,17 @@ class CSVComparisonManager:
             getattr(self.gui, 'usd_jpy_rate', 150.0),
             update_callback,
             display_callback,
-            show_message_callback
+            show_message_callback,
+            partial_results_callback=partial_results_callback,
+            cancel_event=self.csv_compare_cancel,
+            result_cache=get_compare_cache(self.csv_compare_path)
         )
+        if self.csv_compare_cancel.is_set() and hasattr(self.gui, 'csv_compare_progress'):
+            self.gui.after(0, self.gui.csv_compare_progress.stop)
+
+    def cancel_csv_comparison(self) -> None:
+        """Stop the running batch comparison; the matches found so far stay displayed."""
+        self.csv_compare_cancel.set()
 
     def _compare_csv_items_individually_worker(self, items: List[Dict], base_search_query: str) -> None:
         """Worker to compare CSV items individually - each item gets its own eBay search.
@@ -628,21 +686,19 @@ class CSVComparisonManager:
             if hasattr(self.gui, 'csv_compare_progress'):
                 self.gui.after(0, self.gui.csv_compare_progress.stop)
 
-        def create_debug_folder_callback(query: str) -> str:
-            return self.gui._create_debug_folder(query) if hasattr(self.gui, '_create_debug_folder') else 'debug'
-
         # Import workers module for individual comparison
         from gui import workers
+        from compare_cache import get_compare_cache
         workers.compare_csv_items_individually_worker(
             items,
             max_results,
-            add_secondary,
             getattr(self.gui, 'usd_jpy_rate', 150.0),
+            add_secondary,
+            getattr(self.gui, 'publisher_list', set()),
             update_callback,
             display_callback,
             show_message_callback,
-            create_debug_folder_callback,
-            self._extract_secondary_keyword
+            result_cache=get_compare_cache(self.csv_compare_path)
         )
 
     def _extract_secondary_keyword(self, title: str, primary_keyword: str) -> str:
@@ -786,6 +842,8 @@ class CSVComparisonManager:
                 writer.writeheader()
                 writer.writerows(self.csv_compare_data)
 
+            # The columns match the file just written: reloading it needs no re-parse
+            remember_csv_columns(self.csv_compare_path, self._get_csv_columns())
             print(f"[CSV IMAGES] Updated CSV file: {self.csv_compare_path}")
 
         except Exception as e:
@@ -1132,8 +1190,8 @@ class CSVComparisonManager:
         import cv2
         import numpy as np
         import requests
-        from gui.workers import compare_images
         from gui.utils import extract_price
+        from image_features import compare_features_cascade, load_or_extract_features
 
         try:
             # Load query image
@@ -1143,6 +1201,7 @@ class CSVComparisonManager:
                 return []
 
             print(f"[IMAGE COMPARE] Loaded query image: {query_img.shape}")
+            query_features = load_or_extract_features(query_img)
 
             # Get USD/JPY rate from settings
             usd_jpy_rate = 150.0
@@ -1182,12 +1241,14 @@ class CSVComparisonManager:
                     if ebay_img is None:
                         continue
 
-                    # Compare images
-                    similarity = compare_images(query_img, ebay_img)
+                    # Compare images (scoring stops early once the pair can't reach min_similarity)
+                    cascade = compare_features_cascade(query_features, load_or_extract_features(ebay_img),
+                                                       min_similarity, resolve_matches=True)
 
                     # Only include results above threshold
-                    if similarity < min_similarity:
+                    if not cascade.passed:
                         continue
+                    similarity = cascade.score
 
                     # Calculate profit margin
                     ebay_price_text = ebay_result.get('price', '$0')
@@ -1479,12 +1540,14 @@ class CSVComparisonManager:
                     }
 
             # Update csv_compare_data with comparison results
-            updated_count = 0
-            for row in self.csv_compare_data:
+            updated_rows = []
+            for i, row in enumerate(self.csv_compare_data):
                 url = row.get('url', row.get('product_url', ''))
                 if url in url_to_results:
                     row.update(url_to_results[url])
-                    updated_count += 1
+                    updated_rows.append(i)
+            updated_count = len(updated_rows)
+            self._get_csv_columns().update_rows(updated_rows)
 
             # Save updated CSV
             if updated_count > 0:
@@ -1537,10 +1600,15 @@ class CSVComparisonManager:
                     item['ebay_similarity'] = ''
                     item['ebay_price'] = ''
                     item['ebay_profit_margin'] = ''
+                self._get_csv_columns().update_rows()
 
                 # Save updated CSV
                 self._save_updated_csv()
 
+                # Forget cached matches so the next compare runs in full
+                from compare_cache import CompareResultCache, compare_cache_path
+                CompareResultCache(compare_cache_path(self.csv_compare_path)).clear()
+
                 # Log to status instead of popup
                 if hasattr(self.gui, 'browserless_status'):
                     self.gui.browserless_status.set(f"Cleared comparison results for {compared_count} items")
@@ -7,10 +7,21 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional, Callable
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
-import requests
-from io import BytesIO
 
 from gui import workers
+from image_cache import get_image_bytes
+from thumb_cache import get_thumbnail
+
+
+def _side_by_side(images: List[Image.Image]) -> Image.Image:
+    """Paste thumbnails next to each other with a 2px white separator."""
+    width = sum(image.width for image in images) + 2 * (len(images) - 1)
+    composite = Image.new('RGB', (width, max(image.height for image in images)), 'white')
+    x = 0
+    for image in images:
+        composite.paste(image, (x, 0))
+        x += image.width + 2
+    return composite
 
 
 class EbaySearchManager:
@@ -116,10 +127,6 @@ class EbaySearchManager:
 
     def display_browserless_results(self, results):
         """Display browserless search results in the tree view with thumbnails."""
-        from PIL import Image, ImageTk
-        import requests
-        from io import BytesIO
-
         # Clear existing results and images
         for item in self.tree.get_children():
             self.tree.delete(item)
@@ -128,7 +135,8 @@ class EbaySearchManager:
         # Store results for URL opening
         self.results_data = results
 
-        # Add new results with thumbnails
+        # Add new results; thumbnails (eBay and Mandarake side-by-side if both exist) follow
+        thumbnail_jobs = []
         for i, result in enumerate(results, 1):
             values = (
                 result['title'],  # Show full title, no truncation
@@ -141,62 +149,55 @@ class EbaySearchManager:
                 result['url'],  # eBay URL
                 result.get('mandarake_url', '')  # Mandarake URL
             )
+            self.tree.insert('', 'end', iid=str(i), text=str(i), values=values)
 
-            # Try to load thumbnails (eBay and Mandarake side-by-side if both exist)
-            ebay_image_url = result.get('image_url', '')
-            mandarake_image_url = result.get('mandarake_image_url', '')
-            photo = None
+            image_urls = [url for url in (result.get('image_url', ''), result.get('mandarake_image_url', '')) if url]
+            if image_urls:
+                thumbnail_jobs.append((str(i), image_urls))
 
-            try:
-                ebay_img = None
-                mandarake_img = None
+        self._load_result_thumbnails(results, thumbnail_jobs)
+        print(f"[SCRAPY SEARCH] Displayed {len(results)} results in tree view "
+              f"(loading {len(thumbnail_jobs)} thumbnails in the background)")
 
-                # Load eBay image
-                if ebay_image_url:
-                    try:
-                        response = requests.get(ebay_image_url, timeout=5)
-                        response.raise_for_status()
-                        ebay_img = Image.open(BytesIO(response.content))
-                        ebay_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                    except Exception as e:
-                        print(f"[THUMB] Failed to load eBay thumbnail {i}: {e}")
+    def _load_result_thumbnails(self, results: List[Dict[str, Any]], jobs: List[tuple]) -> None:
+        """Download and render row thumbnails in a background thread.
+
+        Each finished thumbnail is put on its row from the Tk thread via after(),
+        so cache misses never block the GUI.
 
-                # Load Mandarake image
-                if mandarake_image_url:
+        Args:
+            results: Result list the rows were built from (thumbnails for an outdated list are dropped)
+            jobs: (row iid, image URLs) pairs; several URLs are shown side by side
+        """
+        def worker():
+            for iid, image_urls in jobs:
+                thumbnails = []
+                for image_url in image_urls:
                     try:
-                        response = requests.get(mandarake_image_url, timeout=5)
-                        response.raise_for_status()
-                        mandarake_img = Image.open(BytesIO(response.content))
-                        mandarake_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
+                        # Downloads and rendered thumbnails are both cached
+                        data = get_image_bytes(image_url, timeout=5)
+                        if data is None:
+                            raise ValueError("download failed")
+                        thumbnails.append(get_thumbnail(data, 60))
                     except Exception as e:
-                        print(f"[THUMB] Failed to load Mandarake thumbnail {i}: {e}")
-
-                # Create composite image if we have both, or use single image
-                if ebay_img and mandarake_img:
-                    # Side-by-side composite
-                    total_width = ebay_img.width + mandarake_img.width + 2  # +2 for separator
-                    max_height = max(ebay_img.height, mandarake_img.height)
-                    composite = Image.new('RGB', (total_width, max_height), 'white')
-                    composite.paste(ebay_img, (0, 0))
-                    composite.paste(mandarake_img, (ebay_img.width + 2, 0))
-                    photo = ImageTk.PhotoImage(composite)
-                elif ebay_img:
-                    photo = ImageTk.PhotoImage(ebay_img)
-                elif mandarake_img:
-                    photo = ImageTk.PhotoImage(mandarake_img)
-
-            except Exception as e:
-                print(f"[SCRAPY SEARCH] Failed to load thumbnails {i}: {e}")
-                photo = None
-
-            # Insert with or without image
-            if photo:
-                self.tree.insert('', 'end', iid=str(i), text='', values=values, image=photo)
-                self.images[str(i)] = photo  # Keep reference to prevent garbage collection
-            else:
-                self.tree.insert('', 'end', iid=str(i), text=str(i), values=values)
+                        print(f"[THUMB] Failed to load thumbnail for row {iid}: {e}")
+                if not thumbnails:
+                    continue
+                image = thumbnails[0] if len(thumbnails) == 1 else _side_by_side(thumbnails)
+                self.gui.after(0, lambda iid=iid, image=image: self._show_row_thumbnail(results, iid, image))
+
+        threading.Thread(target=worker, daemon=True).start()
 
-        print(f"[SCRAPY SEARCH] Displayed {len(results)} results in tree view ({len(self.images)} with thumbnails)")
+    def _show_row_thumbnail(self, results: List[Dict[str, Any]], iid: str, image: Image.Image) -> None:
+        """Put a loaded thumbnail on its row (runs on the Tk thread)."""
+        if results is not self.results_data or not self.tree.exists(iid):
+            return
+        try:
+            photo = ImageTk.PhotoImage(image)
+            self.images[iid] = photo  # Keep reference to prevent garbage collection
+            self.tree.item(iid, image=photo, text='')
+        except Exception as e:
+            print(f"[THUMB] Error updating thumbnail for row {iid}: {e}")
 
     def run_text_search(self, query: str, max_results: int, search_method: str = "scrapy"):
         """Run eBay text search.
@@ -354,7 +355,8 @@ class EbaySearchManager:
         # Store results for URL opening
         self.results_data = results
         
-        # Add new results with thumbnails
+        # Add new results; thumbnails follow from a background thread
+        thumbnail_jobs = []
         for i, result in enumerate(results, 1):
             values = (
                 result['title'],  # Show full title, no truncation
@@ -366,31 +368,16 @@ class EbaySearchManager:
                 result.get('similarity', ''),
                 result['url']  # Show full URL, no truncation
             )
-            
-            # Try to load thumbnail
+            self.tree.insert('', 'end', iid=str(i), text=str(i), values=values)
+
             image_url = result.get('image_url', '')
-            photo = None
-            
             if image_url:
-                try:
-                    response = requests.get(image_url, timeout=5)
-                    response.raise_for_status()
-                    pil_img = Image.open(BytesIO(response.content))
-                    pil_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(pil_img)
-                except Exception as e:
-                    print(f"[EBAY SEARCH] Failed to load thumbnail {i}: {e}")
-                    photo = None
-            
-            # Insert with or without image
-            if photo:
-                self.tree.insert('', 'end', iid=str(i), text='', values=values, image=photo)
-                self.images[str(i)] = photo  # Keep reference to prevent garbage collection
-            else:
-                self.tree.insert('', 'end', iid=str(i), text=str(i), values=values)
-        
-        print(f"[EBAY SEARCH] Displayed {len(results)} results in tree view ({len(self.images)} with thumbnails)")
-    
+                thumbnail_jobs.append((str(i), [image_url]))
+
+        self._load_result_thumbnails(results, thumbnail_jobs)
+        print(f"[EBAY SEARCH] Displayed {len(results)} results in tree view "
+              f"(loading {len(thumbnail_jobs)} thumbnails in the background)")
+
     def clear_results(self):
         """Clear all eBay search results."""
         for item in self.tree.get_children():
@@ -499,8 +486,19 @@ class EbaySearchManager:
             if use_lazy_search:
                 print(f"[LAZY SEARCH] Enabled - will try optimized terms if initial search fails")
 
-            # Search for sold listings using web scraping
-            result = ebay_api.search_sold_listings_web(title, days_back=days_back)
+            # Search for sold listings using web scraping (through the shared search cache)
+            from ebay_search_cache import get_search_cache, search_cache_enabled
+
+            def search_sold(term):
+                if not search_cache_enabled():
+                    return ebay_api.search_sold_listings_web(term, days_back=days_back)
+                return get_search_cache().get_or_fetch_value(
+                    'web_sold', term, True,
+                    lambda: ebay_api.search_sold_listings_web(term, days_back=days_back),
+                    variant=f"{days_back}d"
+                )
+
+            result = search_sold(title)
 
             # If lazy search is enabled and we got poor results OR eBay is blocking, try optimized search terms
             if use_lazy_search and (not result or result.get('sold_count', 0) < 3 or result.get('error')):
@@ -524,7 +522,7 @@ class EbaySearchManager:
                         if optimized_term != title:  # Skip if same as original
                             print(f"[LAZY SEARCH] Trying optimized term: '{optimized_term}'")
 
-                            opt_result = ebay_api.search_sold_listings_web(optimized_term, days_back=days_back)
+                            opt_result = search_sold(optimized_term)
 
                             if opt_result and opt_result.get('sold_count', 0) > best_count:
                                 print(f"[LAZY SEARCH] Better result found: {opt_result['sold_count']} items vs {best_count}")
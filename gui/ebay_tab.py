@@ -346,13 +346,14 @@ class EbayTab(ttk.Frame):
         csv_items_frame.columnconfigure(0, weight=1)
 
         # Scrollbars
-        csv_v_scroll = ttk.Scrollbar(
+        # Scrolling over all CSV rows is taken over by the manager's virtual view
+        self.csv_v_scroll = ttk.Scrollbar(
             csv_items_frame,
             orient=tk.VERTICAL,
             command=self.csv_items_tree.yview
         )
-        csv_v_scroll.grid(row=0, column=1, sticky=tk.NS)
-        self.csv_items_tree.configure(yscrollcommand=csv_v_scroll.set)
+        self.csv_v_scroll.grid(row=0, column=1, sticky=tk.NS)
+        self.csv_items_tree.configure(yscrollcommand=self.csv_v_scroll.set)
 
         csv_h_scroll = ttk.Scrollbar(
             csv_items_frame,
@@ -444,6 +445,12 @@ class EbayTab(ttk.Frame):
         self.csv_compare_progress = ttk.Progressbar(button_frame, mode='indeterminate', length=200)
         self.csv_compare_progress.grid(row=0, column=5, rowspan=2, sticky=tk.W, padx=(10, 5))
 
+        ttk.Button(
+            button_frame,
+            text="Stop",
+            command=self._cancel_csv_comparison
+        ).grid(row=0, column=6, sticky=tk.W, **pad)
+
         # Add the CSV comparison frame to the paned window
         self.ebay_paned.add(csv_compare_frame, minsize=200)
 
@@ -620,6 +627,10 @@ class EbayTab(ttk.Frame):
         """Compare all CSV items with eBay."""
         return self.main_window.compare_all_csv_items()
 
+    def _cancel_csv_comparison(self):
+        """Stop the running CSV batch comparison."""
+        return self.csv_comparison_manager.cancel_csv_comparison()
+
     def _compare_new_csv_items(self):
         """Compare new CSV items only."""
         return self.main_window.compare_new_csv_items()
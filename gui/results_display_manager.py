@@ -4,7 +4,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from pathlib import Path
-import csv
 import webbrowser
 import logging
 from PIL import Image, ImageTk
@@ -12,6 +11,8 @@ from typing import Dict, Any, Optional, List
 import requests
 from io import BytesIO
 
+from csv_columns import load_csv_columns
+
 
 class ResultsDisplayManager:
     """Manages the display and visualization of search results."""
@@ -54,63 +55,62 @@ class ResultsDisplayManager:
         print(f"[RESULTS DISPLAY] Show images setting: {show_images}")
         
         try:
-            with csv_path.open('r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    title = row.get('title', '')
-                    price = row.get('price_text') or row.get('price') or ''
-                    shop = row.get('shop') or row.get('shop_text') or ''
-                    stock = row.get('in_stock') or row.get('stock_status') or ''
-                    if isinstance(stock, str) and stock.lower() in {'true', 'false'}:
-                        stock = 'Yes' if stock.lower() == 'true' else 'No'
-                    category = row.get('category', '')
-                    link = row.get('product_url') or row.get('url') or ''
-                    local_image_path = row.get('local_image') or ''
-                    web_image_url = row.get('image_url') or ''
-                    
-                    item_kwargs = {'values': (title, price, shop, stock, category, link)}
-                    photo = None
-
-                    if show_images:
-                        # Try local image first, then fallback to web image
-                        if local_image_path:
-                            print(f"[RESULTS DISPLAY] Attempting to load local image: {local_image_path}")
-                            try:
-                                pil_img = Image.open(local_image_path)
-                                pil_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                                photo = ImageTk.PhotoImage(pil_img)
-                                item_kwargs['image'] = photo
-                                print(f"[RESULTS DISPLAY] Successfully loaded local thumbnail: {local_image_path}")
-                            except Exception as e:
-                                print(f"[RESULTS DISPLAY] Failed to load local image {local_image_path}: {e}")
-                                photo = None
-
-                        # If no local image or local image failed, try web image
-                        if not photo and web_image_url:
-                            print(f"[RESULTS DISPLAY] Attempting to download web image: {web_image_url}")
-                            try:
-                                response = requests.get(web_image_url, timeout=10)
-                                response.raise_for_status()
-                                pil_img = Image.open(BytesIO(response.content))
-                                pil_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                                photo = ImageTk.PhotoImage(pil_img)
-                                item_kwargs['image'] = photo
-                                print(f"[RESULTS DISPLAY] Successfully downloaded web thumbnail: {web_image_url}")
-                            except Exception as e:
-                                print(f"[RESULTS DISPLAY] Failed to download web image {web_image_url}: {e}")
-                                photo = None
-
-                        if not photo:
-                            print(f"[RESULTS DISPLAY] No image available for row: {title}")
-                    else:
-                        print(f"[RESULTS DISPLAY] Show images disabled")
-                        
-                    item_id = self.main_window.result_tree.insert('', tk.END, **item_kwargs)
-                    self.main_window.result_data[item_id] = row
-                    if photo:
-                        self.main_window.result_images[item_id] = photo
-                    self.main_window.result_links[item_id] = link
+            # Parsed once per file version (memory-mapped sidecar across sessions)
+            for row in load_csv_columns(csv_path).rows:
+                title = row.get('title', '')
+                price = row.get('price_text') or row.get('price') or ''
+                shop = row.get('shop') or row.get('shop_text') or ''
+                stock = row.get('in_stock') or row.get('stock_status') or ''
+                if isinstance(stock, str) and stock.lower() in {'true', 'false'}:
+                    stock = 'Yes' if stock.lower() == 'true' else 'No'
+                category = row.get('category', '')
+                link = row.get('product_url') or row.get('url') or ''
+                local_image_path = row.get('local_image') or ''
+                web_image_url = row.get('image_url') or ''
+                
+                item_kwargs = {'values': (title, price, shop, stock, category, link)}
+                photo = None
+
+                if show_images:
+                    # Try local image first, then fallback to web image
+                    if local_image_path:
+                        print(f"[RESULTS DISPLAY] Attempting to load local image: {local_image_path}")
+                        try:
+                            pil_img = Image.open(local_image_path)
+                            pil_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
+                            photo = ImageTk.PhotoImage(pil_img)
+                            item_kwargs['image'] = photo
+                            print(f"[RESULTS DISPLAY] Successfully loaded local thumbnail: {local_image_path}")
+                        except Exception as e:
+                            print(f"[RESULTS DISPLAY] Failed to load local image {local_image_path}: {e}")
+                            photo = None
+
+                    # If no local image or local image failed, try web image
+                    if not photo and web_image_url:
+                        print(f"[RESULTS DISPLAY] Attempting to download web image: {web_image_url}")
+                        try:
+                            response = requests.get(web_image_url, timeout=10)
+                            response.raise_for_status()
+                            pil_img = Image.open(BytesIO(response.content))
+                            pil_img.thumbnail((60, 60), Image.Resampling.LANCZOS)
+                            photo = ImageTk.PhotoImage(pil_img)
+                            item_kwargs['image'] = photo
+                            print(f"[RESULTS DISPLAY] Successfully downloaded web thumbnail: {web_image_url}")
+                        except Exception as e:
+                            print(f"[RESULTS DISPLAY] Failed to download web image {web_image_url}: {e}")
+                            photo = None
+
+                    if not photo:
+                        print(f"[RESULTS DISPLAY] No image available for row: {title}")
+                else:
+                    print(f"[RESULTS DISPLAY] Show images disabled")
                     
+                item_id = self.main_window.result_tree.insert('', tk.END, **item_kwargs)
+                self.main_window.result_data[item_id] = row
+                if photo:
+                    self.main_window.result_images[item_id] = photo
+                self.main_window.result_links[item_id] = link
+                
             self.main_window.status_var.set(f'Loaded results from {csv_path}')
         except Exception as exc:
             messagebox.showerror('Error', f'Failed to load results: {exc}')
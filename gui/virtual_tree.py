@@ -0,0 +1,199 @@
+"""Virtual Treeview - Shows very large lists in a ttk.Treeview by materializing only visible rows.
+
+A Treeview with tens of thousands of items is slow to fill, to clear and to
+scroll. The virtual view keeps only the rows around the viewport (plus an
+overscan above and below) as real tree items, and drives the scrollbar over
+the full row count:
+
+    view = VirtualTreeview(tree, scrollbar, row_builder, on_window_changed=load_thumbnails)
+    view.set_rows(len(filtered_items))
+
+- row_builder(index) returns the Treeview.insert() options of a row (text,
+  values, image, tags). Rows are built only when they enter the window.
+- Item iids are the row indexes as strings, so selection handlers can map a
+  selected item straight back to the data.
+- Scrolling keeps the items that stay in the window and only inserts and
+  deletes the rows crossing its edges.
+- on_window_changed(start, stop) is called whenever the materialized rows
+  change, e.g. to load thumbnails of the rows on screen only.
+"""
+
+from tkinter import ttk
+from typing import Callable, Dict, Optional, Tuple
+
+# Rows kept above and below the viewport
+DEFAULT_OVERSCAN = 20
+
+
+def visible_window(top: int, visible: int, count: int, overscan: int) -> Tuple[int, int]:
+    """
+    Rows to materialize for a viewport.
+
+    Args:
+        top: First row in the viewport
+        visible: Rows that fit in the viewport
+        count: Total number of rows
+        overscan: Extra rows kept above and below the viewport
+
+    Returns:
+        (start, stop) row range
+    """
+    return max(0, top - overscan), min(count, top + visible + overscan)
+
+
+class VirtualTreeview:
+    """Materializes the rows around the viewport of a ttk.Treeview and recycles them on scroll."""
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: Optional[ttk.Scrollbar],
+                 row_builder: Callable[[int], Dict],
+                 overscan: int = DEFAULT_OVERSCAN,
+                 on_window_changed: Optional[Callable[[int, int], None]] = None):
+        """
+        Take over vertical scrolling of a tree.
+
+        Args:
+            tree: Treeview showing the rows (its items are managed by the view)
+            scrollbar: Vertical scrollbar of the tree (set to the full row count)
+            row_builder: Callback(index) -> Treeview.insert() options of a row
+            overscan: Extra rows kept above and below the viewport
+            on_window_changed: Optional callback(start, stop) after rows are materialized
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_builder = row_builder
+        self.overscan = overscan
+        self.on_window_changed = on_window_changed
+
+        self.count = 0
+        self.top = 0
+        # Materialized rows: [start, stop)
+        self.start = 0
+        self.stop = 0
+
+        self.tree.configure(yscrollcommand=self._on_tree_scrolled)
+        if self.scrollbar is not None:
+            self.scrollbar.configure(command=self.yview)
+        self.tree.bind('<Configure>', lambda event: self.refresh(), add='+')
+
+    # ------------------------------------------------------------------
+    # Data
+    # ------------------------------------------------------------------
+
+    def set_rows(self, count: int, keep_position: bool = True) -> None:
+        """
+        Show a new list of rows (every materialized row is rebuilt).
+
+        Args:
+            count: Total number of rows
+            keep_position: Stay at the current scroll position (else scroll to the top)
+        """
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.start = self.stop = 0
+        self.count = count
+        self._show(self.top if keep_position else 0, force=True)
+
+    def refresh(self) -> None:
+        """Re-fit the window to the viewport (after a resize or a row height change)."""
+        self._show(self.top)
+
+    def is_materialized(self, index: int) -> bool:
+        """Whether a row currently exists as a tree item."""
+        return self.start <= index < self.stop
+
+    def window(self) -> Tuple[int, int]:
+        """Materialized (start, stop) row range."""
+        return self.start, self.stop
+
+    # ------------------------------------------------------------------
+    # Scrolling
+    # ------------------------------------------------------------------
+
+    def yview(self, *args) -> None:
+        """Scrollbar command ('moveto' fraction or 'scroll' units/pages) over the full row count."""
+        if not args:
+            return
+        visible = self._visible_rows()
+        if args[0] == 'moveto':
+            top = int(float(args[1]) * self.count)
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            top = self.top + (step * max(1, visible - 1) if args[2] == 'pages' else step)
+        else:
+            return
+        self._show(top, move=True)
+
+    def _on_tree_scrolled(self, first, last) -> None:
+        """Tree yscrollcommand: follow native scrolling (wheel, keys) inside the materialized rows."""
+        if self.stop > self.start:
+            self.top = self.start + int(round(float(first) * (self.stop - self.start)))
+            self._show(self.top)
+        else:
+            self._update_scrollbar(0)
+
+    def _visible_rows(self) -> int:
+        """Rows that fit in the tree's viewport."""
+        try:
+            rowheight = int(ttk.Style().lookup(self.tree.cget('style') or 'Treeview', 'rowheight') or 20)
+        except (ValueError, TypeError):
+            rowheight = 20
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # Not mapped yet: use the requested height
+            return max(1, int(self.tree.cget('height')))
+        return max(1, height // max(1, rowheight))
+
+    def _show(self, top: int, move: bool = False, force: bool = False) -> None:
+        """
+        Scroll to a row, materializing a new window when the viewport nears its edges.
+
+        Args:
+            top: Row to show at the top of the viewport
+            move: Scroll the tree even if the window is unchanged (scrollbar commands)
+            force: Materialize the window even if the viewport is well inside it
+        """
+        visible = self._visible_rows()
+        top = max(0, min(top, self.count - visible))
+        self.top = top
+
+        # Re-window once the viewport gets within half an overscan of a window edge
+        margin = self.overscan // 2
+        needs_window = (
+            force
+            or (top - self.start < margin and self.start > 0)
+            or (self.stop - (top + visible) < margin and self.stop < self.count)
+        )
+        if needs_window:
+            self._materialize(*visible_window(top, visible, self.count, self.overscan))
+            move = True
+
+        if move and self.stop > self.start:
+            self.tree.yview_moveto((top - self.start) / (self.stop - self.start))
+        self._update_scrollbar(visible)
+
+    def _update_scrollbar(self, visible: int) -> None:
+        if self.scrollbar is None:
+            return
+        if self.count <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.top / self.count, min(1.0, (self.top + visible) / self.count))
+
+    def _materialize(self, start: int, stop: int) -> None:
+        """Turn the tree items into rows [start, stop), keeping the rows already there."""
+        if (start, stop) == (self.start, self.stop):
+            return
+
+        stale = [str(i) for i in range(self.start, self.stop) if not start <= i < stop]
+        if stale:
+            self.tree.delete(*stale)
+
+        # Rows are inserted in order, so each lands at its final position
+        for i in range(start, stop):
+            if not self.start <= i < self.stop:
+                self.tree.insert('', i - start, iid=str(i), **self.row_builder(i))
+
+        self.start, self.stop = start, stop
+        if self.on_window_changed:
+            self.on_window_changed(start, stop)
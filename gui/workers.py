@@ -11,17 +11,22 @@ import logging
 import queue
 import re
 import threading
-from datetime import datetime
-from io import BytesIO
+import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import cv2
 import numpy as np
-import requests
-from PIL import Image, ImageTk, ImageOps
-from skimage.metrics import structural_similarity as ssim
-
+from PIL import Image, ImageTk
+from image_compare_engine import TopKTracker, get_comparison_engine
+from compare_cache import CompareResultCache, cached_match, compare_fingerprint, result_set_version, row_key
+from debug_artifacts import get_artifact_writer, safe_filename, start_debug_run
+from image_cache import get_image, get_image_bytes, image_extension
+from image_decode import load_image
+from image_features import FEATURE_VERSION, ImageFeatures
+from image_index import index_listing_images
+from thumb_cache import get_thumbnail
+from matching_core import get_scorer
+from image_prefilter import CandidatePrefilter, compute_signature, get_prefilter_settings
 from mandarake_scraper import MandarakeScraper, schedule_scraper
 
 
@@ -48,14 +53,22 @@ def extract_price(price_text: str) -> float:
     return 0.0
 
 
+def _compare_scorer(use_ransac: bool = False):
+    return get_scorer('compare_ransac' if use_ransac else 'compare')
+
+
 def compare_images(ref_image: np.ndarray, compare_image: np.ndarray, use_ransac: bool = False) -> float:
     """
     Compare two images and return similarity score (0-100).
     Enhanced multi-metric comparison with robustness to crops/extra elements:
-    - Feature Matching (ORB) - 50% (most robust to crops/additions)
-    - SSIM (Structural Similarity) - 25%
-    - Color Histogram - 15%
-    - Template Matching - 10% (for detecting embedded matches)
+    - Template Matching - 60% (for detecting embedded matches)
+    - Feature Matching (ORB) - 25% (most robust to crops/additions)
+    - SSIM (Structural Similarity) - 10%
+    - Color Histogram - 5%
+
+    When one image is compared against many, extract its features once with
+    get_scorer('compare').load_or_extract() (cached on disk across runs) and
+    score with compare_image_features().
 
     Args:
         ref_image: Reference image (numpy array)
@@ -66,168 +79,7 @@ def compare_images(ref_image: np.ndarray, compare_image: np.ndarray, use_ransac:
         float: Similarity score from 0-100
     """
     try:
-        # Resize images to same size for comparison (higher res for better feature detection)
-        ref_resized = cv2.resize(ref_image, (400, 400))
-        compare_resized = cv2.resize(compare_image, (400, 400))
-
-        # Convert to grayscale
-        ref_gray = cv2.cvtColor(ref_resized, cv2.COLOR_BGR2GRAY)
-        compare_gray = cv2.cvtColor(compare_resized, cv2.COLOR_BGR2GRAY)
-
-        # === 1. Feature Matching (ORB) - 50% weight ===
-        # Increased features for better matching
-        orb = cv2.ORB_create(nfeatures=1000, scaleFactor=1.2, nlevels=8)
-        kp1, des1 = orb.detectAndCompute(ref_gray, None)
-        kp2, des2 = orb.detectAndCompute(compare_gray, None)
-
-        feature_score = 0.0
-        ransac_score = 0.0
-
-        if des1 is not None and des2 is not None and len(des1) > 0 and len(des2) > 0:
-            # Use BFMatcher with Hamming distance for ORB
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-            matches = bf.knnMatch(des1, des2, k=2)
-
-            # Apply ratio test (Lowe's ratio test)
-            good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance < 0.75 * n.distance:  # Ratio test
-                        good_matches.append(m)
-                elif len(match_pair) == 1:
-                    good_matches.append(match_pair[0])
-
-            # Calculate score based on good matches
-            if len(good_matches) > 0:
-                # Normalize by the smaller number of keypoints
-                max_possible_matches = min(len(kp1), len(kp2))
-                if max_possible_matches > 0:
-                    # More lenient scoring for feature matches
-                    raw_ratio = len(good_matches) / max_possible_matches
-                    feature_score = min(raw_ratio * 2.0, 1.0)  # Multiply by 2 to boost scores
-
-                # === RANSAC Geometric Verification (optional) ===
-                if use_ransac and len(good_matches) >= 4:  # Need at least 4 points for homography
-                    try:
-                        # Extract matched keypoint coordinates
-                        src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-                        dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-
-                        # Find homography using RANSAC
-                        M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
-
-                        if mask is not None:
-                            # Calculate inlier ratio (geometrically coherent matches)
-                            inliers = np.sum(mask)
-                            inlier_ratio = inliers / len(good_matches)
-                            ransac_score = inlier_ratio  # 0.0 to 1.0
-
-                    except Exception as e:
-                        # RANSAC can fail if points are degenerate
-                        ransac_score = 0.0
-
-        # === 2. SSIM (Structural Similarity) - 25% weight ===
-        ssim_score = ssim(ref_gray, compare_gray)
-
-        # === 3. Color Histogram Comparison - 15% weight ===
-        # Use HSV color space (better for color matching than RGB)
-        ref_hsv = cv2.cvtColor(ref_resized, cv2.COLOR_BGR2HSV)
-        compare_hsv = cv2.cvtColor(compare_resized, cv2.COLOR_BGR2HSV)
-
-        # Calculate histograms with higher bins for better precision
-        ref_hist = cv2.calcHist([ref_hsv], [0, 1, 2], None, [12, 12, 12], [0, 180, 0, 256, 0, 256])
-        compare_hist = cv2.calcHist([compare_hsv], [0, 1, 2], None, [12, 12, 12], [0, 180, 0, 256, 0, 256])
-        cv2.normalize(ref_hist, ref_hist, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
-        cv2.normalize(compare_hist, compare_hist, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
-        hist_score = cv2.compareHist(ref_hist, compare_hist, cv2.HISTCMP_CORREL)
-
-        # Handle NaN from histogram comparison
-        if np.isnan(hist_score):
-            hist_score = 0.0
-        else:
-            hist_score = max(0.0, hist_score)  # Ensure non-negative
-
-        # === 4. Template Matching - 10% weight ===
-        # Check if reference appears as a sub-region in compare image
-        template_score = 0.0
-        try:
-            # Try multiple scales to handle size differences
-            scales = [0.7, 0.8, 0.9, 1.0, 1.1, 1.2]
-            best_match = 0.0
-
-            for scale in scales:
-                if scale != 1.0:
-                    width = int(ref_resized.shape[1] * scale)
-                    height = int(ref_resized.shape[0] * scale)
-                    if width < compare_resized.shape[1] and height < compare_resized.shape[0]:
-                        scaled_ref = cv2.resize(ref_resized, (width, height))
-                        scaled_ref_gray = cv2.cvtColor(scaled_ref, cv2.COLOR_BGR2GRAY)
-                    else:
-                        continue
-                else:
-                    scaled_ref_gray = ref_gray
-
-                # Template matching
-                result = cv2.matchTemplate(compare_gray, scaled_ref_gray, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, _ = cv2.minMaxLoc(result)
-                best_match = max(best_match, max_val)
-
-            template_score = max(0.0, best_match)
-        except (cv2.error, ValueError, TypeError) as e:
-            logging.debug(f"Template matching failed: {e}")
-            template_score = 0.0
-
-        # === Weighted combination ===
-        # Template matching is proving to be the most reliable for exact matches with watermarks
-        # Feature matching is second but can be inconsistent with heavy watermarks
-        if use_ransac and ransac_score > 0:
-            # With RANSAC: adjust weights to incorporate geometric verification
-            similarity = (
-                template_score * 0.50 +   # Template matching (reduced from 60%)
-                feature_score * 0.20 +    # Feature matching (reduced from 25%)
-                ransac_score * 0.20 +     # RANSAC geometric coherence (new)
-                ssim_score * 0.07 +       # Structural similarity (reduced from 10%)
-                hist_score * 0.03         # Color distribution (reduced from 5%)
-            ) * 100
-        else:
-            # Without RANSAC: standard weights
-            similarity = (
-                template_score * 0.60 +   # Template matching (best for exact matches)
-                feature_score * 0.25 +    # Feature matching (robust to crops)
-                ssim_score * 0.10 +       # Structural similarity
-                hist_score * 0.05         # Color distribution (least important)
-            ) * 100
-
-        # === Consistency Bonus ===
-        # When multiple metrics agree (all score high), it's a stronger match
-        # This increases separation between true matches and false positives
-        high_threshold = 0.50  # Metric must be >50% to count as "high"
-        if use_ransac:
-            metrics = [template_score, feature_score, ssim_score, hist_score, ransac_score]
-        else:
-            metrics = [template_score, feature_score, ssim_score, hist_score]
-        high_count = sum(1 for m in metrics if m > high_threshold)
-
-        consistency_multiplier = 1.0
-        if high_count >= 3:
-            consistency_multiplier = 1.25  # 3+ metrics agree: strong match, +25% boost
-        elif high_count >= 2:
-            consistency_multiplier = 1.15  # 2 metrics agree: good match, +15% boost
-
-        similarity *= consistency_multiplier
-
-        # Debug output for analysis
-        if use_ransac:
-            print(f"[IMAGE COMPARE] Features: {feature_score*100:.1f}%, SSIM: {ssim_score*100:.1f}%, "
-                  f"Hist: {hist_score*100:.1f}%, Template: {template_score*100:.1f}%, RANSAC: {ransac_score*100:.1f}% "
-                  f"[{high_count} high] x{consistency_multiplier:.2f} => Total: {similarity:.1f}%")
-        else:
-            print(f"[IMAGE COMPARE] Features: {feature_score*100:.1f}%, SSIM: {ssim_score*100:.1f}%, "
-                  f"Hist: {hist_score*100:.1f}%, Template: {template_score*100:.1f}% "
-                  f"[{high_count} high] x{consistency_multiplier:.2f} => Total: {similarity:.1f}%")
-
-        return max(0.0, min(100.0, similarity))  # Clamp to 0-100
+        return _compare_scorer(use_ransac).score_images(ref_image, compare_image)
 
     except Exception as e:
         print(f"[IMAGE COMPARE] Error: {e}")
@@ -236,22 +88,17 @@ def compare_images(ref_image: np.ndarray, compare_image: np.ndarray, use_ransac:
         return 0.0
 
 
-def create_debug_folder(query: str) -> Path:
-    """
-    Create debug folder for saving comparison images.
-
-    Args:
-        query: Search query string
+def compare_image_features(ref_features: ImageFeatures, compare_image_features: ImageFeatures,
+                           use_ransac: bool = False) -> float:
+    """compare_images() on precomputed features (returns 0.0 on errors)."""
+    try:
+        return _compare_scorer(use_ransac).score(ref_features, compare_image_features)
 
-    Returns:
-        Path: Debug folder path
-    """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_query = "".join(c for c in query if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-    debug_folder = Path(f"debug_comparison/{safe_query}_{timestamp}")
-    debug_folder.mkdir(parents=True, exist_ok=True)
-    print(f"[DEBUG] Debug folder: {debug_folder}")
-    return debug_folder
+    except Exception as e:
+        print(f"[IMAGE COMPARE] Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0.0
 
 
 def extract_secondary_keyword(title: str, primary_keyword: str, publisher_list: set) -> str:
@@ -532,9 +379,11 @@ def run_ebay_image_comparison_worker(image_path: Path, search_term: str, days_ba
 
         update_callback(f"Searching for sold listings: {search_term}", 30)
 
-        # Create debug output directory
-        debug_dir = create_debug_folder(search_term)
-        update_callback(f"Images will be saved to: {debug_dir}", 30)
+        # Sold listing images are written by the matchers (level 'full' only)
+        debug_run = start_debug_run(search_term)
+        debug_dir = str(debug_run.folder) if debug_run.saves_images else None
+        if debug_dir:
+            update_callback(f"Images will be saved to: {debug_dir}", 30)
 
         if show_browser:
             # Use Playwright version with visible browser
@@ -543,7 +392,7 @@ def run_ebay_image_comparison_worker(image_path: Path, search_term: str, days_ba
             matcher = SoldListingMatcher(
                 headless=False,
                 similarity_threshold=similarity_threshold,
-                debug_output_dir=str(debug_dir)
+                debug_output_dir=debug_dir
             )
             update_callback("Browser ready - starting eBay search...", 30)
         else:
@@ -551,7 +400,7 @@ def run_ebay_image_comparison_worker(image_path: Path, search_term: str, days_ba
             from sold_listing_matcher_requests import SoldListingMatcherRequests
             matcher = SoldListingMatcherRequests(
                 similarity_threshold=similarity_threshold,
-                debug_output_dir=str(debug_dir)
+                debug_output_dir=debug_dir
             )
 
         update_callback("Analyzing sold listing images...", 50)
@@ -575,11 +424,15 @@ def run_ebay_image_comparison_worker(image_path: Path, search_term: str, days_ba
                     days_back=days_back
                 )
 
+            debug_run.close(search_term=search_term, matches_found=result.matches_found,
+                            confidence=result.confidence)
+
             # Update status to show where images were saved
-            if debug_dir.exists():
-                image_count = len([f for f in debug_dir.iterdir() if f.suffix == '.jpg'])
+            if debug_dir:
+                get_artifact_writer().flush(timeout=10)
+                image_count = len([f for f in debug_run.folder.iterdir() if f.suffix == '.jpg'])
                 update_callback(f"Analysis complete! {image_count} comparison images saved to: {debug_dir}", 50)
-                print(f"[IMAGE COMPARISON] Saved {image_count} images to: {debug_dir.absolute()}")
+                print(f"[IMAGE COMPARISON] Saved {image_count} images to: {debug_run.folder.absolute()}")
         finally:
             # Handle cleanup for both sync and async versions
             if show_browser:
@@ -664,19 +517,12 @@ def download_missing_images_worker(csv_data: List[Dict], download_dir: str,
             try:
                 update_callback(f"Downloading image {i}/{len(csv_data)}...")
 
-                response = requests.get(image_url, timeout=10)
-                response.raise_for_status()
+                data = get_image_bytes(image_url, timeout=10)
+                if data is None:
+                    raise IOError(f"download failed: {image_url}")
 
                 # Determine file extension
-                content_type = response.headers.get('content-type', '')
-                if 'jpeg' in content_type or 'jpg' in content_type:
-                    ext = '.jpg'
-                elif 'png' in content_type:
-                    ext = '.png'
-                elif 'webp' in content_type:
-                    ext = '.webp'
-                else:
-                    ext = '.jpg'  # Default
+                ext = image_extension(data)
 
                 # Generate filename from title or index
                 title = row.get('title', f'item_{i}')
@@ -687,7 +533,7 @@ def download_missing_images_worker(csv_data: List[Dict], download_dir: str,
 
                 # Save image
                 with open(local_path, 'wb') as f:
-                    f.write(response.content)
+                    f.write(data)
 
                 # Update row with local image path
                 row['local_image'] = str(local_path)
@@ -848,17 +694,19 @@ def run_scrapy_search_with_compare_worker(query: str, max_results: int, max_comp
 
         print(f"[SCRAPY COMPARE] Found {len(scrapy_results)} results, comparing images...")
 
-        # Create debug folder
-        debug_folder = create_debug_folder(query)
+        # Debug artifacts (folder, images and manifest, per the configured level)
+        debug_run = start_debug_run(query)
 
         # Load reference image
-        ref_image = cv2.imread(str(image_path))
+        ref_image = load_image(str(image_path))
         if ref_image is None:
             raise Exception(f"Could not load reference image: {image_path}")
 
         # Save reference image to debug folder
-        ref_debug_path = debug_folder / f"REF_selected_image.jpg"
-        cv2.imwrite(str(ref_debug_path), ref_image)
+        debug_run.save_image("REF_selected_image.jpg", ref_image, source_file=str(image_path))
+
+        # Reference features are extracted once and reused for every eBay image
+        ref_features = _compare_scorer().load_or_extract(ref_image)
 
         # Determine how many to compare
         items_to_compare = scrapy_results if max_comparisons is None else scrapy_results[:max_comparisons]
@@ -872,19 +720,16 @@ def run_scrapy_search_with_compare_worker(query: str, max_results: int, max_comp
 
             if image_url:
                 try:
-                    response = requests.get(image_url, timeout=5)
-                    if response.status_code == 200:
-                        img_array = np.frombuffer(response.content, np.uint8)
-                        ebay_img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-
-                        if ebay_img is not None:
-                            # Save eBay image to debug folder
-                            ebay_title_safe = "".join(c for c in item.get('product_title', 'unknown')[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-                            ebay_debug_path = debug_folder / f"ebay_{i+1:02d}_{ebay_title_safe}.jpg"
-                            cv2.imwrite(str(ebay_debug_path), ebay_img)
-
-                            # Use shared comparison method
-                            similarity = compare_images(ref_image, ebay_img)
+                    ebay_img = get_image(image_url, timeout=5)
+
+                    if ebay_img is not None:
+                        # Save eBay image to debug folder
+                        ebay_title_safe = safe_filename(item.get('product_title', 'unknown'))
+                        debug_run.save_image(f"ebay_{i+1:02d}_{ebay_title_safe}.jpg", ebay_img, url=image_url)
+
+                        # Use shared comparison method
+                        similarity = compare_image_features(ref_features, _compare_scorer().load_or_extract(ebay_img))
+                        debug_run.record(ebay_item=i + 1, similarity=round(similarity, 2))
                 except Exception as e:
                     print(f"[SCRAPY COMPARE] Error comparing image {i+1}: {e}")
 
@@ -901,6 +746,8 @@ def run_scrapy_search_with_compare_worker(query: str, max_results: int, max_comp
         # Sort by similarity (highest first)
         results.sort(key=lambda x: float(x['similarity'].replace('%', '')) if x['similarity'] != '-' else 0, reverse=True)
 
+        debug_run.close(query=query, reference=str(image_path), compared=len(items_to_compare))
+
         # Update UI with results
         display_callback(results)
         update_callback(f"Found {len(results)} results, compared {len(items_to_compare)} images")
@@ -931,17 +778,19 @@ def run_cached_compare_worker(query: str, max_comparisons: Optional[int], cached
         print(f"[CACHED COMPARE] Max comparisons: {max_comparisons or 'ALL'}")
         print(f"[CACHED COMPARE] Reference image: {image_path}")
 
-        # Create debug folder
-        debug_folder = create_debug_folder(query)
+        # Debug artifacts (folder, images and manifest, per the configured level)
+        debug_run = start_debug_run(query)
 
         # Load reference image
-        ref_image = cv2.imread(str(image_path))
+        ref_image = load_image(str(image_path))
         if ref_image is None:
             raise Exception(f"Could not load reference image: {image_path}")
 
         # Save reference image to debug folder
-        ref_debug_path = debug_folder / f"REF_selected_image.jpg"
-        cv2.imwrite(str(ref_debug_path), ref_image)
+        debug_run.save_image("REF_selected_image.jpg", ref_image, source_file=str(image_path))
+
+        # Reference features are extracted once and reused for every eBay image
+        ref_features = _compare_scorer().load_or_extract(ref_image)
 
         # Determine how many to compare
         items_to_compare = cached_results if max_comparisons is None else cached_results[:max_comparisons]
@@ -955,20 +804,16 @@ def run_cached_compare_worker(query: str, max_comparisons: Optional[int], cached
 
             if image_url:
                 try:
-                    response = requests.get(image_url, timeout=5)
-                    if response.status_code == 200:
-                        img_array = np.frombuffer(response.content, np.uint8)
-                        ebay_img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-
-                        if ebay_img is not None:
-                            # Save eBay image to debug folder
-                            title = item.get('title', 'unknown')
-                            ebay_title_safe = "".join(c for c in title[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-                            ebay_debug_path = debug_folder / f"ebay_{i+1:02d}_{ebay_title_safe}.jpg"
-                            cv2.imwrite(str(ebay_debug_path), ebay_img)
-
-                            # Use shared comparison method
-                            similarity = compare_images(ref_image, ebay_img)
+                    ebay_img = get_image(image_url, timeout=5)
+
+                    if ebay_img is not None:
+                        # Save eBay image to debug folder
+                        ebay_title_safe = safe_filename(item.get('title', 'unknown'))
+                        debug_run.save_image(f"ebay_{i+1:02d}_{ebay_title_safe}.jpg", ebay_img, url=image_url)
+
+                        # Use shared comparison method
+                        similarity = compare_image_features(ref_features, _compare_scorer().load_or_extract(ebay_img))
+                        debug_run.record(ebay_item=i + 1, similarity=round(similarity, 2))
                 except Exception as e:
                     print(f"[CACHED COMPARE] Error comparing image {i+1}: {e}")
 
@@ -986,6 +831,8 @@ def run_cached_compare_worker(query: str, max_comparisons: Optional[int], cached
         # Sort by similarity (highest first)
         results.sort(key=lambda x: float(x['similarity'].replace('%', '')) if x['similarity'] != '-' else 0, reverse=True)
 
+        debug_run.close(query=query, reference=str(image_path), compared=len(items_to_compare))
+
         # Update UI with results
         display_callback(results)
         update_callback(f"Compared {len(items_to_compare)} cached results")
@@ -999,7 +846,8 @@ def run_cached_compare_worker(query: str, max_comparisons: Optional[int], cached
 
 def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
                                update_image_callback, thumb_width: int = 70,
-                               csv_path=None, save_to_csv_callback=None) -> None:
+                               csv_path=None, save_to_csv_callback=None,
+                               indexes: Optional[List[int]] = None) -> None:
     """
     Background worker to load CSV thumbnails without blocking UI.
 
@@ -1010,8 +858,11 @@ def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
         thumb_width: Width of thumbnail column (default 70)
         csv_path: Optional path to CSV file (for saving downloaded images)
         save_to_csv_callback: Optional callback(local_image_path, row_index) to save image path to CSV
+        indexes: Optional indexes of the items to load, e.g. the rows on screen (default: all)
     """
-    print(f"[CSV THUMBNAILS] Loading thumbnails for {len(filtered_items)} items (size: {thumb_width}px)...")
+    if indexes is None:
+        indexes = range(len(filtered_items))
+    print(f"[CSV THUMBNAILS] Loading thumbnails for {len(indexes)} items (size: {thumb_width}px)...")
 
     # Calculate thumbnail size with padding (leave some margin)
     # Use square size to prevent horizontal images from overlapping text
@@ -1022,44 +873,23 @@ def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
     downloaded_any = False
 
     # Batch download images that need downloading
-    import requests
-    from io import BytesIO
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
     # First pass: load local images and identify URLs to download
     images_to_download = []  # (index, row, image_url)
     local_images = {}  # index -> pil_img
 
-    for i, row in enumerate(filtered_items):
+    for i in indexes:
+        row = filtered_items[i]
         local_image_path = row.get('local_image', '').strip()
         image_url = row.get('image_url', '').strip()
 
         # Try local image first (fast)
         if local_image_path and Path(local_image_path).exists():
             try:
-                # Check if this is a new item (needs border)
-                item_id = str(i)
-                is_new = item_id in csv_new_items
-                border_width = 3 if is_new else 0
-
-                # Account for border in final size
-                inner_size = thumb_size - (border_width * 2)
-
-                pil_img = Image.open(local_image_path)
-                pil_img.thumbnail((inner_size, inner_size), Image.Resampling.LANCZOS)
-
-                # Center image on square background to prevent horizontal images from overlapping
-                square_img = Image.new('RGB', (inner_size, inner_size), 'white')
-                offset_x = (inner_size - pil_img.width) // 2
-                offset_y = (inner_size - pil_img.height) // 2
-                square_img.paste(pil_img, (offset_x, offset_y))
-                pil_img = square_img
-
-                # Add light blue border if item is NEW (now fits perfectly within thumb_size)
-                if is_new:
-                    pil_img = ImageOps.expand(pil_img, border=border_width, fill='#87CEEB')
-
-                local_images[i] = pil_img
+                # Rendered once per image, size and style (light blue border if the item is NEW)
+                style = 'square_new' if str(i) in csv_new_items else 'square'
+                local_images[i] = get_thumbnail(local_image_path, thumb_size, style)
             except Exception as e:
                 print(f"[CSV THUMBNAILS] Failed to load local thumbnail {i+1}: {e}")
                 # Add to download queue if local load failed
@@ -1080,52 +910,22 @@ def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
         downloaded_images = {}  # index -> pil_img
         csv_updates = []  # List of (img_path, index) to update CSV once at the end
 
-        # Create a shared Session with connection pooling (like browsers)
-        session = requests.Session()
-        # Configure connection pool size to match our thread count
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=20,
-            pool_maxsize=20,
-            max_retries=2
-        )
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-
         def download_image(args):
             i, row, image_url = args
             try:
-                # Use session for connection pooling and keep-alive
-                response = session.get(image_url, timeout=10)
-                if response.status_code == 200:
+                # Shared image cache (pooled connections, stored across runs)
+                data = get_image_bytes(image_url, timeout=10)
+                if data is not None:
                     # Save image to disk
                     img_filename = f"thumb_product_{i:04d}.jpg"
                     img_path = images_dir / img_filename
 
                     with open(img_path, 'wb') as img_file:
-                        img_file.write(response.content)
-
-                    # Check if this is a new item (needs border)
-                    item_id = str(i)
-                    is_new = item_id in csv_new_items
-                    border_width = 3 if is_new else 0
-
-                    # Account for border in final size
-                    inner_size = thumb_size - (border_width * 2)
-
-                    # Load image for display
-                    pil_img = Image.open(BytesIO(response.content))
-                    pil_img.thumbnail((inner_size, inner_size), Image.Resampling.LANCZOS)
-
-                    # Center image on square background to prevent horizontal images from overlapping
-                    square_img = Image.new('RGB', (inner_size, inner_size), 'white')
-                    offset_x = (inner_size - pil_img.width) // 2
-                    offset_y = (inner_size - pil_img.height) // 2
-                    square_img.paste(pil_img, (offset_x, offset_y))
-                    pil_img = square_img
+                        img_file.write(data)
 
-                    # Add light blue border if item is NEW (now fits perfectly within thumb_size)
-                    if is_new:
-                        pil_img = ImageOps.expand(pil_img, border=border_width, fill='#87CEEB')
+                    # Load image for display (light blue border if the item is NEW)
+                    style = 'square_new' if str(i) in csv_new_items else 'square'
+                    pil_img = get_thumbnail(img_path, thumb_size, style)
 
                     # Update the row data
                     row['local_image'] = str(img_path)
@@ -1152,9 +952,6 @@ def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
                 if completed % 20 == 0 or completed == len(images_to_download):
                     print(f"[CSV THUMBNAILS] Downloaded {completed}/{len(images_to_download)} thumbnails")
 
-        # Close the session
-        session.close()
-
         # Update CSV once with all changes
         if csv_updates and save_to_csv_callback:
             print(f"[CSV THUMBNAILS] Updating CSV with {len(csv_updates)} downloaded images...")
@@ -1171,9 +968,88 @@ def load_csv_thumbnails_worker(filtered_items: List[Dict], csv_new_items: set,
     print(f"[CSV THUMBNAILS] Finished loading thumbnails (downloaded: {downloaded_any})")
 
 
+# Seconds between partial result updates while a CSV batch is being scored
+PARTIAL_RESULTS_INTERVAL = 1.0
+
+
+def _matches_per_item() -> int:
+    """eBay matches kept per CSV item (0 = all, the default), from user settings."""
+    try:
+        from settings_manager import get_setting
+        return int(get_setting('image_comparison.matches_per_item', 0))
+    except Exception:
+        return 0
+
+
+def _compare_scoring_config(method: str) -> Dict:
+    """Settings the similarities and kept matches of a CSV compare depend on (part of its compare cache version)."""
+    top_k, guard_radius = get_prefilter_settings()
+    config = {'method': method, 'feature_version': FEATURE_VERSION, 'matches_per_item': _matches_per_item(),
+              'prefilter_top_k': top_k, 'prefilter_guard_radius': guard_radius}
+    try:
+        from settings_manager import get_setting
+        config['orb_matcher'] = str(get_setting('image_comparison.orb_matcher', 'bf')).lower()
+    except Exception:
+        pass
+    return config
+
+
+def _cached_comparison_results(item: Dict, cached: List[Dict], usd_jpy_rate: float) -> List[Dict]:
+    """Result rows of a CSV item's cached matches, with profit at the current exchange rate."""
+    return [_csv_comparison_result(item, match['ebay_item'], match['similarity'], usd_jpy_rate)
+            for match in cached]
+
+
+def _csv_comparison_result(item: Dict, ebay_item: Dict, similarity: float, usd_jpy_rate: float,
+                           log_missing_prices: bool = False) -> Dict:
+    """Result row for one CSV item / eBay listing match, with profit margin."""
+    # Calculate profit margin
+    mandarake_price_text = item.get('price_text', item.get('price', '0'))
+    mandarake_price = extract_price(mandarake_price_text)
+
+    # Try both key formats (current_price/price, shipping_cost/shipping)
+    ebay_price_text = ebay_item.get('current_price') or ebay_item.get('price', '0')
+    if log_missing_prices and (not ebay_price_text or ebay_price_text == '0'):
+        print(f"[CSV BATCH DEBUG] Missing or zero eBay price for item: {ebay_item.get('product_title') or ebay_item.get('title', 'N/A')[:50]}")
+        print(f"[CSV BATCH DEBUG] eBay item keys: {list(ebay_item.keys())}")
+    ebay_price = extract_price(ebay_price_text)
+
+    shipping_text = ebay_item.get('shipping_cost') or ebay_item.get('shipping', '0')
+    if log_missing_prices and (not shipping_text or shipping_text == '0'):
+        print(f"[CSV BATCH DEBUG] Missing or zero shipping for item: {ebay_item.get('product_title') or ebay_item.get('title', 'N/A')[:50]}")
+    shipping_cost = extract_price(shipping_text)
+
+    # Profit % = ((eBay Price + Shipping) / (Mandarake Price * Exchange Rate) - 1) * 100
+    mandarake_price_usd = mandarake_price / usd_jpy_rate if usd_jpy_rate > 0 else 0
+    total_cost_usd = ebay_price + shipping_cost
+    profit_margin = ((total_cost_usd / mandarake_price_usd - 1) * 100) if mandarake_price_usd > 0 else 0
+
+    return {
+        'thumbnail': ebay_item.get('main_image') or ebay_item.get('image_url', ''),
+        'store_thumbnail': item.get('image_url', ''),
+        'ebay_title': ebay_item.get('product_title') or ebay_item.get('title', 'N/A'),
+        'store_title': item.get('title', 'N/A'),
+        'store_title_en': item.get('title_en', item.get('title', 'N/A')),
+        'store_images': item.get('images', [item.get('image_url', '')]),
+        'store_price': f"¥{mandarake_price:,.0f}",
+        'ebay_price': ebay_price_text,
+        'shipping': shipping_text,
+        'sold_date': ebay_item.get('sold_date', ''),
+        'similarity': similarity,  # Keep as number for sorting
+        'similarity_display': f"{similarity:.1f}%" if similarity > 0 else '-',
+        'profit_margin': profit_margin,  # Keep as number for sorting
+        'profit_display': f"{profit_margin:.1f}%",
+        'store_link': item.get('product_url', ''),
+        'ebay_link': ebay_item.get('product_url') or ebay_item.get('url', '')
+    }
+
+
 def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results: Optional[List[Dict]],
                              search_query: str, usd_jpy_rate: float, update_callback,
-                             display_callback, show_message_callback, ebay_display_callback=None) -> List[Dict]:
+                             display_callback, show_message_callback, ebay_display_callback=None,
+                             partial_results_callback=None,
+                             cancel_event: Optional[threading.Event] = None,
+                             result_cache: Optional[CompareResultCache] = None) -> List[Dict]:
     """
     Worker to compare CSV items with eBay - OPTIMIZED with caching.
 
@@ -1186,6 +1062,10 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
         update_callback: Callback to update status
         display_callback: Callback to display results
         show_message_callback: Callback to show message dialog
+        ebay_display_callback: Optional callback to display the eBay search results
+        partial_results_callback: Optional callback receiving the best matches so far while pairs are scored
+        cancel_event: Optional event; when set, scoring stops and the partial results are returned
+        result_cache: Optional compare cache; items unchanged since their last compare reuse its matches
 
     Returns:
         List[Dict]: Comparison results
@@ -1203,8 +1083,8 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
             print(f"[CSV BATCH] Using {len(ebay_results)} cached eBay results from treeview")
             update_callback(f"Using {len(ebay_results)} cached eBay results...")
 
-            # Create debug folder
-            debug_folder = create_debug_folder(search_query or "cached_search")
+            # Debug artifacts (folder, images and manifest, per the configured level)
+            debug_run = start_debug_run(search_query or "cached_search")
         else:
             # No cached results, need to make a new search
             if not search_query:
@@ -1225,8 +1105,8 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
             print(f"[CSV BATCH] Using search query: '{search_query}'")
             update_callback(f"Searching eBay for '{search_query}'...")
 
-            # Create debug folder
-            debug_folder = create_debug_folder(search_query)
+            # Debug artifacts (folder, images and manifest, per the configured level)
+            debug_run = start_debug_run(search_query)
 
             # **ONE eBay search for all items**
             ebay_results = run_ebay_scrapy_search(
@@ -1245,6 +1125,31 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
             if ebay_display_callback:
                 ebay_display_callback(ebay_results)
 
+        # **Incremental mode: items unchanged since their last compare reuse their cached matches**
+        cached_comparisons = []
+        item_fingerprints = {}
+        if result_cache is not None:
+            version = result_set_version(ebay_results, _compare_scoring_config('batch'))
+            changed_items = []
+            for item in items:
+                fingerprint = compare_fingerprint(item, version)
+                cached = result_cache.get(row_key(item), fingerprint)
+                if cached is None:
+                    changed_items.append(item)
+                    item_fingerprints[row_key(item)] = fingerprint
+                else:
+                    cached_comparisons.extend(_cached_comparison_results(item, cached, usd_jpy_rate))
+            print(f"[CSV BATCH] Incremental: {len(items) - len(changed_items)} items unchanged "
+                  f"({len(cached_comparisons)} cached matches), comparing {len(changed_items)}")
+            items = changed_items
+
+            if not items:
+                cached_comparisons.sort(key=lambda x: x['similarity'], reverse=True)
+                debug_run.close(query=search_query, incremental=True, cached_results=len(cached_comparisons))
+                display_callback(cached_comparisons)
+                update_callback(f"No CSV items changed since the last compare - {len(cached_comparisons)} cached matches")
+                return cached_comparisons
+
         update_callback(f"Downloading and caching {len(ebay_results)} eBay images...")
 
         # **Cache all eBay images at once AND save to debug folder**
@@ -1259,23 +1164,31 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
 
             if ebay_image_url and ebay_image_url not in ebay_image_cache:
                 try:
-                    response = requests.get(ebay_image_url, timeout=5)
-                    if response.status_code == 200:
-                        img_array = np.frombuffer(response.content, np.uint8)
-                        ebay_img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                        if ebay_img is not None:
-                            ebay_image_cache[ebay_image_url] = ebay_img
-
-                            # Save debug image
-                            ebay_title_safe = "".join(c for c in ebay_item.get('product_title', 'unknown')[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-                            debug_path = debug_folder / f"ebay_{idx+1:02d}_{ebay_title_safe}.jpg"
-                            cv2.imwrite(str(debug_path), ebay_img)
-                            print(f"[CSV BATCH] Cached & saved eBay image {idx+1}/{len(ebay_results)}: {debug_path.name}")
+                    ebay_img = get_image(ebay_image_url, timeout=5)
+                    if ebay_img is not None:
+                        ebay_image_cache[ebay_image_url] = ebay_img
+
+                        # Save debug image
+                        ebay_title_safe = safe_filename(ebay_item.get('product_title', 'unknown'))
+                        debug_name = f"ebay_{idx+1:02d}_{ebay_title_safe}.jpg"
+                        debug_run.save_image(debug_name, ebay_img, url=ebay_image_url)
+                        print(f"[CSV BATCH] Cached eBay image {idx+1}/{len(ebay_results)}: {debug_name}")
                 except Exception as e:
                     print(f"[CSV BATCH] Error downloading eBay image {idx+1}: {e}")
 
         print(f"[CSV BATCH] Cached {len(ebay_image_cache)} eBay images")
         print(f"[CSV BATCH DEBUG] Unique image URLs in cache: {len(ebay_image_cache)}")
+
+        # Remember these listings in the embedding index for lookups across queries
+        ebay_items_by_image = {(ebay_item.get('main_image') or ebay_item.get('image_url', '')): ebay_item
+                               for ebay_item in ebay_results}
+        index_listing_images((url, ebay_img, {
+            'title': ebay_items_by_image[url].get('product_title') or ebay_items_by_image[url].get('title', ''),
+            'price': ebay_items_by_image[url].get('current_price') or ebay_items_by_image[url].get('price', ''),
+            'sold_date': ebay_items_by_image[url].get('sold_date', ''),
+            'url': ebay_items_by_image[url].get('product_url') or ebay_items_by_image[url].get('url', ''),
+            'source': 'csv_compare',
+        }) for url, ebay_img in ebay_image_cache.items() if url in ebay_items_by_image)
         if len(ebay_image_cache) != len(ebay_results):
             print(f"[CSV BATCH DEBUG] WARNING: Cache has {len(ebay_image_cache)} unique images but {len(ebay_results)} eBay results!")
 
@@ -1293,7 +1206,7 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
             # Try loading from local disk first (much faster)
             if local_image_path and Path(local_image_path).exists():
                 try:
-                    ref_image = cv2.imread(local_image_path)
+                    ref_image = load_image(local_image_path)
                     if ref_image is not None:
                         csv_image_cache[item_idx] = ref_image
                         print(f"[CSV BATCH] Loaded CSV image {item_idx}/{len(items)} from disk: {Path(local_image_path).name}")
@@ -1312,12 +1225,9 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
             def download_csv_image(args):
                 item_idx, item, image_url = args
                 try:
-                    response = requests.get(image_url, timeout=10)
-                    if response.status_code == 200:
-                        img_array = np.frombuffer(response.content, np.uint8)
-                        ref_image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                        if ref_image is not None:
-                            return (item_idx, ref_image, item)
+                    ref_image = get_image(image_url, timeout=10)
+                    if ref_image is not None:
+                        return (item_idx, ref_image, item)
                 except Exception as e:
                     print(f"[CSV BATCH] Error downloading CSV image {item_idx}: {e}")
                 return (item_idx, None, item)
@@ -1333,155 +1243,176 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
         # Save all CSV debug images
         for item_idx, ref_image in csv_image_cache.items():
             item = items[item_idx - 1]
-            csv_title = item.get('title', 'unknown')
-            csv_title_safe = "".join(c for c in csv_title[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-            csv_debug_path = debug_folder / f"CSV_{item_idx:02d}_REF_{csv_title_safe}.jpg"
-            cv2.imwrite(str(csv_debug_path), ref_image)
+            csv_title_safe = safe_filename(item.get('title', 'unknown'))
+            local_image_path = item.get('local_image', '').strip()
+            debug_run.save_image(f"CSV_{item_idx:02d}_REF_{csv_title_safe}.jpg", ref_image,
+                                 url=item.get('image_url', '') or None,
+                                 source_file=local_image_path or None)
 
         print(f"[CSV BATCH] Cached {len(csv_image_cache)}/{len(items)} CSV images")
 
-        # **Now compare each CSV item with cached eBay images**
-        comparison_results = []
-
-        for item_idx, item in enumerate(items, 1):
+        # **Prefilter: cheap perceptual signatures pick the eBay candidates per CSV item**
+        top_k, guard_radius = get_prefilter_settings()
+        if top_k > 0:
+            prefilter = CandidatePrefilter(top_k=top_k, guard_radius=guard_radius)
+            for ebay_image_url, ebay_img in ebay_image_cache.items():
+                prefilter.add(ebay_image_url, compute_signature(ebay_img))
+            csv_candidates = {item_idx: set(prefilter.select(compute_signature(ref_image)))
+                              for item_idx, ref_image in csv_image_cache.items()}
+        else:
+            # Prefilter off (default): every pair goes to the full comparison
+            csv_candidates = {item_idx: set(ebay_image_cache) for item_idx in csv_image_cache}
+        candidate_urls = set().union(*csv_candidates.values()) if csv_candidates else set()
+        total_pairs = len(csv_image_cache) * len(ebay_image_cache)
+        kept_pairs = sum(len(candidates) for candidates in csv_candidates.values())
+        print(f"[CSV BATCH] Prefilter (top {top_k or 'all'}): {kept_pairs}/{total_pairs} pairs go to full comparison")
+
+        if cancel_event is not None and cancel_event.is_set():
+            debug_run.close(query=search_query, cancelled=True)
+            update_callback("Comparison cancelled")
+            return []
+
+        # **Extract comparison features once per image (N + M extractions, not 2*N*M)**
+        ebay_images_to_extract = {url: img for url, img in ebay_image_cache.items() if url in candidate_urls}
+        update_callback(f"Extracting features from {len(csv_image_cache) + len(ebay_images_to_extract)} images...")
+        from concurrent.futures import ThreadPoolExecutor
+
+        def extract_image_features(key_image):
+            key, image = key_image
             try:
-                update_callback(f"Comparing CSV item {item_idx}/{len(items)}...")
-
-                csv_title = item.get('title', 'unknown')
-                print(f"\n[CSV BATCH] === Processing CSV item {item_idx}/{len(items)}: {csv_title[:50]} ===")
-
-                # Get cached CSV image
-                ref_image = csv_image_cache.get(item_idx)
-
-                if ref_image is None:
-                    print(f"[CSV BATCH] WARNING: No reference image for CSV item {item_idx}, skipping comparisons")
-                    continue
-
-                print(f"[CSV BATCH] CSV image shape: {ref_image.shape}")
-
-                # Compare with all cached eBay images in parallel
-                def compare_with_ebay_item(args):
-                    """Worker function to compare CSV item with one eBay item."""
-                    ebay_idx, ebay_item = args
-                    similarity = 0.0
-
-                    # Support both 'main_image' (from search) and 'image_url' (from cached browserless_results_data)
-                    ebay_image_url = ebay_item.get('main_image') or ebay_item.get('image_url', '')
-                    ebay_img = ebay_image_cache.get(ebay_image_url)
-
-                    if ebay_img is not None:
-                        try:
-                            # Use shared comparison method
-                            similarity = compare_images(ref_image, ebay_img)
-
-                            # === SECONDARY KEYWORD BONUS ===
-                            # If secondary keyword from Mandarake title appears in eBay title, add +25% similarity
-                            mandarake_title = item.get('title_en', item.get('title', ''))
-                            primary_keyword = item.get('keyword', '')
-                            publisher_list = set()  # Will be loaded from settings if available
-
-                            if mandarake_title and primary_keyword:
-                                # Extract secondary keyword from Mandarake title
-                                secondary_keyword = extract_secondary_keyword(mandarake_title, primary_keyword, publisher_list)
-
-                                if secondary_keyword:
-                                    ebay_title = ebay_item.get('product_title', '') or ebay_item.get('title', '')
-
-                                    # Check if secondary keyword appears in eBay title (case-insensitive)
-                                    if secondary_keyword.lower() in ebay_title.lower():
-                                        original_similarity = similarity
-                                        similarity = min(100.0, similarity + 25.0)  # Add +25%, cap at 100%
-                                        print(f"[CSV BATCH] Secondary keyword match! '{secondary_keyword}' found in eBay title")
-                                        print(f"[CSV BATCH]   Similarity boosted: {original_similarity:.1f}% → {similarity:.1f}%")
-
-                            # Debug: Log suspicious perfect matches
-                            if similarity >= 99.9:
-                                print(f"[CSV BATCH DEBUG] Perfect match (100%) at eBay item {ebay_idx+1}")
-                                print(f"[CSV BATCH DEBUG]   CSV image shape: {ref_image.shape}, eBay image shape: {ebay_img.shape}")
-                                print(f"[CSV BATCH DEBUG]   eBay URL: {ebay_image_url[:100]}")
-
-                            return (similarity, ebay_idx, ebay_item.get('product_title', 'unknown')[:50])
-                        except Exception as e:
-                            print(f"[CSV BATCH] Error comparing with eBay item {ebay_idx+1}: {e}")
-                    return (0.0, ebay_idx, '')
-
-                # Parallelize comparisons for this CSV item against all eBay items
-                from concurrent.futures import ThreadPoolExecutor, as_completed
-                item_comparisons = []
-
-                with ThreadPoolExecutor(max_workers=8) as executor:
-                    comparison_tasks = [(ebay_idx, ebay_item) for ebay_idx, ebay_item in enumerate(ebay_results)]
-                    futures = {executor.submit(compare_with_ebay_item, task): task for task in comparison_tasks}
-
-                    for future in as_completed(futures):
-                        result = future.result()
-                        if result[0] > 0:  # Only add non-zero similarities
-                            item_comparisons.append(result)
-
-                # Sort by similarity and show top 5
-                item_comparisons.sort(reverse=True)
-                print(f"[CSV BATCH] Top 5 matches for '{csv_title[:40]}':")
-                for rank, (sim, idx, title) in enumerate(item_comparisons[:5], 1):
-                    print(f"  {rank}. {sim:.1f}% - {title}")
-
-                # Add all comparisons to results
-                for similarity, ebay_idx, _ in item_comparisons:
-                    ebay_item = ebay_results[ebay_idx]
-
-                    # Calculate profit margin
-                    mandarake_price_text = item.get('price_text', item.get('price', '0'))
-                    mandarake_price = extract_price(mandarake_price_text)
-
-                    # Try both key formats (current_price/price, shipping_cost/shipping)
-                    ebay_price_text = ebay_item.get('current_price') or ebay_item.get('price', '0')
-                    if not ebay_price_text or ebay_price_text == '0':
-                        print(f"[CSV BATCH DEBUG] Missing or zero eBay price for item: {ebay_item.get('product_title') or ebay_item.get('title', 'N/A')[:50]}")
-                        print(f"[CSV BATCH DEBUG] eBay item keys: {list(ebay_item.keys())}")
-                    ebay_price = extract_price(ebay_price_text)
-
-                    shipping_text = ebay_item.get('shipping_cost') or ebay_item.get('shipping', '0')
-                    if not shipping_text or shipping_text == '0':
-                        print(f"[CSV BATCH DEBUG] Missing or zero shipping for item: {ebay_item.get('product_title') or ebay_item.get('title', 'N/A')[:50]}")
-                    shipping_cost = extract_price(shipping_text)
-
-                    # Profit % = ((eBay Price + Shipping) / (Mandarake Price * Exchange Rate) - 1) * 100
-                    mandarake_price_usd = mandarake_price / usd_jpy_rate if usd_jpy_rate > 0 else 0
-                    total_cost_usd = ebay_price + shipping_cost
-                    profit_margin = ((total_cost_usd / mandarake_price_usd - 1) * 100) if mandarake_price_usd > 0 else 0
-
-                    comparison_results.append({
-                        'thumbnail': ebay_item.get('main_image') or ebay_item.get('image_url', ''),
-                        'store_thumbnail': item.get('image_url', ''),
-                        'ebay_title': ebay_item.get('product_title') or ebay_item.get('title', 'N/A'),
-                        'store_title': item.get('title', 'N/A'),
-                        'store_title_en': item.get('title_en', item.get('title', 'N/A')),
-                        'store_images': item.get('images', [item.get('image_url', '')]),
-                        'store_price': f"¥{mandarake_price:,.0f}",
-                        'ebay_price': ebay_price_text,
-                        'shipping': shipping_text,
-                        'sold_date': ebay_item.get('sold_date', ''),
-                        'similarity': similarity,  # Keep as number for sorting
-                        'similarity_display': f"{similarity:.1f}%" if similarity > 0 else '-',
-                        'profit_margin': profit_margin,  # Keep as number for sorting
-                        'profit_display': f"{profit_margin:.1f}%",
-                        'store_link': item.get('product_url', ''),
-                        'ebay_link': ebay_item.get('product_url') or ebay_item.get('url', '')
-                    })
-
+                return key, _compare_scorer().load_or_extract(image)
             except Exception as e:
-                print(f"[CSV BATCH] Error processing CSV item {item_idx}: {e}")
-                import traceback
-                traceback.print_exc()
+                print(f"[CSV BATCH] Error extracting features for {str(key)[:80]}: {e}")
+                return key, None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ebay_feature_cache = {url: features for url, features in
+                                  executor.map(extract_image_features, ebay_images_to_extract.items())
+                                  if features is not None}
+            csv_feature_cache = {item_idx: features for item_idx, features in
+                                 executor.map(extract_image_features, csv_image_cache.items())
+                                 if features is not None}
+
+        # **Stream every prefiltered CSV x eBay pair through the comparison engine's process pool,
+        # keeping a running top-K of eBay matches per CSV item**
+        update_callback(f"Comparing {kept_pairs} image pairs...")
+        csv_keys = list(csv_feature_cache)
+        ebay_keys = list(ebay_feature_cache)
+        ebay_positions = {url: position for position, url in enumerate(ebay_keys)}
+        pairs = [(ref_position, ebay_positions[url])
+                 for ref_position, item_idx in enumerate(csv_keys)
+                 for url in csv_candidates.get(item_idx, ()) if url in ebay_positions]
+
+        # Listings sharing an image URL are all ranked with that image's score
+        ebay_indexes_by_url = {}
+        for ebay_idx, ebay_item in enumerate(ebay_results):
+            ebay_indexes_by_url.setdefault(ebay_item.get('main_image') or ebay_item.get('image_url', ''), []).append(ebay_idx)
+
+        # === SECONDARY KEYWORD BONUS ===
+        # If secondary keyword from Mandarake title appears in eBay title, add +25% similarity
+        publisher_list = set()  # Will be loaded from settings if available
+        secondary_keywords = {}
+        for item_idx in csv_keys:
+            item = items[item_idx - 1]
+            mandarake_title = item.get('title_en', item.get('title', ''))
+            primary_keyword = item.get('keyword', '')
+            if mandarake_title and primary_keyword:
+                secondary_keyword = extract_secondary_keyword(mandarake_title, primary_keyword, publisher_list)
+                if secondary_keyword:
+                    secondary_keywords[item_idx] = secondary_keyword
+
+        ranking = TopKTracker(_matches_per_item())
+
+        def ranked_results(log_missing_prices: bool = False) -> List[Dict]:
+            results = [_csv_comparison_result(items[item_idx - 1], ebay_results[ebay_idx], similarity,
+                                              usd_jpy_rate, log_missing_prices)
+                       for item_idx in ranking for similarity, ebay_idx in ranking.ranking(item_idx)]
+            results.extend(cached_comparisons)
+            results.sort(key=lambda x: x['similarity'], reverse=True)
+            return results
+
+        scored_pairs = 0
+        last_partial = time.monotonic()
+        for ref_position, ebay_position, score in get_comparison_engine().compare_matrix(
+                [csv_feature_cache[key] for key in csv_keys],
+                [ebay_feature_cache[key] for key in ebay_keys], pairs, cancel=cancel_event):
+            item_idx, ebay_image_url = csv_keys[ref_position], ebay_keys[ebay_position]
+            scored_pairs += 1
+
+            for ebay_idx in ebay_indexes_by_url.get(ebay_image_url, ()):
+                ebay_item = ebay_results[ebay_idx]
+                similarity = score
+
+                secondary_keyword = secondary_keywords.get(item_idx)
+                if secondary_keyword:
+                    ebay_title = ebay_item.get('product_title', '') or ebay_item.get('title', '')
+
+                    # Check if secondary keyword appears in eBay title (case-insensitive)
+                    if secondary_keyword.lower() in ebay_title.lower():
+                        original_similarity = similarity
+                        similarity = min(100.0, similarity + 25.0)  # Add +25%, cap at 100%
+                        print(f"[CSV BATCH] Secondary keyword match! '{secondary_keyword}' found in eBay title")
+                        print(f"[CSV BATCH]   Similarity boosted: {original_similarity:.1f}% → {similarity:.1f}%")
+
+                # Debug: Log suspicious perfect matches
+                if similarity >= 99.9:
+                    print(f"[CSV BATCH DEBUG] Perfect match (100%) of CSV item {item_idx} at eBay item {ebay_idx+1}")
+                    print(f"[CSV BATCH DEBUG]   eBay URL: {ebay_image_url[:100]}")
+
+                # Only keep non-zero similarities
+                if similarity > 0:
+                    ranking.add(item_idx, ebay_idx, similarity)
+
+            # Show the best matches so far while the rest are still being scored
+            if partial_results_callback and time.monotonic() - last_partial >= PARTIAL_RESULTS_INTERVAL:
+                last_partial = time.monotonic()
+                partial_results_callback(ranked_results())
+                update_callback(f"Compared {scored_pairs}/{len(pairs)} image pairs...")
+
+        print(f"[CSV BATCH] Scored {scored_pairs}/{len(pairs)} image pairs")
+
+        if cancel_event is not None and cancel_event.is_set():
+            comparison_results = ranked_results()
+            debug_run.close(query=search_query, cancelled=True, pairs_scored=scored_pairs)
+            print(f"[CSV BATCH] Comparison cancelled after {scored_pairs}/{len(pairs)} image pairs")
+            if partial_results_callback:
+                partial_results_callback(comparison_results)
+            update_callback(f"Comparison cancelled - {len(comparison_results)} partial matches")
+            return comparison_results
+
+        # **Report the ranked eBay matches of each CSV item**
+        for item_idx, item in enumerate(items, 1):
+            csv_title = item.get('title', 'unknown')
+            if item_idx not in csv_feature_cache:
+                print(f"[CSV BATCH] WARNING: No reference image for CSV item {item_idx}, skipping comparisons")
                 continue
 
-        # Sort by similarity (highest first)
-        comparison_results.sort(key=lambda x: x['similarity'], reverse=True)
+            item_ranking = ranking.ranking(item_idx)
+            print(f"[CSV BATCH] Top 5 matches for '{csv_title[:40]}':")
+            for rank, (sim, idx) in enumerate(item_ranking[:5], 1):
+                ebay_item = ebay_results[idx]
+                print(f"  {rank}. {sim:.1f}% - {ebay_item.get('product_title', 'unknown')[:50]}")
+                debug_run.record(csv_item=item_idx, ebay_item=idx + 1, similarity=round(sim, 2))
+
+        comparison_results = ranked_results(log_missing_prices=True)
+
+        if result_cache is not None:
+            # Items without an image weren't compared; they are retried next time
+            for item_idx in csv_feature_cache:
+                item = items[item_idx - 1]
+                result_cache.put(row_key(item), item_fingerprints[row_key(item)],
+                                 [cached_match(ebay_results[ebay_idx], similarity)
+                                  for similarity, ebay_idx in ranking.ranking(item_idx)])
+            result_cache.save()
 
         print(f"\n[CSV BATCH] ========================================")
         print(f"[CSV BATCH] Generated {len(comparison_results)} comparison results")
-        print(f"[CSV BATCH] Debug images saved to: {debug_folder.absolute()}")
-        print(f"[CSV BATCH] - {len(ebay_image_cache)} eBay images")
-        print(f"[CSV BATCH] - {len(items)} CSV reference images")
+        debug_manifest = debug_run.close(query=search_query, csv_items=len(items), ebay_listings=len(ebay_results),
+                                         pairs_scored=scored_pairs, results=len(comparison_results))
+        if debug_manifest:
+            print(f"[CSV BATCH] Debug artifacts ({debug_run.level}) saved to: {debug_run.folder.absolute()}")
+            print(f"[CSV BATCH] - {len(ebay_image_cache)} eBay images")
+            print(f"[CSV BATCH] - {len(items)} CSV reference images")
         print(f"[CSV BATCH] ========================================\n")
 
         # Display results
@@ -1499,7 +1430,8 @@ def compare_csv_items_worker(items: List[Dict], max_results: int, cached_results
 
 def compare_csv_items_individually_worker(items: List[Dict], max_results: int, usd_jpy_rate: float,
                                          add_secondary_keyword: bool, publisher_list: set,
-                                         update_callback, display_callback, show_message_callback) -> List[Dict]:
+                                         update_callback, display_callback, show_message_callback,
+                                         result_cache: Optional[CompareResultCache] = None) -> List[Dict]:
     """
     Worker to compare CSV items individually - each item gets its own eBay search.
 
@@ -1512,12 +1444,13 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
         update_callback: Callback to update status
         display_callback: Callback to display results
         show_message_callback: Callback to show message dialog
+        result_cache: Optional compare cache; items unchanged since their last compare reuse its matches
 
     Returns:
         List[Dict]: Comparison results
     """
     try:
-        from ebay_scrapy_search import run_ebay_scrapy_search
+        from ebay_scrapy_search import run_ebay_scrapy_batch_search
         from gui.constants import CATEGORY_KEYWORDS
 
         comparison_results = []
@@ -1525,6 +1458,8 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
         print(f"\n[CSV INDIVIDUAL] Starting individual comparisons for {len(items)} items")
         print(f"[CSV INDIVIDUAL] Each item will get its own eBay search with keyword + category")
 
+        # Build every item's search query first so all searches run in one crawl
+        item_queries = []
         for item_idx, item in enumerate(items, 1):
             csv_title = item.get('title', 'Unknown')
             keyword = item.get('keyword', '')
@@ -1551,20 +1486,26 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
                 print(f"[CSV INDIVIDUAL] Skipping item {item_idx}: no search query")
                 continue
 
+            item_queries.append((item_idx, item, search_query))
+
+        # **ONE batch crawl for all item queries** (each query keeps its own results)
+        update_callback(f"Searching eBay for {len(item_queries)} items...")
+        batch_results = run_ebay_scrapy_batch_search(
+            [search_query for _, _, search_query in item_queries],
+            max_results=max_results,
+            sold_listings=True,
+            dedupe=False
+        )
+
+        for item_idx, item, search_query in item_queries:
+            csv_title = item.get('title', 'Unknown')
+
             print(f"\n[CSV INDIVIDUAL] Item {item_idx}/{len(items)}: {csv_title[:50]}")
             print(f"[CSV INDIVIDUAL] Search query: '{search_query}'")
 
-            update_callback(f"Item {item_idx}/{len(items)}: Searching eBay for '{search_query}'...")
-
-            # Create debug folder for this item
-            debug_folder = create_debug_folder(f"{search_query}_item{item_idx}")
+            update_callback(f"Item {item_idx}/{len(items)}: Comparing eBay results for '{search_query}'...")
 
-            # Run eBay search for this specific item
-            ebay_results = run_ebay_scrapy_search(
-                query=search_query,
-                max_results=max_results,
-                sold_listings=True
-            )
+            ebay_results = batch_results.get(search_query.strip(), [])
 
             if not ebay_results:
                 print(f"[CSV INDIVIDUAL] No eBay results for item {item_idx}")
@@ -1572,21 +1513,31 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
 
             print(f"[CSV INDIVIDUAL] Found {len(ebay_results)} eBay listings")
 
+            # Incremental mode: reuse the matches of an item unchanged since its last compare
+            if result_cache is not None:
+                version = result_set_version(ebay_results, _compare_scoring_config('individual'))
+                fingerprint = compare_fingerprint(item, version)
+                cached = result_cache.get(row_key(item), fingerprint)
+                if cached is not None:
+                    print(f"[CSV INDIVIDUAL] Item {item_idx} unchanged, using {len(cached)} cached matches")
+                    comparison_results.extend(_cached_comparison_results(item, cached, usd_jpy_rate))
+                    continue
+
             # Load CSV item image
             csv_image_path = item.get('local_image', '')
             if not csv_image_path or not Path(csv_image_path).exists():
                 print(f"[CSV INDIVIDUAL] No image for item {item_idx}, skipping visual comparison")
                 continue
 
-            ref_image = cv2.imread(str(csv_image_path))
+            ref_image = load_image(str(csv_image_path))
             if ref_image is None:
                 print(f"[CSV INDIVIDUAL] Failed to load image for item {item_idx}")
                 continue
 
-            # Save reference image to debug folder
-            csv_title_safe = "".join(c for c in csv_title[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-            csv_debug_path = debug_folder / f"CSV_REF_{csv_title_safe}.jpg"
-            cv2.imwrite(str(csv_debug_path), ref_image)
+            # Debug artifacts for this item (folder, images and manifest, per the configured level)
+            debug_run = start_debug_run(f"{search_query}_item{item_idx}")
+            debug_run.save_image(f"CSV_REF_{safe_filename(csv_title)}.jpg", ref_image, source_file=str(csv_image_path))
+            ref_features = _compare_scorer().load_or_extract(ref_image)
 
             # Download and compare with each eBay result
             item_comparisons = []
@@ -1597,40 +1548,37 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
                     continue
 
                 try:
-                    response = requests.get(ebay_image_url, timeout=5)
-                    if response.status_code == 200:
-                        img_array = np.frombuffer(response.content, np.uint8)
-                        ebay_img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                    ebay_img = get_image(ebay_image_url, timeout=5)
 
-                        if ebay_img is not None:
-                            # Save eBay image to debug folder
-                            ebay_title_safe = "".join(c for c in ebay_item.get('product_title', 'unknown')[:50] if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
-                            ebay_debug_path = debug_folder / f"ebay_{ebay_idx+1:02d}_{ebay_title_safe}.jpg"
-                            cv2.imwrite(str(ebay_debug_path), ebay_img)
+                    if ebay_img is not None:
+                        # Save eBay image to debug folder
+                        ebay_title_safe = safe_filename(ebay_item.get('product_title', 'unknown'))
+                        debug_run.save_image(f"ebay_{ebay_idx+1:02d}_{ebay_title_safe}.jpg", ebay_img, url=ebay_image_url)
 
-                            # Use shared comparison method
-                            similarity = compare_images(ref_image, ebay_img)
+                        # Use shared comparison method
+                        similarity = compare_image_features(ref_features, _compare_scorer().load_or_extract(ebay_img))
 
-                            # === SECONDARY KEYWORD BONUS ===
-                            # If secondary keyword from Mandarake title appears in eBay title, add +25% similarity
-                            mandarake_title = item.get('title_en', item.get('title', ''))
-                            primary_keyword = item.get('keyword', '')
+                        # === SECONDARY KEYWORD BONUS ===
+                        # If secondary keyword from Mandarake title appears in eBay title, add +25% similarity
+                        mandarake_title = item.get('title_en', item.get('title', ''))
+                        primary_keyword = item.get('keyword', '')
 
-                            if mandarake_title and primary_keyword:
-                                # Extract secondary keyword from Mandarake title
-                                secondary_keyword = extract_secondary_keyword(mandarake_title, primary_keyword, publisher_list)
+                        if mandarake_title and primary_keyword:
+                            # Extract secondary keyword from Mandarake title
+                            secondary_keyword = extract_secondary_keyword(mandarake_title, primary_keyword, publisher_list)
 
-                                if secondary_keyword:
-                                    ebay_title = ebay_item.get('product_title', '') or ebay_item.get('title', '')
+                            if secondary_keyword:
+                                ebay_title = ebay_item.get('product_title', '') or ebay_item.get('title', '')
 
-                                    # Check if secondary keyword appears in eBay title (case-insensitive)
-                                    if secondary_keyword.lower() in ebay_title.lower():
-                                        original_similarity = similarity
-                                        similarity = min(100.0, similarity + 25.0)  # Add +25%, cap at 100%
-                                        print(f"[CSV INDIVIDUAL] Secondary keyword match! '{secondary_keyword}' found in eBay title")
-                                        print(f"[CSV INDIVIDUAL]   Similarity boosted: {original_similarity:.1f}% → {similarity:.1f}%")
+                                # Check if secondary keyword appears in eBay title (case-insensitive)
+                                if secondary_keyword.lower() in ebay_title.lower():
+                                    original_similarity = similarity
+                                    similarity = min(100.0, similarity + 25.0)  # Add +25%, cap at 100%
+                                    print(f"[CSV INDIVIDUAL] Secondary keyword match! '{secondary_keyword}' found in eBay title")
+                                    print(f"[CSV INDIVIDUAL]   Similarity boosted: {original_similarity:.1f}% → {similarity:.1f}%")
 
-                            item_comparisons.append((similarity, ebay_idx, ebay_item.get('product_title', 'unknown')[:50]))
+                        item_comparisons.append((similarity, ebay_idx, ebay_item.get('product_title', 'unknown')[:50]))
+                        debug_run.record(ebay_item=ebay_idx + 1, similarity=round(similarity, 2))
 
                 except Exception as e:
                     print(f"[CSV INDIVIDUAL] Error comparing with eBay item {ebay_idx+1}: {e}")
@@ -1640,41 +1588,20 @@ def compare_csv_items_individually_worker(items: List[Dict], max_results: int, u
             print(f"[CSV INDIVIDUAL] Top 5 matches for '{csv_title[:40]}':")
             for rank, (sim, idx, title) in enumerate(item_comparisons[:5], 1):
                 print(f"  {rank}. {sim:.1f}% - {title}")
+            debug_run.close(query=search_query, csv_item=item_idx, ebay_listings=len(ebay_results),
+                            compared=len(item_comparisons))
 
             # Add all comparisons to results
             for similarity, ebay_idx, _ in item_comparisons:
-                ebay_item = ebay_results[ebay_idx]
+                comparison_results.append(_csv_comparison_result(item, ebay_results[ebay_idx], similarity, usd_jpy_rate))
 
-                # Calculate profit margin
-                mandarake_price_text = item.get('price_text', item.get('price', '0'))
-                mandarake_price = extract_price(mandarake_price_text)
-
-                ebay_price_text = ebay_item.get('current_price', '0')
-                ebay_price = extract_price(ebay_price_text)
-
-                shipping_text = ebay_item.get('shipping_cost', '0')
-                shipping_cost = extract_price(shipping_text)
-
-                # Profit % = ((eBay Price + Shipping) / (Mandarake Price * Exchange Rate) - 1) * 100
-                mandarake_price_usd = mandarake_price / usd_jpy_rate if usd_jpy_rate > 0 else 0
-                total_cost_usd = ebay_price + shipping_cost
-                profit_margin = ((total_cost_usd / mandarake_price_usd - 1) * 100) if mandarake_price_usd > 0 else 0
-
-                comparison_results.append({
-                    'thumbnail': ebay_item.get('main_image') or ebay_item.get('image_url', ''),
-                    'store_title': csv_title,
-                    'ebay_title': ebay_item.get('product_title') or ebay_item.get('title', 'N/A'),
-                    'store_price': f"¥{mandarake_price:,.0f}",
-                    'ebay_price': ebay_price_text,
-                    'shipping': shipping_text,
-                    'sold_date': ebay_item.get('sold_date', ''),
-                    'similarity': similarity,
-                    'similarity_display': f"{similarity:.1f}%" if similarity > 0 else '-',
-                    'profit_margin': profit_margin,
-                    'profit_display': f"{profit_margin:.1f}%",
-                    'store_link': item.get('product_url', ''),
-                    'ebay_link': ebay_item.get('product_url') or ebay_item.get('url', '')
-                })
+            if result_cache is not None:
+                result_cache.put(row_key(item), fingerprint,
+                                 [cached_match(ebay_results[ebay_idx], similarity)
+                                  for similarity, ebay_idx, _ in item_comparisons])
+
+        if result_cache is not None:
+            result_cache.save()
 
         # Sort by similarity (highest first)
         comparison_results.sort(key=lambda x: x['similarity'], reverse=True)
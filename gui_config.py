@@ -293,6 +293,14 @@ class ScraperGUI(tk.Tk):
             # Force cleanup of any remaining Playwright processes
             self._cleanup_playwright_processes()
 
+            # Stop persistent Scrapy crawler services
+            from ebay_search_service import shutdown_search_services
+            shutdown_search_services()
+
+            # Stop the image comparison worker processes
+            from image_compare_engine import shutdown_comparison_engine
+            shutdown_comparison_engine()
+
         except Exception as e:
             logging.error(f"Error during resource cleanup: {e}")
 
@@ -1375,7 +1383,7 @@ class ScraperGUI(tk.Tk):
             ) and self.ebay_tab.csv_comparison_manager.csv_filtered_items else self.ebay_tab.csv_comparison_manager.csv_compare_data
 
             # Get items without ebay_compared (new items)
-            new_items = [item for item in all_items if not item.get('ebay_compared', '')]
+            new_items = self.ebay_tab.csv_comparison_manager.get_uncompared_filtered_items()
 
             if not new_items:
                 messagebox.showinfo("No New Items", "All filtered CSV items have already been compared.")
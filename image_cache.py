@@ -0,0 +1,373 @@
+"""
+Shared on-disk cache of downloaded image bytes.
+
+Reference images (Mandarake, Suruga-ya, CSV rows) and eBay listing images are
+fetched by many code paths - CSV compare, thumbnails, sold listing
+matchers, the scraper, the listing creator - and mostly the same URLs over
+and over. Every image download goes through this cache instead:
+
+    image = get_image(url)                  # decoded BGR, reduced to the comparison size
+    image = get_image(url, max_side=None)   # full resolution
+    data = get_image_bytes(url)             # raw encoded bytes
+
+- Storage: content addressed. Each distinct image is stored once as
+  <hash>.img (the same picture behind several URLs shares one file), and an
+  append-only log maps each URL to the hash of the bytes it returned.
+- Downloads: one pooled requests session for all threads; concurrent
+  requests for the same URL are deduplicated (one download, the other
+  callers wait for it). Callers that must fetch with their own session
+  (e.g. the BrowserMimic of the sold listing matcher) pass it per call.
+- Eviction: least recently used images are deleted once the cache grows past
+  its size limit, images unused for max_age_days are deleted, and URLs
+  fetched more than max_age_days ago are downloaded again.
+
+Sized by the 'image_comparison.image_cache_max_mb' and
+'image_comparison.image_cache_max_age_days' settings.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import requests
+
+from image_decode import DEFAULT_TARGET_SIZE, decode_image
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Longest side callers need by default: the comparison size
+DEFAULT_MAX_SIDE = max(DEFAULT_TARGET_SIZE)
+
+# Extension by leading magic bytes
+_MAGIC_EXTENSIONS = [
+    (b'\xff\xd8', '.jpg'),
+    (b'\x89PNG', '.png'),
+    (b'GIF8', '.gif'),
+    (b'BM', '.bmp'),
+]
+
+
+def image_extension(data: bytes, default: str = '.jpg') -> str:
+    """File extension matching encoded image bytes (by magic number)."""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    for magic, extension in _MAGIC_EXTENSIONS:
+        if data.startswith(magic):
+            return extension
+    return default
+
+
+def content_hash(data: bytes) -> str:
+    """Hash of encoded image bytes (the cache key of the blob)."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class ImageCache:
+    """Content-addressed, size- and age-bounded on-disk cache of image downloads."""
+
+    def __init__(self, cache_dir: str = "image_cache", max_size_mb: float = 1024,
+                 max_age_days: float = 30, timeout: float = 15):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the image files and URL log
+            max_size_mb: Least recently used images are evicted above this size
+            max_age_days: Images unused (and URLs not re-fetched) for this long expire
+            timeout: Default download timeout in seconds
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_days * 24 * 3600
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._urls_path = self.cache_dir / 'urls.jsonl'
+        self._lock = threading.RLock()
+        # hash -> [size, last_used]
+        self._index: Dict[str, list] = {}
+        # url -> (hash, fetched_at)
+        self._urls: Dict[str, Tuple[str, float]] = {}
+        self._url_log_lines = 0
+        self._total_bytes = 0
+        self._last_stamp = 0.0
+        # url -> event set when its download finishes
+        self._inflight: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        self._scan()
+
+    def _scan(self):
+        """Build the LRU index and URL map from the files already on disk, dropping expired images."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        for path in self.cache_dir.glob('*.img'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                continue
+            self._index[path.stem] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+        try:
+            with open(self._urls_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._url_log_lines += 1
+                    try:
+                        record = json.loads(line)
+                        self._urls[record['url']] = (record['hash'], float(record['time']))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+        # Later lines supersede earlier ones; rewrite the log once it is mostly stale
+        if self._url_log_lines > 2 * len(self._urls) + 1000:
+            self._compact_url_log()
+
+    def _compact_url_log(self):
+        live = {url: entry for url, entry in self._urls.items() if entry[0] in self._index}
+        tmp_path = self._urls_path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for url, (blob, fetched) in live.items():
+                    f.write(json.dumps({'url': url, 'hash': blob, 'time': fetched}) + '\n')
+            os.replace(tmp_path, self._urls_path)
+            self._urls = live
+            self._url_log_lines = len(live)
+        except OSError as e:
+            self.logger.warning(f"Could not compact image cache URL log: {e}")
+
+    def _stamp(self) -> float:
+        """Strictly increasing use time, so LRU order is exact even within a clock tick."""
+        self._last_stamp = max(time.time(), self._last_stamp + 1e-6)
+        return self._last_stamp
+
+    def _path(self, blob: str) -> Path:
+        return self.cache_dir / f"{blob}.img"
+
+    # ------------------------------------------------------------------
+    # Read / write
+    # ------------------------------------------------------------------
+
+    def lookup(self, url: str) -> Optional[bytes]:
+        """
+        Cached bytes of a URL, without touching the network.
+
+        Returns:
+            The bytes, or None if the URL is not cached (or has expired)
+        """
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is None or entry[0] not in self._index or time.time() - entry[1] > self.max_age:
+                return None
+            blob = entry[0]
+            self._index[blob][1] = self._stamp()
+
+        path = self._path(blob)
+        try:
+            # Keep recency across restarts (the index is rebuilt from mtimes)
+            os.utime(path)
+            return path.read_bytes()
+        except OSError as e:
+            self.logger.warning(f"Dropping unreadable cached image {path.name}: {e}")
+            self._remove(blob)
+            return None
+
+    def store(self, url: str, data: bytes) -> str:
+        """
+        Add downloaded bytes for a URL, evicting old images if over the size limit.
+
+        Returns:
+            Content hash the bytes are stored under
+        """
+        blob = content_hash(data)
+        path = self._path(blob)
+        with self._lock:
+            known = blob in self._index
+        if not known:
+            tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.warning(f"Could not write cached image {path.name}: {e}")
+                tmp_path.unlink(missing_ok=True)
+                return blob
+
+        fetched = time.time()
+        with self._lock:
+            if blob not in self._index:
+                self._index[blob] = [len(data), self._stamp()]
+                self._total_bytes += len(data)
+            else:
+                self._index[blob][1] = self._stamp()
+            self._urls[url] = (blob, fetched)
+            try:
+                with open(self._urls_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'url': url, 'hash': blob, 'time': fetched}) + '\n')
+                self._url_log_lines += 1
+            except OSError as e:
+                self.logger.warning(f"Could not record image cache URL: {e}")
+            self._evict()
+        return blob
+
+    def get_bytes(self, url: str, timeout: Optional[float] = None,
+                  session: Optional[Any] = None) -> Optional[bytes]:
+        """
+        Encoded bytes of an image URL, downloading them on a cache miss.
+
+        Concurrent calls for the same URL share one download.
+
+        Args:
+            url: Image URL
+            timeout: Download timeout in seconds (default: the cache's)
+            session: Downloads with this object's get(url, timeout=...) instead of
+                the cache's session (a requests.Session or BrowserMimic, to keep
+                its cookies and headers)
+
+        Returns:
+            The bytes, or None if the download failed
+        """
+        if not url:
+            return None
+        data = self.lookup(url)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            event = self._inflight.get(url)
+            owner = event is None
+            if owner:
+                event = self._inflight[url] = threading.Event()
+
+        if not owner:
+            # Another thread is downloading this URL; use its result
+            event.wait((timeout or self.timeout) * 3)
+            return self.lookup(url)
+
+        try:
+            with self._lock:
+                self.misses += 1
+            response = (session or self.session).get(url, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            data = response.content
+            self.store(url, data)
+            return data
+        except Exception as e:
+            self.logger.debug(f"Error downloading {url}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+            event.set()
+
+    def get_image(self, url: str, max_side: Optional[int] = DEFAULT_MAX_SIDE,
+                  timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Decoded BGR image of a URL (see get_bytes).
+
+        Args:
+            url: Image URL
+            max_side: The caller needs no more than this many pixels per side;
+                JPEGs are decoded at the smallest scale still covering
+                max_side x max_side (None decodes at full size)
+            timeout: Download timeout in seconds
+
+        Returns:
+            BGR image, or None if the download or decode failed
+        """
+        data = self.get_bytes(url, timeout)
+        if data is None:
+            return None
+        return decode_image(data, (max_side, max_side) if max_side else None)
+
+    def _remove(self, blob: str):
+        with self._lock:
+            entry = self._index.pop(blob, None)
+            if entry:
+                self._total_bytes -= entry[0]
+        try:
+            self._path(blob).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for blob in sorted(self._index, key=lambda name: self._index[name][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(blob)
+
+    def clear(self):
+        """Delete every cached image and the URL log."""
+        with self._lock:
+            for blob in list(self._index):
+                self._remove(blob)
+            self._urls.clear()
+            self._url_log_lines = 0
+            self._urls_path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'images': len(self._index),
+                'urls': len(self._urls),
+                'size_mb': self._total_bytes / (1024 * 1024),
+                'max_size_mb': self.max_bytes / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global cache instance
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """Get the global image cache, configured from user settings."""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            try:
+                from settings_manager import get_setting
+                _image_cache = ImageCache(
+                    max_size_mb=float(get_setting('image_comparison.image_cache_max_mb', 1024)),
+                    max_age_days=float(get_setting('image_comparison.image_cache_max_age_days', 30)))
+            except Exception:
+                _image_cache = ImageCache()
+        return _image_cache
+
+
+def get_image_bytes(url: str, timeout: Optional[float] = None,
+                    session: Optional[Any] = None) -> Optional[bytes]:
+    """Encoded bytes of an image URL through the global cache (None on failure)."""
+    return get_image_cache().get_bytes(url, timeout, session)
+
+
+def get_image(url: str, max_side: Optional[int] = DEFAULT_MAX_SIDE,
+              timeout: Optional[float] = None) -> Optional[np.ndarray]:
+    """Decoded BGR image of a URL through the global cache (None on failure)."""
+    return get_image_cache().get_image(url, max_side, timeout)
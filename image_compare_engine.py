@@ -0,0 +1,338 @@
+"""
+Process-pool image comparison engine.
+
+Scoring a pair of feature bundles (image_features.compare_features) is
+mostly Python glue around OpenCV calls - knnMatch result loops, the ratio
+test, RANSAC bookkeeping, score blending - so running it on a thread pool
+serializes on the GIL. This engine scores on a persistent pool of worker
+processes instead:
+
+- Feature bundles are packed into a multiprocessing.shared_memory block
+  once per batch; workers attach to the block and build zero-copy NumPy
+  views, so no image or descriptor arrays are pickled.
+- The reference x candidate matrix (or an explicit list of pairs, e.g. the
+  prefilter's picks) is split into chunks that are scheduled on the pool a
+  few at a time; results are streamed back as chunks finish, and a run can
+  be cancelled between chunks. TopKTracker keeps the best candidates of
+  each reference while results arrive.
+- Within a chunk, the cheap metrics of all pairs sharing a reference are
+  scored together (image_features.compare_features_batch).
+- The pool is started on first use and kept until shutdown, so worker
+  start-up (importing OpenCV, scikit-image) is paid once per session.
+
+If the pool can't be used (single core, worker crash), pairs are scored in
+the calling thread instead.
+"""
+
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from image_features import (ImageFeatures, compare_features, compare_features_batch, features_from_arrays,
+                            features_to_arrays)
+
+ALIGNMENT = 64
+
+# {bundle index: {array name: (dtype, shape, offset)}}
+Layout = Dict[int, Dict[str, Tuple[str, Tuple[int, ...], int]]]
+
+
+class SharedFeatureBlock:
+    """Feature bundles packed into one shared memory block."""
+
+    def __init__(self, bundles: Sequence[ImageFeatures]):
+        flattened = [features_to_arrays(bundle) for bundle in bundles]
+        self.layout: Layout = {}
+        offset = 0
+        for index, arrays in enumerate(flattened):
+            entry = {}
+            for name, array in arrays.items():
+                offset += (-offset) % ALIGNMENT
+                entry[name] = (array.dtype.str, tuple(array.shape), offset)
+                offset += array.nbytes
+            self.layout[index] = entry
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for index, arrays in enumerate(flattened):
+            for name, array in arrays.items():
+                dtype, shape, start = self.layout[index][name]
+                view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+                view[...] = array
+                del view
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def sublayout(self, indexes) -> Layout:
+        """Layout entries for the bundles a chunk needs."""
+        return {index: self.layout[index] for index in indexes}
+
+    def release(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logging.debug(f"Shared feature block release: {e}")
+
+
+def _view_bundles(buffer, layout: Layout) -> Dict[int, ImageFeatures]:
+    bundles = {}
+    for index, entry in layout.items():
+        arrays = {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+                  for name, (dtype, shape, offset) in entry.items()}
+        bundles[index] = features_from_arrays(arrays)
+    return bundles
+
+
+def _score_chunk(ref_block: Tuple[str, Layout], candidate_block: Tuple[str, Layout],
+                 pairs: List[Tuple[int, int]], use_ransac: bool) -> List[Tuple[int, int, float]]:
+    """Worker process entry point: score a chunk of (ref, candidate) pairs."""
+    ref_shm = shared_memory.SharedMemory(name=ref_block[0])
+    candidate_shm = ref_shm if candidate_block[0] == ref_block[0] else shared_memory.SharedMemory(name=candidate_block[0])
+    refs = candidates = None
+    try:
+        refs = _view_bundles(ref_shm.buf, ref_block[1])
+        candidates = _view_bundles(candidate_shm.buf, candidate_block[1])
+        return _score_pairs(refs, candidates, pairs, use_ransac)
+    finally:
+        # Views must be gone before the mappings can be closed
+        del refs, candidates
+        ref_shm.close()
+        if candidate_shm is not ref_shm:
+            candidate_shm.close()
+
+
+def _score_pairs(refs, candidates, pairs: List[Tuple[int, int]], use_ransac: bool) -> List[Tuple[int, int, float]]:
+    """Score pairs, batching the cheap metrics of all pairs that share a reference."""
+    by_ref: Dict[int, List[int]] = {}
+    for ref_index, candidate_index in pairs:
+        by_ref.setdefault(ref_index, []).append(candidate_index)
+
+    results = []
+    for ref_index, candidate_indexes in by_ref.items():
+        try:
+            scores = compare_features_batch(refs[ref_index], [candidates[j] for j in candidate_indexes],
+                                            use_ransac, verbose=False)
+        except Exception as e:
+            logging.debug(f"Batch comparison for reference {ref_index} failed: {e}")
+            scores = []
+            for candidate_index in candidate_indexes:
+                try:
+                    scores.append(compare_features(refs[ref_index], candidates[candidate_index], use_ransac,
+                                                   verbose=False))
+                except Exception as e:
+                    logging.debug(f"Comparison of pair ({ref_index}, {candidate_index}) failed: {e}")
+                    scores.append(0.0)
+        results.extend((ref_index, j, float(score)) for j, score in zip(candidate_indexes, scores))
+    return results
+
+
+def _score_inline(refs: Sequence[ImageFeatures], candidates: Sequence[ImageFeatures],
+                  pairs: List[Tuple[int, int]], use_ransac: bool,
+                  cancel: Optional[threading.Event] = None) -> Iterator[Tuple[int, int, float]]:
+    # One reference at a time, so results still stream
+    by_ref: Dict[int, List[Tuple[int, int]]] = {}
+    for pair in pairs:
+        by_ref.setdefault(pair[0], []).append(pair)
+    for ref_pairs in by_ref.values():
+        if cancel is not None and cancel.is_set():
+            return
+        yield from _score_pairs(refs, candidates, ref_pairs, use_ransac)
+
+
+class TopKTracker:
+    """Running top-K candidates per reference, kept in one min-heap per reference."""
+
+    def __init__(self, k: Optional[int] = 10):
+        """
+        Args:
+            k: Candidates kept per reference (None or 0 = all)
+        """
+        self.k = k or None
+        self._heaps: Dict[Hashable, List[Tuple[float, Hashable]]] = {}
+
+    def add(self, ref: Hashable, candidate: Hashable, score: float) -> bool:
+        """
+        Offer one scored pair.
+
+        Returns:
+            True if the candidate is now among the reference's top K
+        """
+        heap = self._heaps.setdefault(ref, [])
+        entry = (score, candidate)
+        if self.k is None or len(heap) < self.k:
+            heapq.heappush(heap, entry)
+            return True
+        if entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+            return True
+        return False
+
+    def ranking(self, ref: Hashable) -> List[Tuple[float, Hashable]]:
+        """(score, candidate) pairs of a reference, best first."""
+        return sorted(self._heaps.get(ref, ()), reverse=True)
+
+    def __iter__(self):
+        return iter(self._heaps)
+
+    def __len__(self) -> int:
+        return len(self._heaps)
+
+
+class ComparisonEngine:
+    """Persistent process pool that scores feature bundle pairs."""
+
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: int = 16, chunks_per_worker: int = 2):
+        """
+        Initialize the engine (the pool starts on first use).
+
+        Args:
+            max_workers: Worker processes (None = one per CPU core)
+            chunk_size: Pairs per scheduled task
+            chunks_per_worker: Tasks queued ahead per worker (bounds results in flight)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.max_in_flight = self.max_workers * max(1, chunks_per_worker)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers must not inherit the GUI's threads / Tk state
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                print(f"[COMPARE ENGINE] Started {self.max_workers} comparison worker processes")
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def compare_matrix(self, refs: Sequence[ImageFeatures], candidates: Sequence[ImageFeatures],
+                       pairs: Optional[Sequence[Tuple[int, int]]] = None,
+                       use_ransac: bool = False,
+                       cancel: Optional[threading.Event] = None) -> Iterator[Tuple[int, int, float]]:
+        """
+        Score reference x candidate pairs, yielding results as they finish.
+
+        Args:
+            refs: Reference feature bundles
+            candidates: Candidate feature bundles
+            pairs: (ref index, candidate index) pairs to score (default: all)
+            use_ransac: Enable RANSAC geometric verification
+            cancel: When set, no further chunks are scheduled and iteration stops
+
+        Yields:
+            (ref index, candidate index, similarity 0-100), in completion order
+        """
+        if pairs is None:
+            pairs = [(i, j) for i in range(len(refs)) for j in range(len(candidates))]
+        pairs = list(pairs)
+        if not pairs:
+            return
+
+        if self.max_workers <= 1 or len(pairs) <= self.chunk_size:
+            yield from _score_inline(refs, candidates, pairs, use_ransac, cancel)
+            return
+
+        ref_block = SharedFeatureBlock(refs)
+        candidate_block = SharedFeatureBlock(candidates)
+        chunks = [pairs[start:start + self.chunk_size] for start in range(0, len(pairs), self.chunk_size)]
+        chunks.reverse()
+        pending = {}
+        try:
+            executor = self._get_executor()
+            while chunks or pending:
+                if cancel is not None and cancel.is_set():
+                    print("[COMPARE ENGINE] Comparison cancelled")
+                    return
+                # Keep only a few chunks queued per worker, so cancelling is quick
+                while chunks and len(pending) < self.max_in_flight:
+                    chunk = chunks.pop()
+                    future = executor.submit(
+                        _score_chunk,
+                        (ref_block.name, ref_block.sublayout({i for i, _ in chunk})),
+                        (candidate_block.name, candidate_block.sublayout({j for _, j in chunk})),
+                        chunk, use_ransac)
+                    pending[future] = chunk
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        chunk = pending[future]
+                        print(f"[COMPARE ENGINE] Chunk failed ({e}), scoring it in-process")
+                        results = list(_score_inline(refs, candidates, chunk, use_ransac))
+                    del pending[future]
+                    yield from results
+
+        except BrokenProcessPool:
+            print("[COMPARE ENGINE] Worker pool crashed, scoring remaining pairs in-process")
+            self._reset_executor()
+            remaining = [pair for chunk in list(pending.values()) + chunks for pair in chunk]
+            pending.clear()
+            yield from _score_inline(refs, candidates, remaining, use_ransac, cancel)
+
+        finally:
+            # Reached on normal completion and when the caller stops iterating
+            for future in pending:
+                future.cancel()
+            if pending:
+                wait(pending)
+            ref_block.release()
+            candidate_block.release()
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Global engine instance
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_comparison_engine() -> ComparisonEngine:
+    """Get the global comparison engine, configured from user settings."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            max_workers = None
+            try:
+                from settings_manager import get_setting
+                if not get_setting('image_comparison.use_process_pool', True):
+                    max_workers = 1
+                else:
+                    max_workers = int(get_setting('image_comparison.process_workers', 0)) or None
+            except Exception:
+                pass
+            _engine = ComparisonEngine(max_workers=max_workers)
+        return _engine
+
+
+def shutdown_comparison_engine():
+    """Stop the global engine's worker processes (called on application exit)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
@@ -0,0 +1,116 @@
+"""
+Reduced-resolution image decoding.
+
+Downloaded listing and reference images are decoded and then immediately
+shrunk - to the 400x400 comparison size, or to a thumbnail. JPEG can be
+decoded at 1/2, 1/4 or 1/8 scale directly in the DCT domain, which is much
+faster and allocates a fraction of the memory of a full decode. This module
+picks the smallest scale that still yields at least the size the caller
+needs and decodes at that scale:
+
+    image = decode_image(response.content)              # BGR, >= 400x400 worth of pixels
+    image = load_image(path, target_size=(400, 400))
+    thumb = load_thumbnail(response.content, 150)       # PIL image via draft()
+
+Only JPEGs are decoded reduced; other formats, and images that are already
+small, decode at full size. Reduced decoding can be turned off with the
+'image_comparison.reduced_decode' setting.
+"""
+
+import logging
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# The size every image is resized to for comparison (image_features.COMPARE_SIZE)
+DEFAULT_TARGET_SIZE = (400, 400)
+
+# Scale factor -> imdecode flag, largest reduction first
+REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+JPEG_MAGIC = b'\xff\xd8'
+
+
+def reduced_decode_enabled() -> bool:
+    """Check the 'image_comparison.reduced_decode' setting (default on)."""
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('image_comparison.reduced_decode', True))
+    except Exception:
+        return True
+
+
+def reduction_factor(image_size: Tuple[int, int], target_size: Tuple[int, int]) -> int:
+    """
+    Largest JPEG scale factor (1, 2, 4 or 8) that keeps the image at least target_size.
+
+    Both sides must stay >= the larger target side, so the choice holds
+    whichever way EXIF orientation rotates the image.
+    """
+    needed = max(target_size)
+    for factor, _ in REDUCED_FLAGS:
+        if image_size[0] // factor >= needed and image_size[1] // factor >= needed:
+            return factor
+    return 1
+
+
+def decode_image(data: bytes, target_size: Optional[Tuple[int, int]] = DEFAULT_TARGET_SIZE) -> Optional[np.ndarray]:
+    """
+    Decode encoded image bytes to a BGR array, reduced when the image is larger than needed.
+
+    Args:
+        data: Encoded image (JPEG, PNG, WebP, ...)
+        target_size: (width, height) the caller will resize to; None decodes at full size
+
+    Returns:
+        BGR image, or None if the data can't be decoded
+    """
+    buffer = np.frombuffer(data, np.uint8)
+    flag = cv2.IMREAD_COLOR
+    if target_size and data[:2] == JPEG_MAGIC and reduced_decode_enabled():
+        try:
+            # PIL only parses the header here
+            factor = reduction_factor(Image.open(BytesIO(data)).size, target_size)
+            flag = dict(REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+        except Exception as e:
+            logging.debug(f"Could not read image header, decoding at full size: {e}")
+    return cv2.imdecode(buffer, flag)
+
+
+def load_image(path: Union[str, Path], target_size: Optional[Tuple[int, int]] = DEFAULT_TARGET_SIZE) -> Optional[np.ndarray]:
+    """decode_image() for a file on disk (like cv2.imread, None if unreadable)."""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    return decode_image(data, target_size)
+
+
+def load_thumbnail(source: Union[str, Path, bytes], size: int) -> Image.Image:
+    """
+    Open an image as a PIL thumbnail fitting in size x size.
+
+    draft() lets the JPEG decoder skip straight to the smallest DCT scale that
+    is still at least the thumbnail size, before thumbnail() does the final
+    high-quality resize.
+
+    Args:
+        source: File path or encoded image bytes
+        size: Maximum thumbnail width and height
+
+    Returns:
+        PIL image (raises like Image.open on bad input)
+    """
+    pil_img = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    if reduced_decode_enabled():
+        pil_img.draft(pil_img.mode, (size, size))
+    pil_img.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return pil_img
@@ -0,0 +1,540 @@
+"""
+Precomputed image features for the multi-metric image comparison.
+
+gui.workers.compare_images() scores a pair of images with four metrics
+(template matching, ORB feature matching, SSIM, HSV color histogram). All of
+the per-image work - resize, grayscale/HSV conversion, ORB keypoints and
+descriptors, histogram, scaled template pyramid - only depends on one image,
+so it is split out here:
+
+    ref = extract_features(ref_image)           # once per reference
+    for ebay_img in ebay_images:
+        other = extract_features(ebay_img)      # once per eBay image
+        score = compare_features(ref, other)
+
+Comparing N references against M eBay images then costs N + M feature
+extractions instead of 2*N*M. compare_features() returns exactly the same
+score as compare_images() on the original images; compare_features_batch()
+scores one reference against many bundles with the cheap metrics (SSIM,
+histogram correlation) vectorized, and compare_features_cascade() stops
+scoring once a pair's side of a similarity threshold is certain.
+load_or_extract_features()
+additionally keeps the bundles in the on-disk feature store (feature_store.py)
+so images seen in earlier runs are not extracted again.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity as ssim
+
+from batch_similarity import correlation_matrix, ssim_matrix
+from matching_core import knn_match
+
+# Bump when anything below changes the extracted features
+FEATURE_VERSION = 2
+
+COMPARE_SIZE = (400, 400)
+ORB_FEATURES = 1000
+HIST_BINS = [12, 12, 12]
+HIST_RANGES = [0, 180, 0, 256, 0, 256]
+# compareHist sees the (12, 12, 12) histogram as a 12-channel 12x12 image and
+# divides its correlation sums by the 144 pixels, not the 1728 bins. Score
+# thresholds are calibrated on that, so the batch path reproduces it.
+HIST_CORREL_SAMPLES = HIST_BINS[0] * HIST_BINS[1]
+TEMPLATE_SCALES = [0.7, 0.8, 0.9, 1.0, 1.1, 1.2]
+
+# Coarse-to-fine template matching: all scales are searched on images
+# downsampled by this factor, then the best scale is refined at full
+# resolution within this many pixels of the coarse peak
+TEMPLATE_COARSE_FACTOR = 4
+TEMPLATE_REFINE_RADIUS = 4
+
+_thread_local = threading.local()
+
+
+def _get_orb():
+    """ORB detector for the current thread (detectors are not shared across threads)."""
+    orb = getattr(_thread_local, 'orb', None)
+    if orb is None:
+        orb = cv2.ORB_create(nfeatures=ORB_FEATURES, scaleFactor=1.2, nlevels=8)
+        _thread_local.orb = orb
+    return orb
+
+
+@dataclass
+class ImageFeatures:
+    """Everything compare_features() needs to know about one image."""
+    gray: np.ndarray                      # COMPARE_SIZE grayscale image
+    keypoints: np.ndarray                 # (N, 2) float32 ORB keypoint coordinates
+    descriptors: Optional[np.ndarray]     # (N, 32) uint8 ORB descriptors, None if no keypoints
+    hist: np.ndarray                      # 12x12x12 HSV histogram, min-max normalized
+    templates: List[np.ndarray] = field(default_factory=list)  # grayscale template pyramid
+    version: int = FEATURE_VERSION
+    # Downsampled gray image and templates for the coarse template search (built on first use)
+    _coarse: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+
+def extract_features(image: np.ndarray) -> ImageFeatures:
+    """
+    Extract the comparison features of a BGR image.
+
+    Args:
+        image: BGR image (numpy array, any size)
+
+    Returns:
+        ImageFeatures for compare_features()
+    """
+    resized = cv2.resize(image, COMPARE_SIZE)
+    gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+
+    kp, descriptors = _get_orb().detectAndCompute(gray, None)
+    keypoints = np.float32([point.pt for point in kp]).reshape(-1, 2)
+
+    hsv = cv2.cvtColor(resized, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, HIST_BINS, HIST_RANGES)
+    cv2.normalize(hist, hist, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
+
+    return ImageFeatures(gray=gray, keypoints=keypoints, descriptors=descriptors, hist=hist,
+                         templates=template_pyramid(gray))
+
+
+def template_pyramid(gray: np.ndarray) -> List[np.ndarray]:
+    """
+    Scaled versions of a gray image used when it is the reference in template matching.
+
+    Every image is resized to COMPARE_SIZE, so only scales that fit inside
+    the other image (< 1.0) and the image itself are usable. The pyramid is
+    a few cheap resizes, so it is rebuilt from gray instead of stored.
+    """
+    templates = []
+    for scale in TEMPLATE_SCALES:
+        if scale == 1.0:
+            templates.append(gray)
+            continue
+        width = int(COMPARE_SIZE[0] * scale)
+        height = int(COMPARE_SIZE[1] * scale)
+        if width < COMPARE_SIZE[0] and height < COMPARE_SIZE[1]:
+            templates.append(cv2.resize(gray, (width, height)))
+    return templates
+
+
+def features_to_arrays(features: ImageFeatures) -> Dict[str, np.ndarray]:
+    """Flatten a feature bundle into named arrays (for the feature store); templates are not stored."""
+    arrays = {
+        'gray': features.gray,
+        'keypoints': features.keypoints,
+        'hist': features.hist,
+    }
+    if features.descriptors is not None:
+        arrays['descriptors'] = features.descriptors
+    return arrays
+
+
+def features_from_arrays(arrays: Dict[str, np.ndarray]) -> ImageFeatures:
+    """Rebuild a feature bundle from features_to_arrays() output (templates are re-derived from gray)."""
+    gray = arrays['gray']
+    return ImageFeatures(gray=gray, keypoints=arrays['keypoints'], descriptors=arrays.get('descriptors'),
+                         hist=arrays['hist'], templates=template_pyramid(gray))
+
+
+def load_or_extract_features(image: np.ndarray) -> ImageFeatures:
+    """
+    extract_features() through the persistent feature store.
+
+    Images whose features were extracted in an earlier run (same pixels,
+    same FEATURE_VERSION) are loaded from disk instead of re-extracted.
+    """
+    from feature_store import get_or_extract
+
+    arrays = get_or_extract(image, 'compare', FEATURE_VERSION,
+                            lambda img: features_to_arrays(extract_features(img)))
+    return features_from_arrays(arrays)
+
+
+def _coarse_level(features: ImageFeatures) -> tuple:
+    """(coarse gray image, coarse templates) of a bundle, cached on the bundle."""
+    if features._coarse is None:
+        def shrink(image):
+            size = (max(1, round(image.shape[1] / TEMPLATE_COARSE_FACTOR)),
+                    max(1, round(image.shape[0] / TEMPLATE_COARSE_FACTOR)))
+            return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        features._coarse = (shrink(features.gray), [shrink(template) for template in features.templates])
+    return features._coarse
+
+
+def _same_size_ccoeff(template: np.ndarray, image: np.ndarray) -> float:
+    """TM_CCOEFF_NORMED of two equally sized images (matchTemplate's single result value)."""
+    a = template.astype(np.float32)
+    b = image.astype(np.float32)
+    a -= a.mean()
+    b -= b.mean()
+    denominator = float(np.sqrt(float((a * a).sum()) * float((b * b).sum())))
+    if denominator <= 1e-6:
+        # Flat image: defer to OpenCV's handling
+        return float(cv2.minMaxLoc(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED))[1])
+    return float((a * b).sum()) / denominator
+
+
+def template_match_score(ref: ImageFeatures, other: ImageFeatures, exhaustive: bool = False) -> float:
+    """
+    Best TM_CCOEFF_NORMED of the reference's template pyramid inside the other image.
+
+    By default runs coarse-to-fine: every scale is matched on the
+    TEMPLATE_COARSE_FACTOR-downsampled images, and only the best scale is
+    matched at full resolution in a small window around the coarse peak. A
+    template the size of the image has a single match position and is scored
+    directly. The result is a real full-resolution correlation value, so it
+    never exceeds the exhaustive score; `python -m benchmarks.template_cascade`
+    reports the difference on debug_comparison/.
+
+    Args:
+        ref: Features of the reference image (provides the templates)
+        other: Features of the image searched
+        exhaustive: Match every scale at full resolution instead
+
+    Returns:
+        Best correlation (may be negative)
+    """
+    if exhaustive:
+        best_match = 0.0
+        for template in ref.templates:
+            result = cv2.matchTemplate(other.gray, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, _ = cv2.minMaxLoc(result)
+            best_match = max(best_match, max_val)
+        return best_match
+
+    best_match = 0.0
+    coarse_image, coarse_templates = _coarse_level(other)[0], _coarse_level(ref)[1]
+    best_coarse = None
+    for template, coarse_template in zip(ref.templates, coarse_templates):
+        if template.shape == other.gray.shape:
+            best_match = max(best_match, _same_size_ccoeff(template, other.gray))
+            continue
+        result = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if best_coarse is None or max_val > best_coarse[0]:
+            best_coarse = (max_val, max_loc, template)
+
+    if best_coarse is not None:
+        _, (coarse_x, coarse_y), template = best_coarse
+        height, width = template.shape
+        max_x = other.gray.shape[1] - width
+        max_y = other.gray.shape[0] - height
+        x0 = min(max(coarse_x * TEMPLATE_COARSE_FACTOR - TEMPLATE_REFINE_RADIUS, 0), max_x)
+        y0 = min(max(coarse_y * TEMPLATE_COARSE_FACTOR - TEMPLATE_REFINE_RADIUS, 0), max_y)
+        x1 = min(coarse_x * TEMPLATE_COARSE_FACTOR + TEMPLATE_REFINE_RADIUS, max_x)
+        y1 = min(coarse_y * TEMPLATE_COARSE_FACTOR + TEMPLATE_REFINE_RADIUS, max_y)
+        window = other.gray[y0:y1 + height, x0:x1 + width]
+        result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        best_match = max(best_match, cv2.minMaxLoc(result)[1])
+
+    return best_match
+
+
+def _orb_match(ref: ImageFeatures, other: ImageFeatures) -> Tuple[float, list]:
+    """ORB feature score (0-1) and the good matches that passed the ratio test."""
+    feature_score = 0.0
+    good_matches = []
+    des1, des2 = ref.descriptors, other.descriptors
+
+    if des1 is not None and des2 is not None and len(des1) > 0 and len(des2) > 0:
+        # Hamming-distance kNN with the shared (BF or FLANN-LSH) matcher
+        matches = knn_match(des1, des2, k=2)
+
+        # Apply ratio test (Lowe's ratio test)
+        for match_pair in matches:
+            if len(match_pair) == 2:
+                m, n = match_pair
+                if m.distance < 0.75 * n.distance:
+                    good_matches.append(m)
+            elif len(match_pair) == 1:
+                good_matches.append(match_pair[0])
+
+        if len(good_matches) > 0:
+            # Normalize by the smaller number of keypoints
+            max_possible_matches = min(len(ref.keypoints), len(other.keypoints))
+            if max_possible_matches > 0:
+                raw_ratio = len(good_matches) / max_possible_matches
+                feature_score = min(raw_ratio * 2.0, 1.0)  # Multiply by 2 to boost scores
+
+    return feature_score, good_matches
+
+
+def _ransac_score(ref: ImageFeatures, other: ImageFeatures, good_matches: list) -> float:
+    """Fraction of good matches consistent with one homography (0-1)."""
+    if len(good_matches) < 4:  # Need at least 4 points for homography
+        return 0.0
+    try:
+        src_pts = ref.keypoints[[m.queryIdx for m in good_matches]].reshape(-1, 1, 2)
+        dst_pts = other.keypoints[[m.trainIdx for m in good_matches]].reshape(-1, 1, 2)
+        M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+        if mask is not None:
+            return np.sum(mask) / len(good_matches)
+    except Exception:
+        # RANSAC can fail if points are degenerate
+        pass
+    return 0.0
+
+
+def _hist_score(raw_score: float) -> float:
+    if np.isnan(raw_score):
+        return 0.0
+    return max(0.0, raw_score)
+
+
+def _template_score(ref: ImageFeatures, other: ImageFeatures, exact_template: bool) -> float:
+    # Check if reference appears as a sub-region in compare image
+    try:
+        return max(0.0, template_match_score(ref, other, exact_template))
+    except (cv2.error, ValueError, TypeError) as e:
+        logging.debug(f"Template matching failed: {e}")
+        return 0.0
+
+
+def _combine_scores(template_score: float, feature_score: float, ssim_score: float, hist_score: float,
+                    ransac_score: float, use_ransac: bool) -> Tuple[float, int, float]:
+    """Weighted similarity (0-100, before clamping), number of high metrics, consistency multiplier."""
+    # Template matching is proving to be the most reliable for exact matches with watermarks
+    # Feature matching is second but can be inconsistent with heavy watermarks
+    if use_ransac and ransac_score > 0:
+        similarity = (
+            template_score * 0.50 +
+            feature_score * 0.20 +
+            ransac_score * 0.20 +
+            ssim_score * 0.07 +
+            hist_score * 0.03
+        ) * 100
+    else:
+        similarity = (
+            template_score * 0.60 +
+            feature_score * 0.25 +
+            ssim_score * 0.10 +
+            hist_score * 0.05
+        ) * 100
+
+    # === Consistency Bonus ===
+    # When multiple metrics agree (all score high), it's a stronger match
+    high_threshold = 0.50
+    if use_ransac:
+        metrics = [template_score, feature_score, ssim_score, hist_score, ransac_score]
+    else:
+        metrics = [template_score, feature_score, ssim_score, hist_score]
+    high_count = sum(1 for m in metrics if m > high_threshold)
+
+    consistency_multiplier = 1.0
+    if high_count >= 3:
+        consistency_multiplier = 1.25  # 3+ metrics agree: strong match, +25% boost
+    elif high_count >= 2:
+        consistency_multiplier = 1.15  # 2 metrics agree: good match, +15% boost
+
+    return similarity * consistency_multiplier, high_count, consistency_multiplier
+
+
+def compare_features(ref: ImageFeatures, other: ImageFeatures, use_ransac: bool = False,
+                     verbose: bool = True, cheap_scores: Optional[Tuple[float, float]] = None,
+                     exact_template: bool = False) -> float:
+    """
+    Score two feature bundles (0-100), same result as compare_images().
+
+    Args:
+        ref: Features of the reference image
+        other: Features of the image to compare
+        use_ransac: Enable RANSAC geometric verification (slower, more accurate)
+        verbose: Print the per-metric breakdown
+        cheap_scores: (SSIM, histogram correlation) already computed for this
+            pair by compare_features_batch()
+        exact_template: Exhaustive template matching instead of the coarse-to-fine search
+
+    Returns:
+        float: Similarity score from 0-100
+    """
+    # === 1. Feature Matching (ORB) ===
+    feature_score, good_matches = _orb_match(ref, other)
+
+    # === RANSAC Geometric Verification (optional) ===
+    ransac_score = _ransac_score(ref, other, good_matches) if use_ransac else 0.0
+
+    if cheap_scores is None:
+        # === 2. SSIM (Structural Similarity) ===
+        ssim_score = ssim(ref.gray, other.gray)
+
+        # === 3. Color Histogram Comparison ===
+        hist_score = _hist_score(cv2.compareHist(ref.hist, other.hist, cv2.HISTCMP_CORREL))
+    else:
+        ssim_score, hist_score = cheap_scores[0], _hist_score(cheap_scores[1])
+
+    # === 4. Template Matching ===
+    template_score = _template_score(ref, other, exact_template)
+
+    # === Weighted combination ===
+    similarity, high_count, consistency_multiplier = _combine_scores(
+        template_score, feature_score, ssim_score, hist_score, ransac_score, use_ransac)
+
+    if not verbose:
+        pass
+    elif use_ransac:
+        print(f"[IMAGE COMPARE] Features: {feature_score*100:.1f}%, SSIM: {ssim_score*100:.1f}%, "
+              f"Hist: {hist_score*100:.1f}%, Template: {template_score*100:.1f}%, RANSAC: {ransac_score*100:.1f}% "
+              f"[{high_count} high] x{consistency_multiplier:.2f} => Total: {similarity:.1f}%")
+    else:
+        print(f"[IMAGE COMPARE] Features: {feature_score*100:.1f}%, SSIM: {ssim_score*100:.1f}%, "
+              f"Hist: {hist_score*100:.1f}%, Template: {template_score*100:.1f}% "
+              f"[{high_count} high] x{consistency_multiplier:.2f} => Total: {similarity:.1f}%")
+
+    return max(0.0, min(100.0, similarity))  # Clamp to 0-100
+
+
+# Range of each metric, used to bound the score while metrics are still unknown
+METRIC_RANGES = {
+    'template': (0.0, 1.0),
+    'feature': (0.0, 1.0),
+    'ssim': (-1.0, 1.0),
+    'hist': (0.0, 1.0),
+    'ransac': (0.0, 1.0),
+}
+
+
+@dataclass
+class CascadeScore:
+    """
+    Result of compare_features_cascade(): the similarity is known to lie in
+    [lower, upper]. Both are equal when every metric was computed.
+    """
+    lower: float
+    upper: float
+    threshold: float
+    stages: List[str] = field(default_factory=list)   # metrics computed, in order
+
+    @property
+    def exact(self) -> bool:
+        return self.upper - self.lower < 1e-9
+
+    @property
+    def passed(self) -> bool:
+        """The similarity is certainly >= threshold."""
+        return self.lower >= self.threshold
+
+    @property
+    def score(self) -> float:
+        """Exact similarity, else the bound on the decided side (at least / at most)."""
+        return self.lower if self.passed else self.upper
+
+
+def score_bounds(known: Dict[str, float], use_ransac: bool = False) -> Tuple[float, float]:
+    """
+    Lower and upper bound of the similarity given the metrics computed so far.
+
+    The score is non-decreasing in every metric within each weighting
+    (RANSAC / no RANSAC), so the bounds are reached with every unknown
+    metric at the bottom or top of its range.
+    """
+    def evaluate(end: int, ransac_score: float) -> float:
+        values = {name: known.get(name, METRIC_RANGES[name][end]) for name in METRIC_RANGES}
+        values['ransac'] = ransac_score
+        similarity, _, _ = _combine_scores(values['template'], values['feature'], values['ssim'],
+                                           values['hist'], values['ransac'], use_ransac)
+        return max(0.0, min(100.0, similarity))
+
+    if not use_ransac:
+        return evaluate(0, 0.0), evaluate(1, 0.0)
+    if 'ransac' in known:
+        return evaluate(0, known['ransac']), evaluate(1, known['ransac'])
+    # RANSAC still unknown: 0 keeps the plain weights, anything above switches to the RANSAC weights
+    return (min(evaluate(0, 0.0), evaluate(0, 1e-12)),
+            max(evaluate(1, 0.0), evaluate(1, 1.0)))
+
+
+def compare_features_cascade(ref: ImageFeatures, other: ImageFeatures, threshold: float,
+                             use_ransac: bool = False, resolve_matches: bool = False,
+                             cheap_scores: Optional[Tuple[float, float]] = None) -> CascadeScore:
+    """
+    Threshold-aware compare_features(): stop as soon as the decision is known.
+
+    Metrics run from cheapest to most expensive (histogram, template, ORB,
+    SSIM, then RANSAC for the pairs still undecided). After each one the
+    score is bounded over every possible value of the remaining metrics,
+    consistency multiplier included; scoring stops once the upper bound is
+    below the threshold or the lower bound clears it.
+
+    Args:
+        ref: Features of the reference image
+        other: Features of the image to compare
+        threshold: Similarity (0-100) the caller cares about
+        use_ransac: Enable RANSAC geometric verification
+        resolve_matches: Keep scoring pairs that clear the threshold until
+            their score is exact (only non-matches exit early)
+        cheap_scores: (SSIM, histogram correlation) from a batch computation
+
+    Returns:
+        CascadeScore; when every metric ran, lower == upper == compare_features()
+    """
+    known: Dict[str, float] = {}
+    stages: List[str] = []
+    good_matches: list = []
+
+    def hist():
+        raw = cheap_scores[1] if cheap_scores is not None else cv2.compareHist(
+            ref.hist, other.hist, cv2.HISTCMP_CORREL)
+        known['hist'] = _hist_score(raw)
+
+    def template():
+        known['template'] = _template_score(ref, other, False)
+
+    def orb():
+        known['feature'], matches = _orb_match(ref, other)
+        good_matches.extend(matches)
+        if len(good_matches) < 4:
+            known['ransac'] = 0.0
+
+    def structural():
+        known['ssim'] = cheap_scores[0] if cheap_scores is not None else ssim(ref.gray, other.gray)
+
+    def ransac():
+        known['ransac'] = _ransac_score(ref, other, good_matches)
+
+    pipeline = [('hist', hist), ('template', template), ('feature', orb), ('ssim', structural)]
+    if use_ransac:
+        pipeline.append(('ransac', ransac))
+
+    lower, upper = score_bounds(known, use_ransac)
+    for name, run in pipeline:
+        if upper < threshold or (lower >= threshold and not resolve_matches):
+            break
+        if name in known:
+            continue
+        run()
+        stages.append(name)
+        lower, upper = score_bounds(known, use_ransac)
+
+    return CascadeScore(lower=lower, upper=upper, threshold=threshold, stages=stages)
+
+
+def compare_features_batch(ref: ImageFeatures, others: Sequence[ImageFeatures], use_ransac: bool = False,
+                           verbose: bool = True) -> List[float]:
+    """
+    Score one reference against many feature bundles.
+
+    SSIM and histogram correlation are computed for all candidates at once
+    (batch_similarity); ORB matching and template matching still run per pair.
+
+    Args:
+        ref: Features of the reference image
+        others: Features of the images to compare
+        use_ransac: Enable RANSAC geometric verification
+        verbose: Print the per-metric breakdown of every pair
+
+    Returns:
+        Similarity scores (0-100), in the order of others
+    """
+    if not others:
+        return []
+    ssim_scores = ssim_matrix(ref.gray, [other.gray for other in others])
+    hist_scores = correlation_matrix(ref.hist.ravel(), [other.hist for other in others],
+                                     samples=HIST_CORREL_SAMPLES)
+    return [compare_features(ref, other, use_ransac, verbose, cheap_scores=(float(ssim_score), float(hist_score)))
+            for other, ssim_score, hist_score in zip(others, ssim_scores, hist_scores)]
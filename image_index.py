@@ -0,0 +1,347 @@
+"""
+Approximate-nearest-neighbour index of listing image embeddings.
+
+Each comparison run only sees the eBay listings fetched for its own query.
+This index accumulates a compact global descriptor of every listing image
+the comparison code has downloaded (sold listing matchers, CSV batch
+compare), so a new reference image can be matched against every comp ever
+scraped in milliseconds:
+
+    index = get_embedding_index()
+    for similarity, key, metadata in index.search(compute_embedding(image), k=10):
+        ...
+
+- Embedding: 384 floats - an HSV color histogram (Hellinger-mapped) and a
+  16x16 zero-mean grayscale thumbnail, L2-normalized, so the inner product
+  is a cosine similarity in [-1, 1].
+- Search: exact (one matrix product) while the index is small; beyond
+  TRAIN_MIN entries an IVF index - k-means centroids with one inverted list
+  each - probes only the lists nearest the query. The centroids are
+  retrained as the index grows.
+- Persistence: vectors and metadata are appended to disk as they are added
+  (vectors.f32 + entries.jsonl); re-adding a key supersedes the old entry.
+
+The candidates it returns are cheap, approximate matches; confirm them
+with the full comparator before trusting them.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+EMBEDDING_VERSION = 1
+COLOR_BINS = [8, 4, 4]
+THUMB_SIZE = 16
+EMBEDDING_DIM = 8 * 4 * 4 + THUMB_SIZE * THUMB_SIZE
+# Share of the embedding's norm given to color (the rest is structure)
+COLOR_WEIGHT = 0.5
+
+# Below this many entries the index is searched exhaustively
+TRAIN_MIN = 2048
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50000
+
+
+def compute_embedding(image: np.ndarray) -> np.ndarray:
+    """
+    Global descriptor of a BGR image for the embedding index.
+
+    Args:
+        image: BGR image (numpy array, any size)
+
+    Returns:
+        (EMBEDDING_DIM,) float32 unit vector
+    """
+    small = cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    color = cv2.calcHist([hsv], [0, 1, 2], None, COLOR_BINS, [0, 180, 0, 256, 0, 256]).ravel()
+    # Hellinger mapping: inner products of sqrt-histograms compare distributions well
+    color = np.sqrt(color / max(float(color.sum()), 1e-8))
+
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    thumb -= thumb.mean()
+    thumb /= max(float(np.linalg.norm(thumb)), 1e-8)
+
+    embedding = np.concatenate([np.sqrt(COLOR_WEIGHT) * color, np.sqrt(1 - COLOR_WEIGHT) * thumb])
+    return (embedding / max(float(np.linalg.norm(embedding)), 1e-8)).astype(np.float32)
+
+
+def _kmeans(vectors: np.ndarray, clusters: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of unit vectors."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[cluster] = centroid / max(float(np.linalg.norm(centroid)), 1e-8)
+            else:
+                # Re-seed empty clusters with a random vector
+                centroids[cluster] = vectors[rng.integers(len(vectors))]
+    return centroids
+
+
+class EmbeddingIndex:
+    """Persistent, incrementally updated IVF index of image embeddings."""
+
+    def __init__(self, index_dir: str = "embedding_index", nprobe: int = 8):
+        """
+        Initialize the index, loading any entries already on disk.
+
+        Args:
+            index_dir: Directory holding the index files
+            nprobe: Inverted lists searched per query once the index is trained
+        """
+        self.index_dir = Path(index_dir)
+        self.nprobe = nprobe
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+
+        self._vectors = np.zeros((0, EMBEDDING_DIM), np.float32)
+        self._count = 0                       # rows used in _vectors
+        self._keys: List[Any] = []            # row -> key
+        self._metadata: List[Dict] = []       # row -> metadata
+        self._rows: Dict[Any, int] = {}       # key -> current row (older rows are superseded)
+        self._active = np.zeros(0, bool)      # row -> still the current row of its key
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._trained_at = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.index_dir / f"vectors.v{EMBEDDING_VERSION}.f32"
+
+    @property
+    def _entries_path(self) -> Path:
+        return self.index_dir / f"entries.v{EMBEDDING_VERSION}.jsonl"
+
+    @property
+    def _centroids_path(self) -> Path:
+        return self.index_dir / f"centroids.v{EMBEDDING_VERSION}.npy"
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if not self._vectors_path.exists() or not self._entries_path.exists():
+            return
+        try:
+            vectors = np.fromfile(self._vectors_path, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+            entries = []
+            with open(self._entries_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # Partially written last line
+            # An interrupted append can leave the two files out of step
+            count = min(len(vectors), len(entries))
+            self._append_rows(vectors[:count], [(entry['key'], entry.get('metadata', {})) for entry in entries[:count]])
+
+            if self._centroids_path.exists():
+                centroids = np.load(self._centroids_path)
+                if centroids.ndim == 2 and centroids.shape[1] == EMBEDDING_DIM:
+                    self._set_centroids(centroids)
+            print(f"[EMBEDDING INDEX] Loaded {len(self)} entries from {self.index_dir}")
+        except Exception as e:
+            self.logger.warning(f"Could not load embedding index from {self.index_dir}: {e}")
+
+    def _append_rows(self, vectors: np.ndarray, entries: List[Tuple[Any, Dict]]):
+        """Add rows in memory (no disk write)."""
+        needed = self._count + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.zeros((max(needed, 2 * len(self._vectors), 1024), EMBEDDING_DIM), np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+            active = np.zeros(len(grown), bool)
+            active[:self._count] = self._active[:self._count]
+            self._active = active
+        self._vectors[self._count:needed] = vectors
+        self._active[self._count:needed] = True
+
+        for offset, (key, metadata) in enumerate(entries):
+            row = self._count + offset
+            self._keys.append(key)
+            self._metadata.append(metadata)
+            previous = self._rows.get(key)
+            if previous is not None:
+                self._active[previous] = False
+            self._rows[key] = row
+        if self._centroids is not None:
+            assignment = np.argmax(vectors @ self._centroids.T, axis=1)
+            for offset, cluster in enumerate(assignment):
+                self._lists[cluster].append(self._count + offset)
+        self._count = needed
+
+    def _set_centroids(self, centroids: np.ndarray):
+        self._centroids = centroids.astype(np.float32)
+        self._lists = [[] for _ in range(len(centroids))]
+        if self._count:
+            assignment = np.argmax(self._vectors[:self._count] @ self._centroids.T, axis=1)
+            for row, cluster in enumerate(assignment):
+                self._lists[cluster].append(row)
+        self._trained_at = len(self._rows)
+
+    # ------------------------------------------------------------------
+    # Insert / train / search
+    # ------------------------------------------------------------------
+
+    def add(self, key: Any, embedding: np.ndarray, metadata: Optional[Dict] = None):
+        """Add one embedding (replacing any earlier entry with the same key)."""
+        self.add_many([(key, embedding, metadata)])
+
+    def add_many(self, entries: Iterable[Tuple[Any, np.ndarray, Optional[Dict]]]):
+        """
+        Add embeddings and append them to the index files.
+
+        Args:
+            entries: (key, embedding, metadata) tuples; keys must be JSON
+                serializable (e.g. image URLs), metadata a JSON-able dict
+        """
+        entries = [(key, np.asarray(embedding, np.float32).reshape(EMBEDDING_DIM), metadata or {})
+                   for key, embedding, metadata in entries]
+        if not entries:
+            return
+        vectors = np.stack([embedding for _, embedding, _ in entries])
+
+        with self._lock:
+            try:
+                with open(self._vectors_path, 'ab') as f:
+                    f.write(vectors.tobytes())
+                with open(self._entries_path, 'a', encoding='utf-8') as f:
+                    for key, _, metadata in entries:
+                        f.write(json.dumps({'key': key, 'metadata': metadata}, ensure_ascii=False) + '\n')
+            except (OSError, TypeError) as e:
+                self.logger.warning(f"Could not persist embedding index entries: {e}")
+
+            self._append_rows(vectors, [(key, metadata) for key, _, metadata in entries])
+            self._maybe_train()
+
+    def _maybe_train(self):
+        """(Re)train the IVF centroids once the index has grown enough."""
+        size = len(self._rows)
+        if size < TRAIN_MIN or (self._centroids is not None and size < 4 * self._trained_at):
+            return
+        clusters = int(np.clip(np.sqrt(size), 16, 4096))
+        self._set_centroids(_kmeans(self._vectors[:self._count][self._active[:self._count]], clusters))
+        try:
+            np.save(self._centroids_path, self._centroids)
+        except OSError as e:
+            self.logger.warning(f"Could not save embedding index centroids: {e}")
+        print(f"[EMBEDDING INDEX] Trained {clusters} lists on {size} entries")
+
+    def search(self, embedding: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[float, Any, Dict]]:
+        """
+        Approximate top-k most similar entries.
+
+        Args:
+            embedding: Query embedding (compute_embedding output)
+            k: Number of results
+            nprobe: Inverted lists to search (default: the index's nprobe)
+
+        Returns:
+            [(cosine similarity, key, metadata)], most similar first
+        """
+        query = np.asarray(embedding, np.float32).reshape(EMBEDDING_DIM)
+        with self._lock:
+            if not self._rows or k <= 0:
+                return []
+            if self._centroids is None:
+                candidates = np.arange(self._count)
+            else:
+                probes = nprobe or self.nprobe
+                nearest_lists = np.argsort(-(self._centroids @ query))[:probes]
+                candidates = np.concatenate([np.asarray(self._lists[cluster], np.int64) for cluster in nearest_lists])
+            # Superseded rows (key re-added later) are skipped
+            candidates = candidates[self._active[candidates]]
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._keys[candidates[i]], self._metadata[candidates[i]]) for i in top]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._rows),
+                'rows': self._count,
+                'lists': 0 if self._centroids is None else len(self._centroids),
+                'size_mb': self._count * EMBEDDING_DIM * 4 / (1024 * 1024),
+            }
+
+
+# Global index instance
+_embedding_index = None
+_embedding_index_lock = threading.Lock()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """Get the global embedding index."""
+    global _embedding_index
+    with _embedding_index_lock:
+        if _embedding_index is None:
+            _embedding_index = EmbeddingIndex()
+        return _embedding_index
+
+
+def embedding_index_enabled() -> bool:
+    """Check the 'image_comparison.embedding_index_enabled' setting (default on)."""
+    try:
+        from settings_manager import get_setting
+        return bool(get_setting('image_comparison.embedding_index_enabled', True))
+    except Exception:
+        return True
+
+
+def index_listing_images(entries: Iterable[Tuple[str, np.ndarray, Dict]]):
+    """
+    Add downloaded listing images to the global index (if enabled).
+
+    Args:
+        entries: (image URL, decoded BGR image, metadata) tuples
+    """
+    if not embedding_index_enabled():
+        return
+    try:
+        get_embedding_index().add_many((url, compute_embedding(image), metadata)
+                                       for url, image, metadata in entries if image is not None)
+    except Exception as e:
+        logging.warning(f"Could not index listing images: {e}")
+
+
+def find_similar_listings(image: np.ndarray, k: int = 10) -> List[Tuple[float, str, Dict]]:
+    """Top-k indexed listing images most similar to a BGR image."""
+    return get_embedding_index().search(compute_embedding(image), k)
+
+
+if __name__ == "__main__":
+    import sys
+
+    index = get_embedding_index()
+    print(index.get_stats())
+    for path in sys.argv[1:]:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Could not read {path}")
+            continue
+        print(f"\n{path}")
+        for similarity, url, metadata in find_similar_listings(image):
+            print(f"  {similarity:.3f}  {metadata.get('title', '')[:60]}  {url}")
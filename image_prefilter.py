@@ -0,0 +1,239 @@
+"""
+Perceptual-hash prefilter for image comparison.
+
+The full comparator (image_features.compare_features: ORB matching, SSIM,
+multi-scale template matching) is far too expensive to run on every
+reference x candidate pair when most pairs are obviously unrelated. This
+module provides a cheap first stage:
+
+- ImageSignature: 64-bit pHash + 64-bit dHash of the grayscale image and a
+  small HSV color histogram, computed in well under a millisecond.
+- BKTree: metric tree over the 128-bit hash (Hamming distance) for radius
+  and k-nearest queries.
+- CandidatePrefilter: indexes the candidate (eBay) images and, for each
+  reference, returns the top-K candidates ranked by hash distance blended
+  with color distance. Only those go on to the expensive comparator.
+
+Recall guard: candidates whose hash distance is within `guard_radius` bits
+are always kept even beyond the top K (near-duplicates must never be
+pruned), and nothing is pruned when there are `top_k` or fewer candidates.
+
+Recall on the labelled debug_comparison/ runs is reported by
+`python -m benchmarks.prefilter_recall`.
+
+The prefilter is off by default (image_comparison.prefilter_top_k = 0):
+pruning is never lossless, so a top K is an explicit speed-for-recall
+choice of the user.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+HASH_BITS = 128
+COLOR_BINS = [8, 4, 4]
+
+# Weight of the hash distance vs. the color distance when ranking candidates
+HASH_WEIGHT = 0.7
+
+
+@dataclass
+class ImageSignature:
+    """Cheap perceptual signature of an image."""
+    hash_value: int          # pHash << 64 | dHash
+    color: np.ndarray        # L1-normalized HSV histogram (float32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def phash(gray: np.ndarray) -> int:
+    """64-bit DCT perceptual hash of a grayscale image."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # DC term excluded from the median so overall brightness doesn't matter
+    median = np.median(low.ravel()[1:])
+    return _bits_to_int(low > median)
+
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash of a grayscale image."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def compute_signature(image: np.ndarray) -> ImageSignature:
+    """
+    Compute the prefilter signature of a BGR image.
+
+    Args:
+        image: BGR image (numpy array, any size)
+
+    Returns:
+        ImageSignature
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    hsv = cv2.cvtColor(cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, COLOR_BINS, [0, 180, 0, 256, 0, 256]).ravel()
+    hist /= max(float(hist.sum()), 1e-8)
+    return ImageSignature(hash_value=(phash(gray) << 64) | dhash(gray), color=hist.astype(np.float32))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def color_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Histogram L1 distance scaled to 0..1."""
+    return float(np.abs(a - b).sum()) / 2.0
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self, items: Iterable[Tuple[int, Any]] = ()):
+        # Node: [hash, [payloads], {distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+        for hash_value, payload in items:
+            self.add(hash_value, payload)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, hash_value: int, payload: Any):
+        """Insert a hash; identical hashes share a node."""
+        self._size += 1
+        if self._root is None:
+            self._root = [hash_value, [payload], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(hash_value, node[0])
+            if distance == 0:
+                node[1].append(payload)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [payload], {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, radius: int) -> List[Tuple[int, Any]]:
+        """All (distance, payload) within radius of hash_value."""
+        results = []
+        if self._root is None:
+            return results
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(hash_value, node[0])
+            if distance <= radius:
+                results.extend((distance, payload) for payload in node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+    def nearest(self, hash_value: int, k: int) -> List[Tuple[int, Any]]:
+        """The k nearest (distance, payload) pairs, closest first."""
+        if self._root is None or k <= 0:
+            return []
+        # Max-heap of the best k so far: (-distance, counter, payload)
+        best: List[Tuple[int, int, Any]] = []
+        counter = 0
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(hash_value, node[0])
+            for payload in node[1]:
+                counter += 1
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, counter, payload))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, counter, payload))
+            radius = -best[0][0] if len(best) >= k else HASH_BITS
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(((-neg, payload) for neg, _, payload in best), key=lambda pair: pair[0])
+
+
+class CandidatePrefilter:
+    """Selects the candidates worth running the full comparator on."""
+
+    def __init__(self, top_k: int = 10, guard_radius: int = 24, pool_factor: int = 3):
+        """
+        Initialize the prefilter.
+
+        Args:
+            top_k: Candidates kept per reference (0 = keep everything)
+            guard_radius: Candidates within this many hash bits are always kept
+            pool_factor: top_k * pool_factor hash neighbours are re-ranked with color
+        """
+        self.top_k = top_k
+        self.guard_radius = guard_radius
+        self.pool_factor = max(1, pool_factor)
+        self._signatures: Dict[Any, ImageSignature] = {}
+        self._tree = BKTree()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key: Any, signature: ImageSignature):
+        """Index a candidate image under a key (e.g. its URL or index)."""
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        self._tree.add(signature.hash_value, key)
+
+    def rank(self, signature: ImageSignature, keys: Optional[Sequence[Any]] = None) -> List[Tuple[float, Any]]:
+        """(blended distance, key) for the given (default: all) candidates, closest first."""
+        ranked = []
+        for key in (self._signatures if keys is None else keys):
+            candidate = self._signatures[key]
+            hash_distance = hamming(signature.hash_value, candidate.hash_value) / HASH_BITS
+            blended = HASH_WEIGHT * hash_distance + (1 - HASH_WEIGHT) * color_distance(signature.color, candidate.color)
+            ranked.append((blended, key))
+        ranked.sort(key=lambda pair: pair[0])
+        return ranked
+
+    def select(self, signature: ImageSignature) -> List[Any]:
+        """
+        Keys of the candidates to compare against a reference, best first.
+
+        Args:
+            signature: Reference image signature
+
+        Returns:
+            Up to top_k keys plus any near-duplicates within guard_radius
+        """
+        if self.top_k <= 0 or len(self._signatures) <= self.top_k:
+            return [key for _, key in self.rank(signature)]
+
+        pool = {key for _, key in self._tree.nearest(signature.hash_value, self.top_k * self.pool_factor)}
+        selected = [key for _, key in self.rank(signature, list(pool))[:self.top_k]]
+
+        chosen = set(selected)
+        for _, key in sorted(self._tree.search(signature.hash_value, self.guard_radius), key=lambda pair: pair[0]):
+            if key not in chosen:
+                selected.append(key)
+                chosen.add(key)
+        return selected
+
+
+def get_prefilter_settings() -> Tuple[int, int]:
+    """(top_k, guard_radius) from user settings; top_k 0 (default) disables the prefilter."""
+    try:
+        from settings_manager import get_setting
+        return (int(get_setting('image_comparison.prefilter_top_k', 0)),
+                int(get_setting('image_comparison.prefilter_guard_radius', 24)))
+    except Exception:
+        return 0, 24
@@ -0,0 +1,202 @@
+"""
+Multi-keyword matcher built on an Aho-Corasick automaton.
+
+Used wherever a piece of text (RSS item title, search result title,
+product name) is checked against a list of watched keywords. Instead of
+looping over every keyword with ``in``, the keywords are compiled once
+into an automaton and each text is scanned in a single pass, returning
+every keyword that occurs in it.
+
+Text and keywords are normalized the same way before matching:
+- NFKC folds full-width ASCII to half-width and half-width katakana to
+  full-width, so "ＮＡＲＵＴＯ" matches "naruto" and "ﾅﾙﾄ" matches "ナルト"
+- casefold() gives case-insensitive matching for English text
+"""
+
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normalize text for keyword matching (Unicode width + case folding).
+
+    Args:
+        text: Raw text (may be None)
+
+    Returns:
+        Normalized text, empty string for None
+    """
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+class KeywordMatcher:
+    """
+    Compiled Aho-Corasick automaton over a set of keywords.
+
+    The automaton is only rebuilt when set_keywords() is given a keyword set
+    that differs from the current one, so callers can pass their keyword list
+    on every check without paying for recompilation.
+    """
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        self._signature: Optional[Tuple[str, ...]] = None
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+        self._patterns: List[str] = []
+        self._originals: List[Tuple[str, ...]] = []
+        self.set_keywords(keywords)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def keywords(self) -> List[str]:
+        """Original keywords in the order they were first given."""
+        return [originals[0] for originals in self._originals]
+
+    def set_keywords(self, keywords: Iterable[str]) -> bool:
+        """
+        Replace the keyword set, rebuilding the automaton only if it changed.
+
+        Empty / whitespace-only keywords are ignored.
+
+        Args:
+            keywords: Keywords to match
+
+        Returns:
+            True if the automaton was rebuilt
+        """
+        keywords = [kw for kw in keywords if kw and kw.strip()]
+        signature = tuple(keywords)
+        if signature == self._signature:
+            return False
+
+        self._signature = signature
+        self._build(keywords)
+        return True
+
+    def _build(self, keywords: List[str]):
+        """Build trie, failure links and merged outputs."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        patterns: List[str] = []
+        originals: List[List[str]] = []
+        pattern_index: Dict[str, int] = {}
+
+        for keyword in keywords:
+            pattern = normalize_text(keyword)
+            if pattern in pattern_index:
+                # Several spellings can normalize to the same pattern
+                originals[pattern_index[pattern]].append(keyword)
+                continue
+
+            idx = len(patterns)
+            pattern_index[pattern] = idx
+            patterns.append(pattern)
+            originals.append([keyword])
+
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(idx)
+
+        # Breadth-first pass to compute failure links; each state inherits
+        # the outputs of its failure state so search never walks the chain.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state].extend(outputs[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(out) for out in outputs]
+        self._patterns = patterns
+        self._originals = [tuple(orig) for orig in originals]
+
+    def _scan(self, text: str, first_only: bool = False) -> Set[int]:
+        """Run the automaton over normalized text and collect pattern indexes."""
+        found: Set[int] = set()
+        if not self._patterns or not text:
+            return found
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+                if first_only:
+                    break
+        return found
+
+    def find_all(self, *texts: Optional[str]) -> List[str]:
+        """
+        Find every keyword that occurs in any of the given texts.
+
+        Args:
+            *texts: One or more texts (e.g. title and description)
+
+        Returns:
+            Matching keywords (original spelling) in keyword order
+        """
+        # NUL can't appear in a normalized keyword, so matches never span texts
+        combined = '\x00'.join(normalize_text(text) for text in texts)
+        found = self._scan(combined)
+        result = []
+        for idx in sorted(found):
+            result.extend(self._originals[idx])
+        return result
+
+    def matches_any(self, *texts: Optional[str]) -> bool:
+        """
+        Check whether at least one keyword occurs in any of the given texts.
+
+        Stops scanning at the first match.
+        """
+        combined = '\x00'.join(normalize_text(text) for text in texts)
+        return bool(self._scan(combined, first_only=True))
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """
+    Get a compiled matcher for a keyword list, reusing previous compilations.
+
+    Intended for callers that hold plain keyword lists (e.g. alert configs)
+    and check them repeatedly. The returned matcher is shared - do not call
+    set_keywords() on it.
+
+    Args:
+        keywords: Keywords to match
+
+    Returns:
+        Compiled KeywordMatcher
+    """
+    return _compile_cached(tuple(keywords))
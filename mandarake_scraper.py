@@ -30,6 +30,7 @@ from oauth2client.service_account import ServiceAccountCredentials
 from PIL import Image
 from tqdm import tqdm
 from mandarake_codes import get_store_display_name
+from image_cache import get_image_bytes, image_extension
 
 
 class MandarakeScraper:
@@ -1051,20 +1052,15 @@ class MandarakeScraper:
                 print(f"[IMAGE DOWNLOAD] Skipping existing image: {filename}")
                 return image_path
 
-            # Download image
-            # Use regular session directly for images (CDN doesn't need anti-blocking delays)
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            # Download image through the shared image cache
+            # (CDN doesn't need the anti-blocking session)
+            data = get_image_bytes(url, timeout=30)
+            if data is None:
+                raise IOError("download failed")
 
-            # If we used default extension, update based on actual content type
+            # If we used default extension, update based on actual content
             if not (original_filename and '.' in original_filename):
-                content_type = response.headers.get('content-type', '')
-                if 'jpeg' in content_type:
-                    ext = '.jpg'
-                elif 'png' in content_type:
-                    ext = '.png'
-                else:
-                    ext = '.jpg'  # Default
+                ext = image_extension(data)
 
                 new_filename = f"product_{index:04d}{ext}"
                 if new_filename != filename:
@@ -1076,7 +1072,7 @@ class MandarakeScraper:
                         return image_path
 
             with open(image_path, 'wb') as f:
-                f.write(response.content)
+                f.write(data)
 
             return image_path
 
@@ -0,0 +1,444 @@
+"""
+Shared image-matching core.
+
+Every image comparison in the app goes through a scorer from this module,
+so an optimization to matching lands in one place:
+
+- 'compare' / 'compare_ransac': the template + ORB + SSIM + histogram
+  comparison of image_features (gui.workers.compare_images, CSV compare),
+  scores 0-100
+- 'sold_listing': the ORB + color + structure + edge comparison used by
+  SoldListingMatcher and SoldListingMatcherRequests, scores 0-1
+
+    scorer = get_scorer('sold_listing')
+    ref = scorer.extract(ref_image)
+    scores = scorer.score_batch(ref, [scorer.extract(image) for image in images])
+
+Scorers are shared singletons. They also share:
+
+- ORB descriptor matchers, created once per thread instead of once per
+  comparison. Brute force by default; the 'image_comparison.orb_matcher'
+  setting switches ratio-test matching to FLANN-LSH (approximate, faster on
+  large descriptor sets)
+- a bounded LRU cache of extracted features (get_feature_cache()), used by
+  the sold listing matchers for downloaded listing images in place of
+  unbounded per-instance dicts
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from batch_similarity import correlation_matrix, cosine_matrix
+
+# FLANN index parameters for binary (ORB) descriptors
+FLANN_INDEX_LSH = 6
+FLANN_LSH_PARAMS = dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+FLANN_SEARCH_PARAMS = dict(checks=50)
+
+DEFAULT_CACHE_ENTRIES = 512
+
+_thread_local = threading.local()
+
+
+# ---------------------------------------------------------------------------
+# Descriptor matchers
+# ---------------------------------------------------------------------------
+
+_matcher_kind: Optional[str] = None
+
+
+def matcher_kind() -> str:
+    """Configured ORB matcher for ratio-test matching: 'bf' or 'flann' (read once per process)."""
+    global _matcher_kind
+    if _matcher_kind is None:
+        try:
+            from settings_manager import get_setting
+            kind = str(get_setting('image_comparison.orb_matcher', 'bf')).lower()
+        except Exception:
+            kind = 'bf'
+        _matcher_kind = kind if kind in ('bf', 'flann') else 'bf'
+    return _matcher_kind
+
+
+def set_matcher_kind(kind: str):
+    """Override the configured ORB matcher for this process ('bf' or 'flann')."""
+    global _matcher_kind
+    if kind not in ('bf', 'flann'):
+        raise ValueError(f"Unknown ORB matcher {kind!r} (expected 'bf' or 'flann')")
+    _matcher_kind = kind
+
+
+def get_descriptor_matcher(kind: str = 'bf', cross_check: bool = False) -> cv2.DescriptorMatcher:
+    """
+    Hamming-distance matcher for ORB descriptors, reused by the calling thread.
+
+    Args:
+        kind: 'bf' (brute force) or 'flann' (FLANN-LSH)
+        cross_check: Brute-force cross-check (mutual nearest neighbours only)
+
+    Returns:
+        cv2.DescriptorMatcher
+    """
+    matchers = getattr(_thread_local, 'matchers', None)
+    if matchers is None:
+        matchers = _thread_local.matchers = {}
+    key = (kind, cross_check)
+    matcher = matchers.get(key)
+    if matcher is None:
+        if kind == 'flann':
+            matcher = cv2.FlannBasedMatcher(FLANN_LSH_PARAMS, FLANN_SEARCH_PARAMS)
+        else:
+            matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=cross_check)
+        matchers[key] = matcher
+    return matcher
+
+
+def knn_match(des1: np.ndarray, des2: np.ndarray, k: int = 2, kind: Optional[str] = None) -> list:
+    """
+    k nearest neighbours in des2 of every descriptor in des1.
+
+    FLANN-LSH may return fewer than k neighbours for a descriptor; callers
+    must handle short lists (the ratio tests here already do).
+    """
+    kind = kind or matcher_kind()
+    if kind == 'flann' and len(des2) >= k:
+        try:
+            return list(get_descriptor_matcher('flann').knnMatch(des1, des2, k=k))
+        except cv2.error as e:
+            logging.debug(f"FLANN matching failed, using brute force: {e}")
+    return list(get_descriptor_matcher('bf').knnMatch(des1, des2, k=k))
+
+
+def cross_check_match(des1: np.ndarray, des2: np.ndarray) -> list:
+    """Mutual nearest-neighbour matches of des1 in des2 (brute force, cross-checked)."""
+    return list(get_descriptor_matcher('bf', cross_check=True).match(des1, des2))
+
+
+# ---------------------------------------------------------------------------
+# Feature cache
+# ---------------------------------------------------------------------------
+
+class FeatureCache:
+    """
+    Thread-safe LRU cache of extracted features with a fixed number of entries.
+
+    Supports the dict operations the matchers used on their old per-instance
+    caches (in, [], []=, get, clear, len).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.put(key, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_feature_cache: Optional[FeatureCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_cache() -> FeatureCache:
+    """Global feature cache, sized by the 'image_comparison.feature_cache_entries' setting."""
+    global _feature_cache
+    with _cache_lock:
+        if _feature_cache is None:
+            try:
+                from settings_manager import get_setting
+                entries = int(get_setting('image_comparison.feature_cache_entries', DEFAULT_CACHE_ENTRIES))
+            except Exception:
+                entries = DEFAULT_CACHE_ENTRIES
+            _feature_cache = FeatureCache(entries)
+        return _feature_cache
+
+
+# ---------------------------------------------------------------------------
+# Scorers
+# ---------------------------------------------------------------------------
+
+class ImageScorer(ABC):
+    """
+    A feature extractor plus the similarity function over its features.
+
+    Subclasses implement extract() and score_batch(); scores within one
+    scorer are comparable, scores of different scorers are not.
+    """
+
+    name = ''
+
+    @abstractmethod
+    def extract(self, image: np.ndarray) -> Any:
+        """Features of one BGR image."""
+        raise NotImplementedError("Subclass must implement extract()")
+
+    def load_or_extract(self, image: np.ndarray) -> Any:
+        """extract(), going through the on-disk feature store where the scorer supports it."""
+        return self.extract(image)
+
+    @abstractmethod
+    def score_batch(self, reference: Any, candidates: Sequence[Any]) -> List[float]:
+        """Similarity of the reference features with each candidate's features."""
+        raise NotImplementedError("Subclass must implement score_batch()")
+
+    def score(self, reference: Any, candidate: Any) -> float:
+        """Similarity of two extracted feature sets."""
+        return self.score_batch(reference, [candidate])[0]
+
+    def score_images(self, image1: np.ndarray, image2: np.ndarray) -> float:
+        """Similarity of two BGR images (extracts both; prefer extract() + score_batch() for many)."""
+        return self.score(self.extract(image1), self.extract(image2))
+
+
+class CompareScorer(ImageScorer):
+    """
+    image_features comparison: template 60%, ORB 25%, SSIM 10%, histogram 5% (0-100).
+
+    Args:
+        use_ransac: Add RANSAC geometric verification
+        verbose: Print the per-metric breakdown of every pair
+    """
+
+    def __init__(self, use_ransac: bool = False, verbose: bool = True):
+        self.use_ransac = use_ransac
+        self.verbose = verbose
+        self.name = 'compare_ransac' if use_ransac else 'compare'
+
+    def extract(self, image):
+        from image_features import extract_features
+        return extract_features(image)
+
+    def load_or_extract(self, image):
+        from image_features import load_or_extract_features
+        return load_or_extract_features(image)
+
+    def score(self, reference, candidate):
+        from image_features import compare_features
+        return compare_features(reference, candidate, self.use_ransac, verbose=self.verbose)
+
+    def score_batch(self, reference, candidates):
+        from image_features import compare_features_batch
+        return compare_features_batch(reference, candidates, self.use_ransac, verbose=self.verbose)
+
+
+class SoldListingScorer(ImageScorer):
+    """
+    Sold listing comparison: ORB 40%, HSV histogram 30%, structure 20%, edges 10% (0-1).
+
+    Args:
+        image_size: Size images are resized to before extraction
+        orb_features: ORB keypoints per image
+    """
+
+    name = 'sold_listing'
+
+    # Bump when extract() output changes (invalidates stored features)
+    FEATURE_VERSION = 1
+
+    WEIGHTS = {
+        'orb': 0.4,         # ORB features are most important for exact matches
+        'color_hist': 0.3,  # Color similarity is very important for similar products
+        'structure': 0.2,   # Overall structure similarity
+        'edges': 0.1,       # Edge patterns
+    }
+
+    def __init__(self, image_size: tuple = (400, 400), orb_features: int = 2000):
+        self.image_size = image_size
+        self.orb_features = orb_features
+
+    def _orb(self):
+        """ORB detector for the calling thread (detectors are not shared across threads)."""
+        detectors = getattr(_thread_local, 'sold_orb', None)
+        if detectors is None:
+            detectors = _thread_local.sold_orb = {}
+        if self.orb_features not in detectors:
+            detectors[self.orb_features] = cv2.ORB_create(nfeatures=self.orb_features)
+        return detectors[self.orb_features]
+
+    def extract(self, image: np.ndarray) -> Dict[str, np.ndarray]:
+        """Extract multiple types of features from image for robust comparison"""
+        try:
+            # Resize image for consistent comparison
+            resized = cv2.resize(image, self.image_size)
+
+            # Convert to grayscale
+            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+
+            features = {}
+
+            # 1. ORB features for keypoint matching
+            keypoints, descriptors = self._orb().detectAndCompute(gray, None)
+            features['orb'] = descriptors if descriptors is not None else np.array([])
+
+            # 2. Color histogram for overall color similarity
+            hsv = cv2.cvtColor(resized, cv2.COLOR_BGR2HSV)
+            hist_h = cv2.calcHist([hsv], [0], None, [50], [0, 180])
+            hist_s = cv2.calcHist([hsv], [1], None, [60], [0, 256])
+            hist_v = cv2.calcHist([hsv], [2], None, [60], [0, 256])
+            features['color_hist'] = np.concatenate([hist_h.flatten(), hist_s.flatten(), hist_v.flatten()])
+
+            # 3. Structural similarity (using template matching on smaller scale)
+            small_gray = cv2.resize(gray, (64, 64))
+            features['structure'] = small_gray.flatten().astype(np.float32)
+
+            # 4. Edge features for shape comparison
+            edges = cv2.Canny(gray, 50, 150)
+            edge_hist = cv2.calcHist([edges], [0], None, [256], [0, 256])
+            features['edges'] = edge_hist.flatten()
+
+            return features
+
+        except Exception as e:
+            logging.debug(f"Error extracting image features: {e}")
+            return {'orb': np.array([]), 'color_hist': np.array([]), 'structure': np.array([]), 'edges': np.array([])}
+
+    def load_or_extract(self, image: np.ndarray) -> Dict[str, np.ndarray]:
+        """Extract image features, reusing features stored by earlier runs"""
+        from feature_store import get_or_extract
+        return get_or_extract(image, self.name, self.FEATURE_VERSION, self.extract)
+
+    def score_batch(self, reference: Dict[str, np.ndarray], candidates: Sequence[Dict[str, np.ndarray]]) -> List[float]:
+        """
+        Similarity of the reference feature set with each candidate feature set.
+
+        The color, structure and edge metrics are computed for all candidates at
+        once as matrix operations (batch_similarity); ORB matching runs per pair.
+        """
+        scores = [0.0] * len(candidates)
+        try:
+            if not reference:
+                return scores
+            valid = [i for i, features in enumerate(candidates) if features]
+
+            # Color histogram and edge correlation, structure cosine similarity
+            batch_metrics = {}
+            for key, metric in (('color_hist', correlation_matrix), ('structure', cosine_matrix),
+                                ('edges', correlation_matrix)):
+                values = np.zeros(len(candidates))
+                usable = [i for i in valid if len(candidates[i][key]) > 0]
+                if len(reference[key]) > 0 and usable:
+                    values[usable] = np.maximum(0.0, metric(np.ravel(reference[key]),
+                                                            [candidates[i][key] for i in usable]))
+                batch_metrics[key] = values
+
+            for i in valid:
+                similarities = {
+                    'orb': self.orb_similarity(reference['orb'], candidates[i]['orb']),
+                    'color_hist': float(batch_metrics['color_hist'][i]),
+                    'structure': float(batch_metrics['structure'][i]),
+                    'edges': float(batch_metrics['edges'][i]),
+                }
+                scores[i] = self.combine(similarities)
+
+        except Exception as e:
+            logging.debug(f"Error calculating similarity: {e}")
+        return scores
+
+    def orb_similarity(self, descriptors1: np.ndarray, descriptors2: np.ndarray) -> float:
+        """ORB descriptor match ratio (0-1)"""
+        orb_sim = 0.0
+        if len(descriptors1) > 0 and len(descriptors2) > 0:
+            try:
+                matches = cross_check_match(descriptors1, descriptors2)
+
+                if len(matches) > 0:
+                    # Use more lenient distance threshold for similar but not identical images
+                    good_matches = [m for m in matches if m.distance < 70]  # Increased from 50
+                    # Normalize by minimum feature count for better scaling
+                    min_features = min(len(descriptors1), len(descriptors2))
+                    orb_sim = len(good_matches) / max(min_features, 1)
+                    orb_sim = min(orb_sim, 1.0)
+            except Exception as e:
+                logging.debug(f"ORB matching error: {e}")
+                orb_sim = 0.0
+        return orb_sim
+
+    def combine(self, similarities: Dict[str, float]) -> float:
+        """Weighted combination of the per-metric similarities"""
+        # Calculate weighted average
+        total_similarity = sum(similarities[key] * weight for key, weight in self.WEIGHTS.items())
+
+        # Bonus for multiple good matches
+        good_feature_count = sum(1 for sim in similarities.values() if sim > 0.5)
+        if good_feature_count >= 2:
+            total_similarity *= 1.1  # 10% bonus for multiple good feature matches
+
+        total_similarity = min(total_similarity, 1.0)
+
+        # Debug logging for similar images
+        if total_similarity > 0.2:
+            logging.info("Similarity breakdown: ORB=%.3f, Color=%.3f, Structure=%.3f, Edges=%.3f, Total=%.3f" % (
+                similarities['orb'], similarities['color_hist'], similarities['structure'],
+                similarities['edges'], total_similarity
+            ))
+
+        return total_similarity
+
+
+SCORERS: Dict[str, Callable[[], ImageScorer]] = {
+    'compare': CompareScorer,
+    'compare_ransac': lambda: CompareScorer(use_ransac=True),
+    'sold_listing': SoldListingScorer,
+}
+
+_scorers: Dict[str, ImageScorer] = {}
+_scorers_lock = threading.Lock()
+
+
+def register_scorer(name: str, factory: Callable[[], ImageScorer]):
+    """Make a scorer available to get_scorer() (replaces any scorer of that name)."""
+    with _scorers_lock:
+        SCORERS[name] = factory
+        _scorers.pop(name, None)
+
+
+def get_scorer(name: str) -> ImageScorer:
+    """
+    Shared instance of a registered scorer.
+
+    Args:
+        name: 'compare', 'compare_ransac', 'sold_listing' or a name passed to register_scorer()
+
+    Raises:
+        KeyError: No scorer of that name is registered
+    """
+    with _scorers_lock:
+        if name not in _scorers:
+            _scorers[name] = SCORERS[name]()
+        return _scorers[name]
@@ -20,6 +20,7 @@ import time
 from typing import List, Dict, Optional, Callable
 from datetime import datetime
 from browser_mimic import BrowserMimic
+from keyword_matcher import KeywordMatcher
 
 
 class MandarakeRSSMonitor:
@@ -65,6 +66,9 @@ class MandarakeRSSMonitor:
         # Track seen item GUIDs to avoid duplicates
         self.seen_items = set()
 
+        # Compiled keyword automaton (rebuilt only when keywords change)
+        self.keyword_matcher = KeywordMatcher()
+
     def fetch_feed(self, shop_code: str = 'all') -> Optional[List[Dict]]:
         """
         Fetch RSS feed for a shop.
@@ -203,13 +207,16 @@ class MandarakeRSSMonitor:
 
         Args:
             shop_code: Shop to monitor ('all' for all shops)
-            keywords: List of keywords to match (case-insensitive)
-            callback: Function to call when match found
+            keywords: List of keywords to match (case- and width-insensitive)
+            callback: Function to call when match found (item gets a
+                      'matched_keywords' list)
             check_interval: Seconds between checks (default: 60)
         """
         print(f"Starting RSS monitor for shop '{shop_code}' with keywords: {keywords}")
         print(f"Check interval: {check_interval} seconds")
 
+        self.keyword_matcher.set_keywords(keywords)
+
         while True:
             try:
                 items = self.fetch_feed(shop_code)
@@ -221,19 +228,15 @@ class MandarakeRSSMonitor:
                         if not guid or guid in self.seen_items:
                             continue
 
-                        # Check if any keyword matches
-                        title = item.get('title', '').lower()
-                        description = item.get('description', '').lower()
-
-                        matched = False
-                        for keyword in keywords:
-                            kw_lower = keyword.lower()
-                            if kw_lower in title or kw_lower in description:
-                                matched = True
-                                break
+                        # Find all matching keywords in one pass over title + description
+                        matched_keywords = self.keyword_matcher.find_all(
+                            item.get('title'), item.get('description')
+                        )
 
-                        if matched:
+                        if matched_keywords:
+                            item['matched_keywords'] = matched_keywords
                             print(f"\n✓ MATCH FOUND: {item.get('title')}")
+                            print(f"  Keywords: {', '.join(matched_keywords)}")
                             print(f"  Link: {item.get('link')}")
                             print(f"  Published: {item.get('pub_date')}")
 
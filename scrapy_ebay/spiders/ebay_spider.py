@@ -60,22 +60,7 @@ class EbaySpider(scrapy.Spider):
             self.logger.error(f"Non-200 response: {response.status}")
             return
 
-        # Try multiple selectors for eBay items
-        item_selectors = [
-            '.s-item',
-            '.sresult',
-            '[data-testid="item"]',
-            '.x-item',
-            '.srp-results .s-item'
-        ]
-
-        items_found = []
-        for selector in item_selectors:
-            items = response.css(selector)
-            if items:
-                self.logger.info(f"Found {len(items)} items with selector: {selector}")
-                items_found = items
-                break
+        items_found = self.select_item_containers(response)
 
         if not items_found:
             self.logger.warning("No items found with any selector")
@@ -136,6 +121,25 @@ class EbaySpider(scrapy.Spider):
 
             self.items_scraped += 1
 
+    def select_item_containers(self, response):
+        """Find the search result item containers on a results page"""
+        # Try multiple selectors for eBay items
+        item_selectors = [
+            '.s-item',
+            '.sresult',
+            '[data-testid="item"]',
+            '.x-item',
+            '.srp-results .s-item'
+        ]
+
+        for selector in item_selectors:
+            items = response.css(selector)
+            if items:
+                self.logger.info(f"Found {len(items)} items with selector: {selector}")
+                return items
+
+        return []
+
     def extract_search_item_data(self, item_selector):
         """Extract basic item data from search results"""
         data = {}
@@ -27,10 +27,28 @@ class ScrapyEbayRunner:
         self.logger = logging.getLogger(__name__)
 
     def run_spider(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        """Run the eBay spider and return results using subprocess"""
+        """Run the eBay spider and return results (crawler service, subprocess fallback)"""
         self.results = []
         self.is_running = True
 
+        from ebay_search_service import SearchServiceError, get_search_service, search_service_enabled
+
+        if search_service_enabled():
+            try:
+                self.logger.info(f"Starting Scrapy spider for query: {query} (crawler service)")
+                self.results = get_search_service('ebay').crawl(
+                    'ebay', timeout=120, query=query, max_results=max_results
+                )
+                if self.results.timed_out:
+                    self.logger.warning(f"Spider timed out after 120 seconds, "
+                                        f"keeping {len(self.results)} partial results")
+                else:
+                    self.logger.info(f"Loaded {len(self.results)} results from spider")
+                self.is_running = False
+                return self.results
+            except SearchServiceError as e:
+                self.logger.warning(f"Crawler service unavailable ({e}), falling back to subprocess")
+
         try:
             # Create temporary output file
             with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
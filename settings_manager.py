@@ -34,6 +34,8 @@ class SettingsManager:
                 "language": "en",
                 "thumbnail_width": 400,
                 "csv_thumbnails_enabled": True,
+                "thumbnail_cache_max_mb": 256,
+                "csv_sidecar_cache": True,
                 "auto_save_configs": True,
                 "recent_files_limit": 10
             },
@@ -59,7 +61,13 @@ class SettingsManager:
                 "search_method": "scrapy",
                 "max_results": 10,
                 "sold_listings": True,
-                "days_back": 90
+                "days_back": 90,
+                "use_search_service": True,
+                "search_service_concurrency": 4,
+                "search_cache_enabled": True,
+                "search_cache_ttl_hours": 24,
+                "search_cache_active_ttl_minutes": 30,
+                "search_cache_stale_hours": 72
             },
 
             # eBay API credentials
@@ -82,6 +90,24 @@ class SettingsManager:
                 "profit_threshold": 20,
                 "enable_ransac": False,
                 "save_debug_images": False,
+                "debug_artifacts": "full",
+                "matches_per_item": 0,
+                "incremental_compare": True,
+                "compare_cache_max_age_hours": 24,
+                "feature_store_enabled": True,
+                "feature_store_max_mb": 512,
+                "prefilter_top_k": 0,
+                "prefilter_guard_radius": 24,
+                "use_process_pool": True,
+                "process_workers": 0,
+                "embedding_index_enabled": True,
+                "reduced_decode": True,
+                "fetch_concurrency": 16,
+                "fetch_per_host": 6,
+                "orb_matcher": "bf",
+                "feature_cache_entries": 512,
+                "image_cache_max_mb": 1024,
+                "image_cache_max_age_days": 30,
                 "weights": {
                     "template": 60,
                     "orb": 25,
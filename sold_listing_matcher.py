@@ -10,17 +10,20 @@ import os
 import logging
 import asyncio
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta
-import cv2
 import numpy as np
 from PIL import Image
-import requests
 from playwright.async_api import async_playwright, Browser, Page
 from dataclasses import dataclass
 from search_optimizer import SearchOptimizer
-
+from image_cache import get_image
+from image_decode import decode_image, load_image
+from matching_core import get_feature_cache, get_scorer
+from async_image_fetch import AsyncImageFetcher
+from debug_artifacts import get_artifact_writer
 
 @dataclass
 class SoldListing:
@@ -56,14 +59,18 @@ class SoldListingMatcher:
 
         # Image comparison settings
         self.image_size = (400, 400)  # Larger size for better feature detection
-        self.feature_detector = cv2.ORB_create(nfeatures=2000)  # More features for better matching
+        self.scorer = get_scorer('sold_listing')
+        # Listing features are extracted off the event loop
+        self._feature_executor: Optional[ThreadPoolExecutor] = None
 
         # Browser setup
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
 
-        # Cache for downloaded images
-        self.image_cache = {}
+        # Features of downloaded images (bounded, shared by all matchers)
+        self.image_cache = get_feature_cache()
+        # Decoded listing images not yet added to the embedding index
+        self.downloaded_images = {}
 
         # Track current search URL for better linking
         self.current_search_url = ""
@@ -369,26 +376,21 @@ class SoldListingMatcher:
                     try:
                         logging.info(f"Downloading image {i+1} immediately: {img_src}")
 
-                        import requests, os, cv2, numpy as np
-                        response = requests.get(img_src, timeout=10, headers={
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                        })
-                        response.raise_for_status()
+                        # Shared image cache, off the event loop
+                        image = await asyncio.get_running_loop().run_in_executor(
+                            None, get_image, img_src, max(self.image_size))
 
                         filename = f"listing_{i+1:02d}.jpg"
                         debug_path = os.path.join(self.debug_output_dir, filename)
-                        os.makedirs(self.debug_output_dir, exist_ok=True)
-
-                        image_array = np.frombuffer(response.content, np.uint8)
-                        image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
 
                         if image is not None:
-                            cv2.imwrite(debug_path, image)
-                            logging.info(f"✅ Saved debug image immediately: {debug_path}")
+                            # Written in the background from the cached download
+                            get_artifact_writer().submit(debug_path, image, url=img_src)
+                            logging.info(f"✅ Queued debug image immediately: {debug_path}")
 
                             try:
-                                features = self._extract_image_features(image)
-                                cache_key = f"{img_src}_{i}"
+                                features = self._get_image_features(image)
+                                cache_key = (self.scorer.name, img_src)
                                 self.image_cache[cache_key] = features
                                 logging.debug(f"Cached features for image {i+1}")
                             except Exception as cache_error:
@@ -624,28 +626,22 @@ class SoldListingMatcher:
                         try:
                             logging.info(f"Downloading image {i+1}/{max_results}: {title[:50]}...")
 
-                            import requests, os, cv2, numpy as np
-                            response = requests.get(img_src, timeout=10, headers={
-                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                            })
-                            response.raise_for_status()
+                            # Shared image cache, off the event loop
+                            image = await asyncio.get_running_loop().run_in_executor(
+                                None, get_image, img_src, max(self.image_size))
 
                             filename = f"listing_{i+1:02d}.jpg"
                             debug_path = os.path.join(self.debug_output_dir, filename)
-                            os.makedirs(self.debug_output_dir, exist_ok=True)
-
-                            # Convert and save image
-                            image_array = np.frombuffer(response.content, np.uint8)
-                            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
 
                             if image is not None:
-                                cv2.imwrite(debug_path, image)
-                                logging.info(f"✅ Saved debug image: {debug_path}")
+                                # Written in the background from the cached download
+                                get_artifact_writer().submit(debug_path, image, url=img_src)
+                                logging.info(f"✅ Queued debug image: {debug_path}")
 
                                 # Cache features for comparison
                                 try:
-                                    features = self._extract_image_features(image)
-                                    cache_key = f"{img_src}_{i}"
+                                    features = self._get_image_features(image)
+                                    cache_key = (self.scorer.name, img_src)
                                     self.image_cache[cache_key] = features
                                     logging.debug(f"Cached features for image {i+1}")
                                 except Exception as cache_error:
@@ -710,30 +706,56 @@ class SoldListingMatcher:
         """Compare reference image with listing images"""
         matches = []
 
-        for i, listing in enumerate(listings):
-            try:
-                # Download and process listing image
-                listing_features = await self._download_and_process_image(listing.image_url, i)
+        # Download all listing images concurrently; each image's features are
+        # extracted in the thread pool as soon as it arrives
+        async with AsyncImageFetcher() as fetcher:
+            results = await asyncio.gather(
+                *(self._download_and_process_image(listing.image_url, i, fetcher)
+                  for i, listing in enumerate(listings)),
+                return_exceptions=True)
 
-                if listing_features is not None:
-                    # Calculate similarity
-                    similarity = self._calculate_image_similarity(reference_features, listing_features)
+        downloaded = []
+        for listing, listing_features in zip(listings, results):
+            if isinstance(listing_features, Exception):
+                logging.debug(f"Error comparing image for listing: {listing_features}")
+            elif listing_features is not None:
+                downloaded.append((listing, listing_features))
 
-                    if similarity >= self.similarity_threshold:
-                        listing.image_similarity = similarity
-                        listing.confidence_score = self._calculate_confidence_score(listing, similarity)
-                        matches.append(listing)
+        self._index_listing_images(listings)
 
-                        logging.info(f"Match found: {listing.title[:50]}... (similarity: {similarity:.2f})")
+        # Score all listings against the reference at once
+        similarities = self.scorer.score_batch(reference_features,
+                                               [features for _, features in downloaded])
 
-            except Exception as e:
-                logging.debug(f"Error comparing image for listing: {e}")
-                continue
+        for (listing, _), similarity in zip(downloaded, similarities):
+            if similarity >= self.similarity_threshold:
+                listing.image_similarity = similarity
+                listing.confidence_score = self._calculate_confidence_score(listing, similarity)
+                matches.append(listing)
+
+                logging.info(f"Match found: {listing.title[:50]}... (similarity: {similarity:.2f})")
 
         # Sort by similarity score
         matches.sort(key=lambda x: x.image_similarity, reverse=True)
         return matches
 
+    def _index_listing_images(self, listings: List[SoldListing]):
+        """Add the downloaded listing images to the embedding index of comps"""
+        from image_index import index_listing_images
+        entries = []
+        for listing in listings:
+            image = self.downloaded_images.pop(listing.image_url, None)
+            if image is not None:
+                entries.append((listing.image_url, image, {
+                    'title': listing.title,
+                    'price': listing.price,
+                    'currency': listing.currency,
+                    'sold_date': listing.sold_date,
+                    'url': listing.listing_url,
+                    'source': 'sold_listing',
+                }))
+        index_listing_images(entries)
+
     async def _load_and_process_image(self, image_path: str) -> Optional[dict]:
         """Load and extract features from reference image"""
         try:
@@ -741,54 +763,48 @@ class SoldListingMatcher:
                 raise FileNotFoundError(f"Reference image not found: {image_path}")
 
             # Load image
-            image = cv2.imread(image_path)
+            image = load_image(image_path, self.image_size)
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
 
-            return self._extract_image_features(image)
+            return self._get_image_features(image)
 
         except Exception as e:
             logging.error(f"Error processing reference image: {e}")
             return None
 
-    async def _download_and_process_image(self, image_url: str, listing_index: int = 0) -> Optional[dict]:
-        """Download and process image from URL"""
+    async def _download_and_process_image(self, image_url: str, listing_index: int = 0,
+                                          fetcher: Optional[AsyncImageFetcher] = None) -> Optional[dict]:
+        """Download and process image from URL without blocking the event loop"""
         try:
             # Check cache first
-            cache_key = f"{image_url}_{listing_index}"
+            cache_key = (self.scorer.name, image_url)
             if cache_key in self.image_cache:
                 return self.image_cache[cache_key]
 
+            if fetcher is None:
+                async with AsyncImageFetcher() as fetcher:
+                    return await self._download_and_process_image(image_url, listing_index, fetcher)
+
             logging.info(f"Downloading image {listing_index + 1}: {image_url}")
 
             # Download image
-            response = requests.get(image_url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
+            data = await fetcher.fetch(image_url)
+            if data is None:
+                return None
 
-            logging.info(f"Downloaded image {listing_index + 1}: {len(response.content):,} bytes")
+            logging.info(f"Downloaded image {listing_index + 1}: {len(data):,} bytes")
 
-            # Convert to OpenCV format
-            image_array = np.frombuffer(response.content, np.uint8)
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+            # Decode and extract features in the thread pool
+            image, features = await asyncio.get_running_loop().run_in_executor(
+                self._get_feature_executor(), self._decode_and_extract, data, listing_index)
 
             if image is None:
                 logging.warning(f"Failed to decode image {listing_index + 1}: {image_url}")
                 return None
 
-            logging.info(f"Decoded image {listing_index + 1}: {image.shape} shape")
-
-            # Save debug image if requested
-            if self.debug_output_dir:
-                import os
-                filename = f"listing_{listing_index + 1:02d}.jpg"
-                debug_path = os.path.join(self.debug_output_dir, filename)
-                cv2.imwrite(debug_path, image)
-                logging.info(f"Saved debug image: {debug_path}")
-
-            # Extract features
-            features = self._extract_image_features(image)
+            # Keep the decoded image for the embedding index
+            self.downloaded_images[image_url] = image
 
             # Cache result
             self.image_cache[cache_key] = features
@@ -799,131 +815,34 @@ class SoldListingMatcher:
             logging.debug(f"Error downloading/processing image {image_url}: {e}")
             return None
 
-    def _extract_image_features(self, image: np.ndarray) -> dict:
-        """Extract multiple types of features from image for robust comparison"""
-        try:
-            # Resize image for consistent comparison
-            resized = cv2.resize(image, self.image_size)
-
-            # Convert to grayscale
-            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+    def _decode_and_extract(self, data: bytes, listing_index: int) -> Tuple[Optional[np.ndarray], Optional[dict]]:
+        """Decode a downloaded image and extract its features (runs in the feature thread pool)"""
+        # Convert to OpenCV format
+        image = decode_image(data, self.image_size)
+        if image is None:
+            return None, None
 
-            features = {}
+        logging.info(f"Decoded image {listing_index + 1}: {image.shape} shape")
 
-            # 1. ORB features for keypoint matching
-            keypoints, descriptors = self.feature_detector.detectAndCompute(gray, None)
-            features['orb'] = descriptors if descriptors is not None else np.array([])
-
-            # 2. Color histogram for overall color similarity
-            hsv = cv2.cvtColor(resized, cv2.COLOR_BGR2HSV)
-            hist_h = cv2.calcHist([hsv], [0], None, [50], [0, 180])
-            hist_s = cv2.calcHist([hsv], [1], None, [60], [0, 256])
-            hist_v = cv2.calcHist([hsv], [2], None, [60], [0, 256])
-            features['color_hist'] = np.concatenate([hist_h.flatten(), hist_s.flatten(), hist_v.flatten()])
-
-            # 3. Structural similarity (using template matching on smaller scale)
-            small_gray = cv2.resize(gray, (64, 64))
-            features['structure'] = small_gray.flatten().astype(np.float32)
-
-            # 4. Edge features for shape comparison
-            edges = cv2.Canny(gray, 50, 150)
-            edge_hist = cv2.calcHist([edges], [0], None, [256], [0, 256])
-            features['edges'] = edge_hist.flatten()
-
-            return features
-
-        except Exception as e:
-            logging.debug(f"Error extracting image features: {e}")
-            return {'orb': np.array([]), 'color_hist': np.array([]), 'structure': np.array([]), 'edges': np.array([])}
-
-    def _calculate_image_similarity(self, features1: dict, features2: dict) -> float:
-        """Calculate similarity between two multi-feature sets using weighted combination"""
-        try:
-            print(f"[DEBUG] Playwright similarity calculation called with types: {type(features1)}, {type(features2)}")
-            if not features1 or not features2:
-                return 0.0
-
-            similarities = {}
-            weights = {
-                'orb': 0.4,      # ORB features are most important for exact matches
-                'color_hist': 0.3, # Color similarity is very important for similar products
-                'structure': 0.2,  # Overall structure similarity
-                'edges': 0.1       # Edge patterns
-            }
+        # Save debug image if requested
+        if self.debug_output_dir:
+            filename = f"listing_{listing_index + 1:02d}.jpg"
+            debug_path = os.path.join(self.debug_output_dir, filename)
+            get_artifact_writer().submit(debug_path, image, data=data)
+            logging.info(f"Queued debug image: {debug_path}")
 
-            # 1. ORB feature matching
-            orb_sim = 0.0
-            if len(features1['orb']) > 0 and len(features2['orb']) > 0:
-                try:
-                    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-                    matches = bf.match(features1['orb'], features2['orb'])
-
-                    if len(matches) > 0:
-                        # Use more lenient distance threshold for similar but not identical images
-                        good_matches = [m for m in matches if m.distance < 70]  # Increased from 50
-                        # Normalize by minimum feature count for better scaling
-                        min_features = min(len(features1['orb']), len(features2['orb']))
-                        orb_sim = len(good_matches) / max(min_features, 1)
-                        orb_sim = min(orb_sim, 1.0)
-                except Exception as e:
-                    logging.debug(f"ORB matching error: {e}")
-                    orb_sim = 0.0
-            similarities['orb'] = orb_sim
-
-            # 2. Color histogram similarity
-            if len(features1['color_hist']) > 0 and len(features2['color_hist']) > 0:
-                color_sim = cv2.compareHist(features1['color_hist'], features2['color_hist'], cv2.HISTCMP_CORREL)
-                color_sim = max(0.0, color_sim)  # Ensure non-negative
-            else:
-                color_sim = 0.0
-            similarities['color_hist'] = color_sim
-
-            # 3. Structural similarity (normalized cross-correlation)
-            if len(features1['structure']) > 0 and len(features2['structure']) > 0:
-                # Normalize features
-                struct1 = features1['structure'] / (np.linalg.norm(features1['structure']) + 1e-8)
-                struct2 = features2['structure'] / (np.linalg.norm(features2['structure']) + 1e-8)
-                struct_sim = np.dot(struct1, struct2)
-                struct_sim = max(0.0, struct_sim)  # Ensure non-negative
-            else:
-                struct_sim = 0.0
-            similarities['structure'] = struct_sim
-
-            # 4. Edge similarity
-            if len(features1['edges']) > 0 and len(features2['edges']) > 0:
-                edge_sim = cv2.compareHist(features1['edges'], features2['edges'], cv2.HISTCMP_CORREL)
-                edge_sim = max(0.0, edge_sim)  # Ensure non-negative
-            else:
-                edge_sim = 0.0
-            similarities['edges'] = edge_sim
-
-            # Calculate weighted average
-            total_similarity = sum(similarities[key] * weights[key] for key in weights.keys())
-
-            # Bonus for multiple good matches
-            good_feature_count = sum(1 for sim in similarities.values() if sim > 0.5)
-            if good_feature_count >= 2:
-                total_similarity *= 1.1  # 10% bonus for multiple good feature matches
-
-            total_similarity = min(total_similarity, 1.0)
-
-            # Debug logging for similar images
-            if total_similarity > 0.2:
-                try:
-                    logging.info("Similarity breakdown: ORB=%.3f, Color=%.3f, Structure=%.3f, Edges=%.3f, Total=%.3f" % (
-                        similarities['orb'], similarities['color_hist'], similarities['structure'],
-                        similarities['edges'], total_similarity
-                    ))
-                except Exception as format_error:
-                    print(f"[DEBUG] Format error in similarity logging: {format_error}")
-                    print(f"[DEBUG] Similarities: {similarities}")
-                    print(f"[DEBUG] Total: {total_similarity}")
+        return image, self._get_image_features(image)
 
-            return total_similarity
+    def _get_feature_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for listing feature extraction (created on first use)"""
+        if self._feature_executor is None:
+            self._feature_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                        thread_name_prefix='sold-listing-features')
+        return self._feature_executor
 
-        except Exception as e:
-            logging.debug(f"Error calculating similarity: {e}")
-            return 0.0
+    def _get_image_features(self, image: np.ndarray) -> dict:
+        """Extract image features, reusing features stored by earlier runs"""
+        return self.scorer.load_or_extract(image)
 
     def _calculate_confidence_score(self, listing: SoldListing, similarity: float) -> float:
         """Calculate overall confidence score for a match"""
@@ -1105,8 +1024,11 @@ class SoldListingMatcher:
                 finally:
                     self._playwright_instance = None
 
-            # Clear image cache
-            self.image_cache.clear()
+            # Stop the feature extraction threads (the feature cache is shared
+            # with other matchers and bounded, so it is kept)
+            if self._feature_executor is not None:
+                self._feature_executor.shutdown(wait=False)
+                self._feature_executor = None
             logging.debug("Cleanup completed successfully")
 
         except Exception as e:
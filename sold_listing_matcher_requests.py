@@ -8,7 +8,6 @@ instead of Playwright which gets blocked more easily.
 
 import logging
 import re
-import cv2
 import numpy as np
 import requests
 from typing import List, Dict, Optional, Tuple
@@ -19,8 +18,11 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote_plus
 
 from browser_mimic import BrowserMimic
+from debug_artifacts import get_artifact_writer
 from search_optimizer import SearchOptimizer
-
+from image_cache import get_image_bytes
+from image_decode import decode_image, load_image
+from matching_core import get_feature_cache, get_scorer
 
 @dataclass
 class SoldListing:
@@ -55,13 +57,15 @@ class SoldListingMatcherRequests:
 
         # Image comparison settings
         self.image_size = (400, 400)  # Larger size for better feature detection
-        self.feature_detector = cv2.ORB_create(nfeatures=2000)  # More features for better matching
+        self.scorer = get_scorer('sold_listing')
 
         # Browser mimic for eBay requests
         self.browser = BrowserMimic("ebay_sold_listings.pkl")
 
-        # Cache for downloaded images
-        self.image_cache = {}
+        # Features of downloaded images (bounded, shared by all matchers)
+        self.image_cache = get_feature_cache()
+        # Decoded listing images not yet added to the embedding index
+        self.downloaded_images = {}
 
         # Debug output directory
         self.debug_output_dir = debug_output_dir
@@ -490,30 +494,19 @@ class SoldListingMatcherRequests:
         logging.info(f"Starting image comparison with {len(listings)} listings")
         logging.info(f"Similarity threshold: {self.similarity_threshold:.2f}")
 
+        # Download and process listing images
+        downloaded = []
         for i, listing in enumerate(listings):
             try:
-                logging.info(f"\n=== Comparing listing {i + 1}/{len(listings)} ===")
+                logging.info(f"\n=== Processing listing {i + 1}/{len(listings)} ===")
                 logging.info(f"Title: {listing.title[:60]}...")
                 logging.info(f"Price: ${listing.price}")
                 logging.info(f"Image URL: {listing.image_url}")
 
-                # Download and process listing image
                 listing_features = self._download_and_process_image(listing.image_url, i)
 
                 if listing_features is not None:
-                    # Calculate similarity
-                    similarity = self._calculate_image_similarity(reference_features, listing_features)
-
-                    logging.info(f"Similarity score: {similarity:.3f} (threshold: {self.similarity_threshold:.3f})")
-
-                    if similarity >= self.similarity_threshold:
-                        listing.image_similarity = similarity
-                        listing.confidence_score = self._calculate_confidence_score(listing, similarity)
-                        matches.append(listing)
-
-                        logging.info(f"✅ MATCH FOUND! Similarity: {similarity:.3f}")
-                    else:
-                        logging.info(f"❌ Below threshold. Similarity: {similarity:.3f} < {self.similarity_threshold:.3f}")
+                    downloaded.append((i, listing, listing_features))
                 else:
                     logging.warning(f"❌ Could not process image for listing {i + 1}")
 
@@ -521,6 +514,24 @@ class SoldListingMatcherRequests:
                 logging.error(f"Error comparing image for listing {i + 1}: {e}")
                 continue
 
+        self._index_listing_images(listings)
+
+        # Score all listings against the reference at once
+        similarities = self.scorer.score_batch(reference_features,
+                                               [features for _, _, features in downloaded])
+
+        for (i, listing, _), similarity in zip(downloaded, similarities):
+            logging.info(f"Listing {i + 1} similarity score: {similarity:.3f} (threshold: {self.similarity_threshold:.3f})")
+
+            if similarity >= self.similarity_threshold:
+                listing.image_similarity = similarity
+                listing.confidence_score = self._calculate_confidence_score(listing, similarity)
+                matches.append(listing)
+
+                logging.info(f"✅ MATCH FOUND! Similarity: {similarity:.3f}")
+            else:
+                logging.info(f"❌ Below threshold. Similarity: {similarity:.3f} < {self.similarity_threshold:.3f}")
+
         logging.info(f"\n=== COMPARISON COMPLETE ===")
         logging.info(f"Total matches found: {len(matches)}")
 
@@ -528,6 +539,23 @@ class SoldListingMatcherRequests:
         matches.sort(key=lambda x: x.image_similarity, reverse=True)
         return matches
 
+    def _index_listing_images(self, listings: List[SoldListing]):
+        """Add the downloaded listing images to the embedding index of comps"""
+        from image_index import index_listing_images
+        entries = []
+        for listing in listings:
+            image = self.downloaded_images.pop(listing.image_url, None)
+            if image is not None:
+                entries.append((listing.image_url, image, {
+                    'title': listing.title,
+                    'price': listing.price,
+                    'currency': listing.currency,
+                    'sold_date': listing.sold_date,
+                    'url': listing.listing_url,
+                    'source': 'sold_listing',
+                }))
+        index_listing_images(entries)
+
     def _load_and_process_image(self, image_path: str) -> Optional[dict]:
         """Load and extract features from reference image"""
         try:
@@ -537,7 +565,7 @@ class SoldListingMatcherRequests:
             logging.info(f"Loading reference image: {image_path}")
 
             # Load image
-            image = cv2.imread(image_path)
+            image = load_image(image_path, self.image_size)
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
 
@@ -547,11 +575,11 @@ class SoldListingMatcherRequests:
             if self.debug_output_dir:
                 import os
                 debug_path = os.path.join(self.debug_output_dir, "reference_image.jpg")
-                cv2.imwrite(debug_path, image)
-                logging.info(f"Saved reference image copy: {debug_path}")
+                get_artifact_writer().submit(debug_path, image, source_file=image_path)
+                logging.info(f"Queued reference image copy: {debug_path}")
 
             # Extract features
-            features = self._extract_image_features(image)
+            features = self._get_image_features(image)
 
             if features is not None:
                 feature_count = len(features) if hasattr(features, '__len__') else "histogram"
@@ -569,24 +597,25 @@ class SoldListingMatcherRequests:
         """Download and process image from URL"""
         try:
             # Check cache first
-            if image_url in self.image_cache:
+            cache_key = (self.scorer.name, image_url)
+            if cache_key in self.image_cache:
                 logging.debug(f"Using cached image: {image_url}")
-                return self.image_cache[image_url]
+                return self.image_cache[cache_key]
 
             logging.info(f"Downloading image {listing_index + 1}: {image_url}")
 
-            # Download image using browser mimic
-            response = self.browser.get(image_url)
+            # Download image through the shared image cache, fetching with the
+            # browser mimic so the request keeps its cookies and headers
+            data = get_image_bytes(image_url, session=self.browser)
 
-            if response.status_code != 200:
-                logging.warning(f"Failed to download image (status {response.status_code}): {image_url}")
+            if data is None:
+                logging.warning(f"Failed to download image: {image_url}")
                 return None
 
-            logging.info(f"Downloaded image {listing_index + 1}: {len(response.content)} bytes")
+            logging.info(f"Downloaded image {listing_index + 1}: {len(data)} bytes")
 
             # Convert to OpenCV format
-            image_array = np.frombuffer(response.content, np.uint8)
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+            image = decode_image(data, self.image_size)
 
             if image is None:
                 logging.warning(f"Failed to decode image: {image_url}")
@@ -594,16 +623,19 @@ class SoldListingMatcherRequests:
 
             logging.info(f"Decoded image {listing_index + 1}: {image.shape} shape")
 
+            # Keep the decoded image for the embedding index
+            self.downloaded_images[image_url] = image
+
             # Save debug image if requested
             if self.debug_output_dir:
                 import os
                 filename = f"listing_{listing_index + 1:02d}.jpg"
                 debug_path = os.path.join(self.debug_output_dir, filename)
-                cv2.imwrite(debug_path, image)
-                logging.info(f"Saved debug image: {debug_path}")
+                get_artifact_writer().submit(debug_path, image, data=data)
+                logging.info(f"Queued debug image: {debug_path}")
 
             # Extract features
-            features = self._extract_image_features(image)
+            features = self._get_image_features(image)
 
             if features is not None:
                 feature_count = len(features) if hasattr(features, '__len__') else "histogram"
@@ -612,7 +644,7 @@ class SoldListingMatcherRequests:
                 logging.warning(f"No features extracted from image {listing_index + 1}")
 
             # Cache result
-            self.image_cache[image_url] = features
+            self.image_cache[cache_key] = features
 
             return features
 
@@ -620,125 +652,9 @@ class SoldListingMatcherRequests:
             logging.error(f"Error downloading/processing image {image_url}: {e}")
             return None
 
-    def _extract_image_features(self, image: np.ndarray) -> dict:
-        """Extract multiple types of features from image for robust comparison"""
-        try:
-            # Resize image for consistent comparison
-            resized = cv2.resize(image, self.image_size)
-
-            # Convert to grayscale
-            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-
-            features = {}
-
-            # 1. ORB features for keypoint matching
-            keypoints, descriptors = self.feature_detector.detectAndCompute(gray, None)
-            features['orb'] = descriptors if descriptors is not None else np.array([])
-
-            # 2. Color histogram for overall color similarity
-            hsv = cv2.cvtColor(resized, cv2.COLOR_BGR2HSV)
-            hist_h = cv2.calcHist([hsv], [0], None, [50], [0, 180])
-            hist_s = cv2.calcHist([hsv], [1], None, [60], [0, 256])
-            hist_v = cv2.calcHist([hsv], [2], None, [60], [0, 256])
-            features['color_hist'] = np.concatenate([hist_h.flatten(), hist_s.flatten(), hist_v.flatten()])
-
-            # 3. Structural similarity (using template matching on smaller scale)
-            small_gray = cv2.resize(gray, (64, 64))
-            features['structure'] = small_gray.flatten().astype(np.float32)
-
-            # 4. Edge features for shape comparison
-            edges = cv2.Canny(gray, 50, 150)
-            edge_hist = cv2.calcHist([edges], [0], None, [256], [0, 256])
-            features['edges'] = edge_hist.flatten()
-
-            return features
-
-        except Exception as e:
-            logging.debug(f"Error extracting image features: {e}")
-            return {'orb': np.array([]), 'color_hist': np.array([]), 'structure': np.array([]), 'edges': np.array([])}
-
-    def _calculate_image_similarity(self, features1: dict, features2: dict) -> float:
-        """Calculate similarity between two multi-feature sets using weighted combination"""
-        try:
-            if not features1 or not features2:
-                return 0.0
-
-            similarities = {}
-            weights = {
-                'orb': 0.4,      # ORB features are most important for exact matches
-                'color_hist': 0.3, # Color similarity is very important for similar products
-                'structure': 0.2,  # Overall structure similarity
-                'edges': 0.1       # Edge patterns
-            }
-
-            # 1. ORB feature matching
-            orb_sim = 0.0
-            if len(features1['orb']) > 0 and len(features2['orb']) > 0:
-                try:
-                    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-                    matches = bf.match(features1['orb'], features2['orb'])
-
-                    if len(matches) > 0:
-                        # Use more lenient distance threshold for similar but not identical images
-                        good_matches = [m for m in matches if m.distance < 70]  # Increased from 50
-                        # Normalize by minimum feature count for better scaling
-                        min_features = min(len(features1['orb']), len(features2['orb']))
-                        orb_sim = len(good_matches) / max(min_features, 1)
-                        orb_sim = min(orb_sim, 1.0)
-                except Exception as e:
-                    logging.debug(f"ORB matching error: {e}")
-                    orb_sim = 0.0
-            similarities['orb'] = orb_sim
-
-            # 2. Color histogram similarity
-            if len(features1['color_hist']) > 0 and len(features2['color_hist']) > 0:
-                color_sim = cv2.compareHist(features1['color_hist'], features2['color_hist'], cv2.HISTCMP_CORREL)
-                color_sim = max(0.0, color_sim)  # Ensure non-negative
-            else:
-                color_sim = 0.0
-            similarities['color_hist'] = color_sim
-
-            # 3. Structural similarity (normalized cross-correlation)
-            if len(features1['structure']) > 0 and len(features2['structure']) > 0:
-                # Normalize features
-                struct1 = features1['structure'] / (np.linalg.norm(features1['structure']) + 1e-8)
-                struct2 = features2['structure'] / (np.linalg.norm(features2['structure']) + 1e-8)
-                struct_sim = np.dot(struct1, struct2)
-                struct_sim = max(0.0, struct_sim)  # Ensure non-negative
-            else:
-                struct_sim = 0.0
-            similarities['structure'] = struct_sim
-
-            # 4. Edge similarity
-            if len(features1['edges']) > 0 and len(features2['edges']) > 0:
-                edge_sim = cv2.compareHist(features1['edges'], features2['edges'], cv2.HISTCMP_CORREL)
-                edge_sim = max(0.0, edge_sim)  # Ensure non-negative
-            else:
-                edge_sim = 0.0
-            similarities['edges'] = edge_sim
-
-            # Calculate weighted average
-            total_similarity = sum(similarities[key] * weights[key] for key in weights.keys())
-
-            # Bonus for multiple good matches
-            good_feature_count = sum(1 for sim in similarities.values() if sim > 0.5)
-            if good_feature_count >= 2:
-                total_similarity *= 1.1  # 10% bonus for multiple good feature matches
-
-            total_similarity = min(total_similarity, 1.0)
-
-            # Debug logging for similar images
-            if total_similarity > 0.2:
-                logging.info("Similarity breakdown: ORB=%.3f, Color=%.3f, Structure=%.3f, Edges=%.3f, Total=%.3f" % (
-                    similarities['orb'], similarities['color_hist'], similarities['structure'],
-                    similarities['edges'], total_similarity
-                ))
-
-            return total_similarity
-
-        except Exception as e:
-            logging.debug(f"Error calculating similarity: {e}")
-            return 0.0
+    def _get_image_features(self, image: np.ndarray) -> dict:
+        """Extract image features, reusing features stored by earlier runs"""
+        return self.scorer.load_or_extract(image)
 
     def _calculate_confidence_score(self, listing: SoldListing, similarity: float) -> float:
         """Calculate overall confidence score for a match"""
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Tests for the concurrent image downloader."""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import async_image_fetch
+from async_image_fetch import AsyncImageFetcher
+
+DELAY = 0.2
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).active += 1
+            type(self).peak = max(type(self).peak, type(self).active)
+        time.sleep(DELAY)
+        with self.lock:
+            type(self).active -= 1
+        if self.path.startswith('/missing'):
+            self.send_error(404)
+            return
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _SlowHandler.active = _SlowHandler.peak = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _SlowHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize('use_aiohttp', [True, False])
+def test_fetches_concurrently_within_per_host_cap(server, monkeypatch, use_aiohttp):
+    """Downloads overlap up to the per-host cap; failures come back as None."""
+    if use_aiohttp and not async_image_fetch.AIOHTTP_AVAILABLE:
+        pytest.skip('aiohttp not installed')
+    monkeypatch.setattr(async_image_fetch, 'AIOHTTP_AVAILABLE', use_aiohttp)
+    urls = [f"{server}/image{i}.jpg" for i in range(8)] + [f"{server}/missing.jpg"]
+
+    async def fetch_all():
+        async with AsyncImageFetcher(max_concurrency=16, per_host=4, use_cache=False) as fetcher:
+            return await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+
+    start = time.perf_counter()
+    results = asyncio.run(fetch_all())
+    elapsed = time.perf_counter() - start
+
+    assert results[:8] == [f"/image{i}.jpg".encode() for i in range(8)]
+    assert results[8] is None
+    assert _SlowHandler.peak == 4
+    # 9 requests, 4 at a time: 3 rounds, not 9
+    assert elapsed < 6 * DELAY
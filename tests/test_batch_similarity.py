@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Test the vectorized similarity metrics against their pairwise versions."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+from skimage.metrics import structural_similarity
+
+from batch_similarity import correlation_matrix, cosine_matrix, ssim_matrix
+from image_features import compare_features, compare_features_batch, extract_features
+
+
+def _gray_images(count, seed, size=(96, 80)):
+    rng = np.random.default_rng(seed)
+    return [cv2.GaussianBlur(rng.integers(0, 256, size, dtype=np.uint8), (5, 5), 0) for _ in range(count)]
+
+
+def test_matrices_match_pairwise_metrics():
+    rng = np.random.default_rng(0)
+    hists = [rng.random(170).astype(np.float32) for _ in range(4)] + [np.zeros(170, np.float32)]
+    expected = [[cv2.compareHist(a, b, cv2.HISTCMP_CORREL) for b in hists] for a in hists]
+    assert np.allclose(correlation_matrix(hists, hists), expected)
+    assert np.allclose(correlation_matrix(hists[1], hists), expected[1])
+
+    # A 3-D histogram reaches compareHist as a 12-channel 12x12 image
+    cubes = [rng.random((12, 12, 12)).astype(np.float32) ** 4 for _ in range(3)]
+    expected = [[cv2.compareHist(a, b, cv2.HISTCMP_CORREL) for b in cubes] for a in cubes]
+    assert np.allclose(correlation_matrix(cubes, cubes, samples=144), expected)
+
+    vectors = [rng.random(64).astype(np.float32) for _ in range(3)]
+    unit = [v / (np.linalg.norm(v) + 1e-8) for v in vectors]
+    assert np.allclose(cosine_matrix(vectors, vectors), [[np.dot(a, b) for b in unit] for a in unit], atol=1e-6)
+
+    refs, candidates = _gray_images(2, 1), _gray_images(3, 2) + [np.full((96, 80), 9, np.uint8)]
+    expected = [[structural_similarity(a, b) for b in candidates] for a in refs]
+    assert np.allclose(ssim_matrix(refs, candidates), expected, atol=1e-9)
+    assert np.allclose(ssim_matrix(refs[0], candidates), expected[0], atol=1e-9)
+
+
+def test_batch_scores_match_pairwise_scores():
+    rng = np.random.default_rng(3)
+    images = [cv2.resize(rng.integers(0, 256, (30, 25, 3), dtype=np.uint8), (250, 300)) for _ in range(4)]
+    features = [extract_features(image) for image in images]
+    batch = compare_features_batch(features[0], features, verbose=False)
+    pairwise = [compare_features(features[0], other, verbose=False) for other in features]
+    assert batch == pytest.approx(pairwise)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Tests for the incremental CSV comparison cache (row fingerprints, scoring versions and cached matches)."""
+
+import time
+
+from compare_cache import (CompareResultCache, cached_match, compare_cache_path, compare_fingerprint,
+                           result_set_version, row_key)
+
+EBAY = [{'product_url': 'https://ebay.com/itm/1', 'main_image': 'https://i.ebayimg.com/1.jpg', 'current_price': '$20'},
+        {'product_url': 'https://ebay.com/itm/2', 'main_image': 'https://i.ebayimg.com/2.jpg', 'current_price': '$35'}]
+
+
+def test_fingerprint_changes_with_price_image_and_results(tmp_path):
+    image = tmp_path / 'item.jpg'
+    image.write_bytes(b'\xff\xd8first')
+    row = {'product_url': 'https://order.mandarake.co.jp/1', 'price': '1,000', 'local_image': str(image)}
+    version = result_set_version(EBAY)
+    fingerprint = compare_fingerprint(row, version)
+
+    assert result_set_version(list(reversed(EBAY))) == version
+    assert compare_fingerprint(dict(row), version) == fingerprint
+    assert compare_fingerprint(dict(row, price='900'), version) != fingerprint
+    assert compare_fingerprint(row, result_set_version(EBAY[:1])) != fingerprint
+    assert compare_fingerprint(row, result_set_version([dict(EBAY[0], current_price='$25'), EBAY[1]])) != fingerprint
+
+    image.write_bytes(b'\xff\xd8second')
+    assert compare_fingerprint(row, version) != fingerprint
+
+
+def test_scoring_settings_are_part_of_the_version():
+    scoring = {'method': 'batch', 'feature_version': 2, 'matches_per_item': 0}
+    version = result_set_version(EBAY, scoring)
+
+    assert result_set_version(EBAY, dict(reversed(list(scoring.items())))) == version
+    assert result_set_version(EBAY, dict(scoring, matches_per_item=5)) != version
+    assert result_set_version(EBAY, dict(scoring, feature_version=3)) != version
+    assert result_set_version(EBAY, dict(scoring, method='individual')) != version
+
+
+def test_cached_matches_are_priced_at_the_current_rate():
+    from gui.workers import _cached_comparison_results
+
+    row = {'product_url': 'https://order.mandarake.co.jp/1', 'title': 'figure', 'price': '1,500'}
+    cached = [cached_match(EBAY[0], 80.5)]
+
+    at_150 = _cached_comparison_results(row, cached, 150.0)
+    at_100 = _cached_comparison_results(row, cached, 100.0)
+    assert at_150[0]['similarity'] == at_100[0]['similarity'] == 80.5
+    assert at_150[0]['ebay_link'] == EBAY[0]['product_url']
+    assert round(at_150[0]['profit_margin'], 1) == 100.0
+    assert round(at_100[0]['profit_margin'], 1) == 33.3
+
+
+def test_cached_matches_persist_until_changed_or_expired(tmp_path):
+    path = compare_cache_path(tmp_path / 'results.csv')
+    assert path.name == 'results.compare.json'
+    row = {'product_url': 'https://order.mandarake.co.jp/1', 'price': '1,000'}
+    matches = [cached_match(EBAY[0], 80.5)]
+
+    cache = CompareResultCache(path)
+    cache.put(row_key(row), 'fp1', matches)
+    cache.put('no-matches', 'fp2', [])
+    cache.save()
+
+    reloaded = CompareResultCache(path)
+    assert reloaded.get(row_key(row), 'fp1') == matches
+    assert reloaded.get('no-matches', 'fp2') == []
+    assert reloaded.get(row_key(row), 'other') is None
+    assert reloaded.get('unknown', 'fp1') is None
+
+    expired = CompareResultCache(path, max_age_hours=0)
+    time.sleep(0.01)
+    assert expired.get(row_key(row), 'fp1') is None
+
+    reloaded.clear()
+    assert not path.exists() and len(CompareResultCache(path)) == 0
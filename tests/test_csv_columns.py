@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for the columnar CSV model (typed columns, mask filters, per-file-version cache, sidecar files)."""
+
+import csv
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from csv_columns import CSVColumns, load_csv_columns, read_sidecar, remember_csv_columns, sidecar_path
+
+NOW = datetime(2025, 10, 4, 12, 0)
+FIELDS = ['title', 'price_text', 'in_stock', 'category', 'first_seen', 'ebay_compared']
+
+
+def _write_csv(csv_path, rows):
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _rows():
+    return [
+        {'title': 'a', 'price_text': '160999.0', 'in_stock': 'True', 'category': 'Photobook',
+         'first_seen': (NOW - timedelta(hours=2)).isoformat(), 'ebay_compared': ''},
+        {'title': 'b', 'price_text': '¥1,234', 'in_stock': 'no', 'category': 'Figure',
+         'first_seen': (NOW - timedelta(hours=30)).isoformat(), 'ebay_compared': NOW.isoformat()},
+        {'title': 'c', 'price_text': '', 'in_stock': 'yes', 'category': 'Photobook',
+         'first_seen': 'not a date', 'ebay_compared': ''},
+    ]
+
+
+def test_filters_are_masks_over_typed_columns():
+    columns = CSVColumns(_rows())
+    now = NOW.timestamp()
+
+    assert columns.select(in_stock_only=True).tolist() == [0, 2]
+    assert columns.select(listed_within_hours=24, now=now).tolist() == [0]
+    assert columns.select(not_compared_only=True).tolist() == [0, 2]
+    assert columns.select(category='Photobook', listed_within_hours=48, now=now).tolist() == [0]
+    assert columns.select(category='Unknown').tolist() == []
+
+    assert columns.display_price(0) == '¥160,999'
+    assert columns.display_price(1) == '¥1,234' and columns.price[1] == 1234
+    assert np.isnan(columns.price[2])
+
+    # Rows edited in place are re-typed on request
+    columns.rows[2]['ebay_compared'] = NOW.isoformat()
+    columns.update_rows([2])
+    assert columns.select(not_compared_only=True).tolist() == [0]
+
+
+def test_columns_are_cached_per_file_version(tmp_path):
+    csv_path = tmp_path / 'results.csv'
+    _write_csv(csv_path, _rows())
+
+    columns = load_csv_columns(csv_path)
+    assert len(columns) == 3
+    assert load_csv_columns(csv_path) is columns
+
+    # A changed file is parsed again
+    with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+        csv.DictWriter(f, fieldnames=FIELDS).writerow(dict(_rows()[0], title='d'))
+    os.utime(csv_path, ns=(1, 1))
+    reloaded = load_csv_columns(csv_path)
+    assert reloaded is not columns and len(reloaded) == 4
+
+    # Columns a file was just written from are reused
+    edited = CSVColumns(reloaded.rows[:2])
+    os.utime(csv_path, ns=(2, 2))
+    remember_csv_columns(csv_path, edited)
+    assert load_csv_columns(csv_path) is edited
+
+
+def test_sidecar_restores_rows_and_columns_of_the_same_file_version(tmp_path):
+    csv_path = tmp_path / 'results.csv'
+    _write_csv(csv_path, _rows())
+    parsed = load_csv_columns(csv_path)
+    assert sidecar_path(csv_path).name == 'results.csvcol'
+
+    stat = csv_path.stat()
+    restored = read_sidecar(csv_path, (stat.st_size, stat.st_mtime_ns))
+    assert restored.rows == parsed.rows
+    for name in CSVColumns.TYPED_COLUMNS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(parsed, name))
+    assert restored.select(category='Photobook').tolist() == [0, 2]
+    assert restored.display_price(0) == '¥160,999'
+
+    # Restored columns can still be updated in place
+    restored.rows[0]['ebay_compared'] = NOW.isoformat()
+    restored.update_rows([0])
+    assert restored.select(not_compared_only=True).tolist() == [2]
+
+    # A sidecar of another file version is ignored
+    assert read_sidecar(csv_path, (stat.st_size, stat.st_mtime_ns + 1)) is None
+    assert read_sidecar(tmp_path / 'missing.csv', (0, 0)) is None
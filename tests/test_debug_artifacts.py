@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests for the background debug-artifact writer and run manifests."""
+
+import json
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from debug_artifacts import ArtifactWriter, DebugRun
+
+IMAGE = np.full((32, 24, 3), 200, np.uint8)
+JPEG = cv2.imencode('.jpg', IMAGE)[1].tobytes()
+PNG = cv2.imencode('.png', IMAGE)[1].tobytes()
+
+
+def test_full_run_copies_encoded_bytes_and_writes_manifest(tmp_path):
+    """JPEG bytes are copied as is; other formats are re-encoded to the file's format."""
+    writer = ArtifactWriter()
+    run = DebugRun('gundam figure', level='full', root=str(tmp_path), writer=writer)
+    run.save_image('ebay_01_a.jpg', IMAGE, data=JPEG, url='http://example.com/a.jpg')
+    run.save_image('ebay_02_b.jpg', IMAGE, data=PNG)
+    run.record(ebay_item=1, similarity=91.5)
+    manifest_path = run.close(results=2)
+    assert writer.flush(timeout=10)
+
+    assert run.folder.parent == tmp_path
+    assert (run.folder / 'ebay_01_a.jpg').read_bytes() == JPEG
+    assert (run.folder / 'ebay_02_b.jpg').read_bytes()[:2] == b'\xff\xd8'
+
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    assert manifest['level'] == 'full'
+    assert manifest['summary'] == {'results': 2}
+    assert [image['file'] for image in manifest['images']] == ['ebay_01_a.jpg', 'ebay_02_b.jpg']
+    assert manifest['images'][0]['url'] == 'http://example.com/a.jpg'
+    assert manifest['records'] == [{'ebay_item': 1, 'similarity': 91.5}]
+
+
+def test_summary_writes_only_the_manifest_and_off_writes_nothing(tmp_path):
+    writer = ArtifactWriter()
+    summary = DebugRun('query', level='summary', root=str(tmp_path / 'summary'), writer=writer)
+    summary.save_image('ebay_01.jpg', IMAGE)
+    summary.close()
+    assert writer.flush(timeout=10)
+    assert sorted(path.name for path in summary.folder.iterdir()) == ['manifest.json']
+
+    off = DebugRun('query', level='off', root=str(tmp_path / 'off'), writer=writer)
+    off.save_image('ebay_01.jpg', IMAGE)
+    assert off.close() is None
+    assert off.folder is None and not (tmp_path / 'off').exists()
+
+
+def test_full_queue_drops_images_instead_of_blocking(tmp_path):
+    writer = ArtifactWriter(max_queue_mb=0)
+    run = DebugRun('query', level='full', root=str(tmp_path), writer=writer)
+    with writer._cond:
+        # Hold the writer thread back so both images are queued together
+        run.save_image('ebay_01.jpg', data=JPEG)
+        run.save_image('ebay_02.jpg', data=JPEG)
+    assert writer.flush(timeout=10)
+    assert run.dropped == 1
+    assert (run.folder / 'ebay_01.jpg').exists() and not (run.folder / 'ebay_02.jpg').exists()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""Check the eBay search page parsers against the recorded golden output."""
+
+import pytest
+
+pytest.importorskip('scrapy')
+pytest.importorskip('bs4')
+pytest.importorskip('cv2')
+
+from benchmarks.ebay_parsers import PARSER_LAYOUTS, check_golden, empty_golden_problems, find_fixtures
+
+
+def test_parsers_match_golden_output():
+    """Every parser extracts exactly the recorded items from every saved page of its layout."""
+    if not find_fixtures():
+        pytest.skip('no saved eBay pages')
+    assert check_golden() == {}
+
+
+def test_legacy_layout_parsers_have_a_page_to_parse():
+    assert find_fixtures('s-item')
+    assert set(PARSER_LAYOUTS.values()) == {'s-card', 's-item'}
+
+
+def test_empty_golden_output_is_a_failure():
+    assert empty_golden_problems({'page.html': []})
+    assert not empty_golden_problems({'page.html': [], 'other.html': [{'product_id': '1'}]})
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Tests for the eBay search result cache (TTL states, depth upgrades, complete flag, eviction, isolation, batched saves)."""
+
+import json
+import threading
+import time
+
+from ebay_search_cache import SearchResultCache
+from ebay_search_service import CrawlResult
+
+
+def _items(*ids):
+    return [{'product_id': str(i), 'product_title': f'item {i}'} for i in ids]
+
+
+class Fetcher:
+    """Search function stub that records the depths it was called with."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, depth):
+        self.calls.append(depth)
+        self.called.set()
+        return self.results(depth) if callable(self.results) else self.results
+
+
+def _age(cache, query, seconds, source='scrapy', sold=True):
+    cache._entries[cache.make_key(source, query, sold)]['fetched_at'] -= seconds
+
+
+def test_fresh_stale_and_expired_entries():
+    cache = SearchResultCache(cache_file=None, sold_ttl_hours=1, stale_hours=1)
+    fetch = Fetcher(_items(1, 2, 3))
+
+    assert cache.get_or_fetch('scrapy', 'Yura  Kano', 3, True, fetch) == _items(1, 2, 3)
+    # Fresh: served from cache, normalized query
+    assert cache.get_or_fetch('scrapy', 'yura kano', 2, True, fetch) == _items(1, 2)
+    assert fetch.calls == [3]
+
+    # Stale: served at once, refreshed in the background at the entry's depth
+    _age(cache, 'yura kano', 1.5 * 3600)
+    fetch.called.clear()
+    fetch.results = _items(4, 5, 6)
+    assert cache.get_or_fetch('scrapy', 'yura kano', 3, True, fetch) == _items(1, 2, 3)
+    assert fetch.called.wait(5)
+    for _ in range(100):
+        if cache.lookup('scrapy', 'yura kano', 3, True):
+            break
+        time.sleep(0.05)
+    assert cache.lookup('scrapy', 'yura kano', 3, True) == _items(4, 5, 6)
+    assert fetch.calls == [3, 3]
+
+    # Expired: fetched again before returning
+    _age(cache, 'yura kano', 3 * 3600)
+    assert cache.lookup('scrapy', 'yura kano', 3, True) is None
+    fetch.results = _items(7)
+    assert cache.get_or_fetch('scrapy', 'yura kano', 3, True, fetch) == _items(7)
+    assert cache.get_stats() == {'fresh': 1, 'stale': 0, 'expired': 0, 'total': 1}
+
+
+def test_deeper_request_extends_the_entry_and_keeps_cached_extras():
+    cache = SearchResultCache(cache_file=None)
+    cache.get_or_fetch('scrapy', 'q', 2, True, Fetcher(_items(1, 2)))
+
+    deeper = Fetcher(_items(2, 3, 4))
+    assert cache.get_or_fetch('scrapy', 'q', 4, True, deeper) == _items(2, 3, 4, 1)
+    assert deeper.calls == [4]
+    assert cache.lookup('scrapy', 'q', 4, True) == _items(2, 3, 4, 1)
+    # Deeper than anything fetched so far: not served from cache
+    assert cache.lookup('scrapy', 'q', 5, True) is None
+
+
+def test_only_exhausted_searches_are_complete():
+    cache = SearchResultCache(cache_file=None)
+
+    # A short result set alone is not proof that eBay has no more results
+    cache.get_or_fetch('scrapy', 'short', 10, True, Fetcher(_items(1, 2)))
+    assert cache.lookup('scrapy', 'short', 20, True) is None
+
+    # The spider ran out of pages: the entry serves any depth
+    exhausted = Fetcher(CrawlResult(_items(1, 2), exhausted_queries=['Yura Kano']))
+    cache.get_or_fetch('scrapy', 'yura  kano', 10, True, exhausted)
+    assert cache.lookup('scrapy', 'yura kano', 50, True) == _items(1, 2)
+    assert cache.get_or_fetch('scrapy', 'yura kano', 50, True, exhausted) == _items(1, 2)
+    assert exhausted.calls == [10]
+
+    cache.store('scrapy', 'batch', 10, True, _items(3), complete=True)
+    assert cache.lookup('scrapy', 'batch', 40, True) == _items(3)
+
+
+def test_timed_out_and_empty_results_are_not_cached():
+    cache = SearchResultCache(cache_file=None)
+
+    partial = Fetcher(CrawlResult(_items(1), timed_out=True, exhausted_queries=['q']))
+    assert cache.get_or_fetch('scrapy', 'q', 10, True, partial) == _items(1)
+    assert cache.lookup('scrapy', 'q', 1, True) is None
+
+    assert cache.get_or_fetch('scrapy', 'q', 10, True, Fetcher([])) == []
+    assert cache.get_or_fetch_value('api', 'q', True, lambda: {'error': 'down'}) == {'error': 'down'}
+    assert cache.get_stats()['total'] == 0
+
+    # A timed-out deeper fetch is returned, but the cached entry stays as it was
+    cache.get_or_fetch('scrapy', 'q', 2, True, Fetcher(_items(1, 2)))
+    timed_out = Fetcher(CrawlResult(_items(3), timed_out=True))
+    assert cache.get_or_fetch('scrapy', 'q', 4, True, timed_out) == _items(3, 1, 2)
+    assert cache.lookup('scrapy', 'q', 4, True) is None
+    assert cache.lookup('scrapy', 'q', 2, True) == _items(1, 2)
+
+
+def test_oldest_entries_are_evicted():
+    cache = SearchResultCache(cache_file=None, max_entries=2)
+    for age, query in enumerate(['a', 'b', 'c']):
+        cache.store('scrapy', query, 1, True, _items(query))
+        _age(cache, query, 100 - age)
+
+    assert cache.lookup('scrapy', 'a', 1, True) is None
+    assert cache.lookup('scrapy', 'b', 1, True) == _items('b')
+    assert cache.lookup('scrapy', 'c', 1, True) == _items('c')
+
+
+def test_returned_results_are_isolated_from_the_cache():
+    cache = SearchResultCache(cache_file=None)
+    fetched = _items(1, 2)
+
+    # The caller's objects are copied in...
+    returned = cache.get_or_fetch('scrapy', 'q', 2, True, Fetcher(fetched))
+    returned[0]['similarity'] = 99
+    fetched.append({'product_id': '3'})
+
+    # ...and copied out
+    hit = cache.get_or_fetch('scrapy', 'q', 2, True, Fetcher([]))
+    hit[1]['ebay_price'] = 10
+    looked_up = cache.lookup('scrapy', 'q', 2, True)
+    looked_up[0]['product_title'] = 'edited'
+
+    assert cache.lookup('scrapy', 'q', 2, True) == _items(1, 2)
+
+    summary = cache.get_or_fetch_value('api', 'q', True, lambda: {'median': 10, 'prices': [9, 11]})
+    summary['prices'].append(100)
+    assert cache.get_or_fetch_value('api', 'q', True, lambda: None) == {'median': 10, 'prices': [9, 11]}
+
+
+def test_stores_are_written_once_per_flush(tmp_path):
+    cache_file = tmp_path / 'search_cache.json'
+    cache = SearchResultCache(cache_file=str(cache_file), flush_delay=60)
+    for query in ['a', 'b', 'c']:
+        cache.store('scrapy', query, 1, True, _items(query))
+
+    # Nothing is written until the flush
+    assert not cache_file.exists()
+    cache.flush()
+    assert len(json.loads(cache_file.read_text(encoding='utf-8'))) == 3
+
+    reloaded = SearchResultCache(cache_file=str(cache_file))
+    assert reloaded.lookup('scrapy', 'b', 1, True) == _items('b')
+
+    # The timer flushes on its own
+    timed = SearchResultCache(cache_file=str(cache_file), flush_delay=0.05)
+    timed.invalidate(source='scrapy', query='a')
+    for _ in range(100):
+        if len(json.loads(cache_file.read_text(encoding='utf-8'))) == 2:
+            break
+        time.sleep(0.05)
+    assert sorted(json.loads(cache_file.read_text(encoding='utf-8'))) == ['scrapy|sold|b', 'scrapy|sold|c']
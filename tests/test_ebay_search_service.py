@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests for the persistent Scrapy crawler service (timeouts, cancellation, exhausted queries, restarts)."""
+
+import textwrap
+
+import pytest
+
+pytest.importorskip('scrapy')
+
+from ebay_search_service import CrawlResult, EbaySearchService, SearchServiceError, SearchTimeoutError
+
+SETTINGS = """
+    BOT_NAME = 'svcproj'
+    SPIDER_MODULES = ['svcproj.spiders']
+    ROBOTSTXT_OBEY = False
+    TELNETCONSOLE_ENABLED = False
+    LOG_LEVEL = 'ERROR'
+    TWISTED_REACTOR = 'twisted.internet.asyncioreactor.AsyncioSelectorReactor'
+"""
+
+# Offline spiders: pages are data: URLs, 'slow' waits between pages
+SPIDERS = """
+    import scrapy
+
+
+    class PagesSpider(scrapy.Spider):
+        name = 'pages'
+
+        def __init__(self, query='q', pages=3, **kwargs):
+            super().__init__(**kwargs)
+            self.query = query
+            self.pages = int(pages)
+            self.exhausted_queries = set()
+
+        start_urls = ['data:,0']
+
+        def parse(self, response):
+            page = int(response.text)
+            yield {'page': page, 'search_query': self.query}
+            if page + 1 < self.pages:
+                yield scrapy.Request(f'data:,{page + 1}', dont_filter=True)
+            else:
+                self.exhausted_queries.add(self.query)
+
+
+    class SlowSpider(PagesSpider):
+        name = 'slow'
+        custom_settings = {'DOWNLOAD_DELAY': 5, 'RANDOMIZE_DOWNLOAD_DELAY': False}
+"""
+
+
+@pytest.fixture
+def service(tmp_path):
+    package = tmp_path / 'svcproj'
+    (package / 'spiders').mkdir(parents=True)
+    (package / '__init__.py').write_text('')
+    (package / 'settings.py').write_text(textwrap.dedent(SETTINGS))
+    (package / 'spiders' / '__init__.py').write_text(textwrap.dedent(SPIDERS))
+
+    service = EbaySearchService(tmp_path, 'svcproj.settings', max_concurrent_jobs=2)
+    yield service
+    service.stop()
+
+
+def test_finished_crawl_reports_exhausted_queries(service):
+    result = service.crawl('pages', timeout=30, query='yura kano', pages=3)
+
+    assert isinstance(result, CrawlResult)
+    assert [item['page'] for item in result] == [0, 1, 2]
+    assert not result.timed_out
+    assert result.exhausted_queries == {'yura kano'}
+
+
+def test_timeout_is_reported_and_the_service_keeps_running(service):
+    # The first page arrives, the second is 5 s away
+    with pytest.raises(SearchTimeoutError):
+        for _ in service.stream('slow', timeout=2, pages=5):
+            pass
+
+    result = service.crawl('slow', timeout=2, pages=5)
+    assert result.timed_out
+    assert [item['page'] for item in result] == [0]
+    assert not result.exhausted_queries
+
+    # Timed-out jobs are stopped in the child (after their pending page), which still runs new jobs
+    assert service.is_alive()
+    assert len(service.crawl('pages', timeout=30, pages=2)) == 2
+
+
+def test_jobs_fail_when_the_child_dies_and_the_next_job_restarts_it(service):
+    assert service.start()
+    first_pid = service._process.pid
+
+    items = service.stream('slow', timeout=30, pages=5)
+    assert next(items)['page'] == 0
+    service._process.kill()
+    with pytest.raises(SearchServiceError) as error:
+        next(items)
+    assert not isinstance(error.value, SearchTimeoutError)
+
+    result = service.crawl('pages', timeout=30, pages=2)
+    assert len(result) == 2 and not result.timed_out
+    assert service._process.pid != first_pid
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Test the persistent image feature store."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from feature_store import FeatureStore, image_content_hash
+from image_features import compare_features, extract_features, features_from_arrays, features_to_arrays
+
+
+def _image(seed: int) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    image = np.full((200, 160, 3), 255, np.uint8)
+    for _ in range(20):
+        x, y = rng.randint(0, 140), rng.randint(0, 180)
+        color = tuple(int(c) for c in rng.randint(0, 255, 3))
+        cv2.circle(image, (x, y), rng.randint(5, 30), color, -1)
+    return image
+
+
+def test_roundtrip_preserves_scores(tmp_path):
+    """Features loaded from disk score exactly like freshly extracted ones."""
+    store = FeatureStore(str(tmp_path), max_size_mb=50)
+    ref, other = _image(1), _image(2)
+    extract = lambda img: features_to_arrays(extract_features(img))
+
+    fresh = compare_features(extract_features(ref), extract_features(other), use_ransac=True)
+    store.get_or_extract(ref, 'compare', 1, extract)
+    store.get_or_extract(other, 'compare', 1, extract)
+
+    # A new instance only sees what is on disk
+    store = FeatureStore(str(tmp_path), max_size_mb=50)
+    calls = []
+    loaded = [features_from_arrays(store.get_or_extract(img, 'compare', 1, lambda i: calls.append(i)))
+              for img in (ref, other)]
+    assert calls == []
+    assert compare_features(loaded[0], loaded[1], use_ransac=True) == fresh
+
+
+def test_template_pyramid_is_rebuilt_not_stored():
+    features = extract_features(_image(1))
+    arrays = features_to_arrays(features)
+    assert sorted(arrays) == ['descriptors', 'gray', 'hist', 'keypoints']
+
+    loaded = features_from_arrays(arrays)
+    assert len(loaded.templates) == len(features.templates)
+    for template, expected in zip(loaded.templates, features.templates):
+        np.testing.assert_array_equal(template, expected)
+
+
+def test_lru_eviction_by_size(tmp_path):
+    store = FeatureStore(str(tmp_path), max_size_mb=0.35)
+    arrays = {'data': np.zeros(100 * 1024, np.uint8)}
+    for name in ('a', 'b', 'c'):
+        store.put(name, arrays)
+    store.get('a')  # 'b' becomes least recently used
+    store.put('d', arrays)
+    assert store.get('b') is None
+    assert store.get('a') is not None
+    assert store.get_stats()['size_mb'] <= 0.35
+
+
+def test_content_hash_ignores_array_identity():
+    image = _image(3)
+    assert image_content_hash(image) == image_content_hash(image.copy())
+    assert image_content_hash(image) != image_content_hash(_image(4))
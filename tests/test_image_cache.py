@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for the shared content-addressed image download cache."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from image_cache import ImageCache, image_extension
+
+JPEG = cv2.imencode('.jpg', np.full((64, 48, 3), 128, np.uint8))[1].tobytes()
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    requests = []
+    user_agents = []
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        type(self).user_agents.append(self.headers.get('User-Agent'))
+        time.sleep(0.1)
+        if self.path.startswith('/missing'):
+            self.send_error(404)
+            return
+        # /same/<n> all return the same picture, anything else a unique one
+        body = JPEG if self.path.startswith('/same') else JPEG + self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _ImageHandler.requests = []
+    _ImageHandler.user_agents = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_downloads_once_and_stores_each_image_once(server, tmp_path):
+    """Concurrent requests share one download; identical bytes share one file."""
+    cache = ImageCache(cache_dir=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(cache.get_bytes, [f"{server}/same/1"] * 4))
+    assert results == [JPEG] * 4
+    assert _ImageHandler.requests == ['/same/1']
+
+    assert cache.get_bytes(f"{server}/same/2") == JPEG
+    assert cache.get_image(f"{server}/same/2").shape == (64, 48, 3)
+    assert cache.get_bytes(f"{server}/missing.jpg") is None
+    assert len(list(tmp_path.glob('*.img'))) == 1
+    assert image_extension(JPEG) == '.jpg'
+
+    # A new instance finds the URLs on disk without downloading them again
+    reopened = ImageCache(cache_dir=str(tmp_path))
+    assert reopened.lookup(f"{server}/same/1") == JPEG
+    assert _ImageHandler.requests == ['/same/1', '/same/2', '/missing.jpg']
+
+
+def test_downloads_with_the_callers_session(server, tmp_path):
+    """A caller's session (cookies, headers) is used for its cache misses."""
+    import requests
+
+    cache = ImageCache(cache_dir=str(tmp_path))
+    session = requests.Session()
+    session.headers['User-Agent'] = 'browser-mimic'
+
+    assert cache.get_bytes(f"{server}/mimic.jpg", session=session) == JPEG + b'/mimic.jpg'
+    assert cache.get_bytes(f"{server}/plain.jpg") == JPEG + b'/plain.jpg'
+    assert _ImageHandler.user_agents[0] == 'browser-mimic'
+    assert _ImageHandler.user_agents[1] != 'browser-mimic'
+
+
+def test_evicts_least_recently_used_over_size_limit(server, tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), max_size_mb=2.5 * len(JPEG) / (1024 * 1024))
+    for name in ('a', 'b'):
+        cache.get_bytes(f"{server}/{name}")
+    cache.get_bytes(f"{server}/a")          # 'a' is now the most recently used
+    cache.get_bytes(f"{server}/c")
+    assert cache.lookup(f"{server}/a") is not None
+    assert cache.lookup(f"{server}/b") is None
+    assert cache.get_stats()['images'] == 2
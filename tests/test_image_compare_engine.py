@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for the process-pool comparison engine (scores, cancellation, top-K ranking)."""
+
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from image_compare_engine import ComparisonEngine, TopKTracker
+from image_features import compare_features, extract_features
+
+
+def _synthetic_images(count, seed):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        image = np.full((240, 200, 3), rng.integers(0, 255, 3), np.uint8)
+        for _ in range(12):
+            x, y = rng.integers(0, 180, 2)
+            image[y:y + 40, x:x + 30] = rng.integers(0, 255, 3)
+        images.append(image)
+    return images
+
+
+def test_process_pool_matches_inline_scores():
+    refs = [extract_features(image) for image in _synthetic_images(3, 1)]
+    candidates = [extract_features(image) for image in _synthetic_images(4, 2)]
+    expected = {(i, j): compare_features(refs[i], candidates[j], verbose=False)
+                for i in range(len(refs)) for j in range(len(candidates))}
+
+    engine = ComparisonEngine(max_workers=2, chunk_size=3)
+    try:
+        results = {(i, j): score for i, j, score in engine.compare_matrix(refs, candidates)}
+        subset = [(0, 1), (2, 3), (1, 0), (2, 0)]
+        partial = {(i, j): score for i, j, score in engine.compare_matrix(refs, candidates, subset)}
+    finally:
+        engine.shutdown()
+
+    assert results.keys() == expected.keys()
+    for pair, score in expected.items():
+        assert results[pair] == pytest.approx(score)
+    assert sorted(partial) == sorted(subset)
+
+
+def test_cancel_stops_scheduling_chunks():
+    refs = [extract_features(image) for image in _synthetic_images(3, 3)]
+    candidates = [extract_features(image) for image in _synthetic_images(4, 4)]
+    cancel = threading.Event()
+
+    engine = ComparisonEngine(max_workers=2, chunk_size=1, chunks_per_worker=1)
+    try:
+        results = []
+        for result in engine.compare_matrix(refs, candidates, cancel=cancel):
+            results.append(result)
+            cancel.set()
+    finally:
+        engine.shutdown()
+
+    # Only the chunks already running when cancelled are reported
+    assert 1 <= len(results) <= 2
+
+
+def test_top_k_tracker_keeps_best_candidates_per_reference():
+    tracker = TopKTracker(k=2)
+    for candidate, score in enumerate([10.0, 50.0, 30.0, 40.0]):
+        tracker.add('a', candidate, score)
+    assert not tracker.add('a', 9, 5.0)
+    tracker.add('b', 0, 1.0)
+
+    assert tracker.ranking('a') == [(50.0, 1), (40.0, 3)]
+    assert tracker.ranking('b') == [(1.0, 0)]
+    assert sorted(tracker) == ['a', 'b']
+    assert len(TopKTracker(k=None).ranking('missing')) == 0
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Test reduced-resolution decoding picks the smallest scale that still covers the target."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from image_decode import decode_image, load_thumbnail, reduction_factor
+
+
+def _encode(width, height, ext='.jpg'):
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode(ext, image)[1].tobytes()
+
+
+def test_reduction_factor():
+    assert reduction_factor((3300, 3300), (400, 400)) == 8
+    assert reduction_factor((1800, 1700), (400, 400)) == 4
+    assert reduction_factor((1700, 900), (400, 400)) == 2
+    assert reduction_factor((500, 375), (400, 400)) == 1
+
+
+def test_decode_image_reduces_large_jpegs_only():
+    assert decode_image(_encode(1800, 1700)).shape == (425, 450, 3)
+    assert decode_image(_encode(1800, 1700), target_size=None).shape == (1700, 1800, 3)
+    assert decode_image(_encode(500, 375)).shape == (375, 500, 3)
+    assert decode_image(_encode(1800, 1700, '.png')).shape == (1700, 1800, 3)
+    assert decode_image(b'not an image') is None
+
+
+def test_load_thumbnail_fits_size():
+    thumbnail = load_thumbnail(_encode(1600, 1200), 150)
+    assert max(thumbnail.size) == 150
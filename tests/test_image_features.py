@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test that precomputed image features can be reused across comparisons."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from image_features import compare_features, compare_features_cascade, extract_features, template_match_score
+
+
+def _synthetic_image(seed: int) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    image = np.full((300, 240, 3), 255, np.uint8)
+    for _ in range(25):
+        x, y = rng.randint(0, 220), rng.randint(0, 280)
+        color = tuple(int(c) for c in rng.randint(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + rng.randint(10, 60), y + rng.randint(10, 60)), color, -1)
+    return image
+
+
+def test_reused_features_give_same_scores():
+    """Scoring a reference bundle against many images matches fresh extraction."""
+    ref = _synthetic_image(0)
+    others = [_synthetic_image(seed) for seed in range(1, 4)] + [ref.copy()]
+    ref_features = extract_features(ref)
+    for other in others:
+        other_features = extract_features(other)
+        for use_ransac in (False, True):
+            reused = compare_features(ref_features, other_features, use_ransac)
+            fresh = compare_features(extract_features(ref), extract_features(other), use_ransac)
+            assert reused == fresh
+
+
+def test_identical_image_scores_highest():
+    ref_features = extract_features(_synthetic_image(0))
+    same = compare_features(ref_features, extract_features(_synthetic_image(0)))
+    different = compare_features(ref_features, extract_features(_synthetic_image(7)))
+    assert same > different
+    assert same >= 90
+
+
+def test_template_cascade_matches_exhaustive_search():
+    """The coarse-to-fine matcher finds the same peak and never scores higher."""
+    ref_features = extract_features(_synthetic_image(0))
+    for seed in range(0, 4):
+        other_features = extract_features(_synthetic_image(seed))
+        exhaustive = template_match_score(ref_features, other_features, exhaustive=True)
+        cascade = template_match_score(ref_features, other_features)
+        assert cascade <= exhaustive + 1e-4
+        assert cascade == pytest.approx(exhaustive, abs=0.02)
+
+
+def test_cascade_decides_like_the_full_score():
+    ref_features = extract_features(_synthetic_image(0))
+    for seed in (0, 1, 2):
+        other_features = extract_features(_synthetic_image(seed))
+        for use_ransac in (False, True):
+            full = compare_features(ref_features, other_features, use_ransac, verbose=False)
+            for threshold in (30.0, 70.0):
+                cascade = compare_features_cascade(ref_features, other_features, threshold, use_ransac)
+                assert cascade.passed == (full >= threshold)
+                assert cascade.lower - 1e-9 <= full <= cascade.upper + 1e-9
+            resolved = compare_features_cascade(ref_features, other_features, 0.0, use_ransac, resolve_matches=True)
+            assert resolved.exact and resolved.score == pytest.approx(full)
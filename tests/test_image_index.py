@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Test the persistent embedding index (exact and IVF search, reload, re-adding keys)."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+import image_index
+from image_index import EMBEDDING_DIM, EmbeddingIndex, compute_embedding
+
+
+def _unit_vectors(count, seed):
+    vectors = np.random.default_rng(seed).normal(size=(count, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_persists_and_supersedes(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_index, 'TRAIN_MIN', 200)
+    vectors = _unit_vectors(600, 0)
+    index = EmbeddingIndex(str(tmp_path), nprobe=64)
+    index.add_many((f"url{i}", vector, {'i': i}) for i, vector in enumerate(vectors))
+    assert index.get_stats()['lists'] > 0
+
+    # Every vector finds itself, before and after reloading from disk
+    for candidate in (index, EmbeddingIndex(str(tmp_path), nprobe=64)):
+        assert len(candidate) == 600
+        for i in (0, 17, 599):
+            similarity, key, metadata = candidate.search(vectors[i], k=3)[0]
+            assert key == f"url{i}" and metadata == {'i': i} and similarity == pytest.approx(1.0)
+
+    # Re-adding a key replaces its entry
+    index.add("url0", vectors[1], {'i': 'moved'})
+    reloaded = EmbeddingIndex(str(tmp_path), nprobe=64)
+    assert len(reloaded) == 600
+    assert {key for _, key, _ in reloaded.search(vectors[0], k=600)} == {f"url{i}" for i in range(600)}
+    assert not any(key == "url0" and similarity > 0.99 for similarity, key, _ in reloaded.search(vectors[0], k=5))
+
+
+def test_embedding_is_unit_length():
+    image = np.random.default_rng(1).integers(0, 256, (120, 90, 3), dtype=np.uint8)
+    embedding = compute_embedding(image)
+    assert embedding.shape == (EMBEDDING_DIM,)
+    assert float(np.linalg.norm(embedding)) == pytest.approx(1.0, abs=1e-5)
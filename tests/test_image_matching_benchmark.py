@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Tests for the image-matching benchmark metrics and manifest."""
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from benchmarks.image_matching import (DEBUG_DIR, MANIFEST_FILE, build_manifest, load_manifest,
+                                       precision_recall, roc_auc)
+
+
+def test_roc_auc_and_precision_recall():
+    """AUC counts ties as half; precision/recall use score >= threshold."""
+    labels = [True, True, False, False, False]
+    assert roc_auc([90, 80, 10, 20, 30], labels) == 1.0
+    assert roc_auc([10, 20, 90, 80, 70], labels) == 0.0
+    assert roc_auc([50, 50, 50, 50, 50], labels) == 0.5
+    assert roc_auc([50, 60], [True, True]) is None
+
+    result = precision_recall([90, 40, 75, 20, 10], labels, 70)
+    assert result['precision'] == 0.5
+    assert result['recall'] == 0.5
+    assert (result['true_positives'], result['false_positives']) == (1, 1)
+
+
+def test_saved_manifest_matches_labels():
+    """The committed manifest is what --build-manifest produces from labels.json."""
+    if not MANIFEST_FILE.exists() or not (DEBUG_DIR / 'labels.json').exists():
+        pytest.skip('no debug_comparison runs')
+    manifest = load_manifest()
+    assert manifest == build_manifest()
+    assert any(pair['match'] for pair in manifest['pairs'])
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Test the BK-tree and candidate prefilter against brute force."""
+
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from image_prefilter import BKTree, CandidatePrefilter, ImageSignature, hamming
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(128) for _ in range(300)]
+    tree = BKTree((h, i) for i, h in enumerate(hashes))
+    for _ in range(20):
+        query = rng.getrandbits(128)
+        distances = sorted(hamming(query, h) for h in hashes)
+        assert [d for d, _ in tree.nearest(query, 5)] == distances[:5]
+        radius = distances[10]
+        assert len(tree.search(query, radius)) == sum(1 for d in distances if d <= radius)
+
+
+def test_guard_keeps_near_duplicates():
+    rng = random.Random(3)
+    color = np.full(128, 1 / 128, np.float32)
+    prefilter = CandidatePrefilter(top_k=2, guard_radius=4)
+    reference = rng.getrandbits(128)
+    for i in range(20):
+        prefilter.add(f'far{i}', ImageSignature(rng.getrandbits(128), color))
+    for i in range(3):
+        prefilter.add(f'near{i}', ImageSignature(reference ^ (1 << i), color))
+    selected = prefilter.select(ImageSignature(reference, color))
+    assert {'near0', 'near1', 'near2'} <= set(selected)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Test the Aho-Corasick keyword matcher against the old linear `in` scan."""
+
+import random
+
+from keyword_matcher import KeywordMatcher, get_matcher
+
+
+def test_matches_like_linear_scan():
+    """Every keyword found by `in` must be found by the automaton (and vice versa)."""
+    rng = random.Random(42)
+    for _ in range(500):
+        keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(6)]
+        text = ''.join(rng.choice('abc') for _ in range(30))
+        expected = {kw for kw in keywords if kw in text}
+        assert set(KeywordMatcher(keywords).find_all(text)) == expected
+
+
+def test_width_and_case_normalization():
+    """Full-width / half-width and case variants match each other."""
+    matcher = KeywordMatcher(['Naruto', 'ﾅﾙﾄ'])
+    assert matcher.find_all('ＮＡＲＵＴＯ ナルト 疾風伝') == ['Naruto', 'ﾅﾙﾄ']
+    assert not matcher.matches_any('One Piece')
+
+
+def test_multiple_texts_do_not_join():
+    """A keyword must not match across the boundary of two texts."""
+    matcher = KeywordMatcher(['ab'])
+    assert not matcher.matches_any('xa', 'bx')
+    assert matcher.matches_any('xa', 'abx')
+
+
+def test_rebuild_only_on_change():
+    """set_keywords() is a no-op for an unchanged keyword list."""
+    matcher = KeywordMatcher(['one', 'two'])
+    assert not matcher.set_keywords(['one', 'two'])
+    assert matcher.set_keywords(['one', 'three'])
+    assert get_matcher(['x', 'y']) is get_matcher(['x', 'y'])
+
+
+if __name__ == '__main__':
+    test_matches_like_linear_scan()
+    test_width_and_case_normalization()
+    test_multiple_texts_do_not_join()
+    test_rebuild_only_on_change()
+    print("[SUCCESS] Keyword matcher tests passed")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Tests for the shared matching core: scorers, reused matchers and the bounded feature cache."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from matching_core import FeatureCache, get_descriptor_matcher, get_scorer
+
+
+def _image(seed):
+    rng = np.random.default_rng(seed)
+    image = cv2.resize(rng.integers(0, 256, (40, 40, 3), dtype=np.uint8), (400, 400),
+                       interpolation=cv2.INTER_NEAREST)
+    return cv2.GaussianBlur(image, (5, 5), 0)
+
+
+def test_feature_cache_evicts_least_recently_used():
+    cache = FeatureCache(max_entries=2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1          # 'a' is now the most recently used
+    cache['c'] = 3
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_scorers_are_shared_and_batch_matches_pairwise():
+    scorer = get_scorer('sold_listing')
+    assert get_scorer('sold_listing') is scorer
+    assert get_descriptor_matcher('bf', True) is get_descriptor_matcher('bf', True)
+
+    ref = scorer.extract(_image(0))
+    candidates = [scorer.extract(_image(seed)) for seed in (0, 1, 2)]
+    batch = scorer.score_batch(ref, candidates)
+    assert batch == pytest.approx([scorer.score(ref, candidate) for candidate in candidates])
+    assert batch[0] == pytest.approx(1.0)
+    assert batch[0] > max(batch[1:])
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Tests for the on-disk rendered thumbnail cache."""
+
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from thumb_cache import ThumbnailCache, render_thumbnail
+
+
+def _jpeg(width, height, color):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_styles_render_to_the_requested_size():
+    data = _jpeg(200, 100, 'red')
+    assert render_thumbnail(data, 56, 'fit').size == (56, 28)
+    assert render_thumbnail(data, 56, 'square').size == (56, 56)
+    framed = render_thumbnail(data, 56, 'square_new')
+    assert framed.size == (56, 56)
+    assert framed.getpixel((0, 0)) == (0x87, 0xCE, 0xEB)
+
+
+def test_thumbnails_are_reused_from_disk_and_follow_file_changes(tmp_path):
+    image_path = tmp_path / 'item.jpg'
+    image_path.write_bytes(_jpeg(120, 160, 'blue'))
+    cache_dir = tmp_path / 'thumbs'
+
+    first = ThumbnailCache(cache_dir=str(cache_dir)).get(str(image_path), 56, 'square')
+    reloaded = ThumbnailCache(cache_dir=str(cache_dir))
+    again = reloaded.get(str(image_path), 56, 'square')
+    assert reloaded.get_stats()['misses'] == 0
+    assert again.tobytes() == first.tobytes()
+
+    # A replaced image file gets a new thumbnail
+    image_path.write_bytes(_jpeg(120, 160, 'green'))
+    os.utime(image_path, ns=(1, 1))
+    changed = reloaded.get(str(image_path), 56, 'square')
+    assert changed.getpixel((28, 28)) != first.getpixel((28, 28))
+
+
+def test_least_recently_used_thumbnails_are_evicted(tmp_path):
+    cache = ThumbnailCache(cache_dir=str(tmp_path), max_size_mb=20000 / (1024 * 1024), memory_entries=0)
+    for shade in range(4):
+        cache.get(_jpeg(80, 80, (shade * 40, 0, 0)), 56, 'square')  # ~9.4 KB each
+    assert cache.get_stats()['thumbnails'] == 2
+    assert sum(path.stat().st_size for path in tmp_path.glob('*.thumb')) <= 20000
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for the virtual Treeview (windowed row materialization and recycling on scroll)."""
+
+from gui.virtual_tree import VirtualTreeview, visible_window
+
+
+class RecordingTree:
+    """Just enough of a ttk.Treeview to follow the items the view creates and deletes."""
+
+    def __init__(self):
+        self.items = []
+        self.inserted = []
+        self.deleted = []
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def delete(self, *iids):
+        self.deleted.extend(iids)
+        self.items = [iid for iid in self.items if iid not in iids]
+
+    def insert(self, parent, index, iid, **options):
+        self.inserted.append(iid)
+        self.items.insert(index, iid)
+
+    def yview_moveto(self, fraction):
+        pass
+
+
+def _view(count, visible=10, overscan=20):
+    tree = RecordingTree()
+    view = VirtualTreeview(tree, None, lambda i: {'text': str(i + 1)}, overscan=overscan)
+    view._visible_rows = lambda: visible
+    view.set_rows(count)
+    return view, tree
+
+
+def test_visible_window_is_clamped_to_the_rows():
+    assert visible_window(0, 10, 50000, 20) == (0, 30)
+    assert visible_window(100, 10, 50000, 20) == (80, 130)
+    assert visible_window(49995, 10, 50000, 20) == (49975, 50000)
+    assert visible_window(0, 10, 5, 20) == (0, 5)
+
+
+def test_only_the_window_is_materialized_and_scrolling_recycles_edge_rows():
+    view, tree = _view(50000)
+    assert tree.items == [str(i) for i in range(30)]
+
+    # Scrolling a few rows stays inside the overscan: nothing is rebuilt
+    tree.inserted.clear()
+    view.yview('scroll', 5, 'units')
+    assert tree.inserted == [] and view.top == 5
+
+    # Past the margin the window moves; rows still in it are kept
+    view.yview('scroll', 10, 'units')
+    assert view.window() == (0, 45)
+    assert tree.inserted == [str(i) for i in range(30, 45)] and tree.deleted == []
+
+    # Jumping with the scrollbar replaces the window, in row order
+    view.yview('moveto', 0.5)
+    start, stop = view.window()
+    assert (start, stop) == (24980, 25030)
+    assert tree.items == [str(i) for i in range(start, stop)]
+
+    # The last page cannot scroll past the end
+    view.yview('moveto', 1.0)
+    assert view.top == 49990 and view.window() == (49970, 50000)
+
+
+def test_new_rows_replace_the_materialized_items():
+    view, tree = _view(50000)
+    view.yview('moveto', 0.5)
+    view.set_rows(12, keep_position=False)
+    assert tree.items == [str(i) for i in range(12)]
@@ -0,0 +1,276 @@
+"""
+Persistent on-disk cache of rendered GUI thumbnails.
+
+The CSV tree re-renders every row thumbnail (decode, LANCZOS resample,
+square canvas, NEW border) on each filter change and column resize, and
+the eBay results tree re-downloads and resamples its thumbnails every time
+results are displayed. Rendered thumbnails are cached instead:
+
+    pil_img = get_thumbnail(local_image_path, 56, style='square_new')
+    pil_img = get_thumbnail(image_bytes, 60)
+
+- Key: the source image (content hash of bytes, or path + size + mtime of
+  a local file) + thumbnail size + style. Resizing the column renders each
+  image once per new size; toggling filters hits the cache.
+- Format: one file per thumbnail - a small header followed by the raw RGB
+  pixels, memory-mapped on read (no decode, no resample).
+- Recently used thumbnails are also kept in memory.
+- Eviction: least recently used files are deleted once the cache grows past
+  its size limit ('general.thumbnail_cache_max_mb').
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from PIL import Image, ImageOps
+
+from image_decode import load_thumbnail
+
+MAGIC = b'THMB1\n'
+HEADER = struct.Struct('<HH')
+
+# style -> (square canvas, border width, border color)
+STYLES = {
+    'fit': (False, 0, None),
+    'square': (True, 0, None),
+    'square_new': (True, 3, '#87CEEB'),
+}
+
+
+def source_key(source: Union[str, Path, bytes]) -> str:
+    """Identity of a thumbnail source: content hash of bytes, or path + size + mtime of a file."""
+    hasher = hashlib.blake2b(digest_size=16)
+    if isinstance(source, bytes):
+        hasher.update(source)
+    else:
+        path = Path(source)
+        stat = path.stat()
+        hasher.update(f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def render_thumbnail(source: Union[str, Path, bytes], size: int, style: str = 'fit') -> Image.Image:
+    """
+    Render a thumbnail (no caching).
+
+    Args:
+        source: File path or encoded image bytes
+        size: Final width and height limit in pixels (border included)
+        style: 'fit' (aspect preserved), 'square' (centered on a white square),
+            'square_new' (square with the light blue NEW border)
+
+    Returns:
+        RGB PIL image
+    """
+    square, border_width, border_color = STYLES[style]
+    # Account for border in final size
+    inner_size = max(1, size - border_width * 2)
+    pil_img = load_thumbnail(source, inner_size).convert('RGB')
+
+    if square:
+        # Center image on square background to prevent horizontal images from overlapping
+        square_img = Image.new('RGB', (inner_size, inner_size), 'white')
+        square_img.paste(pil_img, ((inner_size - pil_img.width) // 2, (inner_size - pil_img.height) // 2))
+        pil_img = square_img
+    if border_width:
+        pil_img = ImageOps.expand(pil_img, border=border_width, fill=border_color)
+    return pil_img
+
+
+class ThumbnailCache:
+    """Size-bounded on-disk cache of rendered thumbnails, with an in-memory LRU in front."""
+
+    def __init__(self, cache_dir: str = "thumb_cache", max_size_mb: float = 256, memory_entries: int = 4096):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the thumbnail files
+            max_size_mb: Least recently used files are evicted above this size
+            memory_entries: Thumbnails kept in memory
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.memory_entries = memory_entries
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, Image.Image]" = OrderedDict()
+        # filename -> [size, last_used]
+        self._index: Dict[str, list] = {}
+        self._total_bytes = 0
+        self._last_stamp = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def _scan(self):
+        """Build the LRU index from the files already on disk."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob('*.thumb'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[path.name] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def _stamp(self) -> float:
+        """Strictly increasing use time, so LRU order is exact even within a clock tick."""
+        self._last_stamp = max(time.time(), self._last_stamp + 1e-6)
+        return self._last_stamp
+
+    @staticmethod
+    def make_key(source: Union[str, Path, bytes], size: int, style: str) -> str:
+        return f"{source_key(source)}.{size}-{style}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.thumb"
+
+    # ------------------------------------------------------------------
+    # Read / write
+    # ------------------------------------------------------------------
+
+    def get(self, source: Union[str, Path, bytes], size: int, style: str = 'fit') -> Image.Image:
+        """
+        Thumbnail of an image, rendered on a cache miss (see render_thumbnail).
+
+        Raises like render_thumbnail when the source can't be read or decoded.
+        """
+        key = self.make_key(source, size, style)
+        with self._lock:
+            pil_img = self._memory.get(key)
+            if pil_img is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pil_img
+
+        pil_img = self._read(key)
+        if pil_img is None:
+            pil_img = render_thumbnail(source, size, style)
+            self._write(key, pil_img)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._memory[key] = pil_img
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return pil_img
+
+    def _read(self, key: str) -> Optional[Image.Image]:
+        path = self._path(key)
+        with self._lock:
+            if path.name not in self._index:
+                return None
+            self._index[path.name][1] = self._stamp()
+
+        try:
+            # Keep recency across restarts (the index is rebuilt from mtimes)
+            os.utime(path)
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped[:len(MAGIC)] != MAGIC:
+                    raise ValueError("bad magic")
+                width, height = HEADER.unpack_from(mapped, len(MAGIC))
+                start = len(MAGIC) + HEADER.size
+                if len(mapped) - start != width * height * 3:
+                    raise ValueError("truncated pixels")
+                return Image.frombytes('RGB', (width, height), mapped[start:])
+        except Exception as e:
+            self.logger.warning(f"Dropping unreadable thumbnail {path.name}: {e}")
+            self._remove(path.name)
+            return None
+
+    def _write(self, key: str, pil_img: Image.Image):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(MAGIC)
+                f.write(HEADER.pack(pil_img.width, pil_img.height))
+                f.write(pil_img.tobytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not write thumbnail {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            previous = self._index.get(path.name)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._index[path.name] = [size, self._stamp()]
+            self._total_bytes += size
+            self._evict()
+
+    def _remove(self, filename: str):
+        with self._lock:
+            entry = self._index.pop(filename, None)
+            if entry:
+                self._total_bytes -= entry[0]
+        try:
+            (self.cache_dir / filename).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for filename in sorted(self._index, key=lambda name: self._index[name][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(filename)
+
+    def clear(self):
+        """Delete every cached thumbnail."""
+        with self._lock:
+            self._memory.clear()
+            for filename in list(self._index):
+                self._remove(filename)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'thumbnails': len(self._index),
+                'in_memory': len(self._memory),
+                'size_mb': self._total_bytes / (1024 * 1024),
+                'max_size_mb': self.max_bytes / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global cache instance
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Get the global thumbnail cache, configured from user settings."""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            try:
+                from settings_manager import get_setting
+                _thumbnail_cache = ThumbnailCache(
+                    max_size_mb=float(get_setting('general.thumbnail_cache_max_mb', 256)))
+            except Exception:
+                _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
+
+
+def get_thumbnail(source: Union[str, Path, bytes], size: int, style: str = 'fit') -> Image.Image:
+    """Thumbnail of an image through the global cache (see ThumbnailCache.get)."""
+    return get_thumbnail_cache().get(source, size, style)